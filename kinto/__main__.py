@@ -34,6 +34,7 @@ def main(args=None):
         "version",
         "create-user",
         "purge-deleted",
+        "process-events",
     )
     subparsers = parser.add_subparsers(
         title="subcommands",
@@ -141,6 +142,14 @@ def main(args=None):
                 help="The maximum number of tombstones to keep per resource and per parent",
                 type=int,
             )
+        elif command == "process-events":
+            subparser.add_argument(
+                "--once",
+                action="store_true",
+                help="Exit once the pending events are delivered",
+                required=False,
+                default=False,
+            )
 
     # Parse command-line arguments
     parsed_args = vars(parser.parse_args(args))
@@ -231,6 +240,10 @@ def main(args=None):
             env, parsed_args["resources"], parsed_args["max-retained"]
         )
 
+    elif which_command == "process-events":
+        env = bootstrap(config_file, options={"command": "process-events"})
+        return core_scripts.process_events(env, once=parsed_args["once"])
+
     elif which_command == "start":
         pserve_argv = ["pserve"]
 
@@ -41,6 +41,7 @@ DEFAULT_SETTINGS = {
     "backoff": None,
     "backoff_percentage": None,
     "batch_max_requests": 25,
+    "batch_parallel_workers": 0,
     "cache_backend": "",
     "cache_hosts": "",
     "cache_url": "",
@@ -77,6 +78,12 @@ DEFAULT_SETTINGS = {
         "kinto.core.events.setup_transaction_hook",
     ),
     "event_listeners": "",
+    "event_listeners_async_workers": 1,
+    "event_listeners_async_batch_size": 100,
+    "event_listeners_async_max_retries": 5,
+    "event_listeners_async_poll_interval_seconds": 1,
+    "event_listeners_async_batch_window_seconds": 0,
+    "resource_events_compact_threshold": 0,
     "json_renderer": "ultrajson",
     "heartbeat_timeout_seconds": 10,
     "newrelic_config": None,
@@ -85,6 +92,7 @@ DEFAULT_SETTINGS = {
     "pagination_token_validity_seconds": 10 * 60,
     "permission_backend": "",
     "permission_url": "",
+    "principals_cache_ttl_seconds": 0,
     "profiler_dir": tempfile.gettempdir(),
     "profiler_enabled": False,
     "project_docs": "",
@@ -8,7 +8,32 @@ from kinto.core.openapi import OpenAPI
 from kinto.core.types import Request
 
 
-class BasicAuthAuthenticationPolicy(base_auth.BasicAuthAuthenticationPolicy):
+class ParentAuthenticationMixin:
+    """Authenticate the subrequests of a batch that carry the credentials of
+    their parent with the userid resolved for it, instead of checking the
+    credentials again.
+    """
+
+    def authenticated_userid(self, request: Request) -> Any:
+        parent = getattr(request, "parent", None)
+        if parent is None or not self._reuses_parent_authentication(request, parent):
+            return super().authenticated_userid(request)  # ty: ignore[unresolved-attribute]
+        if parent.authenticated_userid is None:
+            return None
+        # Set along with ``selected_userid`` when the policy is selected.
+        # See :func:`kinto.core.initialization.setup_authentication()`
+        if getattr(parent, "authn_policy", None) is not self:
+            return None
+        return parent.selected_userid
+
+    def _reuses_parent_authentication(self, request: Request, parent: Request) -> bool:
+        """Whether the `request` is authenticated like its `parent`."""
+        return request.headers.get("Authorization") == parent.headers.get("Authorization")
+
+
+class BasicAuthAuthenticationPolicy(
+    ParentAuthenticationMixin, base_auth.BasicAuthAuthenticationPolicy
+):
     """Basic auth implementation.
 
     Allow any user with any credentials (e.g. there is no need to create an
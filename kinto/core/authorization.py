@@ -1,6 +1,7 @@
 import functools
 import logging
 import re
+import uuid
 from typing import Any
 
 from pyramid.authorization import Authenticated
@@ -21,6 +22,11 @@ PRIVATE = "private"
 # A permission is called "dynamic" when it's computed at request time.
 DYNAMIC = "dynamic"
 
+# Effective principals are cached per user and per version of the groups.
+PRINCIPALS_CACHE_KEY = "principals:{}:{}"
+PRINCIPALS_VERSION_CACHE_KEY = "principals:version"
+PRINCIPALS_VERSION_TTL_SECONDS = 24 * 3600
+
 
 def groupfinder(userid: str, request: Request) -> list:
     """Fetch principals from permission backend for the specified `userid`.
@@ -39,12 +45,60 @@ def groupfinder(userid: str, request: Request) -> list:
     # Query the permission backend only once per request (e.g. batch).
     reify_key = userid + "_principals"
     if reify_key not in request.bound_data:
-        principals = backend.get_user_principals(userid)
+        principals = _get_cached_user_principals(request, backend, userid)
         request.bound_data[reify_key] = principals
 
     return request.bound_data[reify_key]
 
 
+def _get_cached_user_principals(request: Request, backend, userid: str) -> set[str]:
+    """Look up the user principals in the cache backend before querying the
+    permission backend, if ``principals_cache_ttl_seconds`` is enabled.
+    """
+    cache_ttl = _principals_cache_ttl(request)
+    if not cache_ttl:
+        return backend.get_user_principals(userid)
+
+    cache = request.registry.cache
+
+    version = cache.get(PRINCIPALS_VERSION_CACHE_KEY)
+    if version is None:
+        version = invalidate_principals_cache(request)
+
+    cache_key = PRINCIPALS_CACHE_KEY.format(version, userid)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return set(cached)
+
+    principals = backend.get_user_principals(userid)
+    cache.set(cache_key, sorted(principals), ttl=cache_ttl)
+    return principals
+
+
+def invalidate_principals_cache(request: Request) -> str:
+    """Bump the version of the cached users principals.
+
+    This must be called whenever users principals are changed in the permission
+    backend (e.g. groups members). Previously cached entries are not deleted,
+    they are just never read again and will expire.
+
+    :returns: the new version.
+    :rtype: str
+    """
+    version = uuid.uuid4().hex
+    if _principals_cache_ttl(request):
+        cache = request.registry.cache
+        cache.set(PRINCIPALS_VERSION_CACHE_KEY, version, ttl=PRINCIPALS_VERSION_TTL_SECONDS)
+    return version
+
+
+def _principals_cache_ttl(request: Request) -> int:
+    if getattr(request.registry, "cache", None) is None:
+        return 0
+    cache_ttl = int(request.registry.settings.get("principals_cache_ttl_seconds") or 0)
+    return max(cache_ttl, 0)
+
+
 @implementer(IAuthorizationPolicy)
 class AuthorizationPolicy:
     """Default authorization class, that leverages the permission backend
@@ -1,6 +1,11 @@
 import logging
+import math
 import random
-from collections.abc import Callable
+import threading
+import time
+import uuid
+from collections.abc import Callable, Iterable
+from concurrent.futures import Future
 from typing import Any
 
 from pyramid.request import Request
@@ -17,12 +22,18 @@ _HEARTBEAT_TTL_SECONDS = 3600
 _CACHE_HIT_METRIC_KEY = "cache_hits"
 _CACHE_MISS_METRIC_KEY = "cache_misses"
 
+_LOCK_KEY = "lock:{}"
+_LOCK_POLL_SECONDS = 0.05
+
 
 class CacheBase:
     def __init__(self, *args, **kwargs):
         self.prefix = kwargs["cache_prefix"]
         self.max_size_bytes = kwargs.get("cache_max_size_bytes")
         self.set_metrics_backend(kwargs.get("metrics_backend"))
+        # Computations in progress in this process, by key.
+        self._flights: dict[str, Future] = {}
+        self._flights_lock = threading.Lock()
 
     def initialize_schema(self, dry_run: bool = False) -> None:
         """Create every necessary objects (like tables or indices) in the
@@ -80,6 +91,190 @@ class CacheBase:
         """
         raise NotImplementedError
 
+    def pop(self, key: str) -> Any:
+        """Delete the value of the specified `key` and return it.
+
+        Unless the backend cannot guarantee it (e.g. Memcached), only one of
+        the concurrent calls for the same `key` obtains the value. This is
+        suitable for values that must be used only once (e.g. nonces).
+
+        :param str key: key
+        :returns: the deleted value or None if missing.
+        """
+        return self.delete(key)
+
+    def incr(self, key: str, value: int, ttl: float) -> int:
+        """Add `value` to the counter stored with the specified `key` (zero if
+        missing), and set its expiration value to `ttl`.
+
+        Unless the backend cannot guarantee it, concurrent calls for the same
+        `key` are not lost. Counters must only be written with this method.
+
+        :param str key: key
+        :param int value: number to add, possibly negative
+        :param float ttl: expire after number of seconds
+        :returns: the new value of the counter.
+        :rtype: int
+        """
+        count = (self.get(key) or 0) + value
+        self.set(key, count, ttl)
+        return count
+
+    def get_many(self, keys: Iterable[str]) -> dict[str, Any]:
+        """Obtain the values of the specified `keys`.
+
+        Backends override this to fetch all of them in a single round trip.
+
+        :param list keys: keys
+        :returns: the stored values by key, without the missing ones.
+        :rtype: dict
+        """
+        values = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                values[key] = value
+        return values
+
+    def set_many(self, items: dict[str, Any], ttl: float) -> None:
+        """Store several values with the same `ttl`.
+
+        :param dict items: values by key
+        :param float ttl: expire after number of seconds
+        """
+        for key, value in items.items():
+            self.set(key, value, ttl)
+
+    def delete_many(self, keys: Iterable[str]) -> dict[str, Any]:
+        """Delete the values of the specified `keys`.
+
+        :param list keys: keys
+        :returns: the deleted values by key, without the missing ones.
+        :rtype: dict
+        """
+        values = {}
+        for key in keys:
+            value = self.delete(key)
+            if value is not None:
+                values[key] = value
+        return values
+
+    def acquire_lock(self, key: str, ttl: float) -> str | None:
+        """Try to acquire the lock named `key`, shared by every process using
+        the same cache.
+
+        Backends without support for it always grant the lock.
+
+        :param str key: key
+        :param float ttl: release the lock after number of seconds
+        :returns: a token to release the lock with, or ``None`` if held by
+            someone else.
+        :rtype: str
+        """
+        return uuid.uuid4().hex
+
+    def release_lock(self, key: str, token: str) -> None:
+        """Release the lock named `key`, unless it expired and was acquired
+        by someone else meanwhile.
+
+        :param str key: key
+        :param str token: the token returned by :meth:`acquire_lock`
+        """
+
+    def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Any],
+        ttl: float,
+        early_refresh: float = 0,
+        lock_timeout: float = 0,
+    ) -> Any:
+        """Obtain the value of the specified `key`, or compute and store it
+        if missing.
+
+        Concurrent calls for the same `key` in this process share a single
+        call to `compute` and its result (or exception). If `compute` returns
+        ``None``, nothing is stored.
+
+        :param str key: key
+        :param compute: function without arguments returning the value
+        :param float ttl: expire after number of seconds
+        :param float early_refresh: if positive, the value is recomputed before
+            it expires, with a probability increasing as its TTL gets lower
+            than this number of seconds (e.g. the duration of `compute`).
+        :param float lock_timeout: if positive, the other processes sharing
+            the cache wait for the first one to compute the value, for at most
+            this number of seconds, instead of computing it too.
+        :returns: the stored or computed value.
+        """
+        value = self.get(key)
+        if value is not None and not (early_refresh and self._expires_soon(key, early_refresh)):
+            return value
+        stale = value
+
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Future()
+
+        if not leader:
+            if stale is not None:
+                # Being refreshed, keep using the current value meanwhile.
+                return stale
+            return flight.result()
+
+        try:
+            value = self._compute_and_store(key, compute, ttl, lock_timeout, stale)
+        except Exception as e:
+            flight.set_exception(e)
+            raise
+        else:
+            flight.set_result(value)
+        finally:
+            with self._flights_lock:
+                del self._flights[key]
+        return value
+
+    def _expires_soon(self, key: str, early_refresh: float) -> bool:
+        remaining = self.ttl(key)
+        if remaining < 0:
+            return False
+        # Probabilistic early expiration, as in the "XFetch" algorithm.
+        return remaining <= -early_refresh * math.log(1.0 - random.random())
+
+    def _compute_and_store(
+        self,
+        key: str,
+        compute: Callable[[], Any],
+        ttl: float,
+        lock_timeout: float,
+        stale: Any,
+    ) -> Any:
+        lock_key = _LOCK_KEY.format(key)
+        token = None
+        if lock_timeout:
+            token = self.acquire_lock(lock_key, lock_timeout)
+            if token is None:
+                if stale is not None:
+                    # Already being refreshed by another process.
+                    return stale
+                deadline = time.monotonic() + lock_timeout
+                while time.monotonic() < deadline:
+                    time.sleep(_LOCK_POLL_SECONDS)
+                    value = self.get(key)
+                    if value is not None:
+                        return value
+                logger.warning(f"Gave up waiting for {key!r} to be computed.")
+        try:
+            value = compute()
+            if value is not None:
+                self.set(key, value, ttl)
+            return value
+        finally:
+            if token is not None:
+                self.release_lock(lock_key, token)
+
     def set_metrics_backend(self, metrics_backend: Any) -> None:
         """Set a metrics backend via the `CacheMetricsBackend` adapter.
 
@@ -93,22 +288,29 @@ class CacheMetricsBackend:
     A simple adapter for tracking cache-related metrics.
     """
 
-    def __init__(self, metrics_backend: Any, *args, **kwargs):
+    def __init__(self, metrics_backend: Any, *args, tier: str | None = None, **kwargs):
         """Initialize with a given metrics backend.
 
         :param metrics_backend: A metrics backend implementing the IMetricsService interface.
+        :param str tier: An optional name of cache tier, counted in dedicated
+            metrics (e.g. ``cache_local_hits``).
         """
         self._backend = metrics_backend
+        self._hit_key = _CACHE_HIT_METRIC_KEY
+        self._miss_key = _CACHE_MISS_METRIC_KEY
+        if tier:
+            self._hit_key = f"cache_{tier}_hits"
+            self._miss_key = f"cache_{tier}_misses"
 
     def count_hit(self) -> None:
         """Increment the cache hit counter."""
         if self._backend:
-            self._backend.count(key=_CACHE_HIT_METRIC_KEY)
+            self._backend.count(key=self._hit_key)
 
     def count_miss(self) -> None:
         """Increment the cache miss counter."""
         if self._backend:
-            self._backend.count(key=_CACHE_MISS_METRIC_KEY)
+            self._backend.count(key=self._miss_key)
 
 
 def heartbeat(backend: CacheBase) -> Callable[[Request], bool]:
@@ -0,0 +1,133 @@
+"""
+Encoding of the values stored by the network cache backends.
+
+Encoded values start with a header byte, which indicates their format and
+compression. Uncompressed JSON values are written without header, like in
+previous versions, and values without header are read as JSON. Since previous
+versions cannot read the other formats, enable them only once every node of a
+deployment was upgraded.
+"""
+
+import zlib
+from typing import Any
+
+from pyramid.exceptions import ConfigurationError
+
+from kinto.core.utils import json, msgpack, zstandard
+
+
+# Header bytes are control characters, which never start a JSON text.
+FORMAT_JSON = 0x01
+FORMAT_MSGPACK = 0x02
+FORMAT_MASK = 0x03
+
+COMPRESSION_NONE = 0x00
+COMPRESSION_ZLIB = 0x04
+COMPRESSION_ZSTD = 0x10
+COMPRESSION_MASK = 0x1C
+
+DEFAULT_COMPRESSION_THRESHOLD_BYTES = 1024
+
+_FORMATS = {"json": FORMAT_JSON, "msgpack": FORMAT_MSGPACK}
+_COMPRESSIONS = {"": COMPRESSION_NONE, "zlib": COMPRESSION_ZLIB, "zstd": COMPRESSION_ZSTD}
+
+
+class CacheCodec:
+    """Encode values with the specified format, and compress them if larger
+    than `compression_threshold` bytes.
+
+    Any value written with a supported format and compression can be decoded,
+    whatever the codec settings.
+
+    :param str format: ``json`` or ``msgpack``
+    :param str compression: ``zlib``, ``zstd`` or empty to disable
+    :param int compression_threshold: minimum size in bytes to compress
+    """
+
+    def __init__(
+        self,
+        format: str = "json",
+        compression: str = "",
+        compression_threshold: int = DEFAULT_COMPRESSION_THRESHOLD_BYTES,
+    ):
+        if format not in _FORMATS:
+            raise ConfigurationError(f"Unknown cache codec format {format!r}")
+        if compression not in _COMPRESSIONS:
+            raise ConfigurationError(f"Unknown cache codec compression {compression!r}")
+        if format == "msgpack" and msgpack is None:
+            raise ConfigurationError(
+                "msgpack is required by the cache codec: pip install kinto[cache-codecs]"
+            )
+        if compression == "zstd" and zstandard is None:
+            raise ConfigurationError(
+                "zstandard is required by the cache codec: pip install kinto[cache-codecs]"
+            )
+
+        self.format = _FORMATS[format]
+        self.compression = _COMPRESSIONS[compression]
+        self.compression_threshold = compression_threshold
+
+    def encode(self, value: Any) -> bytes:
+        if self.format == FORMAT_MSGPACK:
+            payload = msgpack.packb(value, use_bin_type=True)
+        else:
+            payload = json.dumps(value).encode("utf-8")
+
+        compression = COMPRESSION_NONE
+        if self.compression and len(payload) >= self.compression_threshold:
+            compression = self.compression
+            payload = _compress(compression, payload)
+
+        if self.format == FORMAT_JSON and compression == COMPRESSION_NONE:
+            # Same as previous versions, readable by every node.
+            return payload
+        return bytes([self.format | compression]) + payload
+
+    def decode(self, data: bytes | str) -> Any:
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        header = data[0]
+        if header not in _HEADERS:
+            # Written without header, as plain JSON.
+            return json.loads(data.decode("utf-8"))
+
+        payload = data[1:]
+        compression = header & COMPRESSION_MASK
+        if compression:
+            payload = _decompress(compression, payload)
+
+        if header & FORMAT_MASK == FORMAT_MSGPACK:
+            if msgpack is None:
+                raise ValueError("msgpack is required to decode this cache value")
+            return msgpack.unpackb(payload, raw=False)
+        return json.loads(payload.decode("utf-8"))
+
+
+_HEADERS = {f | c for f in _FORMATS.values() for c in _COMPRESSIONS.values()}
+
+
+def _compress(compression: int, payload: bytes) -> bytes:
+    if compression == COMPRESSION_ZSTD:
+        return zstandard.ZstdCompressor().compress(payload)
+    return zlib.compress(payload)
+
+
+def _decompress(compression: int, payload: bytes) -> bytes:
+    if compression == COMPRESSION_ZSTD:
+        if zstandard is None:
+            raise ValueError("zstandard is required to decode this cache value")
+        return zstandard.ZstdDecompressor().decompress(payload)
+    return zlib.decompress(payload)
+
+
+def create_from_config(config, prefix: str = "") -> CacheCodec:
+    """Cache codec instantiation from settings."""
+    settings = config.get_settings()
+    threshold = settings.get(
+        prefix + "codec_compression_threshold_bytes", DEFAULT_COMPRESSION_THRESHOLD_BYTES
+    )
+    return CacheCodec(
+        format=settings.get(prefix + "codec", "json"),
+        compression=settings.get(prefix + "codec_compression") or "",
+        compression_threshold=int(threshold),
+    )
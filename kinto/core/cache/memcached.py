@@ -1,4 +1,6 @@
 import logging
+import uuid
+from collections.abc import Iterable
 from functools import wraps
 from math import ceil, floor
 from time import time
@@ -8,8 +10,10 @@ from pyramid.config import Configurator
 from pyramid.settings import aslist
 
 from kinto.core.cache import CacheBase
+from kinto.core.cache.codec import CacheCodec
+from kinto.core.cache.codec import create_from_config as create_codec_from_config
 from kinto.core.storage import exceptions
-from kinto.core.utils import json, memcache
+from kinto.core.utils import memcache
 
 
 logger = logging.getLogger(__name__)
@@ -36,7 +40,8 @@ def create_from_config(config, prefix: str = "") -> Any:
     """Memcached client instantiation from settings."""
     settings = config.get_settings()
     hosts = aslist(settings[prefix + "hosts"])
-    return memcache.Client(hosts)
+    # Compare-and-set is used to release locks.
+    return memcache.Client(hosts, cache_cas=True)
 
 
 class Cache(CacheBase):
@@ -50,13 +55,20 @@ class Cache(CacheBase):
 
         kinto.cache_hosts = 127.0.0.1:11211 127.0.0.1:11212
 
+    Values can be stored in a more compact encoding, and compressed above
+    some size (see :class:`kinto.core.cache.codec.CacheCodec`)::
+
+        kinto.cache_codec = msgpack
+        kinto.cache_codec_compression = zlib
+
     :noindex:
 
     """
 
-    def __init__(self, client, *args, **kwargs):
+    def __init__(self, client, *args, codec: CacheCodec | None = None, **kwargs):
         super(Cache, self).__init__(*args, **kwargs)
         self._client = client
+        self.codec = codec or CacheCodec()
 
     def initialize_schema(self, dry_run: bool = False) -> None:
         # Nothing to do.
@@ -73,7 +85,7 @@ class Cache(CacheBase):
             self.metrics_backend.count_miss()
             return None, 0
         self.metrics_backend.count_hit()
-        data = json.loads(value)
+        data = self.codec.decode(value)
         return data["value"], data["ttl"]
 
     def ttl(self, key: str) -> float:
@@ -98,7 +110,7 @@ class Cache(CacheBase):
     def set(self, key: str, value: Any, ttl: float) -> None:
         if isinstance(value, bytes):
             raise TypeError("a string-like object is required, not 'bytes'")
-        value = json.dumps({"value": value, "ttl": ceil(time() + ttl)})
+        value = self.codec.encode({"value": value, "ttl": ceil(time() + ttl)})
         self._client.set(self.prefix + key, value, int(ttl))
 
     @wrap_memcached_error
@@ -107,8 +119,77 @@ class Cache(CacheBase):
         self._client.delete(self.prefix + key)
         return value
 
+    @wrap_memcached_error
+    def incr(self, key: str, value: int, ttl: float) -> int:
+        # Values are stored along with their TTL, which rules out the native
+        # ``incr`` command: compare-and-set until no concurrent write happened.
+        item_key = self.prefix + key
+        try:
+            while True:
+                current = self._client.gets(item_key)
+                count = (self.codec.decode(current)["value"] if current else 0) + value
+                encoded = self.codec.encode({"value": count, "ttl": ceil(time() + ttl)})
+                if current:
+                    stored = self._client.cas(item_key, encoded, int(ttl))
+                else:
+                    stored = self._client.add(item_key, encoded, int(ttl))
+                if stored:
+                    return count
+        finally:
+            self._client.reset_cas()
+
+    @wrap_memcached_error
+    def get_many(self, keys: Iterable[str]) -> dict[str, Any]:
+        keys = list(keys)
+        if not keys:
+            return {}
+        found = self._client.get_multi(keys, key_prefix=self.prefix)
+        values = {}
+        for key in keys:
+            if not found.get(key):
+                self.metrics_backend.count_miss()
+                continue
+            self.metrics_backend.count_hit()
+            values[key] = self.codec.decode(found[key])["value"]
+        return values
+
+    @wrap_memcached_error
+    def set_many(self, items: dict[str, Any], ttl: float) -> None:
+        mapping = {}
+        for key, value in items.items():
+            if isinstance(value, bytes):
+                raise TypeError("a string-like object is required, not 'bytes'")
+            mapping[key] = self.codec.encode({"value": value, "ttl": ceil(time() + ttl)})
+        self._client.set_multi(mapping, time=int(ttl), key_prefix=self.prefix)
+
+    @wrap_memcached_error
+    def delete_many(self, keys: Iterable[str]) -> dict[str, Any]:
+        keys = list(keys)
+        values = self.get_many(keys)
+        if keys:
+            self._client.delete_multi(keys, key_prefix=self.prefix)
+        return values
+
+    @wrap_memcached_error
+    def acquire_lock(self, key: str, ttl: float) -> str | None:
+        token = uuid.uuid4().hex
+        # Memcached expiration has a one second granularity.
+        acquired = self._client.add(self.prefix + key, token, max(1, ceil(ttl)))
+        return token if acquired else None
+
+    @wrap_memcached_error
+    def release_lock(self, key: str, token: str) -> None:
+        try:
+            if self._client.gets(self.prefix + key) == token:
+                # A negative expiration expires the lock immediately, unless
+                # it was taken over since it was read.
+                self._client.cas(self.prefix + key, token, -1)
+        finally:
+            self._client.reset_cas()
+
 
 def load_from_config(config: Configurator) -> Cache:
     settings = config.get_settings()
     client = create_from_config(config, prefix="cache_")
-    return Cache(client, cache_prefix=settings["cache_prefix"])
+    codec = create_codec_from_config(config, prefix="cache_")
+    return Cache(client, codec=codec, cache_prefix=settings["cache_prefix"])
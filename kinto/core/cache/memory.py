@@ -1,4 +1,6 @@
+import heapq
 import logging
+from collections import OrderedDict
 from typing import Any
 
 from pyramid.config import Configurator
@@ -30,25 +32,29 @@ class Cache(CacheBase):
         pass
 
     def flush(self) -> None:
-        self._created_at: dict[str, int] = {}
+        # Keys by order of creation, oldest first.
+        self._created_at: OrderedDict[str, int] = OrderedDict()
         self._ttl: dict[str, int] = {}
+        # Heap of (expiration, key). Entries superseded by a later call to
+        # ``expire()`` are skipped when popped.
+        self._expirations: list[tuple[int, str]] = []
         self._store: dict[str, Any] = {}
         self._quota = 0
 
     def _clean_expired(self) -> None:
         current = msec_time()
-        expired = [k for k, v in self._ttl.items() if current >= v]
-        for expired_item_key in expired:
-            self.delete(expired_item_key[len(self.prefix) :])
+        while self._expirations and self._expirations[0][0] <= current:
+            expiration, item_key = heapq.heappop(self._expirations)
+            if self._ttl.get(item_key) == expiration:
+                self._delete(item_key)
 
     def _clean_oversized(self) -> None:
         if self.max_size_bytes is None or self._quota < self.max_size_bytes:
             return
 
-        for key, value in sorted(self._created_at.items(), key=lambda k: k[1]):
-            if self._quota < (self.max_size_bytes * 0.8):
-                break
-            self.delete(key[len(self.prefix) :])
+        while self._created_at and self._quota >= (self.max_size_bytes * 0.8):
+            oldest_key = next(iter(self._created_at))
+            self._delete(oldest_key)
 
     @synchronized
     def ttl(self, key: str) -> float:
@@ -59,7 +65,14 @@ class Cache(CacheBase):
 
     @synchronized
     def expire(self, key: str, ttl: float) -> None:
-        self._ttl[self.prefix + key] = msec_time() + int(ttl * 1000.0)
+        item_key = self.prefix + key
+        expiration = msec_time() + int(ttl * 1000.0)
+        self._ttl[item_key] = expiration
+        heapq.heappush(self._expirations, (expiration, item_key))
+        if len(self._expirations) > 2 * len(self._ttl) + 64:
+            # Too many superseded entries, rebuild from the current TTLs.
+            self._expirations = [(exp, k) for k, exp in self._ttl.items()]
+            heapq.heapify(self._expirations)
 
     @synchronized
     def set(self, key: str, value: Any, ttl: float) -> None:
@@ -69,8 +82,11 @@ class Cache(CacheBase):
         self._clean_oversized()
         self.expire(key, ttl)
         item_key = self.prefix + key
+        if item_key in self._store:
+            self._quota -= size_of(item_key, self._store[item_key])
         self._store[item_key] = value
         self._created_at[item_key] = msec_time()
+        self._created_at.move_to_end(item_key)
         self._quota += size_of(item_key, value)
 
     @synchronized
@@ -83,13 +99,21 @@ class Cache(CacheBase):
         self.metrics_backend.count_hit()
         return value
 
+    @synchronized
+    def incr(self, key: str, value: int, ttl: float) -> int:
+        return super().incr(key, value, ttl)
+
     @synchronized
     def delete(self, key: str) -> Any:
-        key = self.prefix + key
-        self._ttl.pop(key, None)
-        self._created_at.pop(key, None)
-        value = self._store.pop(key, None)
-        self._quota -= size_of(key, value)
+        return self._delete(self.prefix + key)
+
+    def _delete(self, item_key: str) -> Any:
+        self._ttl.pop(item_key, None)
+        self._created_at.pop(item_key, None)
+        if item_key not in self._store:
+            return None
+        value = self._store.pop(item_key)
+        self._quota -= size_of(item_key, value)
         return value
 
 
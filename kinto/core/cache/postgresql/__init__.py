@@ -1,7 +1,13 @@
 import logging
 import os
+import threading
+import time
+import uuid
+from collections.abc import Iterable
 from typing import Any
 
+from pyramid.settings import asbool
+
 from kinto.core.cache import CacheBase
 from kinto.core.storage.postgresql.client import PostgreSQLClient, create_from_config
 from kinto.core.utils import json
@@ -10,6 +16,9 @@ from kinto.core.utils import sqlalchemy as sa
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_PURGE_INTERVAL_SECONDS = 60
+DEFAULT_PURGE_BATCH_SIZE = 1000
+
 
 class Cache(CacheBase):
     """Cache backend using PostgreSQL.
@@ -56,6 +65,18 @@ class Cache(CacheBase):
     <http://docs.sqlalchemy.org/en/rel_1_0/core/engines.html>`_
     for default values and behaviour.
 
+    Reads never write. Expired entries are deleted in the background by
+    batches, at most every ``purge_interval_seconds`` (``0`` disables it)::
+
+        kinto.cache_purge_interval_seconds = 60
+        kinto.cache_purge_batch_size = 1000
+
+    Since its content can be lost, the cache table can be made ``UNLOGGED``,
+    which avoids writing its changes to the WAL. It is then truncated after a
+    crash and is not replicated. The change is applied by ``kinto migrate``::
+
+        kinto.cache_unlogged = true
+
     .. note::
 
         Using a `dedicated connection pool <http://pgpool.net>`_ is still
@@ -65,9 +86,22 @@ class Cache(CacheBase):
     :noindex:
     """  # NOQA
 
-    def __init__(self, client: PostgreSQLClient, *args, **kwargs):
+    def __init__(
+        self,
+        client: PostgreSQLClient,
+        *args,
+        purge_interval: float = DEFAULT_PURGE_INTERVAL_SECONDS,
+        purge_batch_size: int = DEFAULT_PURGE_BATCH_SIZE,
+        unlogged: bool = False,
+        **kwargs,
+    ):
         super().__init__(*args, **kwargs)
         self.client = client
+        self.purge_interval = purge_interval
+        self.purge_batch_size = purge_batch_size
+        self.unlogged = unlogged
+        self._purge_lock = threading.Lock()
+        self._next_purge = time.monotonic() + purge_interval
 
     def initialize_schema(self, dry_run: bool = False) -> None:
         # Check if cache table exists.
@@ -78,24 +112,44 @@ class Cache(CacheBase):
         """
         with self.client.connect(readonly=True) as conn:
             result = conn.execute(sa.text(query))
-            if result.rowcount > 0:
-                logger.info("PostgreSQL cache schema is up-to-date.")
+            exists = result.rowcount > 0
+
+        if exists:
+            logger.info("PostgreSQL cache schema is up-to-date.")
+        else:
+            # Create schema
+            here = os.path.dirname(__file__)
+            sql_file = os.path.join(here, "schema.sql")
+
+            if dry_run:
+                logger.info(f"Create cache schema from '{sql_file}'")
                 return
 
-        # Create schema
-        here = os.path.dirname(__file__)
-        sql_file = os.path.join(here, "schema.sql")
+            # Since called outside request, force commit.
+            with open(sql_file) as f:
+                schema = f.read()
+            with self.client.connect(force_commit=True) as conn:
+                conn.execute(sa.text(schema))
+            logger.info("Created PostgreSQL cache tables")
+
+        if self.unlogged:
+            self._set_unlogged(dry_run)
 
-        if dry_run:
-            logger.info(f"Create cache schema from '{sql_file}'")
+    def _set_unlogged(self, dry_run: bool) -> None:
+        query = """
+        SELECT relpersistence
+          FROM pg_class
+         WHERE oid = 'cache'::regclass;
+        """
+        with self.client.connect(readonly=True) as conn:
+            persistence = conn.execute(sa.text(query)).fetchone().relpersistence
+        if persistence == "u":
             return
 
-        # Since called outside request, force commit.
-        with open(sql_file) as f:
-            schema = f.read()
-        with self.client.connect(force_commit=True) as conn:
-            conn.execute(sa.text(schema))
-        logger.info("Created PostgreSQL cache tables")
+        logger.info("Alter PostgreSQL cache table to UNLOGGED.")
+        if not dry_run:
+            with self.client.connect(force_commit=True) as conn:
+                conn.execute(sa.text("ALTER TABLE cache SET UNLOGGED;"))
 
     def flush(self) -> None:
         query = """
@@ -140,21 +194,11 @@ class Cache(CacheBase):
         value = json.dumps(value)
         with self.client.connect() as conn:
             conn.execute(sa.text(query), dict(key=self.prefix + key, value=value, ttl=ttl))
+        self._schedule_purge()
 
     def get(self, key: str) -> Any:
-        purge = """
-        DELETE FROM cache c
-        USING (
-            SELECT key
-            FROM cache
-            WHERE ttl IS NOT NULL AND now() > ttl
-            ORDER BY key ASC
-            FOR UPDATE
-        ) del
-        WHERE del.key = c.key;"""
         query = "SELECT value FROM cache WHERE key = :key AND now() < ttl;"
-        with self.client.connect() as conn:
-            conn.execute(sa.text(purge))
+        with self.client.connect(readonly=True) as conn:
             result = conn.execute(sa.text(query), dict(key=self.prefix + key))
             if result.rowcount > 0:
                 self.metrics_backend.count_hit()
@@ -172,8 +216,153 @@ class Cache(CacheBase):
                 return json.loads(value)
         return None
 
+    def incr(self, key: str, value: int, ttl: float) -> int:
+        # Expired counters are restarted from zero.
+        query = """
+        INSERT INTO cache (key, value, ttl)
+        VALUES (:key, :value, sec2ttl(:ttl))
+        ON CONFLICT (key) DO UPDATE
+        SET value = CASE WHEN cache.ttl < now() THEN EXCLUDED.value
+                         ELSE (cache.value::BIGINT + :delta)::TEXT
+                    END,
+            ttl = EXCLUDED.ttl
+        RETURNING value;
+        """
+        placeholders = dict(key=self.prefix + key, value=json.dumps(value), delta=value, ttl=ttl)
+        with self.client.connect() as conn:
+            result = conn.execute(sa.text(query), placeholders)
+            count = json.loads(result.fetchone().value)
+        self._schedule_purge()
+        return count
+
+    def get_many(self, keys: Iterable[str]) -> dict[str, Any]:
+        keys = list(keys)
+        if not keys:
+            return {}
+        query = "SELECT key, value FROM cache WHERE key IN :keys AND now() < ttl;"
+        prefixed = tuple(self.prefix + key for key in keys)
+        with self.client.connect(readonly=True) as conn:
+            result = conn.execute(sa.text(query), dict(keys=prefixed))
+            rows = result.fetchall()
+        values = {row.key[len(self.prefix) :]: json.loads(row.value) for row in rows}
+        for key in keys:
+            if key in values:
+                self.metrics_backend.count_hit()
+            else:
+                self.metrics_backend.count_miss()
+        return values
+
+    def set_many(self, items: dict[str, Any], ttl: float) -> None:
+        if not items:
+            return
+        rows = []
+        placeholders: dict[str, Any] = {"ttl": ttl}
+        for i, (key, value) in enumerate(items.items()):
+            if isinstance(value, bytes):
+                raise TypeError("a string-like object is required, not 'bytes'")
+            rows.append(f"(:key_{i}, :value_{i}, sec2ttl(:ttl))")
+            placeholders[f"key_{i}"] = self.prefix + key
+            placeholders[f"value_{i}"] = json.dumps(value)
+
+        query = f"""
+        INSERT INTO cache (key, value, ttl)
+        VALUES {", ".join(rows)}
+        ON CONFLICT (key) DO UPDATE
+        SET value = EXCLUDED.value,
+            ttl = EXCLUDED.ttl;
+        """
+        with self.client.connect() as conn:
+            conn.execute(sa.text(query), placeholders)
+        self._schedule_purge()
+
+    def delete_many(self, keys: Iterable[str]) -> dict[str, Any]:
+        keys = list(keys)
+        if not keys:
+            return {}
+        query = "DELETE FROM cache WHERE key IN :keys RETURNING key, value;"
+        prefixed = tuple(self.prefix + key for key in keys)
+        with self.client.connect() as conn:
+            result = conn.execute(sa.text(query), dict(keys=prefixed))
+            rows = result.fetchall()
+        return {row.key[len(self.prefix) :]: json.loads(row.value) for row in rows}
+
+    def acquire_lock(self, key: str, ttl: float) -> str | None:
+        # Locks are rows of the cache table, taken over once expired.
+        query = """
+        INSERT INTO cache (key, value, ttl)
+        VALUES (:key, :token, sec2ttl(:ttl))
+        ON CONFLICT (key) DO UPDATE
+        SET value = EXCLUDED.value,
+            ttl = EXCLUDED.ttl
+        WHERE cache.ttl < now()
+        RETURNING key;
+        """
+        token = uuid.uuid4().hex
+        placeholders = dict(key=self.prefix + key, token=json.dumps(token), ttl=ttl)
+        with self.client.connect() as conn:
+            result = conn.execute(sa.text(query), placeholders)
+            return token if result.rowcount > 0 else None
+
+    def release_lock(self, key: str, token: str) -> None:
+        query = "DELETE FROM cache WHERE key = :key AND value = :token;"
+        with self.client.connect() as conn:
+            conn.execute(sa.text(query), dict(key=self.prefix + key, token=json.dumps(token)))
+
+    def purge_expired(self) -> int:
+        """Delete the expired entries, by batches of ``purge_batch_size``.
+
+        Rows locked by concurrent transactions are skipped, and will be
+        deleted on the next run.
+
+        :returns: the number of deleted entries.
+        """
+        query = """
+        DELETE FROM cache
+         WHERE key IN (
+            SELECT key
+              FROM cache
+             WHERE ttl < now()
+             ORDER BY ttl
+             LIMIT :batch_size
+               FOR UPDATE SKIP LOCKED
+         );"""
+        deleted = 0
+        while True:
+            with self.client.connect(force_commit=True) as conn:
+                result = conn.execute(sa.text(query), dict(batch_size=self.purge_batch_size))
+                count = result.rowcount
+            deleted += count
+            if count < self.purge_batch_size:
+                break
+        logger.debug(f"Purged {deleted} expired entries from PostgreSQL cache")
+        return deleted
+
+    def _schedule_purge(self) -> None:
+        if self.purge_interval <= 0:
+            return
+        with self._purge_lock:
+            now = time.monotonic()
+            if now < self._next_purge:
+                return
+            self._next_purge = now + self.purge_interval
+        threading.Thread(target=self._purge_in_background, daemon=True).start()
+
+    def _purge_in_background(self) -> None:
+        try:
+            self.purge_expired()
+        except Exception:
+            logger.exception("Could not purge expired entries from PostgreSQL cache")
+
 
 def load_from_config(config) -> Cache:
     settings = config.get_settings()
     client = create_from_config(config, prefix="cache_", with_transaction=False)
-    return Cache(client=client, cache_prefix=settings["cache_prefix"])
+    return Cache(
+        client=client,
+        cache_prefix=settings["cache_prefix"],
+        purge_interval=float(
+            settings.get("cache_purge_interval_seconds", DEFAULT_PURGE_INTERVAL_SECONDS)
+        ),
+        purge_batch_size=int(settings.get("cache_purge_batch_size", DEFAULT_PURGE_BATCH_SIZE)),
+        unlogged=asbool(settings.get("cache_unlogged", False)),
+    )
@@ -1,4 +1,6 @@
 import logging
+import uuid
+from collections.abc import Iterable
 from functools import wraps
 from typing import Any, cast
 from urllib.parse import urlparse
@@ -7,12 +9,22 @@ from pyramid.config import Configurator
 from redis import Redis
 
 from kinto.core.cache import CacheBase
+from kinto.core.cache.codec import CacheCodec
+from kinto.core.cache.codec import create_from_config as create_codec_from_config
 from kinto.core.storage import exceptions
-from kinto.core.utils import json, redis
+from kinto.core.utils import redis
 
 
 logger = logging.getLogger(__name__)
 
+# Delete the lock only if it is still held with the given token.
+_RELEASE_LOCK_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
 
 def wrap_redis_error(func):
     @wraps(func)
@@ -42,6 +54,15 @@ class Cache(CacheBase):
         kinto.cache_pool_size = 50
         kinto.cache_pool_timeout = 30
 
+    Requires Redis 6.2 or later (``GETDEL`` command).
+
+    Values can be stored in a more compact encoding, and compressed above
+    some size (see :class:`kinto.core.cache.codec.CacheCodec`)::
+
+        kinto.cache_codec = msgpack
+        kinto.cache_codec_compression = zlib
+        kinto.cache_codec_compression_threshold_bytes = 1024
+
     If the database is used for multiple Kinto deployment cache, you
     may want to add a prefix to every key to avoid collision::
 
@@ -51,9 +72,10 @@ class Cache(CacheBase):
 
     """
 
-    def __init__(self, client: Redis, *args, **kwargs):
+    def __init__(self, client: Redis, *args, codec: CacheCodec | None = None, **kwargs):
         super(Cache, self).__init__(*args, **kwargs)
         self._client = client
+        self.codec = codec or CacheCodec()
 
     @property
     def settings(self) -> dict[str, Any]:
@@ -79,23 +101,81 @@ class Cache(CacheBase):
     def set(self, key: str, value: Any, ttl: float) -> None:
         if isinstance(value, bytes):
             raise TypeError("a string-like object is required, not 'bytes'")
-        value = json.dumps(value)
+        value = self.codec.encode(value)
         self._client.psetex(self.prefix + key, int(ttl * 1000), value)
 
     @wrap_redis_error
     def get(self, key: str) -> Any:
         value: bytes | None = cast(bytes, self._client.get(self.prefix + key))
+        return self._decode(value)
+
+    @wrap_redis_error
+    def delete(self, key: str) -> Any:
+        value = cast(bytes, self._client.getdel(self.prefix + key))
+        return self._decode(value)
+
+    @wrap_redis_error
+    def incr(self, key: str, value: int, ttl: float) -> int:
+        # Counters are stored as plain integers, read back as JSON.
+        pipe = self._client.pipeline(transaction=True)
+        pipe.incrby(self.prefix + key, value)
+        pipe.pexpire(self.prefix + key, int(ttl * 1000))
+        count, _ = pipe.execute()
+        return count
+
+    @wrap_redis_error
+    def get_many(self, keys: Iterable[str]) -> dict[str, Any]:
+        keys = list(keys)
+        if not keys:
+            return {}
+        values = self._client.mget([self.prefix + key for key in keys])
+        return self._decode_many(keys, values)
+
+    @wrap_redis_error
+    def set_many(self, items: dict[str, Any], ttl: float) -> None:
+        pipe = self._client.pipeline(transaction=False)
+        for key, value in items.items():
+            if isinstance(value, bytes):
+                raise TypeError("a string-like object is required, not 'bytes'")
+            pipe.psetex(self.prefix + key, int(ttl * 1000), self.codec.encode(value))
+        pipe.execute()
+
+    @wrap_redis_error
+    def delete_many(self, keys: Iterable[str]) -> dict[str, Any]:
+        keys = list(keys)
+        if not keys:
+            return {}
+        prefixed = [self.prefix + key for key in keys]
+        pipe = self._client.pipeline(transaction=True)
+        pipe.mget(prefixed)
+        pipe.delete(*prefixed)
+        values, _ = pipe.execute()
+        return self._decode_many(keys, values)
+
+    @wrap_redis_error
+    def acquire_lock(self, key: str, ttl: float) -> str | None:
+        token = uuid.uuid4().hex
+        acquired = self._client.set(self.prefix + key, token, nx=True, px=int(ttl * 1000))
+        return token if acquired else None
+
+    @wrap_redis_error
+    def release_lock(self, key: str, token: str) -> None:
+        self._client.eval(_RELEASE_LOCK_SCRIPT, 1, self.prefix + key, token)
+
+    def _decode(self, value: bytes | None) -> Any:
         if value:
             self.metrics_backend.count_hit()
-            svalue = value.decode("utf-8")
-            return json.loads(svalue)
+            return self.codec.decode(value)
         self.metrics_backend.count_miss()
+        return None
 
-    @wrap_redis_error
-    def delete(self, key: str) -> Any:
-        value = self.get(key)
-        self._client.delete(self.prefix + key)
-        return value
+    def _decode_many(self, keys: list[str], values: list[bytes | None]) -> dict[str, Any]:
+        decoded = {}
+        for key, value in zip(keys, values):
+            value = self._decode(value)
+            if value is not None:
+                decoded[key] = value
+        return decoded
 
 
 def create_from_config(config, prefix: str = "") -> Redis:
@@ -125,4 +205,5 @@ def create_from_config(config, prefix: str = "") -> Redis:
 def load_from_config(config: Configurator) -> Cache:
     settings = config.get_settings()
     client = create_from_config(config, prefix="cache_")
-    return Cache(client, cache_prefix=settings["cache_prefix"])
+    codec = create_codec_from_config(config, prefix="cache_")
+    return Cache(client, codec=codec, cache_prefix=settings["cache_prefix"])
@@ -0,0 +1,218 @@
+import logging
+import os
+import time
+import uuid
+from collections.abc import Iterable
+from typing import Any
+
+from kinto.core.cache import CacheBase
+from kinto.core.storage.sqlite.client import SQLiteClient, create_from_config
+from kinto.core.utils import json
+
+
+logger = logging.getLogger(__name__)
+
+HERE = os.path.dirname(__file__)
+
+
+class Cache(CacheBase):
+    """Cache backend using SQLite.
+
+    Enable in configuration::
+
+        kinto.cache_backend = kinto.core.cache.sqlite
+
+    Database file location can be customized::
+
+        kinto.cache_url = sqlite:////var/lib/kinto/kinto.sqlite
+
+    Expired entries are skipped on reads, and purged on writes.
+
+    Writes are committed immediately. Since SQLite has a single writer at a
+    time, the database cannot be shared with the storage or permission
+    backends, whose transactions last as long as the requests.
+
+    :noindex:
+    """
+
+    def __init__(self, client: SQLiteClient, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.client = client
+
+    def initialize_schema(self, dry_run: bool = False) -> None:
+        sql_file = os.path.join(HERE, "schema.sql")
+
+        if dry_run:
+            logger.info(f"Create cache schema from '{sql_file}'")
+            return
+
+        with open(sql_file) as f:
+            schema = f.read()
+        self.client.execute_script(schema)
+        logger.info("Created SQLite cache tables")
+
+    def flush(self) -> None:
+        with self.client.connect() as conn:
+            conn.execute("DELETE FROM cache;")
+        logger.debug("Flushed SQLite cache tables")
+
+    def ttl(self, key: str) -> float:
+        query = """
+        SELECT ttl - ?
+          FROM cache
+         WHERE key = ?
+           AND ttl IS NOT NULL;
+        """
+        with self.client.connect(readonly=True) as conn:
+            row = conn.execute(query, (time.time(), self.prefix + key)).fetchone()
+        if row is not None:
+            return row[0]
+        return -1
+
+    def expire(self, key: str, ttl: float) -> None:
+        query = "UPDATE cache SET ttl = ? WHERE key = ?;"
+        with self.client.connect() as conn:
+            conn.execute(query, (_expiration(ttl), self.prefix + key))
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        if isinstance(value, bytes):
+            raise TypeError("a string-like object is required, not 'bytes'")
+
+        purge = "DELETE FROM cache WHERE ttl < ?;"
+        query = """
+        INSERT INTO cache (key, value, ttl)
+        VALUES (?, ?, ?)
+        ON CONFLICT (key) DO UPDATE
+        SET value = excluded.value,
+            ttl = excluded.ttl;
+        """
+        value = json.dumps(value)
+        with self.client.connect() as conn:
+            conn.execute(purge, (time.time(),))
+            conn.execute(query, (self.prefix + key, value, _expiration(ttl)))
+
+    def get(self, key: str) -> Any:
+        query = """
+        SELECT value
+          FROM cache
+         WHERE key = ?
+           AND (ttl IS NULL OR ttl > ?);
+        """
+        with self.client.connect(readonly=True) as conn:
+            row = conn.execute(query, (self.prefix + key, time.time())).fetchone()
+        if row is not None:
+            self.metrics_backend.count_hit()
+            return json.loads(row[0])
+        self.metrics_backend.count_miss()
+        return None
+
+    def delete(self, key: str) -> Any:
+        query = "DELETE FROM cache WHERE key = ? RETURNING value;"
+        with self.client.connect() as conn:
+            rows = conn.execute(query, (self.prefix + key,)).fetchall()
+        if rows:
+            return json.loads(rows[0][0])
+        return None
+
+    def incr(self, key: str, value: int, ttl: float) -> int:
+        # Expired counters are restarted from zero.
+        query = """
+        INSERT INTO cache (key, value, ttl)
+        VALUES (?, ?, ?)
+        ON CONFLICT (key) DO UPDATE
+        SET value = CASE WHEN cache.ttl < ? THEN excluded.value
+                         ELSE CAST(CAST(cache.value AS INTEGER) + ? AS TEXT)
+                    END,
+            ttl = excluded.ttl
+        RETURNING value;
+        """
+        placeholders = (self.prefix + key, json.dumps(value), _expiration(ttl), time.time(), value)
+        with self.client.connect() as conn:
+            rows = conn.execute(query, placeholders).fetchall()
+        return json.loads(rows[0][0])
+
+    def get_many(self, keys: Iterable[str]) -> dict[str, Any]:
+        keys = list(keys)
+        if not keys:
+            return {}
+        query = f"""
+        SELECT key, value
+          FROM cache
+         WHERE key IN ({", ".join("?" * len(keys))})
+           AND (ttl IS NULL OR ttl > ?);
+        """
+        placeholders = [self.prefix + key for key in keys] + [time.time()]
+        with self.client.connect(readonly=True) as conn:
+            rows = conn.execute(query, placeholders).fetchall()
+        values = {key[len(self.prefix) :]: json.loads(value) for key, value in rows}
+        for key in keys:
+            if key in values:
+                self.metrics_backend.count_hit()
+            else:
+                self.metrics_backend.count_miss()
+        return values
+
+    def set_many(self, items: dict[str, Any], ttl: float) -> None:
+        purge = "DELETE FROM cache WHERE ttl < ?;"
+        query = """
+        INSERT INTO cache (key, value, ttl)
+        VALUES (?, ?, ?)
+        ON CONFLICT (key) DO UPDATE
+        SET value = excluded.value,
+            ttl = excluded.ttl;
+        """
+        expiration = _expiration(ttl)
+        rows = []
+        for key, value in items.items():
+            if isinstance(value, bytes):
+                raise TypeError("a string-like object is required, not 'bytes'")
+            rows.append((self.prefix + key, json.dumps(value), expiration))
+        with self.client.connect() as conn:
+            conn.execute(purge, (time.time(),))
+            conn.executemany(query, rows)
+
+    def delete_many(self, keys: Iterable[str]) -> dict[str, Any]:
+        keys = list(keys)
+        if not keys:
+            return {}
+        query = f"""
+        DELETE FROM cache
+         WHERE key IN ({", ".join("?" * len(keys))})
+        RETURNING key, value;
+        """
+        placeholders = [self.prefix + key for key in keys]
+        with self.client.connect() as conn:
+            rows = conn.execute(query, placeholders).fetchall()
+        return {key[len(self.prefix) :]: json.loads(value) for key, value in rows}
+
+    def acquire_lock(self, key: str, ttl: float) -> str | None:
+        # Locks are rows of the cache table, taken over once expired.
+        query = """
+        INSERT INTO cache (key, value, ttl)
+        VALUES (?, ?, ?)
+        ON CONFLICT (key) DO UPDATE
+        SET value = excluded.value,
+            ttl = excluded.ttl
+        WHERE cache.ttl < ?
+        RETURNING key;
+        """
+        token = uuid.uuid4().hex
+        placeholders = (self.prefix + key, json.dumps(token), _expiration(ttl), time.time())
+        with self.client.connect() as conn:
+            rows = conn.execute(query, placeholders).fetchall()
+        return token if rows else None
+
+    def release_lock(self, key: str, token: str) -> None:
+        query = "DELETE FROM cache WHERE key = ? AND value = ?;"
+        with self.client.connect() as conn:
+            conn.execute(query, (self.prefix + key, json.dumps(token)))
+
+
+def _expiration(ttl: float | None) -> float | None:
+    return None if ttl is None else time.time() + ttl
+
+
+def load_from_config(config) -> Cache:
+    settings = config.get_settings()
+    client = create_from_config(config, prefix="cache_", exclusive=True)
+    return Cache(client=client, cache_prefix=settings["cache_prefix"])
@@ -0,0 +1,8 @@
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    -- Expiration, as seconds epoch.
+    ttl REAL DEFAULT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_cache_ttl ON cache(ttl);
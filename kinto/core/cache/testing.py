@@ -1,3 +1,4 @@
+import threading
 import time
 import unittest
 from typing import TYPE_CHECKING, Any
@@ -127,6 +128,74 @@ class CacheTest(_CacheTestBase):
         returned = self.cache.delete("foobar")
         self.assertIsNone(returned)
 
+    def test_pop_returns_the_value_only_once(self):
+        self.cache.set("foobar", "toto", 42)
+        self.assertEqual(self.cache.pop("foobar"), "toto")
+        self.assertIsNone(self.cache.pop("foobar"))
+        self.assertIsNone(self.cache.get("foobar"))
+
+    def test_incr_starts_missing_counters_from_zero(self):
+        self.assertEqual(self.cache.incr("counter", 3, 42), 3)
+        self.assertEqual(self.cache.get("counter"), 3)
+        self.assertGreater(self.cache.ttl("counter"), 0)
+
+    def test_incr_adds_to_existing_counters(self):
+        self.cache.incr("counter", 3, 42)
+        self.assertEqual(self.cache.incr("counter", 2, 42), 5)
+        self.assertEqual(self.cache.incr("counter", -4, 42), 1)
+        self.assertEqual(self.cache.get_many(["counter"]), {"counter": 1})
+
+    def test_incr_does_not_lose_concurrent_calls(self):
+        def incr_many():
+            for _ in range(50):
+                self.cache.incr("counter", 1, 42)
+
+        threads = [threading.Thread(target=incr_many) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.cache.get("counter"), 200)
+
+    def test_get_many_returns_existing_values(self):
+        self.cache.set("foo", "toto", 42)
+        self.cache.set("bar", {"a": 1}, 42)
+        values = self.cache.get_many(["foo", "bar", "unknown"])
+        self.assertEqual(values, {"foo": "toto", "bar": {"a": 1}})
+
+    def test_get_many_with_no_keys_returns_empty(self):
+        self.assertEqual(self.cache.get_many([]), {})
+
+    def test_set_many_adds_the_objects(self):
+        self.cache.set_many({"foo": "toto", "bar": "tata"}, 42)
+        self.assertEqual(self.cache.get("foo"), "toto")
+        self.assertEqual(self.cache.get("bar"), "tata")
+        self.assertGreater(self.cache.ttl("bar"), 0)
+
+    def test_set_many_overwrites_existing_objects(self):
+        self.cache.set("foo", "toto", 42)
+        self.cache.get("foo")
+        self.cache.set_many({"foo": "tata"}, 42)
+        self.assertEqual(self.cache.get_many(["foo"]), {"foo": "tata"})
+
+    def test_set_many_refuses_bytes(self):
+        with pytest.raises(TypeError):
+            self.cache.set_many({"test": b"foo"}, 42)
+
+    def test_delete_many_removes_the_objects(self):
+        self.cache.set_many({"foo": "toto", "bar": "tata", "baz": "titi"}, 42)
+        deleted = self.cache.delete_many(["foo", "bar", "unknown"])
+        self.assertEqual(deleted, {"foo": "toto", "bar": "tata"})
+        self.assertEqual(self.cache.get_many(["foo", "bar", "baz"]), {"baz": "titi"})
+
+    def test_prefix_value_used_with_many_keys(self):
+        backend_prefix = self.get_backend_prefix(prefix="prefix_")
+        backend_prefix.set_many({"key": "foo"}, 42)
+        self.assertEqual(self.cache.get_many(["prefix_key"]), {"prefix_key": "foo"})
+        self.assertEqual(backend_prefix.get_many(["key"]), {"key": "foo"})
+        self.assertEqual(backend_prefix.delete_many(["key"]), {"key": "foo"})
+        self.assertIsNone(backend_prefix.get("key"))
+
     def test_expire_expires_the_value(self):
         self.cache.set("foobar", "toto", 42)
         self.cache.expire("foobar", 0.01)
@@ -218,3 +287,89 @@ class CacheTest(_CacheTestBase):
         # The object should have expired
         retrieved = self.cache.get("prefix_foobar")
         self.assertIsNone(retrieved)
+
+    def test_get_or_compute_stores_the_computed_value(self):
+        compute = mock.Mock(return_value={"a": 1})
+        self.assertEqual(self.cache.get_or_compute("foobar", compute, 42), {"a": 1})
+        self.assertEqual(self.cache.get_or_compute("foobar", compute, 42), {"a": 1})
+        self.assertEqual(compute.call_count, 1)
+        self.assertGreater(self.cache.ttl("foobar"), 0)
+
+    def test_get_or_compute_does_not_store_none(self):
+        compute = mock.Mock(return_value=None)
+        self.assertIsNone(self.cache.get_or_compute("foobar", compute, 42))
+        self.assertIsNone(self.cache.get_or_compute("foobar", compute, 42))
+        self.assertEqual(compute.call_count, 2)
+
+    def test_get_or_compute_computes_once_for_concurrent_calls(self):
+        compute = mock.Mock(side_effect=lambda: time.sleep(0.2) or "toto")
+        results = []
+
+        def read():
+            results.append(self.cache.get_or_compute("foobar", compute, 42))
+
+        threads = [threading.Thread(target=read) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ["toto"] * 5)
+        self.assertEqual(compute.call_count, 1)
+
+    def test_get_or_compute_raises_errors_and_does_not_store(self):
+        compute = mock.Mock(side_effect=ValueError)
+        with pytest.raises(ValueError):
+            self.cache.get_or_compute("foobar", compute, 42)
+        self.assertIsNone(self.cache.get("foobar"))
+        self.assertEqual(self.cache._flights, {})
+
+    def test_get_or_compute_refreshes_early_values_about_to_expire(self):
+        self.cache.set("foobar", "toto", 1)
+        compute = mock.Mock(return_value="tata")
+        with mock.patch("kinto.core.cache.random.random", return_value=0.99):
+            value = self.cache.get_or_compute("foobar", compute, 42, early_refresh=0.5)
+        self.assertEqual(value, "tata")
+        self.assertEqual(self.cache.get("foobar"), "tata")
+
+    def test_get_or_compute_does_not_refresh_early_values_far_from_expiration(self):
+        self.cache.set("foobar", "toto", 3600)
+        compute = mock.Mock(return_value="tata")
+        with mock.patch("kinto.core.cache.random.random", return_value=0.99):
+            value = self.cache.get_or_compute("foobar", compute, 42, early_refresh=0.5)
+        self.assertEqual(value, "toto")
+        compute.assert_not_called()
+
+    def test_get_or_compute_waits_for_value_computed_elsewhere(self):
+        def computed_elsewhere(key, ttl):
+            self.cache.set("foobar", "toto", 42)
+            return None
+
+        compute = mock.Mock(return_value="tata")
+        with mock.patch.object(self.cache, "acquire_lock", side_effect=computed_elsewhere):
+            value = self.cache.get_or_compute("foobar", compute, 42, lock_timeout=1)
+        self.assertEqual(value, "toto")
+        compute.assert_not_called()
+
+    def test_get_or_compute_releases_lock(self):
+        compute = mock.Mock(return_value="toto")
+        self.cache.get_or_compute("foobar", compute, 42, lock_timeout=1)
+        self.assertIsNotNone(self.cache.acquire_lock("lock:foobar", 1))
+
+    def test_lock_cannot_be_acquired_twice(self):
+        token = self.cache.acquire_lock("foobar", 10)
+        self.assertIsNotNone(token)
+        self.assertIsNone(self.cache.acquire_lock("foobar", 10))
+        self.cache.release_lock("foobar", token)
+        self.assertIsNotNone(self.cache.acquire_lock("foobar", 10))
+
+    def test_lock_is_not_released_by_a_previous_owner(self):
+        token = self.cache.acquire_lock("foobar", 0.01)
+        time.sleep(0.02)
+        self.assertIsNotNone(self.cache.acquire_lock("foobar", 10))
+        self.cache.release_lock("foobar", token)
+        self.assertIsNone(self.cache.acquire_lock("foobar", 10))
+
+    def test_lock_can_be_acquired_once_expired(self):
+        self.assertIsNotNone(self.cache.acquire_lock("foobar", 0.01))
+        time.sleep(0.02)
+        self.assertIsNotNone(self.cache.acquire_lock("foobar", 10))
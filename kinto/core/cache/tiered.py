@@ -0,0 +1,203 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterable
+from typing import Any
+
+from pyramid.config import Configurator
+from pyramid.exceptions import ConfigurationError
+from pyramid.settings import asbool
+
+from kinto.core.cache import CacheBase, CacheMetricsBackend
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOCAL_TTL_SECONDS = 5
+DEFAULT_LOCAL_MAX_ENTRIES = 1000
+
+
+class Cache(CacheBase):
+    """Cache backend keeping the recently read values in local process memory,
+    in front of a remote cache backend (e.g. Redis or Memcached).
+
+    Enable in configuration::
+
+        kinto.cache_backend = kinto.core.cache.tiered
+        kinto.cache_tiered_backend = kinto.core.cache.redis
+        kinto.cache_url = redis://localhost:6379/1
+
+    The remote backend is configured with the usual ``cache_*`` settings.
+
+    The local tier is a LRU of bounded size, whose entries expire after a short
+    TTL, regardless of their remaining TTL in the remote tier::
+
+        kinto.cache_tiered_local_ttl_seconds = 5
+        kinto.cache_tiered_local_max_entries = 1000
+
+    Writes are sent to the remote tier and, unless disabled, drop the local
+    copy of the key. Other processes keep theirs until their local TTL elapses.
+
+    Hits and misses of the local tier are counted in the ``cache_local_hits``
+    and ``cache_local_misses`` metrics.
+
+    :noindex:
+    """
+
+    def __init__(
+        self,
+        remote: CacheBase,
+        *args,
+        local_ttl: float = DEFAULT_LOCAL_TTL_SECONDS,
+        local_max_entries: int = DEFAULT_LOCAL_MAX_ENTRIES,
+        invalidate: bool = True,
+        **kwargs,
+    ):
+        self.remote = remote
+        super().__init__(*args, **kwargs)
+        self.local_ttl = local_ttl
+        self.local_max_entries = local_max_entries
+        self.invalidate = invalidate
+        self._lock = threading.Lock()
+        # key -> (expiration, value), least recently used first.
+        self._local: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        # Incremented on invalidations, to not keep a value read before one.
+        self._generation = 0
+
+    def set_metrics_backend(self, metrics_backend: Any) -> None:
+        super().set_metrics_backend(metrics_backend)
+        self.local_metrics_backend = CacheMetricsBackend(metrics_backend, tier="local")
+        self.remote.set_metrics_backend(metrics_backend)
+
+    def initialize_schema(self, dry_run: bool = False) -> None:
+        self.remote.initialize_schema(dry_run=dry_run)
+
+    def flush(self) -> None:
+        self.remote.flush()
+        with self._lock:
+            self._generation += 1
+            self._local.clear()
+
+    def ttl(self, key: str) -> float:
+        return self.remote.ttl(key)
+
+    def expire(self, key: str, ttl: float) -> None:
+        self.remote.expire(key, ttl)
+        self._invalidate(key)
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        self.remote.set(key, value, ttl)
+        self._invalidate(key)
+
+    def incr(self, key: str, value: int, ttl: float) -> int:
+        count = self.remote.incr(key, value, ttl)
+        self._invalidate(key)
+        return count
+
+    def get(self, key: str) -> Any:
+        now = time.monotonic()
+        generation, values, missing = self._get_local([key], now)
+        if not missing:
+            return values[key]
+
+        value = self.remote.get(key)
+        if value is not None:
+            self._set_local({key: value}, now, generation)
+        return value
+
+    def get_many(self, keys: Iterable[str]) -> dict[str, Any]:
+        now = time.monotonic()
+        generation, values, missing = self._get_local(keys, now)
+        if not missing:
+            return values
+
+        fetched = self.remote.get_many(missing)
+        self._set_local(fetched, now, generation)
+        return {**values, **fetched}
+
+    def set_many(self, items: dict[str, Any], ttl: float) -> None:
+        self.remote.set_many(items, ttl)
+        self._invalidate(*items.keys())
+
+    def delete(self, key: str) -> Any:
+        value = self.remote.delete(key)
+        self._invalidate(key)
+        return value
+
+    def pop(self, key: str) -> Any:
+        value = self.remote.pop(key)
+        self._invalidate(key)
+        return value
+
+    def delete_many(self, keys: Iterable[str]) -> dict[str, Any]:
+        keys = list(keys)
+        values = self.remote.delete_many(keys)
+        self._invalidate(*keys)
+        return values
+
+    def acquire_lock(self, key: str, ttl: float) -> str | None:
+        return self.remote.acquire_lock(key, ttl)
+
+    def release_lock(self, key: str, token: str) -> None:
+        self.remote.release_lock(key, token)
+
+    def _get_local(self, keys: Iterable[str], now: float) -> tuple[int, dict[str, Any], list[str]]:
+        """Return the current generation, the values found in the local tier,
+        and the missing keys.
+        """
+        values = {}
+        missing = []
+        with self._lock:
+            generation = self._generation
+            for key in keys:
+                entry = self._local.get(key)
+                if entry is not None and entry[0] <= now:
+                    del self._local[key]
+                    entry = None
+                if entry is None:
+                    missing.append(key)
+                else:
+                    self._local.move_to_end(key)
+                    values[key] = entry[1]
+
+        for _ in values:
+            self.local_metrics_backend.count_hit()
+        for _ in missing:
+            self.local_metrics_backend.count_miss()
+        return generation, values, missing
+
+    def _set_local(self, values: dict[str, Any], now: float, generation: int) -> None:
+        with self._lock:
+            # Do not keep values read before an invalidation.
+            if generation != self._generation:
+                return
+            for key, value in values.items():
+                self._local[key] = (now + self.local_ttl, value)
+                self._local.move_to_end(key)
+            while len(self._local) > self.local_max_entries:
+                self._local.popitem(last=False)
+
+    def _invalidate(self, *keys: str) -> None:
+        if self.invalidate:
+            with self._lock:
+                self._generation += 1
+                for key in keys:
+                    self._local.pop(key, None)
+
+
+def load_from_config(config: Configurator) -> Cache:
+    settings = config.get_settings()
+    remote_backend = settings.get("cache_tiered_backend")
+    if not remote_backend:
+        raise ConfigurationError("Missing setting cache_tiered_backend for tiered cache.")
+    remote = config.maybe_dotted(remote_backend).load_from_config(config)
+    return Cache(
+        remote=remote,
+        local_ttl=float(settings.get("cache_tiered_local_ttl_seconds", DEFAULT_LOCAL_TTL_SECONDS)),
+        local_max_entries=int(
+            settings.get("cache_tiered_local_max_entries", DEFAULT_LOCAL_MAX_ENTRIES)
+        ),
+        invalidate=asbool(settings.get("cache_tiered_invalidate", True)),
+        cache_prefix=settings["cache_prefix"],
+    )
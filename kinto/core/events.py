@@ -1,6 +1,6 @@
 import logging
 import warnings
-from collections import OrderedDict
+import zlib
 from collections.abc import Callable, Iterator
 from enum import Enum
 from typing import Any
@@ -12,8 +12,9 @@ from pyramid.events import NewRequest
 from pyramid.registry import Registry
 from pyramid.request import Request
 from pyramid.response import Response
+from zope.interface import implementedBy
 
-from kinto.core.utils import strip_uri_prefix
+from kinto.core.utils import json, strip_uri_prefix
 
 
 logger = logging.getLogger(__name__)
@@ -86,55 +87,123 @@ class AfterResourceChanged(_ResourceEvent):
         self.impacted_objects = impacted_objects
 
 
+class AfterResourceChangedBatch:
+    """Triggered after a transaction was successfully committed, with all
+    the ``AfterResourceChanged`` events of the request (or batch).
+    """
+
+    def __init__(self, events: list[AfterResourceChanged], request: Any) -> None:
+        self.events = events
+        self.request = request
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__} events={len(self.events)}>"
+
+
+class ImpactedObjects:
+    """The impacted objects of a collected event.
+
+    Once `compact_threshold` objects were added, they are kept
+    serialized and compressed, and only deserialized when the event is
+    notified. This bounds the memory used by large changes (e.g. deletion of
+    big collections), whose impacted objects carry full ``old`` objects.
+    """
+
+    def __init__(self, objects: list, compact_threshold: int = 0) -> None:
+        self.compact_threshold = compact_threshold
+        # Compressed JSON lists of the first objects.
+        self.chunks: list[bytes] = []
+        self.objects = list(objects)
+        self._compact()
+
+    def extend(self, other: "list | ImpactedObjects") -> None:
+        if isinstance(other, ImpactedObjects):
+            if other.chunks:
+                # Keep the objects in order.
+                self._compact(force=True)
+                self.chunks.extend(other.chunks)
+            other = other.objects
+        self.objects.extend(other)
+        self._compact()
+
+    def to_list(self) -> list:
+        if not self.chunks:
+            return self.objects
+        objects = []
+        for chunk in self.chunks:
+            objects.extend(json.loads(zlib.decompress(chunk).decode("utf-8")))
+        return objects + self.objects
+
+    def _compact(self, force: bool = False) -> None:
+        if not self.objects or not (force or 0 < self.compact_threshold <= len(self.objects)):
+            return
+        self.chunks.append(zlib.compress(json.dumps(self.objects).encode("utf-8")))
+        self.objects = []
+
+
 class EventCollector(object):
     """A collection to gather events emitted over the course of a request.
 
     Events are gathered by parent id, resource type, and event
     type. This serves as a primitive normalization so that we can emit
     fewer events.
+
+    :param int compact_threshold: number of impacted objects of an event
+        above which they are kept compressed (see :class:`ImpactedObjects`),
+        or ``0`` to disable
     """
 
-    def __init__(self, cascade_level: int = 1) -> None:
+    def __init__(self, cascade_level: int = 1, compact_threshold: int = 0) -> None:
         self.cascade_level = cascade_level
         """Current level of event cascade. When we start consuming the
         gathered events, we increment it. This way, events emitted from
         events listeners (cascade) are not merged with upstream ones.
         """
 
-        self.event_dict = OrderedDict()
-        """The events as collected so far.
+        self.compact_threshold = compact_threshold
 
-        The key of the event_dict is a quadruple (cascade_level, resource_name,
-        parent_id, action). The value is a triple (impacted, request,
-        payload). If the same (cascade_level, resource_name, parent_id, action) is
-        encountered, we just extend the existing impacted with the new
-        impacted. N.B. this means all values in the payload must not
-        be specific to a single impacted_object. See
+        self.log: list[list] = []
+        """The events as collected so far, in order.
+
+        Each entry of the log is a list (cascade_level, resource_name,
+        parent_id, action, payload, impacted, request). If the same
+        (cascade_level, resource_name, parent_id, action) is encountered
+        before the event was drained, we just extend the existing impacted
+        with the new impacted. N.B. this means all values in the payload must
+        not be specific to a single impacted_object. See
         https://github.com/Kinto/kinto/issues/945 and
         https://github.com/Kinto/kinto/issues/1731.
         """
 
+        self.positions: dict[tuple, int] = {}
+        """Position in the log of the events not drained yet, by
+        (cascade_level, resource_name, parent_id, action)."""
+
+        self.drained = 0
+        """Number of events of the log already drained."""
+
     def add_event(
         self,
         resource_name: str,
         parent_id: str,
         action: "ACTIONS",
         payload: dict | None,
-        impacted: list,
+        impacted: "list | ImpactedObjects",
         request: Request,
     ) -> None:
         key = (self.cascade_level, resource_name, parent_id, action)
-        if key not in self.event_dict:
-            value = (payload, impacted, request)
-            self.event_dict[key] = value
+        position = self.positions.get(key)
+        if position is None:
+            self.positions[key] = len(self.log)
+            objects = ImpactedObjects([], self.compact_threshold)
+            objects.extend(impacted)
+            self.log.append([*key, payload, objects, request])
         else:
-            old_value = self.event_dict[key]
-            (old_payload, old_impacted, old_request) = old_value
             # May be a good idea to assert that old_payload == payload here.
-            self.event_dict[key] = (old_payload, old_impacted + impacted, old_request)
+            self.log[position][5].extend(impacted)
 
     def drain(self) -> "EventCollectorDrain":
-        """Return an iterator that removes elements from this EventCollector.
+        """Return an iterator that consumes the events of this EventCollector.
 
         This can be used to process events while still allowing events
         to be added (for instance, as part of a cascade where events
@@ -147,6 +216,30 @@ class EventCollector(object):
         self.cascade_level += 1
         return EventCollectorDrain(self)
 
+    def rewind(self) -> None:
+        """Make the drained events available to drain again, merged by
+        resource, parent id and action whatever their cascade level.
+
+        This is used to notify the same events after commit.
+        """
+        drained = self.log[: self.drained]
+        pending = self.log[self.drained :]
+        self.cascade_level = 1
+        self.log = []
+        self.positions = {}
+        self.drained = 0
+        for entry in drained + pending:
+            (_, resource_name, parent_id, action, payload, impacted, request) = entry
+            self.add_event(resource_name, parent_id, action, payload, impacted, request)
+
+    def merge(self, other: "EventCollector") -> None:
+        """Add the events gathered by `other` (e.g. by a subrequest run apart),
+        as if they were collected here.
+        """
+        for entry in other.log:
+            (_, resource_name, parent_id, action, payload, impacted, request) = entry
+            self.add_event(resource_name, parent_id, action, payload, impacted, request)
+
 
 class EventCollectorDrain(object):
     """An iterator that drains an EventCollector.
@@ -160,14 +253,15 @@ class EventCollectorDrain(object):
         return self
 
     def __next__(self) -> tuple:
-        if self.event_collector.event_dict:
-            # Get the "first" key in insertion order, so as to process
-            # events in the same order they were queued.
-            key = next(iter(self.event_collector.event_dict.keys()))
-            value = self.event_collector.event_dict.pop(key)
-            return key + value
-        else:
+        collector = self.event_collector
+        if collector.drained >= len(collector.log):
             raise StopIteration
+        # Events are processed in the same order they were queued.
+        entry = collector.log[collector.drained]
+        collector.drained += 1
+        key = tuple(entry[:4])
+        del collector.positions[key]
+        return (*key, entry[4], entry[5].to_list(), entry[6])
 
 
 def notify_resource_events_before(
@@ -196,7 +290,8 @@ def setup_transaction_hook(config: Configurator) -> None:
     Resource events are plugged with the transactions of ``pyramid_tm``.
 
     Once a transaction is committed, ``AfterResourceRead`` and
-    ``AfterResourceChanged`` events are sent.
+    ``AfterResourceChanged`` events are sent, followed by an
+    ``AfterResourceChangedBatch`` event with all the changes.
     """
 
     def _notify_resource_events_after(success: bool, request) -> None:
@@ -204,12 +299,21 @@ def setup_transaction_hook(config: Configurator) -> None:
         if not success:  # pragma: no cover
             return
 
+        changes = []
         for event in request.get_resource_events(after_commit=True):
+            if isinstance(event, AfterResourceChanged):
+                changes.append(event)
             try:
                 request.registry.notify(event)
             except Exception:
                 logger.error("Unable to notify", exc_info=True)
 
+        if changes:
+            try:
+                request.registry.notify(AfterResourceChangedBatch(changes, request))
+            except Exception:
+                logger.error("Unable to notify", exc_info=True)
+
     def on_new_request(event: NewRequest) -> None:
         """When a new request comes in, hook on transaction commit."""
         # Since there is one transaction per batch, ignore subrequests.
@@ -227,23 +331,20 @@ def setup_transaction_hook(config: Configurator) -> None:
 def get_resource_events(request, after_commit: bool = False) -> Iterator[_ResourceEvent]:
     """Generator to iterate the list of events triggered on resources.
 
-    The list is sorted chronologically (see OrderedDict).
+    The list is sorted chronologically.
 
     This drains the resource_events currently in the request, which
     allows us to process new events as they are added by current
-    events. However, once the iteration is over, we merge all the
-    events we've emitted into a new resource_events, which we store on
-    the request so we can reprocess the same events in an after-commit
-    tween.
+    events. However, once the iteration is over, the events we've emitted
+    are merged and kept on the request so we can reprocess the same events
+    in an after-commit tween.
 
     This generator must be completely consumed!
     """
     by_resource = request.bound_data.get("resource_events", EventCollector())
-    afterwards = EventCollector()
 
     for event in by_resource.drain():
         (_, resource_name, parent_id, action, payload, impacted, request) = event
-        afterwards.add_event(resource_name, parent_id, action, payload, impacted, request)
 
         if after_commit:
             if action == ACTIONS.READ:
@@ -258,7 +359,66 @@ def get_resource_events(request, after_commit: bool = False) -> Iterator[_Resour
 
         yield event_cls(payload, impacted, request)
 
-    request.bound_data["resource_events"] = afterwards
+    by_resource.rewind()
+    request.bound_data["resource_events"] = by_resource
+
+
+def impacted_old_required(
+    registry: Registry, resource_name: str, action: ACTIONS = ACTIONS.DELETE
+) -> bool:
+    """Return whether a subscriber of the `action` changes on `resource_name`
+    may read the ``old`` version of the impacted objects.
+
+    Subscribers declare the fields of the impacted objects they read with the
+    ``impacted_fields`` predicate. Those which do not are assumed to read them all.
+    """
+    cache = getattr(registry, "_impacted_old_required", None)
+    if cache is None:
+        cache = registry._impacted_old_required = {}
+    key = (resource_name, action)
+    if key not in cache:
+        cache[key] = _impacted_old_required(registry, resource_name, action)
+    return cache[key]
+
+
+def _impacted_old_required(registry: Registry, resource_name: str, action: ACTIONS) -> bool:
+    from kinto.core.initialization import (
+        EventActionFilter,
+        EventImpactedFields,
+        EventResourceFilter,
+    )
+
+    # Predicates of the subscribers, by registered handler.
+    predicates = {}
+    for entry in registry.introspector.get_category("subscribers", []):
+        intr = entry["introspectable"]
+        if "derived_subscriber" in intr:
+            predicates[intr["derived_subscriber"]] = intr["predicates"]
+
+    change_events = [
+        implementedBy(event_class)
+        for event_class in (ResourceChanged, AfterResourceChanged, AfterResourceChangedBatch)
+    ]
+    for registration in registry.registeredHandlers():
+        interface = registration.required[0]
+        if not any(event.isOrExtends(interface) for event in change_events):
+            continue
+        subscriber_predicates = predicates.get(registration.factory)
+        if subscriber_predicates is None:
+            return True
+        fields = None
+        notified = True
+        for predicate in subscriber_predicates:
+            if isinstance(predicate, EventActionFilter):
+                notified = notified and action.value in predicate.actions
+            elif isinstance(predicate, EventResourceFilter):
+                resources = predicate.resources
+                notified = notified and (not resources or resource_name in resources)
+            elif isinstance(predicate, EventImpactedFields):
+                fields = predicate.fields
+        if notified and (fields is None or "old" in fields):
+            return True
+    return False
 
 
 def notify_resource_event(
@@ -296,6 +456,9 @@ def notify_resource_event(
     elif action == ACTIONS.DELETE:
         if not isinstance(data, list):
             impacted = [{"new": data, "old": old}]
+        elif old is None:
+            # Previous versions were not fetched, since no subscriber reads them.
+            impacted = [{"new": new} for new in data]
         else:
             impacted = []
             for i, new in enumerate(data):
@@ -304,7 +467,13 @@ def notify_resource_event(
         impacted = [{"new": data, "old": old}]
 
     # Get previously triggered events.
-    events = request.bound_data.setdefault("resource_events", EventCollector())
+    events = request.bound_data.get("resource_events")
+    if events is None:
+        settings = request.registry.settings
+        compact_threshold = int(settings.get("resource_events_compact_threshold", 0))
+        events = request.bound_data["resource_events"] = EventCollector(
+            compact_threshold=compact_threshold
+        )
 
     resource_name = resource_name or request.current_resource_name
     matchdict = resource_data or dict(request.matchdict)
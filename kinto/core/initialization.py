@@ -2,7 +2,7 @@ import logging
 import random
 import re
 import warnings
-from collections.abc import Callable
+from collections.abc import Callable, Iterable, Iterator
 from datetime import datetime
 from typing import Any
 
@@ -27,7 +27,9 @@ from pyramid.settings import asbool, aslist
 from pyramid_multiauth import MultiAuthPolicySelected, MultiAuthSecurityPolicy
 
 from kinto.core import cache, errors, metrics, permission, storage, utils
-from kinto.core.events import ACTIONS, ResourceChanged, ResourceRead
+from kinto.core.events import ACTIONS, AfterResourceChangedBatch, ResourceChanged, ResourceRead
+from kinto.core.listeners import get_impacted_fields, has_batch_processing
+from kinto.core.listeners.outbox import setup_outbox
 
 
 try:
@@ -163,6 +165,7 @@ def setup_authentication(config: Configurator) -> None:
         # than using the one specified in settings.
         authn_type = getattr(event.policy, "name", event.policy_name.lower())
         request.authn_type = authn_type
+        request.authn_policy = event.policy
         request.selected_userid = event.userid
         # Add authentication info to context.
         request.log_context(uid=event.userid, authn_type=authn_type)
@@ -433,6 +436,15 @@ def setup_logging(config: Configurator) -> None:
     config.add_subscriber(on_new_response, NewResponse)
 
 
+def _sized_app_iter(app_iter: Iterable[bytes], on_sent: Callable[[int], Any]) -> Iterator[bytes]:
+    """Pass the size of the streamed body to `on_sent`, once sent."""
+    size = 0
+    for chunk in app_iter:
+        size += len(chunk)
+        yield chunk
+    on_sent(size)
+
+
 def setup_metrics(config) -> None:
     settings = config.get_settings()
 
@@ -545,10 +557,17 @@ def setup_metrics(config) -> None:
             # Logging was not setup in this Kinto app (unlikely but possible)
             pass
 
-        # Observe response size.
-        metrics_service.observe(
-            "request_size", len(event.response.body or b""), labels=request_labels
-        )
+        # Observe response size (once sent, for streamed responses).
+        response = event.response
+        if response.content_length is None and not isinstance(response.app_iter, (list, tuple)):
+            response.app_iter = _sized_app_iter(
+                response.app_iter,
+                lambda size: metrics_service.observe("request_size", size, labels=request_labels),
+            )
+        else:
+            metrics_service.observe(
+                "request_size", len(response.body or b""), labels=request_labels
+            )
 
         # Count authentication verifications.
         try:
@@ -585,10 +604,27 @@ class EventResourceFilter:
         return not resource or not self.resources or resource in self.resources
 
 
+class EventImpactedFields:
+    """Declare the fields of the impacted objects read by a subscriber (e.g.
+    ``("new",)``), to skip fetching the others when possible. It does not
+    filter events.
+    """
+
+    def __init__(self, fields: list[str], config: Configurator) -> None:
+        self.fields = fields
+
+    def phash(self) -> str:
+        return f"impacted_fields = {','.join(self.fields)}"
+
+    def __call__(self, event: Any) -> bool:
+        return True
+
+
 def setup_listeners(config: Configurator) -> None:
     # Register basic subscriber predicates, to filter events.
     config.add_subscriber_predicate("for_actions", EventActionFilter)
     config.add_subscriber_predicate("for_resources", EventResourceFilter)
+    config.add_subscriber_predicate("impacted_fields", EventImpactedFields)
 
     write_actions = (ACTIONS.CREATE, ACTIONS.UPDATE, ACTIONS.DELETE)
     settings = config.get_settings()
@@ -643,8 +679,65 @@ def setup_listeners(config: Configurator) -> None:
             config.add_subscriber(wrapped_listener, ResourceRead, **options)
             actions = [a for a in actions if a != ACTIONS.READ]
 
-        if len(actions) > 0:
-            config.add_subscriber(wrapped_listener, ResourceChanged, **options)
+        if len(actions) == 0:
+            continue
+
+        # Listeners can declare the fields of the impacted objects they read.
+        impacted_fields = get_impacted_fields(listener)
+        fields_options = {}
+        if impacted_fields is not None:
+            fields_options["impacted_fields"] = impacted_fields
+
+        # Optional asynchronous delivery of changes, through the outbox.
+        async_setting = prefix + "async"
+        # Read from ENV or settings.
+        async_value = utils.read_env(
+            f"{settings_prefix}.{async_setting}", settings.get(async_setting, False)
+        )
+        # Listeners can receive the changes in bulk.
+        batched = has_batch_processing(listener)
+        if batched:
+            wrapped_listener = metrics.listener_with_timer(
+                config, f"listeners.{name}", listener.process_batch
+            )
+
+        if asbool(async_value):
+            outbox = setup_outbox(config)
+            outbox.add_listener(name, wrapped_listener, batch=batched)
+            compact = None
+            if impacted_fields is not None:
+                compact = _impacted_fields_compactor(impacted_fields)
+            writer = outbox.writer(name, compact=compact)
+            config.add_subscriber(writer, ResourceChanged, **options, **fields_options)
+        elif batched:
+            subscriber = _batch_subscriber(config, wrapped_listener, options)
+            config.add_subscriber(subscriber, AfterResourceChangedBatch, **fields_options)
+        else:
+            config.add_subscriber(wrapped_listener, ResourceChanged, **options, **fields_options)
+
+
+def _impacted_fields_compactor(fields: tuple[str, ...]) -> Callable[[ResourceChanged], list]:
+    """Return a function reducing the impacted objects of events to the `fields`."""
+    return lambda event: [
+        {k: v for k, v in impacted.items() if k in fields} for impacted in event.impacted_objects
+    ]
+
+
+def _batch_subscriber(config: Configurator, process_batch: Callable, options: dict) -> Callable:
+    """Return a subscriber passing the changes of a request to `process_batch`,
+    filtered like with the ``for_actions`` and ``for_resources`` predicates.
+    """
+    predicates = [
+        EventActionFilter(options["for_actions"], config),
+        EventResourceFilter(options["for_resources"], config),
+    ]
+
+    def subscriber(batch: AfterResourceChangedBatch) -> None:
+        events = [e for e in batch.events if all(predicate(e) for predicate in predicates)]
+        if events:
+            process_batch(events)
+
+    return subscriber
 
 
 def load_default_settings(config: Configurator, default_settings: dict) -> None:
@@ -2,6 +2,12 @@ from typing import Any
 
 
 class ListenerBase:
+    impacted_fields: tuple[str, ...] | None = None
+    """Fields of the impacted objects read by the listener (e.g. ``("new",)``).
+    When none of the listeners read ``old``, the previous version of deleted
+    objects is not fetched. ``None`` means all fields.
+    """
+
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         pass
 
@@ -10,3 +16,30 @@ class ListenerBase:
         :param event: Incoming event
         """
         raise NotImplementedError()
+
+    def process_batch(self, events: list[Any]) -> None:
+        """Optional entry point to receive changes in bulk.
+
+        When overridden, the ``AfterResourceChanged`` events of each request
+        (or of each batch read from the outbox, for asynchronous listeners)
+        are passed at once, after commit, instead of calling the listener with
+        every ``ResourceChanged`` event. Read events are still passed to
+        :meth:`__call__`.
+
+        :param events: Incoming events, in chronological order
+        """
+        for event in events:
+            self(event)
+
+
+def has_batch_processing(listener: Any) -> bool:
+    """Return whether the `listener` overrides :meth:`ListenerBase.process_batch`."""
+    process_batch = getattr(type(listener), "process_batch", None)
+    return process_batch is not None and process_batch is not ListenerBase.process_batch
+
+
+def get_impacted_fields(listener: Any) -> tuple[str, ...] | None:
+    """Return the fields of the impacted objects declared by the `listener`
+    class (see :attr:`ListenerBase.impacted_fields`).
+    """
+    return getattr(type(listener), "impacted_fields", None)
@@ -0,0 +1,295 @@
+"""
+Asynchronous delivery of resource events to listeners, through an outbox.
+
+When a listener is enabled as asynchronous::
+
+    kinto.event_listeners.redis.async = true
+
+the events it subscribes to are written in the storage backend, in the same
+transaction as the changes that triggered them. Once committed, they are
+delivered by worker threads of the application processes, or by the
+``kinto process-events`` command.
+
+Each listener has its own queue in the storage backend (see
+:meth:`kinto.core.storage.StorageBase.enqueue`), processed by one worker at a
+time, and delivered events are removed from it. Events are read in the order
+they were written, which may differ from the order of the commits of
+concurrent transactions. Delivery is *at least once*: an event can be delivered again
+if a worker stops before having removed it. A failing event is retried, with
+exponential backoff, and dropped after too many attempts.
+
+Listeners which override :meth:`kinto.core.listeners.ListenerBase.process_batch`
+receive the events of a queue in batches. A batch can be delayed until its
+oldest event is ``event_listeners_async_batch_window_seconds`` old, to group
+the changes of several requests.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+import transaction
+from pyramid.request import Request, apply_request_extensions
+
+from kinto.core.events import AfterResourceChanged, ResourceChanged
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 1
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_POLL_INTERVAL_SECONDS = 1
+DEFAULT_BATCH_WINDOW_SECONDS = 0
+
+
+class Outbox:
+    """Queues of events waiting to be delivered to asynchronous listeners.
+
+    :param registry: the application registry, with ``storage``
+    :param int workers: number of worker threads per process, or ``0`` to
+        deliver events with ``kinto process-events`` only
+    :param int batch_size: maximum number of events read at once per queue
+    :param int max_retries: number of attempts before dropping an event
+    :param float poll_interval: seconds between checks of empty queues
+    :param float batch_window: seconds to wait for more events before
+        delivering an incomplete batch to batch listeners
+    """
+
+    def __init__(
+        self,
+        registry: Any,
+        workers: int = DEFAULT_WORKERS,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        poll_interval: float = DEFAULT_POLL_INTERVAL_SECONDS,
+        batch_window: float = DEFAULT_BATCH_WINDOW_SECONDS,
+    ):
+        self.registry = registry
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.poll_interval = poll_interval
+        self.batch_window = batch_window
+        self.listeners: dict[str, Callable[[Any], Any]] = {}
+        # Listeners receiving lists of events.
+        self.batched: set[str] = set()
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._pid: int | None = None
+        # Queues being processed by a thread of this process.
+        self._processing: set[str] = set()
+        # Failed attempts and time of next retry, by event id.
+        self._attempts: dict[Any, int] = {}
+        self._retry_at: dict[Any, float] = {}
+
+    def add_listener(self, name: str, listener: Callable[[Any], Any], batch: bool = False) -> None:
+        self.listeners[name] = listener
+        if batch:
+            self.batched.add(name)
+
+    def writer(
+        self, name: str, compact: Callable[[ResourceChanged], list[dict]] | None = None
+    ) -> Callable[[ResourceChanged], None]:
+        """Return a subscriber that writes the events in the queue of the
+        listener `name`.
+
+        :param compact: optional function returning the impacted objects of an
+            event reduced to what the listener needs (e.g. without their
+            ``old`` version), or completed with what it cannot read later
+        """
+
+        def write(event: ResourceChanged) -> None:
+            impacted_objects = event.impacted_objects
+            if compact is not None:
+                impacted_objects = compact(event)
+            entry = {
+                "payload": event.payload,
+                "impacted_objects": impacted_objects,
+                "created_at": time.time(),
+            }
+            self.registry.storage.enqueue(name, entry)
+            # Wake the workers once the event is committed.
+            current = transaction.get()
+            current.addAfterCommitHook(lambda success: success and self.wake())
+
+        return write
+
+    def wake(self) -> None:
+        """Signal the workers that events are pending, starting them if
+        necessary.
+        """
+        self.start()
+        self._wakeup.set()
+
+    def start(self) -> None:
+        """Start the worker threads of this process, unless already running."""
+        pid = os.getpid()
+        with self._lock:
+            # Threads do not survive forks, start them in each process.
+            if self.workers <= 0 or self._pid == pid:
+                return
+            self._pid = pid
+            self._stopped.clear()
+            for i in range(self.workers):
+                thread = threading.Thread(target=self.run, name=f"outbox-{i}", daemon=True)
+                thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._wakeup.set()
+
+    def run(self, once: bool = False) -> None:
+        """Deliver events until stopped, or until the queues are empty if
+        `once` is true.
+        """
+        while not self._stopped.is_set():
+            try:
+                processed = self.run_once()
+            except Exception:
+                logger.exception("Could not process the events outbox")
+                processed = 0
+            if processed:
+                continue
+            if once:
+                return
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    def run_once(self) -> int:
+        """Deliver a batch of events of each queue.
+
+        :returns: the number of events removed from the queues.
+        """
+        return sum(self.process(name) for name in self.listeners)
+
+    def process(self, name: str) -> int:
+        """Deliver a batch of events of the queue of the listener `name`,
+        unless another worker is processing it.
+
+        :returns: the number of events removed from the queue.
+        """
+        with self._lock:
+            if name in self._processing:
+                return 0
+            self._processing.add(name)
+        try:
+            # Workers of other processes skip the queue until it is released.
+            with self.registry.storage.claim_queue(name) as claimed:
+                if not claimed:
+                    return 0
+                return self._process(name)
+        finally:
+            with self._lock:
+                self._processing.discard(name)
+
+    def _process(self, name: str) -> int:
+        storage = self.registry.storage
+        with transaction.manager:
+            entries = storage.list_queue(name, limit=self.batch_size)
+        if not entries:
+            return 0
+
+        listener = self.listeners[name]
+        request = self._request()
+        done = []
+        if name in self.batched:
+            oldest = entries[0]["created_at"]
+            if len(entries) < self.batch_size and oldest + self.batch_window > time.time():
+                # Wait for more events to fill the batch.
+                return 0
+            if self._deliver(name, entries, listener, request):
+                done = [entry["id"] for entry in entries]
+        else:
+            for entry in entries:
+                # Stop at the first failure, to preserve ordering.
+                if not self._deliver(name, [entry], lambda events: listener(events[0]), request):
+                    break
+                done.append(entry["id"])
+
+        if done:
+            with transaction.manager:
+                storage.dequeue(name, done)
+        return len(done)
+
+    def _deliver(
+        self, name: str, entries: list[dict], deliver: Callable[[list], Any], request: Request
+    ) -> bool:
+        """Pass the events of the `entries` to `deliver`, unless they are
+        waiting to be retried.
+
+        :returns: whether the events can be removed from the queue, because
+            they were delivered or dropped.
+        """
+        # Attempts of a batch are counted on its first event.
+        entry_id = entries[0]["id"]
+        if self._retry_at.get(entry_id, 0) > time.monotonic():
+            return False
+
+        events = [
+            AfterResourceChanged(entry["payload"], entry["impacted_objects"], request)
+            for entry in entries
+        ]
+        try:
+            with transaction.manager:
+                deliver(events)
+        except Exception:
+            attempts = self._attempts.get(entry_id, 0) + 1
+            if attempts < self.max_retries:
+                logger.warning(
+                    "Listener %r failed on event %r (attempt %s)",
+                    name,
+                    entry_id,
+                    attempts,
+                    exc_info=True,
+                )
+                self._attempts[entry_id] = attempts
+                delay = self.poll_interval * 2 ** (attempts - 1)
+                self._retry_at[entry_id] = time.monotonic() + delay
+                return False
+            logger.exception("Listener %r failed on event %r, dropped", name, entry_id)
+
+        self._attempts.pop(entry_id, None)
+        self._retry_at.pop(entry_id, None)
+        return True
+
+    def _request(self) -> Request:
+        """Return a request for the delivered events, since the original one
+        is gone.
+        """
+        request = Request.blank(path="/")
+        request.registry = self.registry
+        apply_request_extensions(request)
+        return request
+
+
+def setup_outbox(config) -> Outbox:
+    """Return the outbox of the application, created on first call."""
+    outbox = getattr(config.registry, "outbox", None)
+    if outbox is None:
+        settings = config.get_settings()
+        outbox = Outbox(
+            config.registry,
+            workers=int(settings.get("event_listeners_async_workers", DEFAULT_WORKERS)),
+            batch_size=int(settings.get("event_listeners_async_batch_size", DEFAULT_BATCH_SIZE)),
+            max_retries=int(
+                settings.get("event_listeners_async_max_retries", DEFAULT_MAX_RETRIES)
+            ),
+            poll_interval=float(
+                settings.get(
+                    "event_listeners_async_poll_interval_seconds", DEFAULT_POLL_INTERVAL_SECONDS
+                )
+            ),
+            batch_window=float(
+                settings.get(
+                    "event_listeners_async_batch_window_seconds", DEFAULT_BATCH_WINDOW_SECONDS
+                )
+            ),
+        )
+        config.registry.outbox = outbox
+    return outbox
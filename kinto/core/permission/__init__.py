@@ -185,10 +185,29 @@ class PermissionBase:
         """
         raise NotImplementedError
 
-    def delete_object_permissions(self, *object_id_list: str) -> None:
+    def replace_objects_permissions(self, objects_permissions: dict[str, dict[str, Any]]) -> None:
+        """Update the set of principals allowed to perform some actions on
+        several objects at once.
+
+        The default implementation simply calls :meth:`replace_object_permissions`
+        for each object. Backends may override it to proceed in one operation.
+
+        :param objects_permissions: A dict of object id -> permissions
+        (see :meth:`replace_object_permissions`).
+
+        """
+        for object_id, permissions in objects_permissions.items():
+            self.replace_object_permissions(object_id, permissions)
+
+    def delete_object_permissions(self, *object_id_list: str) -> int:
         """Delete all listed object permissions.
 
+        The object ids can be a pattern, (e.g. ``'/buckets/blog/*'`` to remove
+        the permissions of the whole subtree).
+
         :param str object_id_list: Remove given objects permissions.
+        :returns: The number of deleted entries.
+        :rtype: int
         """
         raise NotImplementedError
 
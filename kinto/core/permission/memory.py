@@ -1,11 +1,24 @@
+import bisect
 import re
 from collections.abc import Iterable
 from typing import Any
 
 from pyramid.config import Configurator
+from pyramid.settings import asbool
 
 from kinto.core.decorators import synchronized
 from kinto.core.permission import PermissionBase
+from kinto.core.persistence import SNAPSHOT_INTERVAL, Journal
+
+
+JOURNALED_OPERATIONS = (
+    "add_user_principal",
+    "remove_user_principal",
+    "remove_principal",
+    "add_principal_to_ace",
+    "remove_principal_from_ace",
+    "delete_object_permissions",
+)
 
 
 class Permission(PermissionBase):
@@ -15,86 +28,115 @@ class Permission(PermissionBase):
 
         kinto.permission_backend = kinto.core.permission.memory
 
+    In addition to the Access Control Entries by object, some indexes are
+    maintained (objects by principal and sorted object ids) so that lookups
+    are proportional to the size of the result rather than the whole store.
+
+    If a persistence path is configured, operations are journaled, and
+    periodically snapshotted, into this folder and restored on startup.
+
     :noindex:
     """
 
-    def __init__(self, *args, **kwargs):
+    def __init__(
+        self,
+        *args,
+        persistence_path: str | None = None,
+        persistence_snapshot_interval: int = SNAPSHOT_INTERVAL,
+        persistence_fsync: bool = False,
+        **kwargs,
+    ):
         super().__init__(*args, **kwargs)
-        self.flush()
+        self._journal: Journal | None = None
+        self._reset()
+
+        if persistence_path:
+            journal = Journal(
+                persistence_path,
+                dump_state=self._dump_state,
+                snapshot_interval=persistence_snapshot_interval,
+                fsync=persistence_fsync,
+            )
+            journal.load(restore_state=self._restore_state, replay=self._replay)
+            self._journal = journal
 
     def initialize_schema(self, dry_run: bool = False) -> None:
         # Nothing to do.
         pass
 
+    @synchronized
     def flush(self) -> None:
-        self._store: dict[str, set[str]] = {}
+        self._reset()
+        self._log("flush")
+
+    def snapshot(self) -> None:
+        """Write a snapshot of the permissions, if persistence is enabled."""
+        if self._journal is not None:
+            self._journal.snapshot()
+
+    def _reset(self) -> None:
+        # user_id -> principals
+        self._user_principals: dict[str, set[str]] = {}
+        # principal -> user_ids
+        self._principal_users: dict[str, set[str]] = {}
+        # object_id -> permission -> principals
+        self._aces: dict[str, dict[str, set[str]]] = {}
+        # principal -> (object_id, permission)
+        self._principal_aces: dict[str, set[tuple[str, str]]] = {}
+        # Sorted object ids, for prefix scans.
+        self._object_ids: list[str] = []
 
     @synchronized
     def add_user_principal(self, user_id: str, principal: str) -> None:
-        user_key = f"user:{user_id}"
-        user_principals = self._store.get(user_key, set())
-        user_principals.add(principal)
-        self._store[user_key] = user_principals
+        self._user_principals.setdefault(user_id, set()).add(principal)
+        self._principal_users.setdefault(principal, set()).add(user_id)
+        self._log("add_user_principal", user_id, principal)
 
     @synchronized
     def remove_user_principal(self, user_id: str, principal: str) -> None:
-        user_key = f"user:{user_id}"
-        user_principals = self._store.get(user_key, set())
-        try:
-            user_principals.remove(principal)
-        except KeyError:
-            pass
-        if len(user_principals) == 0:
-            if user_key in self._store:
-                del self._store[user_key]
-        else:
-            self._store[user_key] = user_principals
+        _discard(self._user_principals, user_id, principal)
+        _discard(self._principal_users, principal, user_id)
+        self._log("remove_user_principal", user_id, principal)
 
     @synchronized
     def remove_principal(self, principal: str) -> None:
-        for key, user_principals in self._store.items():
-            if not key.startswith("user:"):
-                continue
-            try:
-                user_principals.remove(principal)
-            except KeyError:
-                pass
+        for user_id in self._principal_users.pop(principal, set()):
+            _discard(self._user_principals, user_id, principal)
+        self._log("remove_principal", principal)
 
     @synchronized
     def get_user_principals(self, user_id: str) -> set[str]:
         # Fetch the groups the user is in.
-        user_key = f"user:{user_id}"
-        members = self._store.get(user_key, set())
+        members = self._user_principals.get(user_id, set())
         # Fetch the groups system.Authenticated is in.
-        group_authenticated = self._store.get("user:system.Authenticated", set())
+        group_authenticated = self._user_principals.get("system.Authenticated", set())
         return members | group_authenticated
 
     @synchronized
     def add_principal_to_ace(self, object_id: str, permission: str, principal: str) -> None:
-        permission_key = f"permission:{object_id}:{permission}"
-        object_permission_principals = self._store.get(permission_key, set())
-        object_permission_principals.add(principal)
-        self._store[permission_key] = object_permission_principals
+        if object_id not in self._aces:
+            self._aces[object_id] = {}
+            bisect.insort(self._object_ids, object_id)
+        self._aces[object_id].setdefault(permission, set()).add(principal)
+        self._principal_aces.setdefault(principal, set()).add((object_id, permission))
+        self._log("add_principal_to_ace", object_id, permission, principal)
 
     @synchronized
     def remove_principal_from_ace(self, object_id: str, permission: str, principal: str) -> None:
-        permission_key = f"permission:{object_id}:{permission}"
-        object_permission_principals = self._store.get(permission_key, set())
-        try:
-            object_permission_principals.remove(principal)
-        except KeyError:
-            pass
-        if len(object_permission_principals) == 0:
-            if permission_key in self._store:
-                del self._store[permission_key]
-        else:
-            self._store[permission_key] = object_permission_principals
+        object_aces = self._aces.get(object_id, {})
+        if principal not in object_aces.get(permission, set()):
+            return
+        object_aces[permission].remove(principal)
+        _discard(self._principal_aces, principal, (object_id, permission))
+        if not object_aces[permission]:
+            del object_aces[permission]
+        if not object_aces:
+            self._remove_object(object_id)
+        self._log("remove_principal_from_ace", object_id, permission, principal)
 
     @synchronized
     def get_object_permission_principals(self, object_id: str, permission: str) -> set[str]:
-        permission_key = f"permission:{object_id}:{permission}"
-        members = self._store.get(permission_key, set())
-        return members
+        return set(self._aces.get(object_id, {}).get(permission, set()))
 
     @synchronized
     def get_accessible_objects(
@@ -104,26 +146,40 @@ class Permission(PermissionBase):
         with_children: bool = True,
     ) -> dict[str, set[str]]:
         principals = set(principals)
-        candidates = []
+        principals_aces = [self._principal_aces.get(p, set()) for p in principals]
+
+        perms_by_object_id: dict[str, set[str]] = {}
         if bound_permissions is None:
-            for key, value in self._store.items():
-                if key.startswith("permission:"):
-                    _, object_id, permission = key.split(":", 2)
-                    candidates.append((object_id, permission, value))
-        else:
-            for pattern, perm in bound_permissions:
-                id_match = ".*" if with_children else "[^/]+"
-                regexp = re.compile(f"^{pattern.replace('*', id_match)}$")
-                for key, value in self._store.items():
-                    if key.endswith(perm):
-                        object_id = key.split(":")[1]
-                        if regexp.match(object_id):
-                            candidates.append((object_id, perm, value))
-
-        perms_by_object_id = {}
-        for object_id, perm, value in candidates:
-            if len(principals & value) > 0:
-                perms_by_object_id.setdefault(object_id, set()).add(perm)
+            for aces in principals_aces:
+                for object_id, perm in aces:
+                    perms_by_object_id.setdefault(object_id, set()).add(perm)
+            return perms_by_object_id
+
+        principals_aces_count = sum(len(aces) for aces in principals_aces)
+        for pattern, perm in bound_permissions:
+            if "*" not in pattern:
+                if principals & self._aces.get(pattern, {}).get(perm, set()):
+                    perms_by_object_id.setdefault(pattern, set()).add(perm)
+                continue
+
+            id_match = ".*" if with_children else "[^/]+"
+            regexp = _pattern_regexp(pattern, id_match)
+
+            # Scan the smallest set of candidates: either the objects whose id
+            # starts with the pattern prefix, or the ACEs of the principals.
+            start, end = self._prefix_range(pattern.split("*", 1)[0])
+            if end - start < principals_aces_count:
+                for object_id in self._object_ids[start:end]:
+                    if not regexp.match(object_id):
+                        continue
+                    if principals & self._aces[object_id].get(perm, set()):
+                        perms_by_object_id.setdefault(object_id, set()).add(perm)
+            else:
+                for aces in principals_aces:
+                    for object_id, ace_perm in aces:
+                        if ace_perm == perm and regexp.match(object_id):
+                            perms_by_object_id.setdefault(object_id, set()).add(perm)
+
         return perms_by_object_id
 
     @synchronized
@@ -139,16 +195,10 @@ class Permission(PermissionBase):
     ) -> list[dict[str, set[str]]]:
         result = []
         for object_id in objects_ids:
-            if permissions is None:
-                aces = [k for k in self._store.keys() if k.startswith(f"permission:{object_id}:")]
-            else:
-                aces = [f"permission:{object_id}:{permission}" for permission in permissions]
-            perms = {}
-            for ace in aces:
-                # Should work with 'permission:/url/id:object:create'.
-                permission = ace.split(":", 2)[2]
-                perms[permission] = set(self._store[ace])
-            result.append(perms)
+            object_aces = self._aces.get(object_id, {})
+            if permissions is not None:
+                object_aces = {p: object_aces[p] for p in permissions if p in object_aces}
+            result.append({perm: set(principals) for perm, principals in object_aces.items()})
         return result
 
     @synchronized
@@ -156,25 +206,115 @@ class Permission(PermissionBase):
         self, object_id: str, permissions: dict[str, Any]
     ) -> dict[str, Any]:
         for permission, principals in permissions.items():
-            permission_key = f"permission:{object_id}:{permission}"
-            if permission_key in self._store and len(principals) == 0:
-                del self._store[permission_key]
-            elif principals:
-                self._store[permission_key] = set(principals)
+            existing = self.get_object_permission_principals(object_id, permission)
+            new_principals = set(principals)
+            for principal in existing - new_principals:
+                self.remove_principal_from_ace(object_id, permission, principal)
+            for principal in new_principals - existing:
+                self.add_principal_to_ace(object_id, permission, principal)
         return permissions
 
     @synchronized
-    def delete_object_permissions(self, *object_id_list: str) -> None:
-        to_delete = []
-        for key in self._store.keys():
-            object_id = key.split(":")[1]
-            for pattern in object_id_list:
-                regexp = re.compile(f"^{pattern.replace('*', '.*')}$")
-                if regexp.match(object_id):
-                    to_delete.append(key)
-        for k in to_delete:
-            del self._store[k]
+    def delete_object_permissions(self, *object_id_list: str) -> int:
+        to_delete = set()
+        for pattern in object_id_list:
+            if "*" not in pattern:
+                if pattern in self._aces:
+                    to_delete.add(pattern)
+                continue
+            regexp = _pattern_regexp(pattern, ".*")
+            start, end = self._prefix_range(pattern.split("*", 1)[0])
+            to_delete.update(o for o in self._object_ids[start:end] if regexp.match(o))
+
+        deleted = 0
+        for object_id in to_delete:
+            for permission, principals in self._aces[object_id].items():
+                deleted += len(principals)
+                for principal in principals:
+                    _discard(self._principal_aces, principal, (object_id, permission))
+            self._remove_object(object_id)
+        if to_delete:
+            self._log("delete_object_permissions", *to_delete)
+        return deleted
+
+    def _log(self, *entry: Any) -> None:
+        if self._journal is not None:
+            self._journal.append(entry)
+
+    @synchronized
+    def _dump_state(self) -> list[list[Any]]:
+        # Copy the state at once, serialization happens out of the lock.
+        users = [
+            ["user", u, sorted(principals)] for u, principals in self._user_principals.items()
+        ]
+        aces = [
+            ["ace", object_id, perm, sorted(principals)]
+            for object_id, object_aces in self._aces.items()
+            for perm, principals in object_aces.items()
+        ]
+        return users + aces
+
+    def _restore_state(self, entries: Iterable[list[Any]]) -> None:
+        for kind, *args in entries:
+            if kind == "user":
+                user_id, principals = args
+                self._user_principals[user_id] = set(principals)
+                for principal in principals:
+                    self._principal_users.setdefault(principal, set()).add(user_id)
+            else:
+                object_id, permission, principals = args
+                self._aces.setdefault(object_id, {})[permission] = set(principals)
+                for principal in principals:
+                    aces = self._principal_aces.setdefault(principal, set())
+                    aces.add((object_id, permission))
+        self._object_ids = sorted(self._aces)
+
+    def _replay(self, entry: list[Any]) -> None:
+        operation, *args = entry
+        if operation == "flush":
+            self._reset()
+        elif operation in JOURNALED_OPERATIONS:
+            getattr(self, operation)(*args)
+        else:
+            raise ValueError(f"Unknown journal operation {operation!r}")
+
+    def _remove_object(self, object_id: str) -> None:
+        del self._aces[object_id]
+        index = bisect.bisect_left(self._object_ids, object_id)
+        del self._object_ids[index]
+
+    def _prefix_range(self, prefix: str) -> tuple[int, int]:
+        """Return the slice of sorted object ids that start with `prefix`."""
+        start = bisect.bisect_left(self._object_ids, prefix)
+        if not prefix:
+            return start, len(self._object_ids)
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        end = bisect.bisect_left(self._object_ids, upper, lo=start)
+        return start, end
+
+
+def _pattern_regexp(pattern: str, id_match: str) -> re.Pattern:
+    """Compile the object id `pattern`, whose wildcards match `id_match`."""
+    escaped = re.escape(pattern).replace(r"\*", id_match)
+    return re.compile(f"^{escaped}$")
+
+
+def _discard(index: dict[str, set], key: str, value: Any) -> None:
+    """Remove `value` from the set of `key` in `index`, and the key if empty."""
+    values = index.get(key)
+    if values is None:
+        return
+    values.discard(value)
+    if not values:
+        del index[key]
 
 
 def load_from_config(config: Configurator) -> Permission:
-    return Permission()
+    settings = config.get_settings()
+    return Permission(
+        persistence_path=settings.get("permission_persistence_path") or None,
+        persistence_snapshot_interval=int(
+            settings.get("permission_persistence_snapshot_interval", SNAPSHOT_INTERVAL)
+        ),
+        persistence_fsync=asbool(settings.get("permission_persistence_fsync", False)),
+    )
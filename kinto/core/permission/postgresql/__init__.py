@@ -458,44 +458,125 @@ class Permission(PermissionBase, MigratorMixin):
         with self.client.connect() as conn:
             conn.execute(sa.text(query), placeholders)
 
-    def delete_object_permissions(self, *object_id_list: str) -> None:
-        if len(object_id_list) == 0:
-            return
+    def replace_objects_permissions(self, objects_permissions: dict[str, dict[str, Any]]) -> None:
+        placeholders: dict[str, Any] = {}
 
-        object_ids_values = []
-        placeholders = {}
-        for i, obj_id in enumerate(object_id_list):
-            object_ids_values.append(f"(:obj_id_{i})")
-            placeholders[f"obj_id_{i}"] = obj_id.replace("*", "%")
+        new_aces = []
+        specified_perms = []
+        for i, (object_id, permissions) in enumerate(objects_permissions.items()):
+            placeholders[f"obj_{i}"] = object_id
+            for perm, principals in permissions.items():
+                j = len(specified_perms)
+                placeholders[f"perm_{j}"] = perm
+                specified_perms.append(f"(:obj_{i}, :perm_{j})")
+                for principal in set(principals):
+                    k = len(new_aces)
+                    placeholders[f"principal_{k}"] = principal
+                    new_aces.append(f"(:obj_{i}, :perm_{j}, :principal_{k})")
+
+        if not specified_perms:
+            return
 
-        query = """
-        WITH object_ids AS (
-          VALUES {object_ids_values}
-        )
-        DELETE FROM access_control_entries
-         USING object_ids
-         WHERE object_id LIKE column1;"""
-
-        safeholders = {"object_ids_values": ",".join(object_ids_values)}
-
-        if len(object_id_list) == 1:
-            # Optimized version for just one object ID.  This can be
-            # done using an index scan on
-            # idx_access_control_entries_object_id. The more
-            # complicated form above confuses Postgres, which chooses
-            # to do a sequential table scan rather than an index scan
-            # for each entry in object_ids, even when there's only one
-            # entry in object_ids.
-            query = """
+        if not new_aces:
+            query = f"""
+            WITH specified_perms AS (
+              VALUES {",".join(specified_perms)}
+            )
             DELETE FROM access_control_entries
-             WHERE object_id LIKE :obj_id_0;
+             USING specified_perms
+             WHERE object_id = column1 AND permission = column2
             """
 
-        query = query.format_map(safeholders)
+        else:
+            # The new entries are inserted once the previous ones were deleted
+            # (the ``deleted`` count forces the evaluation order).
+            query = f"""
+            WITH specified_perms AS (
+              VALUES {",".join(specified_perms)}
+            ),
+            delete_specified AS (
+              DELETE FROM access_control_entries
+               USING specified_perms
+               WHERE object_id = column1 AND permission = column2
+               RETURNING object_id
+            ),
+            deleted AS (
+              SELECT COUNT(*) FROM delete_specified
+            ),
+            new_aces AS (
+              VALUES {",".join(new_aces)}
+            )
+            INSERT INTO access_control_entries(object_id, permission, principal)
+              SELECT DISTINCT n.column1, n.column2, n.column3
+                FROM new_aces AS n, deleted;
+            """
 
         with self.client.connect() as conn:
             conn.execute(sa.text(query), placeholders)
 
+    def delete_object_permissions(self, *object_id_list: str) -> int:
+        if len(object_id_list) == 0:
+            return 0
+
+        object_ids = set()
+        prefixes = set()
+        patterns = set()
+        for object_id in object_id_list:
+            if "*" not in object_id:
+                object_ids.add(object_id)
+            elif object_id.find("*") == len(object_id) - 1:
+                # Subtree deletion (e.g. ``/buckets/bid/*``).
+                prefixes.add(object_id[:-1])
+            else:
+                patterns.add(object_id.replace("*", "%"))
+
+        deleted = 0
+        with self.client.connect() as conn:
+            if object_ids:
+                # This can be done using an index scan on
+                # idx_access_control_entries_object_id, unlike a join on
+                # a list of values which makes Postgres choose to do a
+                # sequential table scan.
+                query = """
+                DELETE FROM access_control_entries
+                 WHERE object_id IN :object_ids;
+                """
+                result = conn.execute(sa.text(query), dict(object_ids=tuple(object_ids)))
+                deleted += result.rowcount
+
+            for prefix in prefixes:
+                deleted += self._delete_object_permissions_subtree(conn, prefix)
+
+            for pattern in patterns:
+                query = """
+                DELETE FROM access_control_entries
+                 WHERE object_id LIKE :pattern;
+                """
+                result = conn.execute(sa.text(query), dict(pattern=pattern))
+                deleted += result.rowcount
+
+        return deleted
+
+    def _delete_object_permissions_subtree(self, conn, prefix: str) -> int:
+        """Delete the entries whose object id starts with `prefix`.
+
+        Since object ids are ``COLLATE "C"``, the prefix condition is expressed
+        as a range, which leverages the object id index.
+        """
+        placeholders: dict[str, Any] = {"prefix": prefix}
+        upper_condition = ""
+        if prefix:
+            # /buckets/bid/ -> /buckets/bid0
+            placeholders["upper"] = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+            upper_condition = "AND object_id < :upper"
+
+        query = f"""
+        DELETE FROM access_control_entries
+         WHERE object_id >= :prefix {upper_condition};
+        """
+        result = conn.execute(sa.text(query), placeholders)
+        return result.rowcount
+
 
 def load_from_config(config: Configurator) -> Permission:
     client = create_from_config(config, prefix="permission_")
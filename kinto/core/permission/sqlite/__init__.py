@@ -0,0 +1,283 @@
+import logging
+import os
+from collections.abc import Iterable
+from typing import Any
+
+from pyramid.config import Configurator
+
+from kinto.core.permission import PermissionBase
+from kinto.core.storage.sqlite.client import SQLiteClient, create_from_config, glob_pattern
+
+
+logger = logging.getLogger(__name__)
+
+HERE = os.path.dirname(__file__)
+
+
+class Permission(PermissionBase):
+    """Permission backend using SQLite.
+
+    Enable in configuration::
+
+        kinto.permission_backend = kinto.core.permission.sqlite
+
+    Database file location can be customized::
+
+        kinto.permission_url = sqlite:////var/lib/kinto/kinto.sqlite
+
+    :noindex:
+    """
+
+    def __init__(self, client: SQLiteClient, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.client = client
+
+    def initialize_schema(self, dry_run: bool = False) -> None:
+        sql_file = os.path.join(HERE, "schema.sql")
+
+        if dry_run:
+            logger.info(f"Create SQLite permission schema from '{sql_file}'")
+            return
+
+        with open(sql_file) as f:
+            schema = f.read()
+        self.client.execute_script(schema)
+        logger.info("Created SQLite permission tables")
+
+    def flush(self) -> None:
+        with self.client.connect() as conn:
+            conn.execute("DELETE FROM user_principals;")
+            conn.execute("DELETE FROM access_control_entries;")
+        logger.debug("Flushed SQLite permission tables")
+
+    def add_user_principal(self, user_id: str, principal: str) -> None:
+        query = """
+        INSERT OR IGNORE INTO user_principals (user_id, principal)
+        VALUES (?, ?);"""
+        with self.client.connect() as conn:
+            conn.execute(query, (user_id, principal))
+
+    def remove_user_principal(self, user_id: str, principal: str) -> None:
+        query = """
+        DELETE FROM user_principals
+         WHERE user_id = ?
+           AND principal = ?;"""
+        with self.client.connect() as conn:
+            conn.execute(query, (user_id, principal))
+
+    def remove_principal(self, principal: str) -> None:
+        query = """
+        DELETE FROM user_principals
+         WHERE principal = ?;"""
+        with self.client.connect() as conn:
+            conn.execute(query, (principal,))
+
+    def get_user_principals(self, user_id: str) -> set[str]:
+        query = """
+        SELECT principal
+          FROM user_principals
+         WHERE user_id IN (?, 'system.Authenticated');"""
+        with self.client.connect(readonly=True) as conn:
+            rows = conn.execute(query, (user_id,)).fetchall()
+        return set([principal for (principal,) in rows])
+
+    def add_principal_to_ace(self, object_id: str, permission: str, principal: str) -> None:
+        query = """
+        INSERT OR IGNORE INTO access_control_entries (object_id, permission, principal)
+        VALUES (?, ?, ?);"""
+        with self.client.connect() as conn:
+            conn.execute(query, (object_id, permission, principal))
+
+    def remove_principal_from_ace(self, object_id: str, permission: str, principal: str) -> None:
+        query = """
+        DELETE FROM access_control_entries
+         WHERE object_id = ?
+           AND permission = ?
+           AND principal = ?;"""
+        with self.client.connect() as conn:
+            conn.execute(query, (object_id, permission, principal))
+
+    def get_object_permission_principals(self, object_id: str, permission: str) -> set[str]:
+        query = """
+        SELECT principal
+          FROM access_control_entries
+         WHERE object_id = ?
+           AND permission = ?;"""
+        with self.client.connect(readonly=True) as conn:
+            rows = conn.execute(query, (object_id, permission)).fetchall()
+        return set([principal for (principal,) in rows])
+
+    def get_authorized_principals(self, bound_permissions: list[tuple[str, str]]) -> set[str]:
+        if not bound_permissions:
+            return set()
+
+        query = f"""
+        SELECT principal
+          FROM access_control_entries
+         WHERE (object_id, permission) IN (VALUES {_values(bound_permissions)});"""
+        placeholders = [value for bound in bound_permissions for value in bound]
+        with self.client.connect(readonly=True) as conn:
+            rows = conn.execute(query, placeholders).fetchall()
+        return set([principal for (principal,) in rows])
+
+    def get_accessible_objects(
+        self,
+        principals: Iterable[str],
+        bound_permissions: list[tuple[str, str]] | None = None,
+        with_children: bool = True,
+    ) -> dict[str, set[str]]:
+        principals = list(principals)
+        placeholders: list[Any] = [*principals]
+
+        if bound_permissions is None:
+            # Return all objects on which the specified principals have some
+            # permissions.
+            # (e.g. permissions endpoint which lists everything)
+            query = f"""
+            SELECT object_id, permission
+              FROM access_control_entries
+             WHERE principal IN ({_values(principals)});
+            """
+        elif len(bound_permissions) == 0:
+            # If the list of object permissions to filter on is empty, then
+            # do not bother querying the backend. The result will be empty.
+            # (e.g. root object /buckets)
+            return {}
+        else:
+            conditions = []
+            for pattern, perm in bound_permissions:
+                if "*" not in pattern:
+                    conditions.append("(object_id = ? AND permission = ?)")
+                    placeholders += [pattern, perm]
+                elif with_children:
+                    conditions.append("(object_id GLOB ? AND permission = ?)")
+                    placeholders += [glob_pattern(pattern), perm]
+                else:
+                    conditions.append(
+                        "(object_id GLOB ? AND object_id NOT GLOB ? AND permission = ?)"
+                    )
+                    placeholders += [glob_pattern(pattern), glob_pattern(pattern + "/*"), perm]
+            query = f"""
+            SELECT object_id, permission
+              FROM access_control_entries
+             WHERE principal IN ({_values(principals)})
+               AND ({" OR ".join(conditions)});
+            """
+
+        with self.client.connect(readonly=True) as conn:
+            rows = conn.execute(query, placeholders).fetchall()
+
+        perms_by_id = {}
+        for object_id, permission in rows:
+            perms_by_id.setdefault(object_id, set()).add(permission)
+        return perms_by_id
+
+    def get_objects_permissions(
+        self, objects_ids: list[str], permissions: list[str] | None = None
+    ) -> list[dict[str, set[str]]]:
+        query = f"""
+        SELECT object_id, permission, principal
+          FROM access_control_entries
+         WHERE object_id IN ({_values(objects_ids)})
+        """
+        placeholders = list(objects_ids)
+        if permissions is not None:
+            query += f" AND permission IN ({_values(permissions)})"
+            placeholders += permissions
+
+        with self.client.connect(readonly=True) as conn:
+            rows = conn.execute(query, placeholders).fetchall()
+
+        groupby_id: dict[str, dict[str, set[str]]] = {}
+        for object_id in objects_ids:
+            groupby_id[object_id] = {}
+        for object_id, permission, principal in rows:
+            groupby_id[object_id].setdefault(permission, set()).add(principal)
+        return list(groupby_id.values())
+
+    def replace_object_permissions(self, object_id: str, permissions: dict[str, Any]) -> None:
+        self.replace_objects_permissions({object_id: permissions})
+
+    def replace_objects_permissions(self, objects_permissions: dict[str, dict[str, Any]]) -> None:
+        delete_query = """
+        DELETE FROM access_control_entries
+         WHERE object_id = ?
+           AND permission = ?;"""
+        insert_query = """
+        INSERT OR IGNORE INTO access_control_entries (object_id, permission, principal)
+        VALUES (?, ?, ?);"""
+
+        specified_perms = []
+        new_aces = []
+        for object_id, permissions in objects_permissions.items():
+            for perm, principals in permissions.items():
+                specified_perms.append((object_id, perm))
+                new_aces.extend((object_id, perm, principal) for principal in set(principals))
+
+        if not specified_perms:
+            return
+
+        with self.client.connect() as conn:
+            conn.executemany(delete_query, specified_perms)
+            conn.executemany(insert_query, new_aces)
+
+    def delete_object_permissions(self, *object_id_list: str) -> int:
+        if len(object_id_list) == 0:
+            return 0
+
+        object_ids = []
+        prefixes = []
+        patterns = []
+        for object_id in object_id_list:
+            if "*" not in object_id:
+                object_ids.append(object_id)
+            elif object_id.find("*") == len(object_id) - 1:
+                # Subtree deletion (e.g. ``/buckets/bid/*``).
+                prefixes.append(object_id[:-1])
+            else:
+                patterns.append(glob_pattern(object_id))
+
+        deleted = 0
+        with self.client.connect() as conn:
+            if object_ids:
+                query = f"""
+                DELETE FROM access_control_entries
+                 WHERE object_id IN ({_values(object_ids)});
+                """
+                deleted += conn.execute(query, object_ids).rowcount
+
+            for prefix in prefixes:
+                # Expressed as a range, which leverages the primary key index.
+                if prefix:
+                    # /buckets/bid/ -> /buckets/bid0
+                    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+                    query = """
+                    DELETE FROM access_control_entries
+                     WHERE object_id >= ? AND object_id < ?;
+                    """
+                    deleted += conn.execute(query, (prefix, upper)).rowcount
+                else:
+                    query = "DELETE FROM access_control_entries;"
+                    deleted += conn.execute(query).rowcount
+
+            for pattern in patterns:
+                query = """
+                DELETE FROM access_control_entries
+                 WHERE object_id GLOB ?;
+                """
+                deleted += conn.execute(query, (pattern,)).rowcount
+
+        return deleted
+
+
+def _values(values: list[Any]) -> str:
+    """Return the placeholders of `values`, as tuples if they are."""
+    if values and isinstance(values[0], tuple):
+        row = f"({', '.join('?' * len(values[0]))})"
+        return ", ".join([row] * len(values))
+    return ", ".join("?" * len(values))
+
+
+def load_from_config(config: Configurator) -> Permission:
+    client = create_from_config(config, prefix="permission_")
+    return Permission(client=client)
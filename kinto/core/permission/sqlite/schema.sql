@@ -0,0 +1,18 @@
+CREATE TABLE IF NOT EXISTS user_principals (
+    user_id TEXT NOT NULL,
+    principal TEXT NOT NULL,
+
+    PRIMARY KEY (user_id, principal)
+);
+CREATE INDEX IF NOT EXISTS idx_user_principals_principal
+    ON user_principals(principal);
+
+CREATE TABLE IF NOT EXISTS access_control_entries (
+    object_id TEXT NOT NULL,
+    permission TEXT NOT NULL,
+    principal TEXT NOT NULL,
+
+    PRIMARY KEY (object_id, permission, principal)
+);
+CREATE INDEX IF NOT EXISTS idx_access_control_entries_principal_permission
+    ON access_control_entries(principal, permission);
@@ -54,6 +54,7 @@ class PermissionTest(_PermissionTestBase):
             (self.permission.get_object_permission_principals, "", ""),
             (self.permission.get_object_permissions, ""),
             (self.permission.replace_object_permissions, "", {"write": []}),
+            (self.permission.replace_objects_permissions, {"": {"write": []}}),
             (self.permission.delete_object_permissions, ""),
             (self.permission.get_accessible_objects, []),
             (self.permission.get_authorized_principals, [("*", "read")]),
@@ -466,6 +467,49 @@ class PermissionTest(_PermissionTestBase):
         permissions = self.permission.get_object_permissions("/url/a/id/1")
         self.assertEqual(len(permissions), 0)
 
+    def test_replace_objects_permissions_replace_given_sets_of_every_object(self):
+        self.permission.add_principal_to_ace("/url/a/id/1", "write", "user1")
+        self.permission.add_principal_to_ace("/url/a/id/1", "read", "user3")
+        self.permission.add_principal_to_ace("/url/a/id/2", "write", "user2")
+        self.permission.add_principal_to_ace("/url/a/id/3", "write", "user3")
+
+        self.permission.replace_objects_permissions(
+            {
+                "/url/a/id/1": {"write": ["user2"], "new": ["user3", "user3"]},
+                "/url/a/id/2": {"write": []},
+                "/url/a/id/4": {"read": ["user4"]},
+            }
+        )
+
+        permissions = self.permission.get_objects_permissions(
+            ["/url/a/id/1", "/url/a/id/2", "/url/a/id/3", "/url/a/id/4"]
+        )
+        self.assertEqual(
+            permissions,
+            [
+                {"write": {"user2"}, "read": {"user3"}, "new": {"user3"}},
+                {},
+                {"write": {"user3"}},
+                {"read": {"user4"}},
+            ],
+        )
+
+    def test_replace_objects_permissions_supports_only_removals(self):
+        self.permission.add_principal_to_ace("/url/a/id/1", "write", "user1")
+        self.permission.add_principal_to_ace("/url/a/id/2", "write", "user2")
+        self.permission.replace_objects_permissions(
+            {"/url/a/id/1": {"write": []}, "/url/a/id/2": {"write": set()}}
+        )
+        permissions = self.permission.get_objects_permissions(["/url/a/id/1", "/url/a/id/2"])
+        self.assertEqual(permissions, [{}, {}])
+
+    def test_replace_objects_permissions_supports_empty_input(self):
+        self.permission.add_principal_to_ace("/url/a/id/1", "write", "user1")
+        self.permission.replace_objects_permissions({})
+        self.permission.replace_objects_permissions({"/url/a/id/1": {}})
+        permissions = self.permission.get_object_permissions("/url/a/id/1")
+        self.assertDictEqual(permissions, {"write": {"user1"}})
+
     def test_delete_object_permissions_remove_all_given_objects_acls(self):
         self.permission.add_principal_to_ace("/url/a/id/1", "write", "user1")
         self.permission.add_principal_to_ace("/url/a/id/1", "write", "user2")
@@ -485,6 +529,33 @@ class PermissionTest(_PermissionTestBase):
     def test_delete_object_permissions_supports_empty_list(self):
         self.permission.delete_object_permissions()  # Not failing
 
+    def test_delete_object_permissions_returns_the_number_of_deleted_entries(self):
+        self.permission.add_principal_to_ace("/url/a/id/1", "write", "user1")
+        self.permission.add_principal_to_ace("/url/a/id/1", "write", "user2")
+        self.permission.add_principal_to_ace("/url/a/id/1", "read", "user3")
+        self.permission.add_principal_to_ace("/url/a/id/2", "read", "user3")
+        self.permission.add_principal_to_ace("/url/b/id/1", "read", "user3")
+
+        deleted = self.permission.delete_object_permissions("/url/a/id/1", "/url/b/*")
+
+        self.assertEqual(deleted, 4)
+        self.assertEqual(self.permission.delete_object_permissions("/url/a/id/1"), 0)
+
+    def test_delete_object_permissions_removes_the_whole_subtree(self):
+        self.permission.add_principal_to_ace("/url/a", "write", "user1")
+        self.permission.add_principal_to_ace("/url/a/id/1", "write", "user1")
+        self.permission.add_principal_to_ace("/url/a/id/1/sub/2", "read", "user2")
+        self.permission.add_principal_to_ace("/url/ab/id/1", "read", "user3")
+        self.permission.add_user_principal("/url/a/user", "group")
+
+        self.permission.delete_object_permissions("/url/a/*")
+
+        permissions = self.permission.get_objects_permissions(
+            ["/url/a", "/url/a/id/1", "/url/a/id/1/sub/2", "/url/ab/id/1"]
+        )
+        self.assertEqual(permissions, [{"write": {"user1"}}, {}, {}, {"read": {"user3"}}])
+        self.assertEqual(self.permission.get_user_principals("/url/a/user"), {"group"})
+
     def test_delete_object_permissions_supports_pattern_matching(self):
         self.permission.add_principal_to_ace("/url/b/id/1", "write", "user1")
         self.permission.add_principal_to_ace("/url/a/id/1", "write", "user2")
@@ -0,0 +1,162 @@
+"""Append-only journal and snapshots, to persist the state of the memory backends.
+
+Operations are appended to a journal file as JSON lines. Once enough of them
+were written, the whole state is dumped into a snapshot file and the previous
+journal files are removed. On startup, the last snapshot is loaded and the
+journal files written since are replayed.
+
+Journal entries must be idempotent (eg. *set this key to this value*), since
+snapshots are taken while the backend keeps serving writes: the operations
+journaled during a snapshot may already be part of it.
+"""
+
+import logging
+import mmap
+import os
+import re
+import threading
+from collections.abc import Callable, Iterable, Iterator
+from typing import IO, Any
+
+from kinto.core.utils import json
+
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+SNAPSHOT_FILENAME = "snapshot.jsonl"
+JOURNAL_FILENAME = "journal-{:08d}.jsonl"
+JOURNAL_FILENAME_REGEXP = re.compile(r"^journal-(\d{8})\.jsonl$")
+SNAPSHOT_INTERVAL = 10000
+
+
+class Journal:
+    """Journal of the operations applied on a backend state.
+
+    :param str path: the folder where journal and snapshot files are stored.
+    :param dump_state: a callable returning the entries of a snapshot.
+    :param int snapshot_interval: number of journaled operations after which
+        a snapshot is taken in the background.
+    :param bool fsync: whether every journaled operation is synced to disk.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        dump_state: Callable[[], Iterable[Any]],
+        snapshot_interval: int = SNAPSHOT_INTERVAL,
+        fsync: bool = False,
+    ):
+        self.path = path
+        self.dump_state = dump_state
+        self.snapshot_interval = snapshot_interval
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._snapshot_lock = threading.Lock()
+        self._file: IO[bytes] | None = None
+        self._sequence = 0
+        self._pending = 0
+        os.makedirs(path, exist_ok=True)
+
+    def load(
+        self,
+        restore_state: Callable[[Iterator[Any]], None],
+        replay: Callable[[Any], None],
+    ) -> None:
+        """Restore the last snapshot and replay the journal files written since,
+        then start a new journal file for the upcoming operations.
+        """
+        first_sequence = 0
+        snapshot_path = os.path.join(self.path, SNAPSHOT_FILENAME)
+        if os.path.exists(snapshot_path):
+            entries = _read_entries(snapshot_path)
+            header = next(entries, None) or {}
+            if header.get("version") != FORMAT_VERSION:
+                raise ValueError(f"Unsupported snapshot format in {snapshot_path}")
+            first_sequence = header["journal"]
+            restore_state(entries)
+
+        sequences = self._journal_sequences()
+        for sequence in sequences:
+            if sequence >= first_sequence:
+                for entry in _read_entries(self._journal_path(sequence)):
+                    replay(entry)
+
+        with self._lock:
+            self._rotate(max(sequences + [first_sequence - 1]) + 1)
+
+    def append(self, entry: Any) -> None:
+        """Journal the specified operation."""
+        with self._lock:
+            if self._file is None:
+                raise RuntimeError("Journal was not loaded.")
+            self._file.write(json.dumps(entry).encode("utf-8") + b"\n")
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self._pending += 1
+            snapshot_due = self._pending == self.snapshot_interval
+
+        if snapshot_due:
+            threading.Thread(target=self.snapshot, daemon=True).start()
+
+    def snapshot(self) -> None:
+        """Dump the whole state into a new snapshot and remove the journal files
+        it covers.
+        """
+        with self._snapshot_lock:
+            with self._lock:
+                sequence = self._rotate(self._sequence + 1)
+
+            snapshot_path = os.path.join(self.path, SNAPSHOT_FILENAME)
+            tmp_path = snapshot_path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                header = {"version": FORMAT_VERSION, "journal": sequence}
+                f.write(json.dumps(header).encode("utf-8") + b"\n")
+                for entry in self.dump_state():
+                    f.write(json.dumps(entry).encode("utf-8") + b"\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, snapshot_path)
+
+            for previous in self._journal_sequences():
+                if previous < sequence:
+                    os.remove(self._journal_path(previous))
+
+        logger.info(f"Snapshot of {self.path!r} written.")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _rotate(self, sequence: int) -> int:
+        if self._file is not None:
+            self._file.close()
+        self._file = open(self._journal_path(sequence), "ab")
+        self._sequence = sequence
+        self._pending = 0
+        return sequence
+
+    def _journal_path(self, sequence: int) -> str:
+        return os.path.join(self.path, JOURNAL_FILENAME.format(sequence))
+
+    def _journal_sequences(self) -> list[int]:
+        matches = (JOURNAL_FILENAME_REGEXP.match(name) for name in os.listdir(self.path))
+        return sorted(int(m.group(1)) for m in matches if m)
+
+
+def _read_entries(filepath: str) -> Iterator[Any]:
+    with open(filepath, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for line in iter(mapped.readline, b""):
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Operation interrupted while being journaled.
+                    logger.warning(f"Ignore truncated entry at the end of {filepath!r}.")
+                    return
+                yield entry
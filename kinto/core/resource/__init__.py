@@ -23,7 +23,7 @@ from pyramid.settings import asbool
 
 from kinto.core import Service
 from kinto.core.errors import ERRORS, http_error, raise_invalid, request_GET, send_alert
-from kinto.core.events import ACTIONS
+from kinto.core.events import ACTIONS, impacted_old_required
 from kinto.core.storage import MISSING, Filter, KintoObject, Sort
 from kinto.core.storage import exceptions as storage_exceptions
 from kinto.core.types import Request
@@ -485,16 +485,32 @@ class Resource:
         sorting = self._extract_sorting(limit)
         pagination_rules, offset = self._extract_pagination_rules_from_token(limit, sorting)
 
-        objects = self.model.get_objects(
-            filters=filters, sorting=sorting, limit=limit + 1, pagination_rules=pagination_rules
-        )
+        # The previous versions of the objects are only fetched if a subscriber reads them.
+        objects = None
+        if impacted_old_required(self.request.registry, self.request.current_resource_name):
+            objects = self.model.get_objects(
+                filters=filters,
+                sorting=sorting,
+                limit=limit + 1,
+                pagination_rules=pagination_rules,
+            )
         deleted = self.model.delete_objects(
             filters=filters, sorting=sorting, limit=limit, pagination_rules=pagination_rules
         )
         if deleted:
             lastobject = deleted[-1]
             # Add pagination header, but only if there are more objects beyond the limit.
-            if limit and len(objects) == limit + 1:
+            if objects is not None:
+                has_more = len(objects) == limit + 1
+            elif len(deleted) == limit:
+                # Check whether some objects remain beyond the deleted ones.
+                remaining = self.model.get_objects(
+                    filters=filters, sorting=sorting, limit=1, pagination_rules=pagination_rules
+                )
+                has_more = len(remaining) > 0
+            else:
+                has_more = False
+            if limit and has_more:
                 next_page = self._next_page_url(sorting, limit, lastobject, offset)
                 self.request.response.headers["Next-Page"] = next_page
 
@@ -505,7 +521,8 @@ class Resource:
             self._add_timestamp_header(self.request.response)
 
         action = len(deleted) > 0 and ACTIONS.DELETE or ACTIONS.READ
-        return self.postprocess(deleted, action=action, old=objects[:limit])
+        old = objects[:limit] if objects is not None else None
+        return self.postprocess(deleted, action=action, old=old)
 
     def get(self) -> dict:
         """Object ``GET`` endpoint: retrieve an object.
@@ -1277,7 +1294,7 @@ class Resource:
             # The cache backend is used to keep track of "nonces".
             if self.request.method.lower() == "delete" and error_msg is None:
                 registry = self.request.registry
-                deleted = registry.cache.delete(nonce)
+                deleted = registry.cache.pop(nonce)
                 if deleted is None:
                     error_msg = "_token was already used or has expired."
 
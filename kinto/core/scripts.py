@@ -66,3 +66,15 @@ def flush_cache(env: dict[str, Any]) -> int:
     registry.cache.flush()
     logger.info("Cache has been cleared.")
     return 0
+
+
+def process_events(env: dict[str, Any], once: bool = False) -> int:
+    registry = env["registry"]
+    outbox = getattr(registry, "outbox", None)
+    if outbox is None:
+        logger.error("No asynchronous event listener is configured.")
+        return 1
+
+    logger.info("Delivering events to asynchronous listeners.")
+    outbox.run(once=once)
+    return 0
@@ -1,14 +1,18 @@
+import contextlib
 import logging
 import random
+import re
+import threading
 import warnings
 from collections import namedtuple
-from collections.abc import Callable
+from collections.abc import Callable, Iterator
 from typing import Any
 
 from pyramid.request import Request
 from pyramid.settings import asbool
 
 from kinto.core.decorators import deprecate_kwargs
+from kinto.core.utils import COMPARISON
 
 from . import generators
 
@@ -47,6 +51,12 @@ _HEARTBEAT_RESOURCE_NAME = "__heartbeat__"
 _HEART_PARENT_ID = _HEARTBEAT_RESOURCE_NAME
 _HEARTBEAT_OBJECT: dict[str, Any] = {"__heartbeat__": True}
 
+_QUEUE_RESOURCE_NAME = "__queue__"
+
+# Queues claimed in this process, as (storage id, queue) pairs.
+_CLAIMED_QUEUES: set[tuple[int, str]] = set()
+_CLAIMED_QUEUES_LOCK = threading.Lock()
+
 
 class StorageBase:
     """Storage abstraction used by resource views.
@@ -143,6 +153,43 @@ class StorageBase:
         """
         raise NotImplementedError
 
+    def create_many(
+        self,
+        resource_name: str,
+        parent_id: str,
+        objs: list[KintoObject],
+        id_generator: generators.Generator | None = None,
+        id_field: str = DEFAULT_ID_FIELD,
+        modified_field: str = DEFAULT_MODIFIED_FIELD,
+    ) -> list[KintoObject]:
+        """Create the specified `objs` in this `resource_name` for this `parent_id`,
+        at once.
+
+        .. note::
+
+            Backends may override this with a single query.
+
+        :raises: :exc:`kinto.core.storage.exceptions.UnicityError`
+
+        :param str resource_name: the resource name.
+        :param str parent_id: the resource parent.
+        :param list objs: the objects to create.
+
+        :returns: the newly created objects, in the same order.
+        :rtype: list[dict]
+        """
+        return [
+            self.create(
+                resource_name,
+                parent_id,
+                obj,
+                id_generator=id_generator,
+                id_field=id_field,
+                modified_field=modified_field,
+            )
+            for obj in objs
+        ]
+
     def get(
         self,
         resource_name: str,
@@ -399,6 +446,50 @@ class StorageBase:
         """
         raise NotImplementedError
 
+    def list_all_by_parent_id(
+        self,
+        resource_name: str,
+        parent_id: str,
+        filters: list[Filter] | None = None,
+        id_field: str = DEFAULT_ID_FIELD,
+        modified_field: str = DEFAULT_MODIFIED_FIELD,
+        deleted_field: str = DEFAULT_DELETED_FIELD,
+    ) -> dict[str, list[KintoObject]]:
+        """Retrieve all objects in this `resource_name` whose parent matches
+        `parent_id`, grouped by parent.
+
+        Unlike :meth:`list_all`, this allows to know the parent of each object
+        when using a wildcard (e.g. every collection of every bucket).
+
+        The default implementation lists the objects of each known parent.
+        Backends may override it to proceed in one query.
+
+        :param str resource_name: the resource name.
+        :param str parent_id: the parent resource, possibly
+            containing a wildcard '*'.
+        :param filters: Optionally filter the objects by their attribute.
+        :type filters: list of :class:`kinto.core.storage.Filter`
+        :returns: the list of objects (deleted ones excluded) by parent id.
+        :rtype: dict
+        """
+        pattern = re.escape(parent_id).replace(r"\*", ".*")
+        parent_id_match = re.compile(f"^{pattern}$")
+        by_parent_id = {}
+        for pid in self.all_resources_timestamps(resource_name):
+            if not parent_id_match.match(pid):
+                continue
+            objects = self.list_all(
+                resource_name=resource_name,
+                parent_id=pid,
+                filters=filters,
+                id_field=id_field,
+                modified_field=modified_field,
+                deleted_field=deleted_field,
+            )
+            if objects:
+                by_parent_id[pid] = objects
+        return by_parent_id
+
     def collection_timestamp(self, collection_id: str, parent_id: str) -> int:
         message = "`collection_timestamp()` is deprecated, use `resource_timestamp()` instead."
         warnings.warn(message, DeprecationWarning)
@@ -426,6 +517,71 @@ class StorageBase:
         :rtype: int"""
         raise NotImplementedError
 
+    def enqueue(self, queue: str, entry: dict[str, Any]) -> None:
+        """Append the `entry` to the `queue`.
+
+        The default implementation stores the entries as objects whose parent
+        is the queue name. Backends may override it, along with
+        :meth:`list_queue` and :meth:`dequeue`, to store them apart.
+
+        :param str queue: the queue name.
+        :param dict entry: the entry to append.
+        """
+        self.create(resource_name=_QUEUE_RESOURCE_NAME, parent_id=queue, obj=entry)
+
+    def list_queue(self, queue: str, limit: int) -> list[dict[str, Any]]:
+        """Return the first entries of the `queue`, oldest first.
+
+        :param str queue: the queue name.
+        :param int limit: maximum number of entries to return.
+        :returns: the entries, with their ``id`` in the queue.
+        :rtype: list[dict]
+        """
+        return self.list_all(
+            resource_name=_QUEUE_RESOURCE_NAME,
+            parent_id=queue,
+            sorting=[Sort(self.modified_field, 1)],
+            limit=limit,
+        )
+
+    def dequeue(self, queue: str, ids: list[Any]) -> None:
+        """Remove the entries with the specified `ids` from the `queue`.
+
+        :param str queue: the queue name.
+        :param list ids: the ``id`` of the entries to remove.
+        """
+        self.delete_all(
+            resource_name=_QUEUE_RESOURCE_NAME,
+            parent_id=queue,
+            filters=[Filter(self.id_field, ids, COMPARISON.IN)],
+            with_deleted=False,
+        )
+
+    @contextlib.contextmanager
+    def claim_queue(self, queue: str) -> Iterator[bool]:
+        """Claim the `queue` for the duration of the context, so that its
+        entries are processed by a single worker at a time.
+
+        The default implementation only excludes the other threads of the
+        process. Backends whose data is shared between processes may override
+        it, e.g. with a lock that is released if the worker stops.
+
+        :param str queue: the queue name.
+        :returns: whether the queue was claimed, or is being processed by
+            another worker.
+        :rtype: bool
+        """
+        key = (id(self), queue)
+        with _CLAIMED_QUEUES_LOCK:
+            claimed = key not in _CLAIMED_QUEUES
+            _CLAIMED_QUEUES.add(key)
+        try:
+            yield claimed
+        finally:
+            if claimed:
+                with _CLAIMED_QUEUES_LOCK:
+                    _CLAIMED_QUEUES.discard(key)
+
 
 def heartbeat(backend: StorageBase) -> Callable[[Request], bool]:
     def ping(request) -> bool:
@@ -1,12 +1,20 @@
+import bisect
+import heapq
 import numbers
 import operator
 import re
+import threading
 from collections import abc, defaultdict
-from collections.abc import Iterator
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from operator import itemgetter
 from typing import Any
 
+from pyramid.settings import asbool
+
 from kinto.core import utils
-from kinto.core.decorators import deprecate_kwargs, synchronized
+from kinto.core.decorators import deprecate_kwargs
+from kinto.core.persistence import SNAPSHOT_INTERVAL, Journal
 from kinto.core.storage import (
     DEFAULT_DELETED_FIELD,
     DEFAULT_ID_FIELD,
@@ -22,6 +30,10 @@ from kinto.core.storage import (
 from kinto.core.utils import COMPARISON, find_nested_value, json
 
 
+LOCK_STRIPES = 64
+"""Number of locks shared by the parent ids of the memory storage."""
+
+
 def tree() -> defaultdict:
     return defaultdict(tree)
 
@@ -149,40 +161,391 @@ class MemoryBasedStorage(StorageBase):
         raise NotImplementedError
 
 
+class _Resource:
+    """Objects and tombstones of a resource under a parent id.
+
+    Their ``(last_modified, id)`` pairs are kept sorted in timelines, in order
+    to scan them by ranges of timestamps, or in order, without sorting.
+    """
+
+    __slots__ = (
+        "modified_field",
+        "objects",
+        "tombstones",
+        "objects_timeline",
+        "tombstones_timeline",
+    )
+
+    def __init__(self, modified_field: str | None):
+        # Field of the timelines keys (``None`` if writes used different fields).
+        self.modified_field: str | None = modified_field
+        self.objects: dict[str, KintoObject] = {}
+        self.tombstones: dict[str, KintoObject] = {}
+        self.objects_timeline: list[tuple[Any, str]] = []
+        self.tombstones_timeline: list[tuple[Any, str]] = []
+
+    def store(
+        self, object_id: str, obj: KintoObject, modified_field: str, tombstone: bool = False
+    ) -> None:
+        self.discard(object_id)
+        if modified_field != self.modified_field:
+            self.modified_field = None
+        if tombstone:
+            objects, timeline = self.tombstones, self.tombstones_timeline
+        else:
+            objects, timeline = self.objects, self.objects_timeline
+        objects[object_id] = obj
+        bisect.insort(timeline, (obj[modified_field], object_id))
+
+    def discard(self, object_id: str) -> None:
+        for objects, timeline in (
+            (self.objects, self.objects_timeline),
+            (self.tombstones, self.tombstones_timeline),
+        ):
+            obj = objects.pop(object_id, None)
+            if obj is not None:
+                _timeline_remove(timeline, obj.get(self.modified_field), object_id)
+
+    def purge(self, before: int | None = None, max_retained: int | None = None) -> list[str]:
+        """Remove the tombstones older than `before`, or all but the
+        `max_retained` most recent ones, and return their ids.
+        """
+        timeline = self.tombstones_timeline
+        if before is not None:
+            count = bisect.bisect_left(timeline, before, key=itemgetter(0))
+        elif max_retained is not None:
+            count = max(len(timeline) - max_retained, 0)
+        else:
+            count = len(timeline)
+        removed = [object_id for _, object_id in timeline[:count]]
+        for object_id in removed:
+            del self.tombstones[object_id]
+        del timeline[:count]
+        return removed
+
+    @classmethod
+    def restore(
+        cls,
+        modified_field: str | None,
+        objects: dict[str, KintoObject],
+        tombstones: dict[str, KintoObject],
+    ) -> "_Resource":
+        resource = cls(modified_field)
+        resource.objects = objects
+        resource.tombstones = tombstones
+        key = modified_field or DEFAULT_MODIFIED_FIELD
+        resource.objects_timeline = sorted((o.get(key), i) for i, o in objects.items())
+        resource.tombstones_timeline = sorted((o.get(key), i) for i, o in tombstones.items())
+        return resource
+
+    def scans(
+        self, low: Any, high: Any, include_deleted: bool, reverse: bool = False
+    ) -> list[Iterator[tuple[Any, KintoObject]]]:
+        """Return the iterators of ``(last_modified, object)`` within the
+        (inclusive) `low` and `high` bounds, in timelines order.
+        """
+        scans = [_scan(self.objects_timeline, self.objects, low, high, reverse)]
+        if include_deleted:
+            scans.append(_scan(self.tombstones_timeline, self.tombstones, low, high, reverse))
+        return scans
+
+    def values(self, low: Any, high: Any, include_deleted: bool) -> Iterator[KintoObject]:
+        if low is None and high is None:
+            yield from self.objects.values()
+            if include_deleted:
+                yield from self.tombstones.values()
+            return
+        for scan in self.scans(low, high, include_deleted):
+            for _, obj in scan:
+                yield obj
+
+    def __bool__(self) -> bool:
+        return bool(self.objects or self.tombstones)
+
+
 class Storage(MemoryBasedStorage):
     """Storage backend implementation in memory.
 
     Useful for development or testing purposes, but stored data is lost after
-    each server restart.
+    each server restart, unless a persistence path is configured: operations
+    are then journaled, and periodically snapshotted, into this folder.
+
+    Parent ids are kept sorted, so that wildcard lookups only scan the ones
+    sharing the pattern prefix, and objects are indexed by their timestamp.
+    Locks are striped by parent id, so that operations on different parents
+    do not wait for each other.
 
     Enable in configuration::
 
         kinto.storage_backend = kinto.core.storage.memory
+        # kinto.storage_persistence_path = /var/lib/kinto/storage
     """
 
-    def __init__(self, *args, readonly: bool = False, **kwargs):
+    def __init__(
+        self,
+        *args,
+        readonly: bool = False,
+        persistence_path: str | None = None,
+        persistence_snapshot_interval: int = SNAPSHOT_INTERVAL,
+        persistence_fsync: bool = False,
+        **kwargs,
+    ):
         super().__init__(*args, **kwargs)
         self.readonly = readonly
-        self.flush()
+        self._index_lock = threading.Lock()
+        self._locks = [threading.RLock() for _ in range(LOCK_STRIPES)]
+        self._journal: Journal | None = None
+        self._reset()
+
+        if persistence_path:
+            journal = Journal(
+                persistence_path,
+                dump_state=self._dump_state,
+                snapshot_interval=persistence_snapshot_interval,
+                fsync=persistence_fsync,
+            )
+            journal.load(restore_state=self._restore_state, replay=self._replay)
+            self._journal = journal
 
     def flush(self) -> None:
-        self._store = tree()
-        self._cemetery = tree()
-        self._timestamps = defaultdict(dict)
+        self._reset()
+        self._log("flush")
+
+    def snapshot(self) -> None:
+        """Write a snapshot of the whole storage, if persistence is enabled."""
+        if self._journal is not None:
+            self._journal.snapshot()
+
+    def _reset(self) -> None:
+        with self._index_lock:
+            # parent_id -> resource_name -> timestamp
+            self._timestamps: dict[str, dict[str, int]] = {}
+            # parent_id -> resource_name -> objects and tombstones
+            self._resources: dict[str, dict[str, _Resource]] = {}
+            # Sorted parent ids, for wildcard prefix scans.
+            self._parent_ids: list[str] = []
+
+    @contextmanager
+    def _locked(self, *parent_ids: str) -> Iterator[None]:
+        """Hold the locks of the specified parent ids.
+
+        Stripes are always acquired in the same order to prevent deadlocks.
+        """
+        stripes = sorted({hash(parent_id) % len(self._locks) for parent_id in parent_ids})
+        for stripe in stripes:
+            self._locks[stripe].acquire()
+        try:
+            yield
+        finally:
+            for stripe in reversed(stripes):
+                self._locks[stripe].release()
+
+    def _log(self, *entry: Any) -> None:
+        if self._journal is not None:
+            self._journal.append(entry)
+
+    def _dump_state(self) -> Iterator[dict[str, Any]]:
+        with self._index_lock:
+            parent_ids = list(self._parent_ids)
+        for pid in parent_ids:
+            # Objects are never modified in place, copy the containers only.
+            with self._locked(pid):
+                timestamps = {**self._timestamps.get(pid, {})}
+                resources = {
+                    name: (r.modified_field, {**r.objects}, {**r.tombstones})
+                    for name, r in self._resources.get(pid, {}).items()
+                }
+            yield {
+                "parent_id": pid,
+                "timestamps": timestamps,
+                "resources": {
+                    name: {
+                        "modified_field": modified_field,
+                        "objects": objects,
+                        "tombstones": tombstones,
+                    }
+                    for name, (modified_field, objects, tombstones) in resources.items()
+                },
+            }
+
+    def _restore_state(self, entries: Iterator[dict[str, Any]]) -> None:
+        for entry in entries:
+            pid = entry["parent_id"]
+            self._register_parent(pid)
+            self._timestamps[pid].update(entry["timestamps"])
+            self._resources[pid].update(
+                {
+                    name: _Resource.restore(
+                        resource["modified_field"], resource["objects"], resource["tombstones"]
+                    )
+                    for name, resource in entry["resources"].items()
+                }
+            )
+
+    def _replay(self, entry: list[Any]) -> None:
+        operation, *args = entry
+        if operation == "flush":
+            self._reset()
+        elif operation == "timestamp":
+            pid, name, timestamp = args
+            self._register_parent(pid)
+            if timestamp is None:
+                self._timestamps[pid].pop(name, None)
+                self._unregister_parent(pid)
+            else:
+                self._timestamps[pid][name] = timestamp
+        elif operation == "store":
+            pid, name, object_id, obj, modified_field, tombstone = args
+            resource = self._resource(pid, name, modified_field)
+            resource.store(object_id, obj, modified_field, tombstone=tombstone)
+        elif operation == "discard":
+            pid, name, object_ids = args
+            resource = self._resources.get(pid, {}).get(name)
+            for object_id in object_ids if resource is not None else []:
+                resource.discard(object_id)
+            self._unregister_parent(pid)
+        else:
+            raise ValueError(f"Unknown journal operation {operation!r}")
+
+    def _register_parent(self, parent_id: str) -> None:
+        if parent_id in self._resources:
+            return
+        with self._index_lock:
+            if parent_id not in self._resources:
+                self._timestamps[parent_id] = {}
+                self._resources[parent_id] = {}
+                bisect.insort(self._parent_ids, parent_id)
+
+    def _unregister_parent(self, parent_id: str) -> None:
+        """Forget about the specified parent id if it has no data left."""
+        resources = self._resources.get(parent_id, {})
+        if self._timestamps.get(parent_id) or any(resources.values()):
+            return
+        with self._index_lock:
+            self._timestamps.pop(parent_id, None)
+            if self._resources.pop(parent_id, None) is not None:
+                index = bisect.bisect_left(self._parent_ids, parent_id)
+                del self._parent_ids[index]
+
+    def _matching_parent_ids(self, parent_id: str) -> list[str]:
+        if "*" not in parent_id:
+            return [parent_id] if parent_id in self._resources else []
+        escaped = re.escape(parent_id).replace(r"\*", ".*")
+        parent_id_match = re.compile(f"^{escaped}$")
+        with self._index_lock:
+            start, end = _prefix_range(self._parent_ids, parent_id.split("*", 1)[0])
+            candidates = self._parent_ids[start:end]
+        return [pid for pid in candidates if parent_id_match.match(pid)]
+
+    def _matching_resources(
+        self, parent_ids: list[str], resource_name: str | None
+    ) -> list[tuple[str, str, _Resource]]:
+        matching = []
+        for pid in parent_ids:
+            resources = self._resources.get(pid, {})
+            if resource_name is not None:
+                resource = resources.get(resource_name)
+                resources = {resource_name: resource} if resource is not None else {}
+            matching.extend((pid, name, resource) for name, resource in resources.items())
+        return matching
+
+    def _resource(self, parent_id: str, resource_name: str, modified_field: str) -> _Resource:
+        self._register_parent(parent_id)
+        resources = self._resources[parent_id]
+        resource = resources.get(resource_name)
+        if resource is None:
+            resource = resources[resource_name] = _Resource(modified_field)
+        return resource
+
+    def _query(
+        self,
+        resources: list[tuple[str, str, _Resource]],
+        filters: list[Filter] | None,
+        sorting: list[Sort] | None = None,
+        pagination_rules: list[list[Filter]] | None = None,
+        limit: int | None = None,
+        include_deleted: bool = False,
+        id_field: str = DEFAULT_ID_FIELD,
+        modified_field: str = DEFAULT_MODIFIED_FIELD,
+        deleted_field: str = DEFAULT_DELETED_FIELD,
+    ) -> list[tuple[str, str, KintoObject]]:
+        """Return the ``(parent_id, resource_name, object)`` of the objects in
+        `resources` that match the filters and pagination rules.
+
+        When sorting on the timestamp field only, the timelines are merged and
+        scanned until the limit is reached, instead of sorting every object.
+        """
+        filters = filters or []
+        low, high = self._scan_bounds(resources, filters, pagination_rules, modified_field)
+
+        if (
+            sorting
+            and len(sorting) == 1
+            and sorting[0].field == modified_field
+            and all(r.modified_field == modified_field for _, _, r in resources)
+        ):
+            reverse = sorting[0].direction < 0
+            scans = [
+                _tagged(pid, name, scan)
+                for pid, name, resource in resources
+                for scan in resource.scans(low, high, include_deleted, reverse)
+            ]
+            matches = compile_filters(filters)
+            rules = [compile_filters(rule) for rule in pagination_rules or []]
+            selected = []
+            for _, pid, name, obj in heapq.merge(*scans, key=itemgetter(0), reverse=reverse):
+                if matches(obj) and (not rules or any(rule(obj) for rule in rules)):
+                    selected.append((pid, name, obj))
+                    if limit and len(selected) >= limit:
+                        break
+            return selected
+
+        owners = {}
+        candidates = []
+        for pid, name, resource in resources:
+            for obj in resource.values(low, high, include_deleted):
+                owners[id(obj)] = (pid, name)
+                candidates.append(obj)
+        objects, _ = self.extract_object_set(
+            objects=candidates,
+            filters=filters,
+            sorting=sorting,
+            id_field=id_field,
+            deleted_field=deleted_field,
+            pagination_rules=pagination_rules,
+            limit=limit,
+        )
+        return [(*owners[id(obj)], obj) for obj in objects]
+
+    def _scan_bounds(
+        self,
+        resources: list[tuple[str, str, _Resource]],
+        filters: list[Filter],
+        pagination_rules: list[list[Filter]] | None,
+        modified_field: str,
+    ) -> tuple[Any, Any]:
+        if any(r.modified_field != modified_field for _, _, r in resources):
+            return None, None
+        return _modified_bounds(filters, pagination_rules, modified_field)
 
-    @synchronized
     def resource_timestamp(self, resource_name: str, parent_id: str) -> int:
-        ts = self._timestamps[parent_id].get(resource_name)
-        if ts is not None:
-            return ts
-        if self.readonly:
-            error_msg = "Cannot initialize empty resource timestamp when running in readonly."
-            raise exceptions.ReadonlyError(message=error_msg)
-        return self.bump_and_store_timestamp(resource_name, parent_id)
-
-    @synchronized
+        with self._locked(parent_id):
+            ts = self._timestamps.get(parent_id, {}).get(resource_name)
+            if ts is not None:
+                return ts
+            if self.readonly:
+                error_msg = "Cannot initialize empty resource timestamp when running in readonly."
+                raise exceptions.ReadonlyError(message=error_msg)
+            return self.bump_and_store_timestamp(resource_name, parent_id)
+
     def all_resources_timestamps(self, resource_name: str) -> dict[str, int]:
-        return {k: v[resource_name] for k, v in self._timestamps.items() if resource_name in v}
+        with self._index_lock:
+            timestamps = list(self._timestamps.items())
+        return {
+            pid: ts
+            for pid, resources in timestamps
+            if (ts := resources.get(resource_name)) is not None
+        }
 
     def bump_and_store_timestamp(
         self,
@@ -193,17 +556,19 @@ class Storage(MemoryBasedStorage):
         last_modified: int | None = None,
     ) -> int:
         """Use the bump_timestamp to get its next value and store the resource_timestamp."""
-        current_resource_timestamp = self._timestamps[parent_id].get(resource_name, 0)
+        self._register_parent(parent_id)
+        timestamps = self._timestamps[parent_id]
+        current_resource_timestamp = timestamps.get(resource_name, 0)
 
         current, resource_timestamp = self.bump_timestamp(
             current_resource_timestamp, obj, modified_field, last_modified
         )
-        self._timestamps[parent_id][resource_name] = resource_timestamp
+        timestamps[resource_name] = resource_timestamp
+        self._log("timestamp", parent_id, resource_name, resource_timestamp)
 
         return current
 
     @deprecate_kwargs({"collection_id": "resource_name", "record": "obj"})
-    @synchronized
     def create(
         self,
         resource_name: str,
@@ -221,24 +586,24 @@ class Storage(MemoryBasedStorage):
         # copy of the passed object.
         obj = json.loads(json.dumps(obj))
 
-        if id_field in obj:
-            # Raise unicity error if object with same id already exists.
-            try:
-                existing = self.get(resource_name, parent_id, obj[id_field])
-                raise exceptions.UnicityError(id_field, existing)
-            except exceptions.ObjectNotFoundError:
-                pass
-        else:
-            obj[id_field] = id_generator()
+        with self._locked(parent_id):
+            if id_field in obj:
+                # Raise unicity error if object with same id already exists.
+                try:
+                    existing = self.get(resource_name, parent_id, obj[id_field])
+                    raise exceptions.UnicityError(id_field, existing)
+                except exceptions.ObjectNotFoundError:
+                    pass
+            else:
+                obj[id_field] = id_generator()
 
-        self.set_object_timestamp(resource_name, parent_id, obj, modified_field=modified_field)
-        _id = obj[id_field]
-        self._store[parent_id][resource_name][_id] = obj
-        self._cemetery[parent_id][resource_name].pop(_id, None)
-        return obj
+            self.set_object_timestamp(resource_name, parent_id, obj, modified_field=modified_field)
+            resource = self._resource(parent_id, resource_name, modified_field)
+            resource.store(obj[id_field], obj, modified_field)
+            self._log("store", parent_id, resource_name, obj[id_field], obj, modified_field, False)
+            return obj
 
     @deprecate_kwargs({"collection_id": "resource_name"})
-    @synchronized
     def get(
         self,
         resource_name: str,
@@ -247,13 +612,13 @@ class Storage(MemoryBasedStorage):
         id_field: str = DEFAULT_ID_FIELD,
         modified_field: str = DEFAULT_MODIFIED_FIELD,
     ) -> KintoObject:
-        objects = self._store[parent_id][resource_name]
-        if object_id not in objects:
-            raise exceptions.ObjectNotFoundError(object_id)
-        return {**objects[object_id]}
+        with self._locked(parent_id):
+            resource = self._resources.get(parent_id, {}).get(resource_name)
+            if resource is None or object_id not in resource.objects:
+                raise exceptions.ObjectNotFoundError(object_id)
+            return {**resource.objects[object_id]}
 
     @deprecate_kwargs({"collection_id": "resource_name", "record": "obj"})
-    @synchronized
     def update(
         self,
         resource_name: str,
@@ -271,13 +636,14 @@ class Storage(MemoryBasedStorage):
 
         obj[id_field] = object_id
 
-        self.set_object_timestamp(resource_name, parent_id, obj, modified_field=modified_field)
-        self._store[parent_id][resource_name][object_id] = obj
-        self._cemetery[parent_id][resource_name].pop(object_id, None)
-        return obj
+        with self._locked(parent_id):
+            self.set_object_timestamp(resource_name, parent_id, obj, modified_field=modified_field)
+            resource = self._resource(parent_id, resource_name, modified_field)
+            resource.store(object_id, obj, modified_field)
+            self._log("store", parent_id, resource_name, object_id, obj, modified_field, False)
+            return obj
 
     @deprecate_kwargs({"collection_id": "resource_name"})
-    @synchronized
     def delete(
         self,
         resource_name: str,
@@ -289,28 +655,34 @@ class Storage(MemoryBasedStorage):
         deleted_field: str = DEFAULT_DELETED_FIELD,
         last_modified: int | None = None,
     ) -> KintoObject:
-        existing = self.get(resource_name, parent_id, object_id)
-        # Need to delete the last_modified field of the object.
-        del existing[modified_field]
-
-        self.set_object_timestamp(
-            resource_name,
-            parent_id,
-            existing,
-            modified_field=modified_field,
-            last_modified=last_modified,
-        )
-        existing = self.strip_deleted_object(resource_name, parent_id, existing)
+        with self._locked(parent_id):
+            existing = self.get(resource_name, parent_id, object_id)
+            # Need to delete the last_modified field of the object.
+            del existing[modified_field]
 
-        # Add to deleted items, remove from store.
-        if with_deleted:
-            deleted = {**existing}
-            self._cemetery[parent_id][resource_name][object_id] = deleted
-        self._store[parent_id][resource_name].pop(object_id)
-        return existing
+            self.set_object_timestamp(
+                resource_name,
+                parent_id,
+                existing,
+                modified_field=modified_field,
+                last_modified=last_modified,
+            )
+            existing = self.strip_deleted_object(resource_name, parent_id, existing)
+
+            # Add to deleted items, remove from store.
+            resource = self._resources[parent_id][resource_name]
+            if with_deleted:
+                tombstone = {**existing}
+                resource.store(object_id, tombstone, modified_field, tombstone=True)
+                self._log(
+                    "store", parent_id, resource_name, object_id, tombstone, modified_field, True
+                )
+            else:
+                resource.discard(object_id)
+                self._log("discard", parent_id, resource_name, [object_id])
+            return existing
 
     @deprecate_kwargs({"collection_id": "resource_name"})
-    @synchronized
     def purge_deleted(
         self,
         resource_name: str,
@@ -324,56 +696,25 @@ class Storage(MemoryBasedStorage):
         if max_retained is not None and before is not None:
             raise ValueError("`before` and `max_retained` are exclusive arguments. Pick one.")
 
-        parent_id_match = re.compile(parent_id.replace("*", ".*"))
-
-        timestamps_by_parent_id = {
-            pid: resources
-            for pid, resources in self._timestamps.items()
-            if parent_id_match.match(pid)
-        }
-        if resource_name is not None:
-            for pid, resources in timestamps_by_parent_id.items():
-                del self._timestamps[pid][resource_name]
-        else:
-            for pid, resources in timestamps_by_parent_id.items():
-                del self._timestamps[pid]
-
+        parent_ids = self._matching_parent_ids(parent_id)
         num_deleted = 0
-        tombstones_by_parent_id = {
-            pid: resources
-            for pid, resources in self._cemetery.items()
-            if parent_id_match.match(pid)
-        }
-        for pid, resources in tombstones_by_parent_id.items():
-            if resource_name is not None:
-                resources = {resource_name: resources[resource_name]}
-            for resource, resource_objects in resources.items():
-                if before is None:
-                    if max_retained is None:
-                        kept = {}
-                    else:
-                        kept = {
-                            key: value
-                            for i, (key, value) in enumerate(
-                                sorted(
-                                    resource_objects.items(),
-                                    key=lambda i: i[1]["last_modified"],
-                                    reverse=True,
-                                )
-                            )
-                            if i < max_retained
-                        }
-                else:
-                    kept = {
-                        key: value
-                        for key, value in resource_objects.items()
-                        if value[modified_field] >= before
-                    }
-                self._cemetery[pid][resource] = kept
-                num_deleted += len(resource_objects) - len(kept)
+        with self._locked(*parent_ids):
+            for pid in parent_ids:
+                timestamps = self._timestamps.get(pid, {})
+                names = list(timestamps) if resource_name is None else [resource_name]
+                for name in names:
+                    if timestamps.pop(name, None) is not None:
+                        self._log("timestamp", pid, name, None)
+
+                for _, name, resource in self._matching_resources([pid], resource_name):
+                    removed = resource.purge(before=before, max_retained=max_retained)
+                    if removed:
+                        self._log("discard", pid, name, removed)
+                    num_deleted += len(removed)
+
+                self._unregister_parent(pid)
         return num_deleted
 
-    @synchronized
     def list_all(
         self,
         resource_name: str,
@@ -387,31 +728,44 @@ class Storage(MemoryBasedStorage):
         modified_field: str = DEFAULT_MODIFIED_FIELD,
         deleted_field: str = DEFAULT_DELETED_FIELD,
     ) -> list[KintoObject]:
-        objects = _get_objects_by_parent_id(self._store, parent_id, resource_name)
-
-        objects, _ = self.extract_object_set(
-            objects=objects,
-            filters=filters,
-            sorting=None,
-            id_field=id_field,
-            deleted_field=deleted_field,
-        )
-        deleted = []
-        if include_deleted:
-            deleted = _get_objects_by_parent_id(self._cemetery, parent_id, resource_name)
+        parent_ids = self._matching_parent_ids(parent_id)
+        with self._locked(*parent_ids):
+            selected = self._query(
+                self._matching_resources(parent_ids, resource_name),
+                filters=filters,
+                sorting=sorting,
+                pagination_rules=pagination_rules,
+                limit=limit,
+                include_deleted=include_deleted,
+                id_field=id_field,
+                modified_field=modified_field,
+                deleted_field=deleted_field,
+            )
+        return [obj for _, _, obj in selected]
 
-        objects, _ = self.extract_object_set(
-            objects=objects + deleted,
-            filters=filters,
-            sorting=sorting,
-            id_field=id_field,
-            deleted_field=deleted_field,
-            pagination_rules=pagination_rules,
-            limit=limit,
-        )
-        return objects
+    def list_all_by_parent_id(
+        self,
+        resource_name: str,
+        parent_id: str,
+        filters: list[Filter] | None = None,
+        id_field: str = DEFAULT_ID_FIELD,
+        modified_field: str = DEFAULT_MODIFIED_FIELD,
+        deleted_field: str = DEFAULT_DELETED_FIELD,
+    ) -> dict[str, list[KintoObject]]:
+        parent_ids = self._matching_parent_ids(parent_id)
+        with self._locked(*parent_ids):
+            selected = self._query(
+                self._matching_resources(parent_ids, resource_name),
+                filters=filters,
+                id_field=id_field,
+                modified_field=modified_field,
+                deleted_field=deleted_field,
+            )
+        by_parent_id = {}
+        for pid, _, obj in selected:
+            by_parent_id.setdefault(pid, []).append({**obj})
+        return by_parent_id
 
-    @synchronized
     def count_all(
         self,
         resource_name: str,
@@ -422,22 +776,27 @@ class Storage(MemoryBasedStorage):
         modified_field: str = DEFAULT_MODIFIED_FIELD,
         deleted_field: str = DEFAULT_DELETED_FIELD,
     ) -> int:
-        objects = _get_objects_by_parent_id(self._store, parent_id, resource_name)
-        if include_deleted:
-            objects += _get_objects_by_parent_id(self._cemetery, parent_id, resource_name)
-
-        _, count = self.extract_object_set(
-            objects=objects,
-            filters=filters,
-            sorting=None,
-            include_deleted=include_deleted,
-            id_field=id_field,
-            deleted_field=deleted_field,
-        )
+        filters = filters or []
+        parent_ids = self._matching_parent_ids(parent_id)
+        with self._locked(*parent_ids):
+            resources = self._matching_resources(parent_ids, resource_name)
+            low, high = self._scan_bounds(resources, filters, None, modified_field)
+            objects = [
+                obj
+                for _, _, resource in resources
+                for obj in resource.values(low, high, include_deleted)
+            ]
+            _, count = self.extract_object_set(
+                objects=objects,
+                filters=filters,
+                sorting=None,
+                include_deleted=include_deleted,
+                id_field=id_field,
+                deleted_field=deleted_field,
+            )
         return count
 
     @deprecate_kwargs({"collection_id": "resource_name"})
-    @synchronized
     def delete_all(
         self,
         resource_name: str,
@@ -451,32 +810,32 @@ class Storage(MemoryBasedStorage):
         modified_field: str = DEFAULT_MODIFIED_FIELD,
         deleted_field: str = DEFAULT_DELETED_FIELD,
     ) -> list[KintoObject]:
-        objects = _get_objects_by_parent_id(self._store, parent_id, resource_name, with_meta=True)
-        objects, count = self.extract_object_set(
-            objects=objects,
-            filters=filters,
-            sorting=sorting,
-            pagination_rules=pagination_rules,
-            limit=limit,
-            id_field=id_field,
-            deleted_field=deleted_field,
-        )
-
-        deleted = [
-            self.delete(
-                r.pop("__resource_name__"),
-                r.pop("__parent_id__"),
-                r[id_field],
+        parent_ids = self._matching_parent_ids(parent_id)
+        with self._locked(*parent_ids):
+            selected = self._query(
+                self._matching_resources(parent_ids, resource_name),
+                filters=filters,
+                sorting=sorting,
+                pagination_rules=pagination_rules,
+                limit=limit,
                 id_field=id_field,
-                with_deleted=with_deleted,
                 modified_field=modified_field,
                 deleted_field=deleted_field,
             )
-            for r in objects
-        ]
+            deleted = [
+                self.delete(
+                    name,
+                    pid,
+                    obj[id_field],
+                    id_field=id_field,
+                    with_deleted=with_deleted,
+                    modified_field=modified_field,
+                    deleted_field=deleted_field,
+                )
+                for pid, name, obj in selected
+            ]
         return deleted
 
-    @synchronized
     def trim_objects(
         self,
         resource_name: str,
@@ -486,24 +845,24 @@ class Storage(MemoryBasedStorage):
         id_field: str = DEFAULT_ID_FIELD,
         modified_field: str = DEFAULT_MODIFIED_FIELD,
     ) -> int:
-        objects = _get_objects_by_parent_id(self._store, parent_id, resource_name, with_meta=True)
-        objects, _ = self.extract_object_set(
-            objects=objects,
-            filters=filters,
-            sorting=[Sort(modified_field, -1)],
-            id_field=id_field,
-            deleted_field=DEFAULT_DELETED_FIELD,
-        )
-
-        to_delete = objects[max_objects:]
-        for r in to_delete:
-            self.delete(
-                resource_name,
-                parent_id,
-                r[id_field],
+        parent_ids = self._matching_parent_ids(parent_id)
+        with self._locked(*parent_ids):
+            selected = self._query(
+                self._matching_resources(parent_ids, resource_name),
+                filters=filters,
+                sorting=[Sort(modified_field, -1)],
                 id_field=id_field,
                 modified_field=modified_field,
             )
+            to_delete = selected[max_objects:]
+            for pid, name, obj in to_delete:
+                self.delete(
+                    name,
+                    pid,
+                    obj[id_field],
+                    id_field=id_field,
+                    modified_field=modified_field,
+                )
         return len(to_delete)
 
 
@@ -551,74 +910,116 @@ def canonical_json(obj: Any) -> str:
 
 def apply_filters(objects: list[KintoObject], filters: list[Filter]) -> Iterator[KintoObject]:
     """Filter the specified objects, using basic iteration."""
+    matches = compile_filters(filters)
+    for obj in objects:
+        if matches(obj):
+            yield obj
+
+
+def compile_filters(filters: list[Filter]) -> Callable[[KintoObject], bool]:
+    """Compile the specified filters into a predicate on objects.
 
-    def contains_filtering(object_value: Any, search_term: Any) -> bool:
-        if object_value == MISSING:
-            return False
+    Operators are dispatched, and the filters values transformed, once for all
+    instead of for every object.
+    """
+    predicates = [_compile_filter(f) for f in filters]
+    if not predicates:
+        return lambda obj: True
+    if len(predicates) == 1:
+        return predicates[0]
+
+    def matches(obj: KintoObject) -> bool:
+        for predicate in predicates:
+            if not predicate(obj):
+                return False
+        return True
+
+    return matches
+
+
+def _compile_filter(f: Filter) -> Callable[[KintoObject], Any]:
+    value_of = _field_getter(f.field)
+    right = f.value
+    if f.field == DEFAULT_ID_FIELD:
+        if isinstance(right, int):
+            right = str(right)
+
+    if f.operator == COMPARISON.HAS:
+        if f.value:
+            return lambda obj: value_of(obj) is not MISSING
+        return lambda obj: value_of(obj) is MISSING
+
+    if f.operator in (COMPARISON.IN, COMPARISON.EXCLUDE):
+        contained = _contained_in(right)
+        if f.operator == COMPARISON.IN:
+            return lambda obj: contained(value_of(obj))
+        return lambda obj: not contained(value_of(obj))
+
+    if f.operator == COMPARISON.LIKE:
+        # Add implicit start/end wildchars if none is specified.
+        if "*" not in right:
+            right = f"*{right}*"
+        regexp = re.compile(f"^{right.replace('*', '.*')}$", re.IGNORECASE)
+        return lambda obj: regexp.search(value_of(obj))
+
+    if f.operator in (COMPARISON.CONTAINS, COMPARISON.CONTAINS_ANY):
         try:
-            search_set = set([canonical_json(v) for v in search_term])
-            object_value_set = set([canonical_json(v) for v in object_value])
+            search_set = set([canonical_json(v) for v in right])
         except TypeError:
-            return False
-        return object_value_set.intersection(search_set) == search_set
+            return lambda obj: False
+        contains_all = f.operator == COMPARISON.CONTAINS
 
-    def contains_any_filtering(object_value: Any, search_term: Any) -> Any:
-        if object_value == MISSING:
-            return False
+        def contains(obj: KintoObject) -> Any:
+            object_value = value_of(obj)
+            if object_value is MISSING:
+                return False
+            try:
+                object_value_set = set([canonical_json(v) for v in object_value])
+            except TypeError:
+                return False
+            if contains_all:
+                return search_set <= object_value_set
+            return object_value_set.intersection(search_set)
+
+        return contains
+
+    compare = _COMPARISON_OPERATORS[f.operator]
+    right = schwartzian_transform(right)
+    return lambda obj: compare(schwartzian_transform(value_of(obj)), right)
+
+
+_COMPARISON_OPERATORS = {
+    COMPARISON.LT: operator.lt,
+    COMPARISON.MAX: operator.le,
+    COMPARISON.EQ: operator.eq,
+    COMPARISON.NOT: operator.ne,
+    COMPARISON.MIN: operator.ge,
+    COMPARISON.GT: operator.gt,
+}
+
+
+def _field_getter(field: str) -> Callable[[KintoObject], Any]:
+    if "." not in field:
+        return lambda obj: obj.get(field, MISSING)
+    return lambda obj: find_nested_value(obj, field, MISSING)
+
+
+def _contained_in(values: Any) -> Callable[[Any], bool]:
+    """Return a membership test on `values`, using a set when possible."""
+    if not isinstance(values, (list, tuple, set, frozenset)):
+        return lambda value: value in values
+    try:
+        hashed = frozenset(values)
+    except TypeError:
+        return lambda value: value in values
+
+    def contained(value: Any) -> bool:
         try:
-            search_set = set([canonical_json(v) for v in search_term])
-            object_value_set = set([canonical_json(v) for v in object_value])
-        except TypeError:
-            return False
-        return object_value_set.intersection(search_set)
-
-    operators = {
-        COMPARISON.LT: operator.lt,
-        COMPARISON.MAX: operator.le,
-        COMPARISON.EQ: operator.eq,
-        COMPARISON.NOT: operator.ne,
-        COMPARISON.MIN: operator.ge,
-        COMPARISON.GT: operator.gt,
-        COMPARISON.IN: operator.contains,
-        COMPARISON.EXCLUDE: lambda x, y: not operator.contains(x, y),
-        COMPARISON.LIKE: lambda x, y: re.search(y, x, re.IGNORECASE),
-        COMPARISON.CONTAINS: contains_filtering,
-        COMPARISON.CONTAINS_ANY: contains_any_filtering,
-    }
-    for obj in objects:
-        matches = True
-        for f in filters:
-            right = f.value
-            if f.field == DEFAULT_ID_FIELD:
-                if isinstance(right, int):
-                    right = str(right)
-
-            left = find_nested_value(obj, f.field, MISSING)
-
-            if f.operator in (COMPARISON.IN, COMPARISON.EXCLUDE):
-                right, left = left, right
-            elif f.operator == COMPARISON.LIKE:
-                # Add implicit start/end wildchars if none is specified.
-                if "*" not in right:
-                    right = f"*{right}*"
-                right = f"^{right.replace('*', '.*')}$"
-            elif f.operator in (
-                COMPARISON.LT,
-                COMPARISON.MAX,
-                COMPARISON.EQ,
-                COMPARISON.NOT,
-                COMPARISON.MIN,
-                COMPARISON.GT,
-            ):
-                left = schwartzian_transform(left)
-                right = schwartzian_transform(right)
-
-            if f.operator == COMPARISON.HAS:
-                matches = left != MISSING if f.value else left == MISSING
-            else:
-                matches = matches and operators[f.operator](left, right)
-        if matches:
-            yield obj
+            return value in hashed
+        except TypeError:  # Unhashable object value (eg. list).
+            return value in values
+
+    return contained
 
 
 def schwartzian_transform(value: Any) -> tuple[int, Any]:
@@ -654,40 +1055,126 @@ def schwartzian_transform(value: Any) -> tuple[int, Any]:
 
 
 def apply_sorting(objects: list[KintoObject], sorting: list[Sort]) -> list[KintoObject]:
-    """Sort the specified objects, using cumulative python sorting."""
+    """Sort the specified objects, using a composite key of all the sort fields."""
     result = list(objects)
 
-    if not result:
+    if not result or not sorting:
         return result
 
-    def column(obj: KintoObject, name: str) -> tuple[int, Any]:
-        return schwartzian_transform(find_nested_value(obj, name, default=MISSING))
+    columns = [(_field_getter(sort.field), sort.direction < 0) for sort in sorting]
+
+    if len(columns) == 1:
+        value_of, descending = columns[0]
+        result.sort(key=lambda obj: schwartzian_transform(value_of(obj)), reverse=descending)
+        return result
 
-    for sort in reversed(sorting):
-        result = sorted(result, key=lambda r: column(r, sort.field), reverse=(sort.direction < 0))
+    def key(obj: KintoObject) -> tuple:
+        return tuple(
+            _Descending(schwartzian_transform(value_of(obj)))
+            if descending
+            else schwartzian_transform(value_of(obj))
+            for value_of, descending in columns
+        )
 
+    result.sort(key=key)
     return result
 
 
-def _get_objects_by_parent_id(
-    store: dict[str, Any], parent_id: str, resource_name: str | None, with_meta: bool = False
-) -> list[KintoObject]:
-    parent_id_match = re.compile(f"^{parent_id.replace('*', '.*')}$")
-    by_parent_id = {
-        pid: resources for pid, resources in store.items() if parent_id_match.match(pid)
-    }
-    objects = []
-    for pid, resources in by_parent_id.items():
-        if resource_name is not None:
-            resources = {resource_name: resources[resource_name]}
-        for resource, colobjects in resources.items():
-            for r in colobjects.values():
-                if with_meta:
-                    objects.append(dict(__resource_name__=resource, __parent_id__=pid, **r))
-                else:
-                    objects.append(r)
-    return objects
+class _Descending:
+    """Sort key wrapper that inverts the order of the wrapped value."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+    def __eq__(self, other: Any) -> bool:
+        return self.value == other.value
+
+    def __lt__(self, other: Any) -> bool:
+        return other.value < self.value
+
+
+def _prefix_range(sorted_values: list[str], prefix: str) -> tuple[int, int]:
+    """Return the slice of `sorted_values` that start with `prefix`."""
+    start = bisect.bisect_left(sorted_values, prefix)
+    if not prefix:
+        return start, len(sorted_values)
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return start, bisect.bisect_left(sorted_values, upper, lo=start)
+
+
+def _timeline_remove(timeline: list[tuple[Any, str]], key: Any, object_id: str) -> None:
+    index = bisect.bisect_left(timeline, (key, object_id))
+    if index < len(timeline) and timeline[index] == (key, object_id):
+        del timeline[index]
+        return
+    # The timestamp field was changed in place, fallback to a full scan.
+    index = next(i for i, (_, oid) in enumerate(timeline) if oid == object_id)
+    del timeline[index]
+
+
+def _scan(
+    timeline: list[tuple[Any, str]],
+    objects: dict[str, KintoObject],
+    low: Any,
+    high: Any,
+    reverse: bool,
+) -> Iterator[tuple[Any, KintoObject]]:
+    start = 0 if low is None else bisect.bisect_left(timeline, low, key=itemgetter(0))
+    end = len(timeline) if high is None else bisect.bisect_right(timeline, high, key=itemgetter(0))
+    indices = range(end - 1, start - 1, -1) if reverse else range(start, end)
+    for index in indices:
+        key, object_id = timeline[index]
+        yield key, objects[object_id]
+
+
+def _tagged(
+    parent_id: str, resource_name: str, scan: Iterator[tuple[Any, KintoObject]]
+) -> Iterator[tuple[Any, str, str, KintoObject]]:
+    for key, obj in scan:
+        yield key, parent_id, resource_name, obj
+
+
+def _filters_bounds(filters: list[Filter], modified_field: str) -> tuple[Any, Any]:
+    low = high = None
+    for f in filters:
+        value = f.value
+        if f.field != modified_field or isinstance(value, bool):
+            continue
+        if not isinstance(value, numbers.Number):
+            continue
+        if f.operator in (COMPARISON.GT, COMPARISON.MIN, COMPARISON.EQ):
+            low = value if low is None else max(low, value)
+        if f.operator in (COMPARISON.LT, COMPARISON.MAX, COMPARISON.EQ):
+            high = value if high is None else min(high, value)
+    return low, high
+
+
+def _modified_bounds(
+    filters: list[Filter], pagination_rules: list[list[Filter]] | None, modified_field: str
+) -> tuple[Any, Any]:
+    """Return the inclusive range of timestamps that the objects matching the
+    `filters` and any of the `pagination_rules` can have (``None`` if unbounded).
+    """
+    low, high = _filters_bounds(filters, modified_field)
+    if pagination_rules:
+        rules_bounds = [_filters_bounds(rule, modified_field) for rule in pagination_rules]
+        rules_lows = [rule_low for rule_low, _ in rules_bounds]
+        rules_highs = [rule_high for _, rule_high in rules_bounds]
+        if None not in rules_lows:
+            low = min(rules_lows) if low is None else max(low, min(rules_lows))
+        if None not in rules_highs:
+            high = max(rules_highs) if high is None else min(high, max(rules_highs))
+    return low, high
 
 
 def load_from_config(config) -> Storage:
-    return Storage()
+    settings = config.get_settings()
+    return Storage(
+        persistence_path=settings.get("storage_persistence_path") or None,
+        persistence_snapshot_interval=int(
+            settings.get("storage_persistence_snapshot_interval", SNAPSHOT_INTERVAL)
+        ),
+        persistence_fsync=asbool(settings.get("storage_persistence_fsync", False)),
+    )
@@ -1,7 +1,9 @@
+import contextlib
 import logging
 import os
 import warnings
 from collections import defaultdict
+from collections.abc import Iterator
 from typing import Any
 
 from kinto.core.decorators import deprecate_kwargs
@@ -173,7 +175,7 @@ class Storage(StorageBase, MigratorMixin):
 
     # MigratorMixin attributes.
     name = "storage"
-    schema_version = 26
+    schema_version = 27
     schema_file = os.path.join(HERE, "schema.sql")
     migrations_directory = os.path.join(HERE, "migrations")
 
@@ -288,6 +290,7 @@ class Storage(StorageBase, MigratorMixin):
         query = """
         DELETE FROM objects;
         DELETE FROM timestamps;
+        DELETE FROM queue_entries;
         """
         with self.client.connect(force_commit=True) as conn:
             conn.execute(sa.text(query))
@@ -450,6 +453,63 @@ class Storage(StorageBase, MigratorMixin):
         obj[modified_field] = inserted.last_modified
         return obj
 
+    def create_many(
+        self,
+        resource_name: str,
+        parent_id: str,
+        objs: list[KintoObject],
+        id_generator: generators.Generator | None = None,
+        id_field: str = DEFAULT_ID_FIELD,
+        modified_field: str = DEFAULT_MODIFIED_FIELD,
+    ) -> list[KintoObject]:
+        if not objs:
+            return []
+
+        id_generator = id_generator or self.id_generator
+        placeholders: dict[str, Any] = dict(parent_id=parent_id, resource_name=resource_name)
+        values = []
+        created = []
+        for i, obj in enumerate(objs):
+            obj = {**obj}
+            if id_field not in obj:
+                obj[id_field] = id_generator()
+            created.append(obj)
+
+            # Remove redundancy in data field
+            query_object = {**obj}
+            query_object.pop(id_field, None)
+            query_object.pop(modified_field, None)
+
+            placeholders[f"object_id_{i}"] = obj[id_field]
+            placeholders[f"last_modified_{i}"] = obj.get(modified_field)
+            placeholders[f"data_{i}"] = json.dumps(query_object)
+            values.append(
+                f"(:object_id_{i}, :parent_id, :resource_name, (:data_{i})::JSONB,"
+                f" from_epoch(:last_modified_{i}), FALSE)"
+            )
+
+        # Same as ``create()``, with a row per object.
+        query = f"""
+        INSERT INTO objects (id, parent_id, resource_name, data, last_modified, deleted)
+        VALUES {",".join(values)}
+        ON CONFLICT (id, parent_id, resource_name) DO UPDATE
+        SET last_modified = EXCLUDED.last_modified,
+            data = EXCLUDED.data,
+            deleted = FALSE
+        WHERE objects.deleted = TRUE
+        RETURNING id, as_epoch(last_modified) AS last_modified;
+        """
+        with self.client.connect() as conn:
+            result = conn.execute(sa.text(query), placeholders)
+            inserted = {row.id: row.last_modified for row in result.fetchall()}
+
+        if len(inserted) < len(created):
+            raise exceptions.UnicityError(id_field)
+
+        for obj in created:
+            obj[modified_field] = inserted[obj[id_field]]
+        return created
+
     @deprecate_kwargs({"collection_id": "resource_name"})
     def get(
         self,
@@ -830,6 +890,47 @@ class Storage(StorageBase, MigratorMixin):
             records.append(record)
         return records
 
+    def list_all_by_parent_id(
+        self,
+        resource_name: str,
+        parent_id: str,
+        filters: list[Filter] | None = None,
+        id_field: str = DEFAULT_ID_FIELD,
+        modified_field: str = DEFAULT_MODIFIED_FIELD,
+        deleted_field: str = DEFAULT_DELETED_FIELD,
+    ) -> dict[str, list[KintoObject]]:
+        query = """
+            SELECT parent_id, id, as_epoch(last_modified) AS last_modified, data
+            FROM objects
+            WHERE {parent_id_filter}
+            AND resource_name = :resource_name
+            AND NOT deleted
+            {conditions_filter};
+        """
+        placeholders: dict[str, Any] = dict(parent_id=parent_id, resource_name=resource_name)
+        safeholders = dict(parent_id_filter="parent_id = :parent_id", conditions_filter="")
+
+        if "*" in parent_id:
+            safeholders["parent_id_filter"] = "parent_id LIKE :parent_id"
+            placeholders["parent_id"] = parent_id.replace("*", "%")
+
+        if filters:
+            safe_sql, holders = self._format_conditions(filters, id_field, modified_field)
+            safeholders["conditions_filter"] = f"AND {safe_sql}"
+            placeholders.update(**holders)
+
+        with self.client.connect(readonly=True) as conn:
+            result = conn.execute(sa.text(query.format_map(safeholders)), placeholders)
+            rows = result.fetchall()
+
+        by_parent_id = {}
+        for row in rows:
+            obj = row.data
+            obj[id_field] = row.id
+            obj[modified_field] = row.last_modified
+            by_parent_id.setdefault(row.parent_id, []).append(obj)
+        return by_parent_id
+
     def count_all(
         self,
         resource_name: str,
@@ -899,6 +1000,39 @@ class Storage(StorageBase, MigratorMixin):
             # Using RETURNING so rowcount reflects the number deleted
             return result.rowcount
 
+    def enqueue(self, queue: str, entry: dict[str, Any]) -> None:
+        query = "INSERT INTO queue_entries (queue, entry) VALUES (:queue, (:entry)::JSONB);"
+        with self.client.connect() as conn:
+            conn.execute(sa.text(query), dict(queue=queue, entry=json.dumps(entry)))
+
+    def list_queue(self, queue: str, limit: int) -> list[dict[str, Any]]:
+        query = """
+        SELECT id, entry
+          FROM queue_entries
+         WHERE queue = :queue
+         ORDER BY id
+         LIMIT :limit;
+        """
+        with self.client.connect(readonly=True) as conn:
+            result = conn.execute(sa.text(query), dict(queue=queue, limit=limit))
+            return [{**row.entry, "id": row.id} for row in result.fetchall()]
+
+    def dequeue(self, queue: str, ids: list[Any]) -> None:
+        if not ids:
+            return
+        query = "DELETE FROM queue_entries WHERE queue = :queue AND id IN :ids;"
+        with self.client.connect() as conn:
+            conn.execute(sa.text(query), dict(queue=queue, ids=tuple(ids)))
+
+    @contextlib.contextmanager
+    def claim_queue(self, queue: str) -> Iterator[bool]:
+        # The lock is held by a transaction of its own, released on exit, or
+        # if the worker stops (and its connection is closed).
+        query = "SELECT pg_try_advisory_xact_lock(hashtext(:queue));"
+        with self.client.connect_apart() as conn:
+            claimed = conn.execute(sa.text(query), dict(queue=f"queue:{queue}")).scalar()
+            yield claimed
+
     def _get_rows(
         self,
         query: str,
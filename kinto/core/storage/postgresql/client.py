@@ -19,6 +19,16 @@ BLACKLISTED_SETTINGS = [
     "max_size_bytes",
     "prefix",
     "hosts",
+    "purge_interval_seconds",
+    "purge_batch_size",
+    "unlogged",
+    "tiered_backend",
+    "tiered_local_ttl_seconds",
+    "tiered_local_max_entries",
+    "tiered_invalidate",
+    "codec",
+    "codec_compression",
+    "codec_compression_threshold_bytes",
 ]
 
 
@@ -28,10 +38,12 @@ class PostgreSQLClient:
         session_factory: Callable[[], Any],
         commit_manually: bool,
         invalidate: Callable[[Any], None],
+        engine: Any = None,
     ):
         self.session_factory = session_factory
         self.commit_manually = commit_manually
         self.invalidate = invalidate
+        self.engine = engine
 
     @contextlib.contextmanager
     def connect(self, readonly: bool = False, force_commit: bool = False) -> Iterator[Any]:
@@ -74,6 +86,20 @@ class PostgreSQLClient:
                 # Give back to pool if commit done manually.
                 session.close()
 
+    @contextlib.contextmanager
+    def connect_apart(self) -> Iterator[Any]:
+        """
+        Pulls a connection of its own from the pool, apart from the sessions
+        of the threads, whose transaction lasts as long as the context (e.g.
+        to hold a lock while other transactions are committed).
+        """
+        try:
+            with self.engine.connect() as conn, conn.begin():
+                yield conn
+        except sqlalchemy.exc.SQLAlchemyError as e:  # ty: ignore[possibly-missing-submodule]
+            logger.error(e, exc_info=True)
+            raise exceptions.BackendError(original=e) from e
+
 
 # Reuse existing client if same URL.
 _CLIENTS = defaultdict(dict)
@@ -124,6 +150,6 @@ def create_from_config(
 
     # Store one client per URI.
     commit_manually = not transaction_per_request
-    client = PostgreSQLClient(session_factory, commit_manually, invalidate)
+    client = PostgreSQLClient(session_factory, commit_manually, invalidate, engine=engine)
     _CLIENTS[transaction_per_request][url] = client
     return client
@@ -0,0 +1,13 @@
+-- Store the queues of entries in their own table, instead of objects, whose
+-- timestamps and unicity make concurrent writes wait for each other.
+
+CREATE TABLE IF NOT EXISTS queue_entries (
+    id BIGSERIAL PRIMARY KEY,
+    queue TEXT COLLATE "C" NOT NULL,
+    entry JSONB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_queue_entries_queue_id
+    ON queue_entries(queue, id);
+
+-- Bump storage schema version.
+INSERT INTO metadata (name, value) VALUES ('storage_schema_version', '27');
@@ -128,6 +128,18 @@ CREATE TRIGGER tgr_objects_last_modified
 BEFORE INSERT OR UPDATE OF data ON objects
 FOR EACH ROW EXECUTE PROCEDURE bump_timestamp();
 
+--
+-- Queues of entries (e.g. events waiting to be delivered to listeners).
+-- Apart from objects, to avoid the timestamps and unicity of resources.
+--
+CREATE TABLE IF NOT EXISTS queue_entries (
+    id BIGSERIAL PRIMARY KEY,
+    queue TEXT COLLATE "C" NOT NULL,
+    entry JSONB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_queue_entries_queue_id
+    ON queue_entries(queue, id);
+
 --
 -- Metadata table
 --
@@ -140,4 +152,4 @@ INSERT INTO metadata (name, value) VALUES ('created_at', NOW()::TEXT);
 
 -- Set storage schema version.
 -- Should match ``kinto.core.storage.postgresql.PostgreSQL.schema_version``
-INSERT INTO metadata (name, value) VALUES ('storage_schema_version', '26');
+INSERT INTO metadata (name, value) VALUES ('storage_schema_version', '27');
@@ -0,0 +1,768 @@
+import contextlib
+import logging
+import numbers
+import os
+import re
+import sqlite3
+from collections.abc import Iterable
+from typing import Any
+
+from pyramid.settings import asbool, aslist
+
+from kinto.core.decorators import deprecate_kwargs
+from kinto.core.storage import (
+    DEFAULT_DELETED_FIELD,
+    DEFAULT_ID_FIELD,
+    DEFAULT_MODIFIED_FIELD,
+    Filter,
+    KintoObject,
+    Sort,
+    exceptions,
+    generators,
+    memory,
+)
+from kinto.core.storage.memory import MemoryBasedStorage
+from kinto.core.storage.sqlite.client import SQLiteClient, create_from_config, glob_pattern
+from kinto.core.utils import COMPARISON, json
+
+
+logger = logging.getLogger(__name__)
+HERE = os.path.dirname(__file__)
+
+INDEXABLE_FIELD = re.compile(r"^[A-Za-z0-9_-]+$")
+"""Data fields that can be looked up, and indexed, with a JSON1 expression."""
+
+_SQL_COMPARISONS = {
+    COMPARISON.LT: "<",
+    COMPARISON.MAX: "<=",
+    COMPARISON.EQ: "=",
+    COMPARISON.NOT: "<>",
+    COMPARISON.MIN: ">=",
+    COMPARISON.GT: ">",
+}
+
+
+class Storage(MemoryBasedStorage):
+    """Storage backend using SQLite.
+
+    Suited to single-node deployments, where running a PostgreSQL server is
+    not worth it.
+
+    Enable in configuration::
+
+        kinto.storage_backend = kinto.core.storage.sqlite
+
+    Database file location can be customized::
+
+        kinto.storage_url = sqlite:////var/lib/kinto/kinto.sqlite
+
+    The database is opened in WAL mode, with one connection per thread.
+
+    Conditions on ids, timestamps and parent ids, as well as equality on
+    top-level data fields, are executed by SQLite. The latter use JSON1
+    expressions, that can be indexed for some fields::
+
+        kinto.storage_json_indexes = title author
+
+    The other filters and sorting are then applied on the selected objects,
+    like the memory backend does.
+
+    :noindex:
+    """
+
+    def __init__(
+        self,
+        client: SQLiteClient,
+        *args,
+        readonly: bool = False,
+        json_indexes: Iterable[str] = (),
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.client = client
+        self.readonly = readonly
+        self.json_indexes = list(json_indexes)
+        for field in self.json_indexes:
+            if not INDEXABLE_FIELD.match(field):
+                raise ValueError(f"Cannot index field {field!r}")
+
+    def initialize_schema(self, dry_run: bool = False) -> None:
+        sql_file = os.path.join(HERE, "schema.sql")
+
+        if dry_run:
+            logger.info(f"Create SQLite storage schema from '{sql_file}'")
+            return
+
+        with open(sql_file) as f:
+            schema = f.read()
+        for field in self.json_indexes:
+            schema += (
+                f'CREATE INDEX IF NOT EXISTS "idx_objects_data_{field}"\n'
+                f"    ON objects(parent_id, resource_name, {_json_extract(field)});\n"
+            )
+        self.client.execute_script(schema)
+        logger.info("Created SQLite storage tables")
+
+    def flush(self) -> None:
+        with self.client.connect() as conn:
+            conn.execute("DELETE FROM objects;")
+            conn.execute("DELETE FROM timestamps;")
+        logger.debug("Flushed SQLite storage tables")
+
+    def resource_timestamp(self, resource_name: str, parent_id: str) -> int:
+        with self.client.connect(readonly=True) as conn:
+            timestamp = _stored_timestamp(conn, resource_name, parent_id)
+        if timestamp is not None:
+            return timestamp
+
+        if self.readonly:
+            error_msg = "Cannot initialize empty resource timestamp when running in readonly."
+            raise exceptions.ReadonlyError(message=error_msg)
+
+        with self.client.connect() as conn:
+            # Could have been initialized meanwhile.
+            timestamp = _stored_timestamp(conn, resource_name, parent_id)
+            if timestamp is not None:
+                return timestamp
+            return self.bump_and_store_timestamp(resource_name, parent_id)
+
+    def all_resources_timestamps(self, resource_name: str) -> dict[str, int]:
+        query = """
+        SELECT parent_id, last_modified
+          FROM timestamps
+         WHERE resource_name = ?;
+        """
+        with self.client.connect(readonly=True) as conn:
+            rows = conn.execute(query, (resource_name,)).fetchall()
+        return dict(rows)
+
+    def bump_and_store_timestamp(
+        self,
+        resource_name: str,
+        parent_id: str,
+        obj: KintoObject | None = None,
+        modified_field: str | None = None,
+        last_modified: int | None = None,
+    ) -> int:
+        """Use the bump_timestamp to get its next value and store the resource_timestamp."""
+        query = """
+        INSERT INTO timestamps (resource_name, parent_id, last_modified)
+        VALUES (?, ?, ?)
+        ON CONFLICT (resource_name, parent_id) DO UPDATE
+        SET last_modified = excluded.last_modified;
+        """
+        with self.client.connect() as conn:
+            current_resource_timestamp = _stored_timestamp(conn, resource_name, parent_id) or 0
+            current, resource_timestamp = self.bump_timestamp(
+                current_resource_timestamp, obj, modified_field, last_modified
+            )
+            conn.execute(query, (resource_name, parent_id, resource_timestamp))
+        return current
+
+    @deprecate_kwargs({"collection_id": "resource_name", "record": "obj"})
+    def create(
+        self,
+        resource_name: str,
+        parent_id: str,
+        obj: KintoObject,
+        id_generator: generators.Generator | None = None,
+        id_field: str = DEFAULT_ID_FIELD,
+        modified_field: str = DEFAULT_MODIFIED_FIELD,
+    ) -> KintoObject:
+        id_generator = id_generator or self.id_generator
+        obj = {**obj}
+
+        with self.client.connect() as conn:
+            if id_field in obj:
+                # Raise unicity error if object with same id already exists.
+                try:
+                    existing = self.get(resource_name, parent_id, obj[id_field])
+                    raise exceptions.UnicityError(id_field, existing)
+                except exceptions.ObjectNotFoundError:
+                    pass
+            else:
+                obj[id_field] = id_generator()
+
+            self.set_object_timestamp(resource_name, parent_id, obj, modified_field=modified_field)
+            if not _store(
+                conn, resource_name, parent_id, obj, id_field, modified_field, create=True
+            ):
+                raise exceptions.UnicityError(id_field)
+        return obj
+
+    def create_many(
+        self,
+        resource_name: str,
+        parent_id: str,
+        objs: list[KintoObject],
+        id_generator: generators.Generator | None = None,
+        id_field: str = DEFAULT_ID_FIELD,
+        modified_field: str = DEFAULT_MODIFIED_FIELD,
+    ) -> list[KintoObject]:
+        id_generator = id_generator or self.id_generator
+        created = []
+        # Within a single transaction.
+        with self.client.connect() as conn:
+            for obj in objs:
+                obj = {**obj}
+                if id_field not in obj:
+                    obj[id_field] = id_generator()
+                self.set_object_timestamp(
+                    resource_name, parent_id, obj, modified_field=modified_field
+                )
+                if not _store(
+                    conn, resource_name, parent_id, obj, id_field, modified_field, create=True
+                ):
+                    raise exceptions.UnicityError(id_field)
+                created.append(obj)
+        return created
+
+    @deprecate_kwargs({"collection_id": "resource_name"})
+    def get(
+        self,
+        resource_name: str,
+        parent_id: str,
+        object_id: str,
+        id_field: str = DEFAULT_ID_FIELD,
+        modified_field: str = DEFAULT_MODIFIED_FIELD,
+    ) -> KintoObject:
+        query = """
+        SELECT last_modified, data
+          FROM objects
+         WHERE id = ?
+           AND parent_id = ?
+           AND resource_name = ?
+           AND NOT deleted;
+        """
+        with self.client.connect(readonly=True) as conn:
+            row = conn.execute(query, (object_id, parent_id, resource_name)).fetchone()
+        if row is None:
+            raise exceptions.ObjectNotFoundError(object_id)
+        last_modified, data = row
+        return {**json.loads(data), id_field: object_id, modified_field: last_modified}
+
+    @deprecate_kwargs({"collection_id": "resource_name", "record": "obj"})
+    def update(
+        self,
+        resource_name: str,
+        parent_id: str,
+        object_id: str,
+        obj: KintoObject,
+        id_field: str = DEFAULT_ID_FIELD,
+        modified_field: str = DEFAULT_MODIFIED_FIELD,
+    ) -> KintoObject:
+        obj = {**obj, id_field: object_id}
+
+        with self.client.connect() as conn:
+            self.set_object_timestamp(resource_name, parent_id, obj, modified_field=modified_field)
+            _store(conn, resource_name, parent_id, obj, id_field, modified_field)
+        return obj
+
+    @deprecate_kwargs({"collection_id": "resource_name"})
+    def delete(
+        self,
+        resource_name: str,
+        parent_id: str,
+        object_id: str,
+        id_field: str = DEFAULT_ID_FIELD,
+        with_deleted: bool = True,
+        modified_field: str = DEFAULT_MODIFIED_FIELD,
+        deleted_field: str = DEFAULT_DELETED_FIELD,
+        last_modified: int | None = None,
+    ) -> KintoObject:
+        with self.client.connect() as conn:
+            existing = self.get(resource_name, parent_id, object_id)
+            # Need to delete the last_modified field of the object.
+            del existing[modified_field]
+
+            self.set_object_timestamp(
+                resource_name,
+                parent_id,
+                existing,
+                modified_field=modified_field,
+                last_modified=last_modified,
+            )
+            existing = self.strip_deleted_object(resource_name, parent_id, existing)
+
+            if with_deleted:
+                tombstone = {**existing}
+                _store(conn, resource_name, parent_id, tombstone, id_field, modified_field, True)
+            else:
+                query = """
+                DELETE FROM objects
+                 WHERE id = ?
+                   AND parent_id = ?
+                   AND resource_name = ?;
+                """
+                conn.execute(query, (object_id, parent_id, resource_name))
+        return existing
+
+    @deprecate_kwargs({"collection_id": "resource_name"})
+    def purge_deleted(
+        self,
+        resource_name: str,
+        parent_id: str,
+        before: int | None = None,
+        max_retained: int | None = None,
+        id_field: str = DEFAULT_ID_FIELD,
+        modified_field: str = DEFAULT_MODIFIED_FIELD,
+        force_commit: bool = False,
+    ) -> int:
+        if max_retained is not None and before is not None:
+            raise ValueError("`before` and `max_retained` are exclusive arguments. Pick one.")
+
+        scope, placeholders = _scope_condition(resource_name, parent_id)
+        if max_retained is not None:
+            query = f"""
+            DELETE FROM objects
+             WHERE rowid IN (
+                SELECT rowid
+                  FROM (
+                    SELECT rowid,
+                           ROW_NUMBER() OVER (
+                             PARTITION BY parent_id, resource_name
+                             ORDER BY last_modified DESC
+                           ) AS rank
+                      FROM objects
+                     WHERE deleted AND {scope}
+                  )
+                 WHERE rank > ?
+             );
+            """
+            purge_placeholders = [*placeholders, max_retained]
+        elif before is not None:
+            query = f"DELETE FROM objects WHERE deleted AND {scope} AND last_modified < ?;"
+            purge_placeholders = [*placeholders, before]
+        else:
+            query = f"DELETE FROM objects WHERE deleted AND {scope};"
+            purge_placeholders = placeholders
+
+        with self.client.connect(force_commit=force_commit) as conn:
+            conn.execute(f"DELETE FROM timestamps WHERE {scope};", placeholders)
+            result = conn.execute(query, purge_placeholders)
+        return result.rowcount
+
+    def list_all(
+        self,
+        resource_name: str,
+        parent_id: str,
+        filters: list[Filter] | None = None,
+        sorting: list[Sort] | None = None,
+        pagination_rules: list[list[Filter]] | None = None,
+        limit: int | None = None,
+        include_deleted: bool = False,
+        id_field: str = DEFAULT_ID_FIELD,
+        modified_field: str = DEFAULT_MODIFIED_FIELD,
+        deleted_field: str = DEFAULT_DELETED_FIELD,
+    ) -> list[KintoObject]:
+        with self.client.connect(readonly=True) as conn:
+            selected = self._query(
+                conn,
+                resource_name,
+                parent_id,
+                filters=filters,
+                sorting=sorting,
+                pagination_rules=pagination_rules,
+                limit=limit,
+                include_deleted=include_deleted,
+                id_field=id_field,
+                modified_field=modified_field,
+                deleted_field=deleted_field,
+            )
+        return [obj for _, _, obj in selected]
+
+    def list_all_by_parent_id(
+        self,
+        resource_name: str,
+        parent_id: str,
+        filters: list[Filter] | None = None,
+        id_field: str = DEFAULT_ID_FIELD,
+        modified_field: str = DEFAULT_MODIFIED_FIELD,
+        deleted_field: str = DEFAULT_DELETED_FIELD,
+    ) -> dict[str, list[KintoObject]]:
+        with self.client.connect(readonly=True) as conn:
+            selected = self._query(
+                conn,
+                resource_name,
+                parent_id,
+                filters=filters,
+                id_field=id_field,
+                modified_field=modified_field,
+                deleted_field=deleted_field,
+            )
+        by_parent_id = {}
+        for pid, _, obj in selected:
+            by_parent_id.setdefault(pid, []).append(obj)
+        return by_parent_id
+
+    def count_all(
+        self,
+        resource_name: str,
+        parent_id: str,
+        filters: list[Filter] | None = None,
+        include_deleted: bool = False,
+        id_field: str = DEFAULT_ID_FIELD,
+        modified_field: str = DEFAULT_MODIFIED_FIELD,
+        deleted_field: str = DEFAULT_DELETED_FIELD,
+    ) -> int:
+        filters = filters or []
+        conditions, placeholders, exact = _conditions(
+            resource_name, parent_id, filters, include_deleted, id_field, modified_field
+        )
+        with self.client.connect(readonly=True) as conn:
+            if exact:
+                query = f"SELECT COUNT(*) FROM objects WHERE {conditions};"
+                (count,) = conn.execute(query, placeholders).fetchone()
+                return count
+
+            selected = self._query(
+                conn,
+                resource_name,
+                parent_id,
+                filters=filters,
+                include_deleted=include_deleted,
+                id_field=id_field,
+                modified_field=modified_field,
+                deleted_field=deleted_field,
+            )
+        _, count = self.extract_object_set(
+            objects=[obj for _, _, obj in selected],
+            filters=None,
+            sorting=None,
+            include_deleted=include_deleted,
+            id_field=id_field,
+            deleted_field=deleted_field,
+        )
+        return count
+
+    @deprecate_kwargs({"collection_id": "resource_name"})
+    def delete_all(
+        self,
+        resource_name: str,
+        parent_id: str,
+        filters: list[Filter] | None = None,
+        sorting: list[Sort] | None = None,
+        pagination_rules: list[list[Filter]] | None = None,
+        limit: int | None = None,
+        id_field: str = DEFAULT_ID_FIELD,
+        with_deleted: bool = True,
+        modified_field: str = DEFAULT_MODIFIED_FIELD,
+        deleted_field: str = DEFAULT_DELETED_FIELD,
+    ) -> list[KintoObject]:
+        with self.client.connect() as conn:
+            selected = self._query(
+                conn,
+                resource_name,
+                parent_id,
+                filters=filters,
+                sorting=sorting,
+                pagination_rules=pagination_rules,
+                limit=limit,
+                id_field=id_field,
+                modified_field=modified_field,
+                deleted_field=deleted_field,
+            )
+            deleted = [
+                self.delete(
+                    name,
+                    pid,
+                    obj[id_field],
+                    id_field=id_field,
+                    with_deleted=with_deleted,
+                    modified_field=modified_field,
+                    deleted_field=deleted_field,
+                )
+                for pid, name, obj in selected
+            ]
+        return deleted
+
+    def trim_objects(
+        self,
+        resource_name: str,
+        parent_id: str,
+        filters: list,
+        max_objects: int,
+        id_field: str = DEFAULT_ID_FIELD,
+        modified_field: str = DEFAULT_MODIFIED_FIELD,
+    ) -> int:
+        with self.client.connect() as conn:
+            selected = self._query(
+                conn,
+                resource_name,
+                parent_id,
+                filters=filters,
+                sorting=[Sort(modified_field, -1)],
+                id_field=id_field,
+                modified_field=modified_field,
+            )
+            to_delete = selected[max_objects:]
+            for pid, name, obj in to_delete:
+                self.delete(
+                    name,
+                    pid,
+                    obj[id_field],
+                    id_field=id_field,
+                    modified_field=modified_field,
+                )
+        return len(to_delete)
+
+    def _query(
+        self,
+        conn: sqlite3.Connection,
+        resource_name: str,
+        parent_id: str,
+        filters: list[Filter] | None,
+        sorting: list[Sort] | None = None,
+        pagination_rules: list[list[Filter]] | None = None,
+        limit: int | None = None,
+        include_deleted: bool = False,
+        id_field: str = DEFAULT_ID_FIELD,
+        modified_field: str = DEFAULT_MODIFIED_FIELD,
+        deleted_field: str = DEFAULT_DELETED_FIELD,
+    ) -> list[tuple[str, str, KintoObject]]:
+        """Return the ``(parent_id, resource_name, object)`` of the objects
+        that match the filters and pagination rules.
+
+        SQLite selects the candidates from the conditions it can evaluate.
+        When it can also sort them, they are fetched until the limit is
+        reached, instead of being all loaded and sorted.
+        """
+        filters = filters or []
+        conditions, placeholders, _ = _conditions(
+            resource_name, parent_id, filters, include_deleted, id_field, modified_field
+        )
+        rules_condition = _pagination_condition(pagination_rules, id_field, modified_field)
+        if rules_condition is not None:
+            condition, rules_placeholders = rules_condition
+            conditions += f" AND {condition}"
+            placeholders += rules_placeholders
+
+        query = f"""
+        SELECT parent_id, resource_name, id, last_modified, data
+          FROM objects
+         WHERE {conditions}
+        """
+        order_by = _order_by(sorting or [], id_field, modified_field)
+        if order_by is None:
+            owners = {}
+            candidates = []
+            for pid, name, obj in _fetch(conn, query, placeholders, id_field, modified_field):
+                owners[id(obj)] = (pid, name)
+                candidates.append(obj)
+            objects, _ = self.extract_object_set(
+                objects=candidates,
+                filters=filters,
+                sorting=sorting,
+                id_field=id_field,
+                deleted_field=deleted_field,
+                pagination_rules=pagination_rules,
+                limit=limit,
+            )
+            return [(*owners[id(obj)], obj) for obj in objects]
+
+        if order_by:
+            query += f" ORDER BY {order_by}"
+        matches = memory.compile_filters(filters)
+        rules = [memory.compile_filters(rule) for rule in pagination_rules or []]
+        selected = []
+        for pid, name, obj in _fetch(conn, query, placeholders, id_field, modified_field):
+            if matches(obj) and (not rules or any(rule(obj) for rule in rules)):
+                selected.append((pid, name, obj))
+                if limit and len(selected) >= limit:
+                    break
+        return selected
+
+
+def _stored_timestamp(conn: sqlite3.Connection, resource_name: str, parent_id: str) -> int | None:
+    query = """
+    SELECT last_modified
+      FROM timestamps
+     WHERE resource_name = ?
+       AND parent_id = ?;
+    """
+    row = conn.execute(query, (resource_name, parent_id)).fetchone()
+    return None if row is None else row[0]
+
+
+def _store(
+    conn: sqlite3.Connection,
+    resource_name: str,
+    parent_id: str,
+    obj: KintoObject,
+    id_field: str,
+    modified_field: str,
+    deleted: bool = False,
+    create: bool = False,
+) -> bool:
+    """Insert or replace the object, and return whether it was stored.
+
+    On creation, only a tombstone can be replaced.
+    """
+    query = f"""
+    INSERT INTO objects (id, parent_id, resource_name, last_modified, data, deleted)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (id, parent_id, resource_name) DO UPDATE
+    SET last_modified = excluded.last_modified,
+        data = excluded.data,
+        deleted = excluded.deleted
+    {"WHERE objects.deleted" if create else ""};
+    """
+    data = {k: v for k, v in obj.items() if k not in (id_field, modified_field)}
+    result = conn.execute(
+        query,
+        (obj[id_field], parent_id, resource_name, obj[modified_field], json.dumps(data), deleted),
+    )
+    return result.rowcount > 0
+
+
+def _fetch(
+    conn: sqlite3.Connection,
+    query: str,
+    placeholders: list[Any],
+    id_field: str,
+    modified_field: str,
+):
+    with contextlib.closing(conn.execute(query, placeholders)) as cursor:
+        for pid, name, object_id, last_modified, data in cursor:
+            obj = json.loads(data)
+            obj[id_field] = object_id
+            obj[modified_field] = last_modified
+            yield pid, name, obj
+
+
+def _json_extract(field: str) -> str:
+    return f"json_extract(data, '$.\"{field}\"')"
+
+
+def _scope_condition(resource_name: str | None, parent_id: str) -> tuple[str, list[Any]]:
+    if "*" in parent_id:
+        conditions = ["parent_id GLOB ?"]
+        placeholders: list[Any] = [glob_pattern(parent_id)]
+    else:
+        conditions = ["parent_id = ?"]
+        placeholders = [parent_id]
+    if resource_name is not None:
+        conditions.append("resource_name = ?")
+        placeholders.append(resource_name)
+    return " AND ".join(conditions), placeholders
+
+
+def _conditions(
+    resource_name: str | None,
+    parent_id: str,
+    filters: list[Filter],
+    include_deleted: bool,
+    id_field: str,
+    modified_field: str,
+) -> tuple[str, list[Any], bool]:
+    """Return the SQL conditions that the objects matching the `filters` satisfy,
+    and whether they are exactly the filters.
+    """
+    condition, placeholders = _scope_condition(resource_name, parent_id)
+    conditions = [condition]
+    if not include_deleted:
+        conditions.append("NOT deleted")
+    exact = True
+    for f in filters:
+        filter_condition = _filter_condition(f, id_field, modified_field)
+        if filter_condition is None:
+            exact = False
+            continue
+        condition, values, filter_exact = filter_condition
+        conditions.append(condition)
+        placeholders.extend(values)
+        exact = exact and filter_exact
+    return " AND ".join(conditions), placeholders, exact
+
+
+def _pagination_condition(
+    pagination_rules: list[list[Filter]] | None, id_field: str, modified_field: str
+) -> tuple[str, list[Any]] | None:
+    if not pagination_rules:
+        return None
+    rules_conditions = []
+    placeholders: list[Any] = []
+    for rule in pagination_rules:
+        conditions = []
+        for f in rule:
+            filter_condition = _filter_condition(f, id_field, modified_field)
+            if filter_condition is not None:
+                condition, values, _ = filter_condition
+                conditions.append(condition)
+                placeholders.extend(values)
+        if not conditions:
+            # This rule cannot be evaluated, hence any object can match.
+            return None
+        rules_conditions.append(f"({' AND '.join(conditions)})")
+    return f"({' OR '.join(rules_conditions)})", placeholders
+
+
+def _filter_condition(
+    f: Filter, id_field: str, modified_field: str
+) -> tuple[str, list[Any], bool] | None:
+    """Return the SQL condition that the objects matching the filter `f`
+    satisfy, and whether it is exactly the filter (``None`` if there is none).
+    """
+    value = f.value
+    if f.field == id_field:
+        if f.operator == COMPARISON.EQ and _is_scalar(value) and not isinstance(value, float):
+            return "id = ?", [str(value)], True
+        if f.operator == COMPARISON.IN and _all(value, lambda v: isinstance(v, str)):
+            return f"id IN ({_placeholders(value)})", list(value), True
+        return None
+
+    if f.field == modified_field:
+        if f.operator in _SQL_COMPARISONS and _is_number(value):
+            return f"last_modified {_SQL_COMPARISONS[f.operator]} ?", [value], True
+        if f.operator == COMPARISON.IN and _all(value, _is_number):
+            return f"last_modified IN ({_placeholders(value)})", list(value), True
+        return None
+
+    if not INDEXABLE_FIELD.match(f.field):
+        return None
+    # Objects with a JSON ``true`` match ``1`` here, hence the filter is
+    # still applied on the selected objects.
+    if f.operator == COMPARISON.EQ and _is_scalar(value):
+        return f"{_json_extract(f.field)} = ?", [value], False
+    if f.operator == COMPARISON.IN and _all(value, _is_scalar):
+        return f"{_json_extract(f.field)} IN ({_placeholders(value)})", list(value), False
+    return None
+
+
+def _order_by(sorting: list[Sort], id_field: str, modified_field: str) -> str | None:
+    """Return the SQL ordering of `sorting`, or ``None`` if some fields
+    are data fields.
+    """
+    columns = {id_field: "id", modified_field: "last_modified"}
+    if any(sort.field not in columns for sort in sorting):
+        return None
+    return ", ".join(
+        f"{columns[sort.field]} {'DESC' if sort.direction < 0 else 'ASC'}" for sort in sorting
+    )
+
+
+def _is_number(value: Any) -> bool:
+    if isinstance(value, bool) or not isinstance(value, numbers.Real):
+        return False
+    # SQLite integers are 64 bits.
+    return not isinstance(value, int) or -(2**63) <= value < 2**63
+
+
+def _is_scalar(value: Any) -> bool:
+    return isinstance(value, str) or _is_number(value)
+
+
+def _all(values: Any, predicate) -> bool:
+    return isinstance(values, (list, tuple)) and len(values) > 0 and all(map(predicate, values))
+
+
+def _placeholders(values: list[Any]) -> str:
+    return ", ".join("?" * len(values))
+
+
+def load_from_config(config) -> Storage:
+    settings = config.get_settings()
+    readonly = asbool(settings.get("readonly", False))
+    json_indexes = aslist(settings.get("storage_json_indexes", ""))
+    client = create_from_config(config, prefix="storage_")
+    return Storage(client=client, readonly=readonly, json_indexes=json_indexes)
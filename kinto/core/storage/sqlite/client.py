@@ -0,0 +1,381 @@
+import contextlib
+import logging
+import sqlite3
+import threading
+from collections.abc import Iterator
+
+import transaction as zope_transaction
+from pyramid.exceptions import ConfigurationError
+from pyramid.settings import asbool
+
+from kinto.core.storage import exceptions
+
+
+logger = logging.getLogger(__name__)
+
+MEMORY_DATABASE = ":memory:"
+URL_SCHEME = "sqlite://"
+
+BUSY_TIMEOUT_SECONDS = 5.0
+"""Number of seconds a connection waits for the database lock to be released."""
+
+CACHED_STATEMENTS = 256
+"""Number of prepared statements kept by each connection."""
+
+
+class SQLiteClient:
+    """Hand out one connection per thread to the SQLite database at `path`.
+
+    Database files are opened in WAL mode, so that readers and the writer do
+    not block each other. Since an in-memory database only lives with its
+    connection, a single one is shared by the threads and the transactions
+    are serialized.
+
+    With `transaction_per_request`, the writes of a thread join the
+    ``transaction`` explicitly begun in this thread (e.g. the one of the
+    request, by ``pyramid_tm``), and are committed or rolled back along with
+    it.
+
+    Statements are prepared once and cached by each connection, as long as the
+    values are passed as parameters.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        timeout: float = BUSY_TIMEOUT_SECONDS,
+        transaction_per_request: bool = False,
+    ):
+        self.path = path
+        self.timeout = timeout
+        self.transaction_per_request = transaction_per_request
+        self._local = threading.local()
+        # Connections committing each block, for forced writes.
+        self._forced = threading.local()
+        self._shared: sqlite3.Connection | None = None
+        self._shared_lock = threading.RLock() if path == MEMORY_DATABASE else None
+
+    @contextlib.contextmanager
+    def connect(
+        self, readonly: bool = False, force_commit: bool = False
+    ) -> Iterator[sqlite3.Connection]:
+        """
+        Run the context within a transaction on the connection of the current
+        thread. Nested contexts join the ongoing transaction.
+
+        Unless `readonly`, a write joins the transaction begun in the thread
+        if `transaction_per_request` is enabled. The SQLite transaction then
+        lasts until this one is committed or aborted, and the following
+        contexts of the thread join it.
+
+        Otherwise, a COMMIT is performed if everything went well, or the
+        transaction is rolled back. With `force_commit`, this happens apart
+        from the ongoing transaction of the thread, on a connection of its own.
+        SQLite errors are raised as
+        :class:`kinto.core.storage.exceptions.BackendError`.
+        """
+        if force_commit:
+            with self._forced_connect() as conn:
+                yield conn
+            return
+
+        with self._shared_lock or contextlib.nullcontext():
+            ongoing = getattr(self._local, "transaction", None)
+            if ongoing is not None:
+                with _translate_errors():
+                    yield ongoing
+                return
+
+            if self.transaction_per_request and not readonly:
+                conn = self._join_begun_transaction()
+                if conn is not None:
+                    with _translate_errors():
+                        yield conn
+                    return
+
+            with self._commit_each(self._local, readonly) as conn:
+                yield conn
+
+    @contextlib.contextmanager
+    def _forced_connect(self) -> Iterator[sqlite3.Connection]:
+        if getattr(self._local, "writing", False):
+            # With a single writer at a time, it would wait for this thread.
+            raise exceptions.BackendError(
+                message="Cannot commit apart from the ongoing write transaction of the thread"
+            )
+        if self._shared_lock is not None:
+            # An in-memory database only lives with its single connection.
+            if getattr(self._local, "transaction", None) is not None:
+                raise exceptions.BackendError(
+                    message="Cannot commit apart from the ongoing transaction of the thread"
+                )
+            with self._shared_lock, self._commit_each(self._local) as conn:
+                yield conn
+            return
+
+        ongoing = getattr(self._forced, "transaction", None)
+        if ongoing is not None:
+            with _translate_errors():
+                yield ongoing
+            return
+
+        with self._commit_each(self._forced) as conn:
+            yield conn
+
+    @contextlib.contextmanager
+    def _commit_each(
+        self, local: threading.local, readonly: bool = False
+    ) -> Iterator[sqlite3.Connection]:
+        """Run the context in a transaction of the connection of `local`,
+        committed at the end of the context.
+        """
+        conn = None
+        try:
+            with _translate_errors():
+                conn = self._connection(local)
+                # Writers take the lock upfront, instead of failing to upgrade
+                # a read transaction while another thread writes.
+                conn.execute("BEGIN" if readonly else "BEGIN IMMEDIATE")
+                local.transaction = conn
+                local.writing = not readonly
+                yield conn
+                conn.execute("COMMIT")
+        except BaseException:
+            _rollback(conn)
+            raise
+        finally:
+            local.transaction = None
+            local.writing = False
+
+    def _join_begun_transaction(self) -> sqlite3.Connection | None:
+        """Begin a transaction that will be committed or rolled back along with
+        the ``transaction`` begun in the thread.
+
+        :returns: the connection, or ``None`` if there is none to join (e.g.
+            none was begun, or from the after-commit hooks of the last one).
+        """
+        synchronizer = getattr(self._local, "synchronizer", None)
+        if synchronizer is None:
+            synchronizer = self._local.synchronizer = _Synchronizer()
+            # Synchronizers are registered in the thread, and weakly referenced.
+            zope_transaction.manager.registerSynch(synchronizer)
+        begun = synchronizer.begun
+        if begun is None:
+            return None
+
+        with _translate_errors():
+            conn = self._connection(self._local)
+        data_manager = _DataManager(self, conn)
+        try:
+            begun.join(data_manager)
+        except ValueError:
+            return None
+        data_manager.begin()
+        return conn
+
+    def execute_script(self, script: str) -> None:
+        """Execute the SQL `script` (eg. schema) outside of any transaction."""
+        with self._shared_lock or contextlib.nullcontext():
+            try:
+                self._connection(self._local).executescript(script)
+            except sqlite3.Error as e:
+                logger.error(e, exc_info=True)
+                raise exceptions.BackendError(original=e) from e
+
+    def _connection(self, local: threading.local) -> sqlite3.Connection:
+        if self._shared_lock is not None:
+            if self._shared is None:
+                self._shared = self._open()
+            return self._shared
+
+        conn = getattr(local, "connection", None)
+        if conn is None:
+            conn = local.connection = self._open()
+        return conn
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.timeout,
+            # Transactions are managed explicitly.
+            isolation_level=None,
+            check_same_thread=self._shared_lock is None,
+            cached_statements=CACHED_STATEMENTS,
+        )
+        if self.path != MEMORY_DATABASE:
+            conn.execute("PRAGMA journal_mode = WAL")
+            # Durable on checkpoints, which is enough for a WAL database.
+            conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+
+class _Synchronizer:
+    """Keep track of the ``transaction`` explicitly begun in a thread, which
+    is the only one that writes may join.
+
+    The one ongoing when it is registered (i.e. on the first write of the
+    thread) is taken as begun, like the one of the request by ``pyramid_tm``.
+    """
+
+    def __init__(self):
+        self.begun = None
+
+    def newTransaction(self, txn) -> None:
+        self.begun = txn
+
+    def beforeCompletion(self, txn) -> None:
+        pass
+
+    def afterCompletion(self, txn) -> None:
+        if txn is self.begun:
+            self.begun = None
+
+
+class _DataManager:
+    """Commit or roll back the transaction of a thread connection, along with
+    the ``transaction`` it has joined.
+    """
+
+    transaction_manager = zope_transaction.manager
+
+    def __init__(self, client: SQLiteClient, conn: sqlite3.Connection):
+        self.client = client
+        self.conn = conn
+        self._began = False
+
+    def begin(self) -> None:
+        shared_lock = self.client._shared_lock
+        if shared_lock is not None:
+            # Hold the shared connection until the transaction is over.
+            shared_lock.acquire()
+        try:
+            with _translate_errors():
+                self.conn.execute("BEGIN IMMEDIATE")
+        except BaseException:
+            if shared_lock is not None:
+                shared_lock.release()
+            raise
+        self._began = True
+        self.client._local.transaction = self.conn
+        self.client._local.writing = True
+
+    def abort(self, txn) -> None:
+        self._end(commit=False)
+
+    def tpc_begin(self, txn) -> None:
+        pass
+
+    def commit(self, txn) -> None:
+        pass
+
+    def tpc_vote(self, txn) -> None:
+        # Commit when voting, so that a failure aborts the whole transaction.
+        self._end(commit=True)
+
+    def tpc_finish(self, txn) -> None:
+        pass
+
+    def tpc_abort(self, txn) -> None:
+        self._end(commit=False)
+
+    def sortKey(self) -> str:
+        return f"sqlite:{self.client.path}"
+
+    def _end(self, commit: bool) -> None:
+        if not self._began:
+            return
+        self._began = False
+        try:
+            if commit:
+                with _translate_errors():
+                    self.conn.execute("COMMIT")
+            else:
+                _rollback(self.conn)
+        except BaseException:
+            _rollback(self.conn)
+            raise
+        finally:
+            self.client._local.transaction = None
+            self.client._local.writing = False
+            if self.client._shared_lock is not None:
+                self.client._shared_lock.release()
+
+
+@contextlib.contextmanager
+def _translate_errors() -> Iterator[None]:
+    """Raise SQLite errors as backend exceptions."""
+    try:
+        yield
+    except sqlite3.IntegrityError as e:
+        logger.error(e, exc_info=True)
+        raise exceptions.IntegrityError(original=e) from e
+    except sqlite3.Error as e:
+        logger.error(e, exc_info=True)
+        raise exceptions.BackendError(original=e) from e
+
+
+def _rollback(conn: sqlite3.Connection | None) -> None:
+    if conn is None or not conn.in_transaction:
+        return
+    try:
+        conn.execute("ROLLBACK")
+    except sqlite3.Error:  # pragma: no cover
+        logger.exception("Could not rollback transaction")
+
+
+def glob_pattern(pattern: str) -> str:
+    """Turn an id `pattern` with ``*`` wildcards into a ``GLOB`` pattern,
+    where the other special characters are matched literally.
+    """
+    return pattern.replace("[", "[[]").replace("?", "[?]")
+
+
+def database_path(url: str) -> str:
+    """Return the database file path of a ``sqlite:///path/to/file.sqlite`` URL.
+
+    An empty URL, or ``sqlite:///:memory:``, designates an in-memory database.
+    """
+    if url.startswith(URL_SCHEME):
+        url = url[len(URL_SCHEME) :]
+        url = url[1:] if url.startswith("/") else url
+    return url or MEMORY_DATABASE
+
+
+# Reuse existing client if same URL.
+_CLIENTS: dict[str, SQLiteClient] = {}
+# Clients of the databases reserved to a single backend.
+_EXCLUSIVE_CLIENTS: dict[str, SQLiteClient] = {}
+
+
+def create_from_config(config, prefix: str = "", exclusive: bool = False) -> SQLiteClient:
+    """Create a SQLiteClient client using settings in the provided config.
+
+    With `exclusive`, the database cannot be shared with other backends, and
+    every block is committed on its own (e.g. for the cache, whose writes must
+    not wait for the transaction of the request).
+    """
+    settings = config.get_settings()
+    path = database_path(settings.get(prefix + "url", ""))
+    # In-memory databases are not shared between exclusive and other clients.
+    in_memory = path == MEMORY_DATABASE
+    if exclusive:
+        if path in _CLIENTS and not in_memory:
+            raise ConfigurationError(f"The SQLite database {path!r} is used by other backends.")
+        existing_client = _EXCLUSIVE_CLIENTS.get(path)
+        if existing_client is None:
+            existing_client = _EXCLUSIVE_CLIENTS[path] = SQLiteClient(path)
+        return existing_client
+
+    if path in _EXCLUSIVE_CLIENTS and not in_memory:
+        raise ConfigurationError(f"The SQLite database {path!r} is used by another backend.")
+    transaction_per_request = asbool(settings.get("transaction_per_request", False))
+    existing_client = _CLIENTS.get(path)
+    if existing_client:
+        # The backends of a same database share its connections, and thus
+        # their transactions.
+        existing_client.transaction_per_request |= transaction_per_request
+        return existing_client
+
+    client = SQLiteClient(path, transaction_per_request=transaction_per_request)
+    _CLIENTS[path] = client
+    return client
@@ -0,0 +1,33 @@
+--
+-- Actual objects
+--
+CREATE TABLE IF NOT EXISTS objects (
+    id TEXT NOT NULL,
+    parent_id TEXT NOT NULL,
+    resource_name TEXT NOT NULL,
+
+    -- Milliseconds epoch, as manipulated by the HTTP API.
+    last_modified INTEGER NOT NULL,
+
+    -- JSON, without the id and last_modified fields.
+    data TEXT NOT NULL DEFAULT '{}',
+
+    deleted INTEGER NOT NULL DEFAULT 0,
+
+    PRIMARY KEY (id, parent_id, resource_name)
+);
+CREATE INDEX IF NOT EXISTS idx_objects_parent_id_resource_name_last_modified
+    ON objects(parent_id, resource_name, last_modified);
+CREATE INDEX IF NOT EXISTS idx_objects_resource_name_parent_id_deleted
+    ON objects(resource_name, parent_id, deleted);
+-- Index for history plugin trimming.
+CREATE INDEX IF NOT EXISTS idx_objects_history_userid_and_resourcename
+    ON objects(resource_name, json_extract(data, '$."user_id"'),
+               json_extract(data, '$."resource_name"'));
+
+CREATE TABLE IF NOT EXISTS timestamps (
+    resource_name TEXT NOT NULL,
+    parent_id TEXT NOT NULL,
+    last_modified INTEGER NOT NULL,
+    PRIMARY KEY (resource_name, parent_id)
+);
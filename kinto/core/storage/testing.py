@@ -212,6 +212,42 @@ class BaseTestStorage(_StorageMixin):
         created = self.create_object(obj=obj)
         self.assertIn(self.modified_field, created)
 
+    def test_create_many_returns_the_objects_in_order(self):
+        objs = [{"name": "a"}, {"name": "b"}]
+        created = self.storage.create_many(objs=objs, **self.storage_kw)
+        self.assertEqual([o["name"] for o in created], ["a", "b"])
+        self.assertEqual(objs, [{"name": "a"}, {"name": "b"}])
+
+    def test_create_many_stores_the_objects(self):
+        created = self.storage.create_many(objs=[{"name": "a"}, {"name": "b"}], **self.storage_kw)
+        for obj in created:
+            retrieved = self.storage.get(object_id=obj["id"], **self.storage_kw)
+            self.assertEqual(retrieved, obj)
+
+    def test_create_many_assigns_increasing_timestamps(self):
+        before = self.create_object()
+        created = self.storage.create_many(objs=[{"name": "a"}, {"name": "b"}], **self.storage_kw)
+        timestamps = [before[self.modified_field]] + [o[self.modified_field] for o in created]
+        self.assertEqual(timestamps, sorted(set(timestamps)))
+        timestamp = self.storage.resource_timestamp(**self.storage_kw)
+        self.assertEqual(timestamp, created[-1][self.modified_field])
+
+    def test_create_many_does_not_overwrite_the_provided_ids(self):
+        objs = [{**self.obj, self.id_field: OBJECT_ID}, {**self.obj}]
+        created = self.storage.create_many(objs=objs, **self.storage_kw)
+        self.assertEqual(created[0][self.id_field], OBJECT_ID)
+        self.assertNotEqual(created[1][self.id_field], OBJECT_ID)
+
+    def test_create_many_raise_unicity_error_if_provided_id_exists(self):
+        self.create_object(obj={**self.obj, self.id_field: OBJECT_ID})
+        objs = [{**self.obj}, {**self.obj, self.id_field: OBJECT_ID}]
+        self.assertRaises(
+            exceptions.UnicityError, self.storage.create_many, objs=objs, **self.storage_kw
+        )
+
+    def test_create_many_with_no_objects(self):
+        self.assertEqual(self.storage.create_many(objs=[], **self.storage_kw), [])
+
     def test_get_raise_on_object_not_found(self):
         self.assertRaises(
             exceptions.ObjectNotFoundError,
@@ -326,6 +362,38 @@ class BaseTestStorage(_StorageMixin):
         self.assertEqual(objects[0], abc1)
         self.assertEqual(objects[1], abc2)
 
+    def test_list_all_by_parent_id_groups_objects_by_parent(self):
+        abc1 = self.create_object(parent_id="abc1", resource_name="c", obj={"id": "a"})
+        abc2 = self.create_object(parent_id="abc2", resource_name="c", obj={"id": "a"})
+        abc2b = self.create_object(parent_id="abc2", resource_name="c", obj={"id": "b"})
+        self.create_object(parent_id="abc3", resource_name="d", obj={"id": "a"})
+        self.create_object(parent_id="efg", resource_name="c", obj={"id": "a"})
+
+        by_parent_id = self.storage.list_all_by_parent_id(parent_id="ab*", resource_name="c")
+
+        by_parent_id["abc2"].sort(key=lambda obj: obj["id"])
+        self.assertEqual(by_parent_id, {"abc1": [abc1], "abc2": [abc2, abc2b]})
+
+    def test_list_all_by_parent_id_ignores_deleted_objects(self):
+        self.create_object(parent_id="abc1", resource_name="c", obj={"id": "a"})
+        abc2 = self.create_object(parent_id="abc2", resource_name="c", obj={"id": "a"})
+        self.storage.delete(object_id="a", parent_id="abc1", resource_name="c")
+
+        by_parent_id = self.storage.list_all_by_parent_id(parent_id="ab*", resource_name="c")
+
+        self.assertEqual(by_parent_id, {"abc2": [abc2]})
+
+    def test_list_all_by_parent_id_can_filter(self):
+        self.create_object(parent_id="abc1", resource_name="c", obj={"id": "a", "v": 1})
+        abc2 = self.create_object(parent_id="abc2", resource_name="c", obj={"id": "a", "v": 2})
+        filters = [Filter("v", 2, utils.COMPARISON.EQ)]
+
+        by_parent_id = self.storage.list_all_by_parent_id(
+            parent_id="ab*", resource_name="c", filters=filters
+        )
+
+        self.assertEqual(by_parent_id, {"abc2": [abc2]})
+
     def test_return_all_values(self):
         for x in range(10):
             obj = dict(self.obj)
@@ -1957,6 +2025,42 @@ class TrimObjectsTest(_StorageMixin):
         self.assertEqual(count, 20 - num_removed)
 
 
+class QueueTest(_StorageMixin):
+    def test_queue_entries_are_listed_oldest_first(self):
+        for i in range(5):
+            self.storage.enqueue("demo", {"num": i})
+
+        entries = self.storage.list_queue("demo", limit=3)
+        self.assertEqual([entry["num"] for entry in entries], [0, 1, 2])
+
+    def test_queues_are_isolated(self):
+        self.storage.enqueue("demo", {"num": 1})
+        self.storage.enqueue("other", {"num": 2})
+
+        (entry,) = self.storage.list_queue("other", limit=10)
+        self.assertEqual(entry["num"], 2)
+
+    def test_dequeued_entries_are_removed(self):
+        for i in range(3):
+            self.storage.enqueue("demo", {"num": i})
+        first, *_ = self.storage.list_queue("demo", limit=10)
+
+        self.storage.dequeue("demo", [first["id"]])
+
+        entries = self.storage.list_queue("demo", limit=10)
+        self.assertEqual([entry["num"] for entry in entries], [1, 2])
+
+    def test_queues_are_claimed_by_one_worker_at_a_time(self):
+        with self.storage.claim_queue("demo") as claimed:
+            self.assertTrue(claimed)
+            with self.storage.claim_queue("demo") as other:
+                self.assertFalse(other)
+            with self.storage.claim_queue("other") as other:
+                self.assertTrue(other)
+        with self.storage.claim_queue("demo") as claimed:
+            self.assertTrue(claimed)
+
+
 class DeprecatedCoreNotionsTest(_StorageMixin):
     def setUp(self):
         super().setUp()
@@ -2027,6 +2131,7 @@ class StorageTest(
     DeprecatedCoreNotionsTest,
     BaseTestStorage,
     TrimObjectsTest,
+    QueueTest,
 ):
     """Compound of all storage tests."""
 
@@ -51,6 +51,7 @@ class Request(PyramidRequest):
     validated: dict
     selected_userid: str
     authn_type: str
+    authn_policy: Any
     prefixed_userid: str | None
     prefixed_principals: list
     current_resource_name: str
@@ -41,6 +41,16 @@ try:
 except ImportError:  # pragma: no cover
     redis = None  # ty: ignore[invalid-assignment]
 
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None  # ty: ignore[invalid-assignment]
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None  # ty: ignore[invalid-assignment]
+
 
 class json:
     @staticmethod
@@ -424,13 +434,15 @@ def build_request(original, dict_obj: dict) -> Any:
     return request
 
 
-def build_response(response, request) -> dict:
+def build_response(response, request, raw_body: bool = False) -> dict:
     """
     Transform a :class:`pyramid.response.Response` object into a serializable
     dict.
 
     :param response: a response object, returned by Pyramid.
     :param request: the request that was used to get the response.
+    :param raw_body: keep JSON bodies serialized, as :class:`rapidjson.RawJSON`,
+        to embed them in another JSON document without decoding them.
     """
     dict_obj = {}
     dict_obj["path"] = unquote(request.path)
@@ -440,10 +452,13 @@ def build_response(response, request) -> dict:
     body = ""
     if request.method != "HEAD":
         # XXX : Pyramid should not have built response body for HEAD!
-        try:
-            body = response.json
-        except ValueError:
-            body = response.body
+        if raw_body and response.content_type == "application/json" and response.body:
+            body = rapidjson.RawJSON(response.body.decode("utf-8"))
+        else:
+            try:
+                body = response.json
+            except ValueError:
+                body = response.body
     dict_obj["body"] = body
 
     return dict_obj
@@ -1,21 +1,31 @@
 import logging
+import os
+import threading
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 
 import colander
+import transaction
 from pyramid import httpexceptions
+from pyramid.response import Response
 from pyramid.security import NO_PERMISSION_REQUIRED
 
 from kinto.core import Service, errors
 from kinto.core.cornice.validators import colander_validator
 from kinto.core.errors import ErrorSchema
+from kinto.core.events import EventCollector
 from kinto.core.resource.viewset import CONTENT_TYPES
-from kinto.core.utils import build_request, build_response, merge_dicts
+from kinto.core.utils import build_request, build_response, json, merge_dicts
 
 
 subrequest_logger = logging.getLogger("subrequest.summary")
 
 valid_http_method = colander.OneOf(("GET", "HEAD", "DELETE", "TRACE", "POST", "PUT", "PATCH"))
 
+# Subrequests that can run concurrently, outside the batch transaction.
+READ_ONLY_METHODS = ("GET", "HEAD")
+
 
 def string_values(node, cstruct: dict) -> None:
     """Validate that a ``colander.Mapping`` only has strings in its values.
@@ -113,7 +123,7 @@ batch = Service(name="batch", path="/batch", description="Batch operations")
     operation_id="batch",
     response_schemas=batch_responses,
 )
-def post_batch(request) -> dict | None:
+def post_batch(request) -> Response | None:
     requests = request.validated["body"]["requests"]
 
     request.log_context(batch_size=len(requests))
@@ -129,36 +139,140 @@ def post_batch(request) -> dict | None:
         request.errors.add("body", "requests", error_msg)
         return
 
-    responses = []
-
-    for subrequest_spec in requests:
-        subrequest = build_request(request, subrequest_spec)
+    subrequests = [build_request(request, subrequest_spec) for subrequest_spec in requests]
+
+    # The read-only subrequests preceding the first write can run concurrently.
+    workers = int(request.registry.settings["batch_parallel_workers"] or 0)
+    parallel = 0
+    if workers > 0:
+        while parallel < len(subrequests) and subrequests[parallel].method in READ_ONLY_METHODS:
+            parallel += 1
+    if parallel < 2:
+        parallel = 0
+
+    results = []
+    if parallel:
+        # Subrequests with the credentials of the batch are authenticated with
+        # its userid: resolve it once, before they run concurrently.
+        request.authenticated_userid
+        executor = _get_executor(request.registry, workers)
+        futures = []
+        for subrequest in subrequests[:parallel]:
+            # Gather the events of each subrequest apart, and merge them in order.
+            subrequest.bound_data = {
+                k: v for k, v in request.bound_data.items() if k != "resource_events"
+            }
+            futures.append(executor.submit(_follow_read_subrequest, request, subrequest))
+        for future in futures:
+            resp, subrequest = future.result()
+            if resp.status_code == 409:
+                # Stop the batch transaction, like the subrequests run in it.
+                request.tm.abort()
+            _merge_resource_events(request, subrequest)
+            results.append((resp, subrequest))
 
+    responses = []
+    for i, subrequest in enumerate(subrequests):
         log_context = {
             **request.log_context(),
             "path": subrequest.path,
             "method": subrequest.method,
         }
-        try:
-            # Invoke subrequest without individual transaction.
-            resp, subrequest = request.follow_subrequest(subrequest, use_tweens=False)
-        except httpexceptions.HTTPException as e:
-            # Since some request in the batch failed, we need to stop the parent request
-            # through Pyramid's transaction manager. 5XX errors are already caught by
-            # pyramid_tm's commit_veto
-            # https://github.com/Kinto/kinto/issues/624
-            if e.status_code == 409:
-                request.tm.abort()
-
-            if e.content_type == "application/json":
-                resp = e
-            else:
-                # JSONify raw Pyramid errors.
-                resp = errors.http_error(e)
+        if i < parallel:
+            resp, subrequest = results[i]
+        else:
+            resp, subrequest = _follow_subrequest(request, subrequest)
 
         subrequest_logger.info("subrequest.summary", extra=log_context)
 
-        dict_resp = build_response(resp, subrequest)
+        # Subresponses bodies are embedded as is in the batch response.
+        dict_resp = build_response(resp, subrequest, raw_body=True)
         responses.append(dict_resp)
 
-    return {"responses": responses}
+    return Response(app_iter=_serialize_responses(responses), content_type="application/json")
+
+
+def _serialize_responses(responses: list[dict]) -> Iterator[bytes]:
+    """Serialize the batch response body, one subresponse at a time.
+
+    Each subresponse is released once serialized, so that the whole body is
+    never held in memory along with the subresponses.
+    """
+    yield b'{"responses":['
+    for i in range(len(responses)):
+        separator = b"," if i > 0 else b""
+        yield separator + json.dumps(responses[i], default=_bytes_to_str).encode("utf-8")
+        responses[i] = None
+    yield b"]}"
+
+
+def _bytes_to_str(obj: Any) -> str:
+    """Non JSON subresponses bodies are sent as strings."""
+    if isinstance(obj, bytes):
+        return obj.decode("utf-8")
+    raise TypeError(f"{obj!r} is not JSON serializable")
+
+
+def _follow_subrequest(request, subrequest, in_batch_transaction: bool = True) -> tuple:
+    """Invoke the `subrequest` in the batch transaction.
+
+    :param bool in_batch_transaction: whether the subrequest runs in the
+        batch transaction, and thus may abort it.
+    :returns: the response and the request that produced it.
+    """
+    try:
+        # Invoke subrequest without individual transaction.
+        return request.follow_subrequest(subrequest, use_tweens=False)
+    except httpexceptions.HTTPException as e:
+        # Since some request in the batch failed, we need to stop the parent request
+        # through Pyramid's transaction manager. 5XX errors are already caught by
+        # pyramid_tm's commit_veto
+        # https://github.com/Kinto/kinto/issues/624
+        if e.status_code == 409 and in_batch_transaction:
+            request.tm.abort()
+
+        if e.content_type == "application/json":
+            resp = e
+        else:
+            # JSONify raw Pyramid errors.
+            resp = errors.http_error(e)
+        return resp, subrequest
+
+
+def _follow_read_subrequest(request, subrequest) -> tuple:
+    """Invoke the read-only `subrequest` in a transaction of its own (and thus
+    its own storage connection), from a thread of the pool.
+    """
+    with transaction.manager:
+        # The transaction of the batch belongs to the thread of the request.
+        return _follow_subrequest(request, subrequest, in_batch_transaction=False)
+
+
+def _merge_resource_events(request, subrequest) -> None:
+    """Add the events of a subrequest run apart to those of the batch."""
+    collected = subrequest.bound_data.get("resource_events")
+    if collected is None:
+        return
+    events = request.bound_data.get("resource_events")
+    if events is None:
+        request.bound_data["resource_events"] = events = EventCollector(
+            compact_threshold=collected.compact_threshold
+        )
+    events.merge(collected)
+
+
+_executor_lock = threading.Lock()
+
+
+def _get_executor(registry, workers: int) -> ThreadPoolExecutor:
+    """Return the pool of threads running the read-only subrequests, shared by
+    the batch requests of this process.
+    """
+    pid = os.getpid()
+    with _executor_lock:
+        # Threads do not survive forks, create the pool in each process.
+        pool = getattr(registry, "batch_executor", None)
+        if pool is None or pool[0] != pid:
+            pool = (pid, ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch"))
+            registry.batch_executor = pool
+        return pool[1]
@@ -2,11 +2,13 @@ import bcrypt
 from pyramid import authentication as base_auth
 
 from kinto.core import utils
+from kinto.core.authentication import ParentAuthenticationMixin
 from kinto.core.storage import exceptions as storage_exceptions
 
 from .utils import (
     ACCOUNT_CACHE_KEY,
     ACCOUNT_POLICY_NAME,
+    ACCOUNTS_WRITTEN_KEY,
 )
 
 
@@ -17,35 +19,59 @@ def account_check(username: str, password: str, request) -> bool | None:
     cache_ttl = int(settings.get("account_cache_ttl_seconds", 30))
     hashed_password = utils.hmac_digest(cache_key, password)
 
+    def check_password() -> str | None:
+        parent_id = username
+        try:
+            existing = request.registry.storage.get(
+                parent_id=parent_id, resource_name="account", object_id=username
+            )
+        except storage_exceptions.ObjectNotFoundError:
+            return None
+
+        hashed = existing["password"].encode(encoding="utf-8")
+        pwd_str = password.encode(encoding="utf-8")
+        # Check if password is valid (it is a very expensive computation)
+        if bcrypt.checkpw(pwd_str, hashed):
+            return hashed_password
+        return None
+
+    if ACCOUNTS_WRITTEN_KEY in request.bound_data:
+        # Accounts were written by a previous subrequest of the batch, and
+        # their cache entries are only deleted once the batch is over.
+        return True if check_password() is not None else None
+
     # Check cache to see whether somebody has recently logged in with the same
-    # username and password.
+    # username and password. Otherwise, concurrent checks for the same username
+    # are run once.
     cache = request.registry.cache
-    cache_result = cache.get(cache_key)
+    checked = []
+
+    def check_once() -> str | None:
+        checked.append(True)
+        return check_password()
+
+    cache_result = cache.get_or_compute(cache_key, check_once, ttl=cache_ttl)
 
     # Username and password have been verified previously. No need to compare hashes
     if cache_result == hashed_password:
-        # Refresh the cache TTL.
-        cache.expire(cache_key, cache_ttl)
+        if not checked:
+            # Refresh the cache TTL.
+            cache.expire(cache_key, cache_ttl)
         return True
 
-    # Back to standard procedure
-    parent_id = username
-    try:
-        existing = request.registry.storage.get(
-            parent_id=parent_id, resource_name="account", object_id=username
-        )
-    except storage_exceptions.ObjectNotFoundError:
+    if checked:
         return None
 
-    hashed = existing["password"].encode(encoding="utf-8")
-    pwd_str = password.encode(encoding="utf-8")
-    # Check if password is valid (it is a very expensive computation)
-    if bcrypt.checkpw(pwd_str, hashed):
-        cache.set(cache_key, hashed_password, ttl=cache_ttl)
-        return True
+    # Verified previously or concurrently, but with another password.
+    if check_password() is None:
+        return None
+    cache.set(cache_key, hashed_password, ttl=cache_ttl)
+    return True
 
 
-class AccountsAuthenticationPolicy(base_auth.BasicAuthAuthenticationPolicy):
+class AccountsAuthenticationPolicy(
+    ParentAuthenticationMixin, base_auth.BasicAuthAuthenticationPolicy
+):
     """Accounts authentication policy.
 
     It will check that the credentials exist in the account resource.
@@ -56,6 +82,13 @@ class AccountsAuthenticationPolicy(base_auth.BasicAuthAuthenticationPolicy):
     def __init__(self, *args, **kwargs) -> None:
         super().__init__(account_check, *args, **kwargs)
 
+    def _reuses_parent_authentication(self, request, parent) -> bool:
+        # Accounts may have been created, deleted or given another password
+        # by the previous subrequests of the batch.
+        if ACCOUNTS_WRITTEN_KEY in request.bound_data:
+            return False
+        return super()._reuses_parent_authentication(request, parent)
+
     def effective_principals(self, request) -> list:
         # Bypass default Pyramid construction of principals because
         # Pyramid multiauth already adds userid, Authenticated and Everyone
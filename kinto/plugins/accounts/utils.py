@@ -3,6 +3,8 @@ import bcrypt
 
 ACCOUNT_CACHE_KEY = "accounts:{}:verified"
 ACCOUNT_POLICY_NAME = "account"
+# Set in the data bound to a batch once one of its subrequests writes accounts.
+ACCOUNTS_WRITTEN_KEY = "accounts_written"
 
 
 def hash_password(password: str) -> str:
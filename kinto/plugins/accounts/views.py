@@ -12,7 +12,7 @@ from kinto.core.storage import KintoObject
 from kinto.core.types import Request
 from kinto.views import NameGenerator
 
-from .utils import ACCOUNT_CACHE_KEY, ACCOUNT_POLICY_NAME, hash_password
+from .utils import ACCOUNT_CACHE_KEY, ACCOUNT_POLICY_NAME, ACCOUNTS_WRITTEN_KEY, hash_password
 
 
 def _extract_posted_body_id(request: Request) -> str:
@@ -52,6 +52,9 @@ class Account(resource.Resource):
         )
         # Shortcut to check if current is anonymous (before get_parent_id()).
         context.is_anonymous = request.authenticated_userid is None
+        if request.method not in ("GET", "HEAD"):
+            # The following subrequests of a batch are authenticated again.
+            request.bound_data[ACCOUNTS_WRITTEN_KEY] = True
 
         super().__init__(request, context)
 
@@ -124,7 +127,10 @@ class Account(resource.Resource):
 
 # Clear cache on account change
 @subscriber(
-    ResourceChanged, for_resources=("account",), for_actions=(ACTIONS.UPDATE, ACTIONS.DELETE)
+    ResourceChanged,
+    for_resources=("account",),
+    for_actions=(ACTIONS.UPDATE, ACTIONS.DELETE),
+    impacted_fields=("new",),
 )
 def on_account_changed(event: ResourceChanged) -> None:
     request = event.request
@@ -134,7 +140,7 @@ def on_account_changed(event: ResourceChanged) -> None:
 
     for obj in event.impacted_objects:
         # Extract username and password from current user
-        username = obj["old"]["id"]
+        username = obj["new"]["id"]
         cache_key = utils.hmac_digest(hmac_secret, ACCOUNT_CACHE_KEY.format(username))
         # Delete cache
         cache.delete(cache_key)
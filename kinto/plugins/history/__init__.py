@@ -1,13 +1,19 @@
 from typing import Any
 
 from pyramid.config import Configurator
-from pyramid.settings import aslist
+from pyramid.settings import asbool, aslist
 
 from kinto.authorization import PERMISSIONS_INHERITANCE_TREE
 from kinto.core import metrics
-from kinto.core.events import ResourceChanged
+from kinto.core.events import ACTIONS, ResourceChanged
+from kinto.core.listeners.outbox import setup_outbox
 
-from .listener import on_resource_changed
+from .listener import (
+    compact_impacted_objects,
+    on_buckets_deleted,
+    on_resource_changed,
+    on_resources_changed,
+)
 
 
 def uri_to_dict(uri: str) -> dict[str, str]:
@@ -49,17 +55,48 @@ def includeme(config: Configurator) -> None:
         **exposed_settings,
     )
 
+    # Entries are stored with the other objects, unless a dedicated storage
+    # is configured (e.g. ``kinto.plugins.history.postgresql``).
+    config.registry.history_storage = config.registry.storage
+    if history_storage_backend := settings.get("history.storage_backend"):
+        backend = config.maybe_dotted(history_storage_backend)
+        config.registry.history_storage = backend.load_from_config(config)
+
     # Activate end-points.
     config.scan("kinto.plugins.history.views")
 
-    wrapped_listener = metrics.listener_with_timer(config, "plugins.history", on_resource_changed)
-
     # Listen to every resources (except history)
-    config.add_subscriber(
-        wrapped_listener,
-        ResourceChanged,
-        for_resources=("bucket", "group", "collection", "record"),
-    )
+    resources = ("bucket", "group", "collection", "record")
+
+    if asbool(settings.get("history.deferred", False)):
+        # Enqueue the changes in the outbox, and create the entries in bulk
+        # once committed.
+        wrapped_listener = metrics.listener_with_timer(
+            config, "plugins.history", on_resources_changed
+        )
+        outbox = setup_outbox(config)
+        outbox.add_listener("history", wrapped_listener, batch=True)
+        writer = outbox.writer("history", compact=compact_impacted_objects)
+        config.add_subscriber(
+            writer, ResourceChanged, for_resources=resources, impacted_fields=("new",)
+        )
+    else:
+        wrapped_listener = metrics.listener_with_timer(
+            config, "plugins.history", on_resource_changed
+        )
+        config.add_subscriber(
+            wrapped_listener, ResourceChanged, for_resources=resources, impacted_fields=("new",)
+        )
+
+    if config.registry.history_storage is not config.registry.storage:
+        # Entries of deleted buckets are not deleted with their other objects.
+        config.add_subscriber(
+            on_buckets_deleted,
+            ResourceChanged,
+            for_resources=("bucket",),
+            for_actions=(ACTIONS.DELETE,),
+            impacted_fields=("new",),
+        )
 
     # Register the permission inheritance for history entries.
     PERMISSIONS_INHERITANCE_TREE["history"] = {
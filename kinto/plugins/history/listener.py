@@ -1,16 +1,21 @@
 import logging
 import time
+from collections import Counter
 from datetime import datetime, timezone
 
 from pyramid.settings import asbool, aslist
 
-from kinto.core.events import ResourceChanged
+from kinto.core.events import AfterResourceChanged, ResourceChanged
 from kinto.core.storage import Filter
 from kinto.core.utils import COMPARISON, instance_uri
 
 
 logger = logging.getLogger(__name__)
 
+# Number of entries written since the last trim, by bucket, resource and user.
+TRIM_COUNTER_KEY = "history:trim:{}:{}:{}"
+TRIM_COUNTER_TTL_SECONDS = 7 * 24 * 3600
+
 
 def on_resource_changed(event: ResourceChanged) -> None:
     """
@@ -18,182 +23,285 @@ def on_resource_changed(event: ResourceChanged) -> None:
     ``history`` resource. The entries are served as read-only in the
     :mod:`kinto.plugins.history.views` module.
     """
-    payload = event.payload
-    assert payload is not None
-    resource_name = payload["resource_name"]
-    user_id = payload["user_id"]
+    write_history(event.request, [event])
 
-    storage = event.request.registry.storage
-    permission = event.request.registry.permission
-    settings = event.request.registry.settings
 
-    excluded_user_ids = aslist(settings.get("history.exclude_user_ids", ""))
-    if user_id in excluded_user_ids:
-        logger.info(f"History entries for user {user_id!r} are disabled in config")
-        return
+def on_resources_changed(events: list[AfterResourceChanged]) -> None:
+    """
+    In deferred mode, the entries of several changes are created at once, once
+    committed. Their date is the one of the changes.
+    """
+    write_history(events[0].request, events, deferred=True)
 
-    trim_history_max = int(settings.get("history.auto_trim_max_count", "-1"))
-    is_trim_enabled = trim_history_max > 0
-    trim_user_ids = aslist(settings.get("history.auto_trim_user_ids", ""))
-    is_trim_by_user_enabled = len(trim_user_ids) > 0
-    trim_history_threshold = int(settings.get("history.auto_trim_threshold", "100"))
 
-    bucket_id = None
-    bucket_uri = None
-    collection_uri = None
+def on_buckets_deleted(event: ResourceChanged) -> None:
+    """
+    When entries are stored apart from the other objects, delete those of the
+    deleted buckets.
+    """
+    history_storage = event.request.registry.history_storage
+    for change in event.impacted_objects:
+        bucket_uri = instance_uri(event.request, "bucket", id=change["new"]["id"])
+        history_storage.delete_all(
+            resource_name="history", parent_id=bucket_uri, with_deleted=False
+        )
+
 
+def compact_impacted_objects(event: ResourceChanged) -> list[dict]:
+    """In deferred mode, only the new version of the tracked objects is needed
+    to create the entries, along with the permissions of the objects, bucket
+    and collection at the time of the change.
+    """
+    targets = _history_targets(event.request, [event])
+    perms_by_object_id = _objects_permissions(event.request.registry.permission, targets)
+    return [
+        {
+            "new": impacted["new"],
+            "permissions": {
+                object_id: perms_by_object_id[object_id] for object_id in perms_objects
+            },
+        }
+        for _, perms_objects, impacted in targets
+    ]
+
+
+def _history_targets(request, events: list[ResourceChanged]) -> list[tuple]:
+    """Return the objects of the `events` to track, as
+    ``(payload, perms_objects, impacted)`` tuples, where ``perms_objects`` are
+    the URIs of the bucket, object and collection (if any).
+    """
+    settings = request.registry.settings
+    excluded_user_ids = aslist(settings.get("history.exclude_user_ids", ""))
     excluded_resources = aslist(settings.get("history.exclude_resources", ""))
 
     targets = []
-    for impacted in event.impacted_objects:
-        target = impacted["new"]
-        obj_id = target["id"]
+    for event in events:
+        payload = event.payload
+        assert payload is not None
+        resource_name = payload["resource_name"]
+        user_id = payload["user_id"]
 
-        try:
-            bucket_id = payload["bucket_id"]
-        except KeyError:
-            # e.g. DELETE /buckets
-            bucket_id = obj_id
-        bucket_uri = instance_uri(event.request, "bucket", id=bucket_id)
-
-        if bucket_uri in excluded_resources:
-            logger.info(f"History entries for bucket {bucket_uri!r} are disabled in config")
+        if user_id in excluded_user_ids:
+            logger.info(f"History entries for user {user_id!r} are disabled in config")
             continue
 
-        if "collection_id" in payload:
-            collection_id = payload["collection_id"]
-            collection_uri = instance_uri(
-                event.request, "collection", bucket_id=bucket_id, id=collection_id
-            )
-            if collection_uri in excluded_resources:
-                logger.info(
-                    f"History entries for collection {collection_uri!r} are disabled in config"
+        for impacted in event.impacted_objects:
+            target = impacted["new"]
+            obj_id = target["id"]
+
+            try:
+                bucket_id = payload["bucket_id"]
+            except KeyError:
+                # e.g. DELETE /buckets
+                bucket_id = obj_id
+            bucket_uri = instance_uri(request, "bucket", id=bucket_id)
+
+            if bucket_uri in excluded_resources:
+                logger.info(f"History entries for bucket {bucket_uri!r} are disabled in config")
+                continue
+
+            collection_uri = None
+            if "collection_id" in payload:
+                collection_id = payload["collection_id"]
+                collection_uri = instance_uri(
+                    request, "collection", bucket_id=bucket_id, id=collection_id
                 )
+                if collection_uri in excluded_resources:
+                    logger.info(
+                        f"History entries for collection {collection_uri!r} are disabled in config"
+                    )
+                    continue
+
+            # Build the resource URI from the IDs we already have, rather than
+            # parsing ``event_uri`` (which is ``request.path``). Some plugins
+            # route resource writes through sub-paths (e.g. kinto-attachment's
+            # ``patch_record()`` hits ``.../records/<id>/attachment``);
+            # parsing the request path would produce a malformed
+            # ``.../records/<id>/<id>`` URI for those entries.
+            route_params = {"id": obj_id}
+            if resource_name != "bucket":
+                route_params["bucket_id"] = bucket_id
+            if "collection_id" in payload:
+                route_params["collection_id"] = payload["collection_id"]
+            uri = instance_uri(request, resource_name, **route_params)
+
+            if uri in excluded_resources:
+                logger.info(f"History entries for record {uri!r} are disabled in config")
                 continue
 
-        # Build the resource URI from the IDs we already have, rather than
-        # parsing ``event_uri`` (which is ``request.path``). Some plugins
-        # route resource writes through sub-paths (e.g. kinto-attachment's
-        # ``patch_record()`` hits ``.../records/<id>/attachment``);
-        # parsing the request path would produce a malformed
-        # ``.../records/<id>/<id>`` URI for those entries.
-        route_params = {"id": obj_id}
-        if resource_name != "bucket":
-            route_params["bucket_id"] = bucket_id
-        if "collection_id" in payload:
-            route_params["collection_id"] = payload["collection_id"]
-        uri = instance_uri(event.request, resource_name, **route_params)
-
-        if uri in excluded_resources:
-            logger.info(f"History entries for record {uri!r} are disabled in config")
-            continue
+            perms_objects = [bucket_uri, uri] + ([collection_uri] if collection_uri else [])
+            targets.append((payload, perms_objects, impacted))
+    return targets
 
-        targets.append((uri, target))
 
+def _objects_permissions(permission, targets: list[tuple]) -> dict[str, dict[str, list[str]]]:
+    """Fetch the permissions of the objects of the `targets` all at once."""
+    all_perms_objects_ids = list({object_id for _, objs, _ in targets for object_id in objs})
+    all_permissions = permission.get_objects_permissions(all_perms_objects_ids)
+    return {
+        object_id: {k: sorted(v) for k, v in perms.items()}
+        for object_id, perms in zip(all_perms_objects_ids, all_permissions)
+    }
+
+
+def write_history(request, events: list[ResourceChanged], deferred: bool = False) -> None:
+    """Create the history entries of the specified `events`, with one insert
+    per bucket, one permissions update, and one trim per bucket and resource.
+
+    The permissions given to the entries are the ones captured along with the
+    impacted objects if any (c.f. :func:`compact_impacted_objects`), or the
+    current ones.
+    """
+    storage = request.registry.history_storage
+    permission = request.registry.permission
+    settings = request.registry.settings
+
+    targets = _history_targets(request, events)
     if not targets:
         return  # Nothing to do.
 
-    # A non-empty ``targets`` means the loop above ran and assigned ``bucket_uri``.
-    assert bucket_uri is not None
+    perms_by_object_id = {}
+    if any("permissions" not in impacted for _, _, impacted in targets):
+        perms_by_object_id = _objects_permissions(permission, targets)
 
-    # Prepare a list of object ids to be fetched from permission backend,
-    # and fetch them all at once. Use a mapping for later convenience.
-    all_perms_objects_ids = [oid for (oid, _) in targets]
-    all_perms_objects_ids.append(bucket_uri)
-    if collection_uri is not None:
-        all_perms_objects_ids.append(collection_uri)
-    all_perms_objects_ids = list(set(all_perms_objects_ids))
-    all_permissions = permission.get_objects_permissions(all_perms_objects_ids)
-    perms_by_object_id = dict(zip(all_perms_objects_ids, all_permissions))
-
-    bucket_perms = perms_by_object_id[bucket_uri]
-    collection_perms = {}
-    if collection_uri is not None:
-        collection_perms = perms_by_object_id[collection_uri]
-
-    # The principals allowed to read the bucket and collection.
-    # (Note: ``write`` means ``read``)
-    read_principals = set(bucket_perms.get("read", []))
-    read_principals.update(bucket_perms.get("write", []))
-    read_principals.update(collection_perms.get("read", []))
-    read_principals.update(collection_perms.get("write", []))
-
-    # Create a history entry for each impacted object.
-    for uri, target in targets:
+    # Prepare the history entries, grouped by bucket.
+    now = datetime.now(timezone.utc).isoformat()
+    entries_by_bucket: dict[str, list[dict]] = {}
+    # The permissions of the objects, bucket and collection of each entry.
+    objects_perms_by_bucket: dict[str, list[dict]] = {}
+    for payload, perms_objects, impacted in targets:
+        target = impacted["new"]
         obj_id = target["id"]
-        # Prepare the history entry attributes.
-        perms = {k: list(v) for k, v in perms_by_object_id[uri].items()}
+        bucket_uri, uri = perms_objects[:2]
+        if "permissions" in impacted:
+            objects_perms = impacted["permissions"]
+        else:
+            objects_perms = {
+                object_id: perms_by_object_id[object_id] for object_id in perms_objects
+            }
+        perms = {k: list(v) for k, v in objects_perms[uri].items()}
         eventattrs = dict(**payload)
-        eventattrs.pop("timestamp", None)  # Already in target `last_modified`.
+        timestamp = eventattrs.pop("timestamp", None)  # Already in target `last_modified`.
         eventattrs.pop("bucket_id", None)
-        eventattrs[f"{resource_name}_id"] = obj_id
+        eventattrs[f"{payload['resource_name']}_id"] = obj_id
         eventattrs["uri"] = uri
+        if deferred and timestamp is not None:
+            date = datetime.fromtimestamp(timestamp / 1000, timezone.utc).isoformat()
+        else:
+            date = now
         attrs = dict(
-            date=datetime.now(timezone.utc).isoformat(),
+            date=date,
             target={"data": target, "permissions": perms},
             **eventattrs,
         )
+        entries_by_bucket.setdefault(bucket_uri, []).append(attrs)
+        objects_perms_by_bucket.setdefault(bucket_uri, []).append(objects_perms)
 
-        # Create an entry for the 'history' resource, whose parent_id is
-        # the bucket URI (c.f. views.py).
-        # Note: this will be rolledback if the transaction is rolledback.
-        entry = storage.create(parent_id=bucket_uri, resource_name="history", obj=attrs)
-
-        # If enabled, we trim history by resource.
-        # This means that we will only keep the last `auto_trim_max_count` history entries
-        # for this same type of object (eg. `collection`, `record`).
-        #
-        # If trim by user is enabled, we only trim if the user matches the config
-        # and we only delete the history entries of this user.
-        # This means that if a user touches X different types of objects, we will keep
-        # ``(X * auto_trim_max_count)`` entries.
-        if is_trim_enabled and (not is_trim_by_user_enabled or user_id in trim_user_ids):
-            filters = [
-                Filter("resource_name", resource_name, COMPARISON.EQ),
-            ]
-            if is_trim_by_user_enabled:
-                filters.append(Filter("user_id", user_id, COMPARISON.EQ))
-
-            before_time = time.time()
-            history_objs_count = storage.count_all(
-                parent_id=bucket_uri,
-                resource_name="history",
-                filters=filters,
-            )
-            if history_objs_count > trim_history_max + trim_history_threshold:
-                count_deleted = storage.trim_objects(
-                    parent_id=bucket_uri,
-                    resource_name="history",
-                    filters=filters,
-                    max_objects=trim_history_max,
-                )
-                logger.info(
-                    f"Trimmed {count_deleted} old history entries, in %.3f seconds."
-                    % (time.time() - before_time)
-                )
-            else:
+    # Create the entries for the 'history' resource, whose parent_id is
+    # the bucket URI (c.f. views.py).
+    # Note: this will be rolledback if the transaction is rolledback.
+    for bucket_uri, entries in entries_by_bucket.items():
+        entries_by_bucket[bucket_uri] = storage.create_many(
+            parent_id=bucket_uri, resource_name="history", objs=entries
+        )
+
+    _trim_history(storage, request.registry.cache, settings, entries_by_bucket)
+
+    # Without explicit permissions, the ACLs on the history entries will
+    # fully depend on the inherited permission tree (eg. bucket:read, bucket:write).
+    # This basically means that if user loose the permissions on the related
+    # object, they also loose the permission on the history entry.
+    # See https://github.com/Kinto/kinto/issues/893
+    if not asbool(settings["explicit_permissions"]):
+        return
+
+    entries_perms = {}
+    for bucket_uri, entries in entries_by_bucket.items():
+        for entry, objects_perms in zip(entries, objects_perms_by_bucket[bucket_uri]):
+            # The read permission on the newly created history entry is the union
+            # of the object permissions with the one from bucket and collection.
+            # (Note: ``write`` means ``read``)
+            read_principals = set()
+            for perms in objects_perms.values():
+                read_principals.update(perms.get("read", []))
+                read_principals.update(perms.get("write", []))
+            # /buckets/{id}/history is the URI for the list of history entries.
+            entry_perm_id = f"{bucket_uri}/history/{entry['id']}"
+            entries_perms[entry_perm_id] = {"read": list(read_principals)}
+
+    # Set the permissions of every history entry at once.
+    permission.replace_objects_permissions(entries_perms)
+
+
+def _trim_history(storage, cache, settings, entries_by_bucket: dict[str, list[dict]]) -> None:
+    """
+    If enabled, we trim history by resource.
+    This means that we will only keep the last `auto_trim_max_count` history entries
+    for this same type of object (eg. `collection`, `record`).
+
+    If trim by user is enabled, we only trim if the user matches the config
+    and we only delete the history entries of this user.
+    This means that if a user touches X different types of objects, we will keep
+    ``(X * auto_trim_max_count)`` entries.
+
+    Rather than counting the entries, the number of entries written since the
+    last trim is kept in the cache, and the history is trimmed once it exceeds
+    `auto_trim_threshold`.
+    """
+    trim_history_max = int(settings.get("history.auto_trim_max_count", "-1"))
+    is_trim_enabled = trim_history_max > 0
+    trim_user_ids = aslist(settings.get("history.auto_trim_user_ids", ""))
+    is_trim_by_user_enabled = len(trim_user_ids) > 0
+    trim_history_threshold = int(settings.get("history.auto_trim_threshold", "100"))
+
+    # Number of new entries per bucket, resource (and user).
+    written: Counter[tuple[str, str, str | None]] = Counter()
+    for bucket_uri, entries in entries_by_bucket.items():
+        for entry in entries:
+            user_id = entry["user_id"]
+            if not is_trim_enabled or (is_trim_by_user_enabled and user_id not in trim_user_ids):
                 logger.info(
-                    f"No old history to trim for {user_id!r} on {resource_name!r} in {bucket_uri!r}."
+                    f"Trimming of old history entries is not enabled{f' for {user_id!r}.' if is_trim_enabled else '.'}"
                 )
-        else:
+                continue
+            group = (
+                bucket_uri,
+                entry["resource_name"],
+                user_id if is_trim_by_user_enabled else None,
+            )
+            written[group] += 1
+
+    for group, count in sorted(written.items(), key=str):
+        bucket_uri, resource_name, user_id = group
+        counter_key = TRIM_COUNTER_KEY.format(*group)
+        # Counted atomically, so that the entries of concurrent writers are not
+        # lost. Only the writer whose entries take the counter past the
+        # threshold trims the history (or past its next multiples, should a
+        # trim fail before resetting the counter).
+        pending = cache.incr(counter_key, count, ttl=TRIM_COUNTER_TTL_SECONDS)
+        period = trim_history_threshold + 1
+        if pending // period == (pending - count) // period:
             logger.info(
-                f"Trimming of old history entries is not enabled{f' for {user_id!r}.' if is_trim_enabled else '.'}"
+                f"No old history to trim for {user_id!r} on {resource_name!r} in {bucket_uri!r}."
             )
+            continue
+
+        filters = [
+            Filter("resource_name", resource_name, COMPARISON.EQ),
+        ]
+        if user_id is not None:
+            filters.append(Filter("user_id", user_id, COMPARISON.EQ))
 
-        # Without explicit permissions, the ACLs on the history entries will
-        # fully depend on the inherited permission tree (eg. bucket:read, bucket:write).
-        # This basically means that if user loose the permissions on the related
-        # object, they also loose the permission on the history entry.
-        # See https://github.com/Kinto/kinto/issues/893
-        if not asbool(settings["explicit_permissions"]):
-            return
-
-        # The read permission on the newly created history entry is the union
-        # of the object permissions with the one from bucket and collection.
-        entry_principals = set(read_principals)
-        entry_principals.update(perms.get("read", []))
-        entry_principals.update(perms.get("write", []))
-        entry_perms = {"read": list(entry_principals)}
-        # /buckets/{id}/history is the URI for the list of history entries.
-        entry_perm_id = f"/buckets/{bucket_id}/history/{entry['id']}"
-        permission.replace_object_permissions(entry_perm_id, entry_perms)
+        before_time = time.time()
+        count_deleted = storage.trim_objects(
+            parent_id=bucket_uri,
+            resource_name="history",
+            filters=filters,
+            max_objects=trim_history_max,
+        )
+        logger.info(
+            f"Trimmed {count_deleted} old history entries, in %.3f seconds."
+            % (time.time() - before_time)
+        )
+        # Keep counting the entries written concurrently meanwhile.
+        cache.incr(counter_key, -pending, ttl=TRIM_COUNTER_TTL_SECONDS)
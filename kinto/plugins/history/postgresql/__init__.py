@@ -0,0 +1,587 @@
+"""
+Storage of the history entries in a dedicated PostgreSQL table.
+
+Enable in configuration::
+
+    kinto.history.storage_backend = kinto.plugins.history.postgresql
+
+The ``history`` table is created by ``kinto migrate``, which moves the existing
+entries out of the ``objects`` table. It has typed columns for the bucket, the
+type and URI of the changed object, the user and the action, and is
+partitioned by month. The partitions of the current and next months are
+created on the first write of each month, in a transaction of their own.
+
+Rather than deleting expired entries one by one, the partitions older than
+a number of months are dropped::
+
+    kinto.history.retention_months = 12
+"""
+
+import logging
+import os
+import re
+import time
+from collections import defaultdict
+from typing import Any
+
+from pyramid.exceptions import ConfigurationError
+
+from kinto.core.storage import (
+    DEFAULT_DELETED_FIELD,
+    DEFAULT_ID_FIELD,
+    DEFAULT_MODIFIED_FIELD,
+    Filter,
+    KintoObject,
+    Sort,
+    exceptions,
+    generators,
+    postgresql,
+)
+from kinto.core.storage.postgresql import PostgreSQLPluginMigration
+from kinto.core.storage.postgresql.client import PostgreSQLClient, create_from_config
+from kinto.core.utils import COMPARISON, json
+from kinto.core.utils import sqlalchemy as sa
+
+
+logger = logging.getLogger(__name__)
+HERE = os.path.dirname(__file__)
+
+# Attributes of the entries stored in their own column.
+COLUMNS = ("resource_name", "uri", "user_id", "action")
+COLUMN_OPERATORS = {
+    COMPARISON.EQ: "=",
+    COMPARISON.NOT: "<>",
+    COMPARISON.IN: "IN",
+    COMPARISON.EXCLUDE: "NOT IN",
+}
+
+PARTITION_NAME = "history_y{:04d}m{:02d}"
+PARTITION_NAME_REGEX = re.compile(r"^history_y(\d{4})m(\d{2})$")
+# Creating or dropping partitions locks the whole table: give up quickly
+# rather than queuing up the requests behind it, and retry on next write.
+PARTITIONS_LOCK_TIMEOUT_MS = 1000
+
+
+class HistoryMigration(PostgreSQLPluginMigration):
+    name = "history"
+    schema_version = 2
+    migrations_directory = os.path.join(HERE, "migrations")
+
+
+class Storage(postgresql.Storage):
+    """Storage of the ``history`` resource in its own table.
+
+    Only the methods used by the history plugin are supported: entries are
+    created in bulk, listed, counted, trimmed, and deleted without tombstones.
+
+    :param int retention_months: number of past months whose entries are kept,
+        or ``0`` to keep them all
+    :param maintenance_client: client committing each block, used to create
+        and drop the partitions apart from the request transaction
+    """
+
+    def __init__(
+        self,
+        *args,
+        retention_months: int = 0,
+        maintenance_client: PostgreSQLClient | None = None,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.retention_months = retention_months
+        self.maintenance_client = maintenance_client or self.client
+        # Time (monotonic) of the next month of the database clock, until
+        # which the partitions created by this process are enough.
+        self._next_maintenance = 0.0
+
+    def flush(self) -> None:
+        query = """
+        DELETE FROM history;
+        DELETE FROM timestamps WHERE resource_name = 'history';
+        """
+        with self.client.connect(force_commit=True) as conn:
+            conn.execute(sa.text(query))
+        logger.debug("Flushed PostgreSQL history table")
+
+    def resource_timestamp(self, resource_name: str, parent_id: str) -> int:
+        query_existing = """
+        WITH existing_timestamps AS (
+          -- Timestamp of latest entry.
+          (
+            SELECT last_modified
+            FROM history
+            WHERE parent_id = :parent_id
+            ORDER BY last_modified DESC
+            LIMIT 1
+          )
+          -- Timestamp of empty history.
+          UNION
+          (
+            SELECT last_modified
+            FROM timestamps
+            WHERE parent_id = :parent_id
+              AND resource_name = :resource_name
+          )
+        )
+        SELECT MAX(last_modified) AS last_modified, as_epoch(MAX(last_modified)) AS last_epoch
+          FROM existing_timestamps
+        """
+
+        create_if_missing = """
+        INSERT INTO timestamps (parent_id, resource_name, last_modified)
+        VALUES (:parent_id, :resource_name, COALESCE(:last_modified, clock_timestamp()::timestamp))
+        ON CONFLICT (parent_id, resource_name) DO NOTHING
+        RETURNING as_epoch(last_modified) AS last_epoch
+        """
+
+        placeholders = dict(parent_id=parent_id, resource_name=resource_name)
+        with self.client.connect(readonly=False) as conn:
+            row = conn.execute(sa.text(query_existing), placeholders).fetchone()
+            if self.readonly:
+                if row.last_modified is None:
+                    error_msg = (
+                        "Cannot initialize empty resource timestamp when running in readonly."
+                    )
+                    raise exceptions.ReadonlyError(message=error_msg)
+                obj = row
+            else:
+                create_result = conn.execute(
+                    sa.text(create_if_missing),
+                    dict(last_modified=row.last_modified, **placeholders),
+                )
+                obj = create_result.fetchone() or row
+
+        return obj.last_epoch
+
+    def create(
+        self,
+        resource_name: str,
+        parent_id: str,
+        obj: KintoObject,
+        id_generator: generators.Generator | None = None,
+        id_field: str = DEFAULT_ID_FIELD,
+        modified_field: str = DEFAULT_MODIFIED_FIELD,
+    ) -> KintoObject:
+        (created,) = self.create_many(
+            resource_name,
+            parent_id,
+            [obj],
+            id_generator=id_generator,
+            id_field=id_field,
+            modified_field=modified_field,
+        )
+        return created
+
+    def create_many(
+        self,
+        resource_name: str,
+        parent_id: str,
+        objs: list[KintoObject],
+        id_generator: generators.Generator | None = None,
+        id_field: str = DEFAULT_ID_FIELD,
+        modified_field: str = DEFAULT_MODIFIED_FIELD,
+    ) -> list[KintoObject]:
+        if not objs:
+            return []
+
+        self._create_partitions()
+
+        id_generator = id_generator or self.id_generator
+        placeholders: dict[str, Any] = dict(parent_id=parent_id, resource_name=resource_name)
+        values = []
+        created = []
+        for i, obj in enumerate(objs):
+            obj = {**obj}
+            if id_field not in obj:
+                obj[id_field] = id_generator()
+            created.append(obj)
+
+            query_object = {**obj}
+            query_object.pop(id_field, None)
+            query_object.pop(modified_field, None)
+
+            placeholders[f"object_id_{i}"] = obj[id_field]
+            for column in COLUMNS:
+                placeholders[f"{column}_{i}"] = obj[column]
+            placeholders[f"data_{i}"] = json.dumps(query_object)
+            values.append(
+                f"({i}, :object_id_{i}, :resource_name_{i}, :uri_{i}, :user_id_{i},"
+                f" :action_{i}, (:data_{i})::JSONB)"
+            )
+
+        # Like the ``bump_timestamp()`` trigger of the ``objects`` table, entries
+        # are given increasing timestamps, after the previous ones of the bucket.
+        query = f"""
+        WITH previous AS (
+            SELECT as_epoch(MAX(last_modified)) AS epoch
+              FROM (
+                (
+                  SELECT last_modified
+                    FROM history
+                   WHERE parent_id = :parent_id
+                   ORDER BY last_modified DESC
+                   LIMIT 1
+                )
+                UNION
+                (
+                  SELECT last_modified
+                    FROM timestamps
+                   WHERE parent_id = :parent_id
+                     AND resource_name = :resource_name
+                )
+              ) AS existing_timestamps
+        )
+        INSERT INTO history (id, parent_id, resource_name, uri, user_id, action, last_modified, data)
+        SELECT entries.id, :parent_id, entries.resource_name, entries.uri, entries.user_id,
+               entries.action,
+               from_epoch(
+                   GREATEST(as_epoch(clock_timestamp()::TIMESTAMP), previous.epoch + 1)
+                   + entries.ordinal
+               ),
+               entries.data
+          FROM (VALUES {",".join(values)})
+               AS entries (ordinal, id, resource_name, uri, user_id, action, data),
+               previous
+        RETURNING id, as_epoch(last_modified) AS last_modified;
+        """
+        with self.client.connect() as conn:
+            # Serialize the writes in the bucket history, for timestamps to be unique.
+            conn.execute(
+                sa.text("SELECT pg_advisory_xact_lock(hashtext(:parent_id));"),
+                dict(parent_id=parent_id),
+            )
+            result = conn.execute(sa.text(query), placeholders)
+            inserted = {row.id: row.last_modified for row in result.fetchall()}
+
+        for obj in created:
+            obj[modified_field] = inserted[obj[id_field]]
+        return created
+
+    def list_all(
+        self,
+        resource_name: str,
+        parent_id: str,
+        filters: list[Filter] | None = None,
+        sorting: list[Sort] | None = None,
+        pagination_rules: list[list[Filter]] | None = None,
+        limit: int | None = None,
+        include_deleted: bool = False,
+        id_field: str = DEFAULT_ID_FIELD,
+        modified_field: str = DEFAULT_MODIFIED_FIELD,
+        deleted_field: str = DEFAULT_DELETED_FIELD,
+    ) -> list[KintoObject]:
+        query = """
+            SELECT id, as_epoch(last_modified) AS last_modified, data
+            FROM history
+            WHERE {parent_id_filter}
+            {conditions_filter}
+            {pagination_rules}
+            {sorting}
+            LIMIT :pagination_limit;
+        """
+        rows = self._get_rows(
+            query,
+            resource_name,
+            parent_id,
+            filters=filters,
+            sorting=sorting,
+            pagination_rules=pagination_rules,
+            limit=limit,
+            id_field=id_field,
+            modified_field=modified_field,
+        )
+
+        entries = []
+        for row in rows:
+            entry = row.data
+            entry[id_field] = row.id
+            entry[modified_field] = row.last_modified
+            entries.append(entry)
+        return entries
+
+    def count_all(
+        self,
+        resource_name: str,
+        parent_id: str,
+        filters: list[Filter] | None = None,
+        include_deleted: bool = False,
+        id_field: str = DEFAULT_ID_FIELD,
+        modified_field: str = DEFAULT_MODIFIED_FIELD,
+        deleted_field: str = DEFAULT_DELETED_FIELD,
+    ) -> int:
+        query = """
+            SELECT COUNT(*) AS total_count
+            FROM history
+            WHERE {parent_id_filter}
+            {conditions_filter}
+        """
+        rows = self._get_rows(
+            query,
+            resource_name,
+            parent_id,
+            filters=filters,
+            id_field=id_field,
+            modified_field=modified_field,
+        )
+        return rows[0].total_count
+
+    def delete_all(
+        self,
+        resource_name: str,
+        parent_id: str,
+        filters: list[Filter] | None = None,
+        sorting: list[Sort] | None = None,
+        pagination_rules: list[list[Filter]] | None = None,
+        limit: int | None = None,
+        id_field: str = DEFAULT_ID_FIELD,
+        with_deleted: bool = True,
+        modified_field: str = DEFAULT_MODIFIED_FIELD,
+        deleted_field: str = DEFAULT_DELETED_FIELD,
+    ) -> list[KintoObject]:
+        # Entries are deleted without tombstones. Instead, the timestamp of the
+        # history is bumped, for it to keep increasing.
+        query = """
+            WITH matching_entries AS (
+                SELECT id, parent_id, last_modified
+                  FROM history
+                 WHERE {parent_id_filter}
+                       {conditions_filter}
+                       {pagination_rules}
+                 {sorting}
+                 LIMIT :pagination_limit
+                 FOR UPDATE
+            )
+            DELETE
+              FROM history
+             USING matching_entries
+             WHERE history.id = matching_entries.id
+               AND history.parent_id = matching_entries.parent_id
+               AND history.last_modified = matching_entries.last_modified
+            RETURNING history.id, history.parent_id, as_epoch(history.last_modified) AS last_modified;
+        """
+        bump_timestamp = """
+            INSERT INTO timestamps (parent_id, resource_name, last_modified)
+            VALUES (:parent_id, :resource_name, clock_timestamp()::timestamp)
+            ON CONFLICT (parent_id, resource_name) DO UPDATE
+            SET last_modified = GREATEST(timestamps.last_modified, EXCLUDED.last_modified);
+        """
+        placeholders: dict[str, Any] = dict(parent_id=parent_id, resource_name=resource_name)
+        safeholders = defaultdict(str)
+        if "*" in parent_id:
+            safeholders["parent_id_filter"] = "parent_id LIKE :parent_id"
+            placeholders["parent_id"] = parent_id.replace("*", "%")
+        else:
+            safeholders["parent_id_filter"] = "parent_id = :parent_id"
+
+        if filters:
+            safe_sql, holders = self._format_conditions(filters, id_field, modified_field)
+            safeholders["conditions_filter"] = f"AND {safe_sql}"
+            placeholders.update(**holders)
+
+        if sorting:
+            sql, holders = self._format_sorting(sorting, id_field, modified_field)
+            safeholders["sorting"] = sql
+            placeholders.update(**holders)
+
+        if pagination_rules:
+            sql, holders = self._format_pagination(pagination_rules, id_field, modified_field)
+            safeholders["pagination_rules"] = f"AND ({sql})"
+            placeholders.update(**holders)
+
+        limit = min(self._max_fetch_size, limit) if limit else self._max_fetch_size
+        placeholders["pagination_limit"] = limit
+
+        with self.client.connect() as conn:
+            result = conn.execute(sa.text(query.format_map(safeholders)), placeholders)
+            deleted = result.fetchmany(self._max_fetch_size)
+            for bucket_uri in {row.parent_id for row in deleted}:
+                conn.execute(
+                    sa.text(bump_timestamp),
+                    dict(parent_id=bucket_uri, resource_name=resource_name),
+                )
+
+        return [
+            {id_field: row.id, modified_field: row.last_modified, deleted_field: True}
+            for row in deleted
+        ]
+
+    def trim_objects(
+        self,
+        resource_name: str,
+        parent_id: str,
+        filters: list,
+        max_objects: int,
+        id_field: str = DEFAULT_ID_FIELD,
+        modified_field: str = DEFAULT_MODIFIED_FIELD,
+    ) -> int:
+        query = """
+            WITH to_delete AS (
+                SELECT id, last_modified
+                FROM history
+                WHERE parent_id = :parent_id
+                  {conditions_filter}
+                ORDER BY last_modified DESC
+                OFFSET :max_objects
+            )
+            DELETE FROM history h
+            USING to_delete d
+            WHERE h.parent_id = :parent_id
+              AND h.id = d.id
+              AND h.last_modified = d.last_modified
+            RETURNING 1;
+        """
+        placeholders: dict[str, Any] = dict(parent_id=parent_id, max_objects=max_objects)
+        safe_sql, holders = self._format_conditions(filters, id_field, modified_field)
+        placeholders.update(**holders)
+        safeholders = dict(conditions_filter=f"AND {safe_sql}")
+
+        with self.client.connect() as conn:
+            result = conn.execute(sa.text(query.format_map(safeholders)), placeholders)
+            return result.rowcount
+
+    def _create_partitions(self) -> None:
+        """Create the partitions of the current and next months, and drop the
+        expired ones, on the first write of the month.
+
+        Months are those of the database clock, which timestamps the entries.
+        This is committed on its own, so that the locks on the ``history``
+        table are released right away, and retried on the next write if it
+        fails.
+        """
+        if time.monotonic() < self._next_maintenance:
+            return
+
+        try:
+            seconds_left = self._maintain_partitions()
+        except exceptions.BackendError:
+            logger.warning("Could not maintain the history partitions, will retry.")
+            return
+        self._next_maintenance = time.monotonic() + seconds_left
+
+    def _maintain_partitions(self) -> float:
+        """:returns: the number of seconds until the next month."""
+        with self.maintenance_client.connect() as conn:
+            conn.execute(sa.text(f"SET LOCAL lock_timeout = {PARTITIONS_LOCK_TIMEOUT_MS};"))
+            # Like the ``last_modified`` column of the entries.
+            clock = conn.execute(
+                sa.text("""
+                WITH clock AS (SELECT clock_timestamp()::TIMESTAMP AS ts)
+                SELECT EXTRACT(YEAR FROM ts)::INT AS year,
+                       EXTRACT(MONTH FROM ts)::INT AS month,
+                       EXTRACT(EPOCH FROM date_trunc('month', ts) + INTERVAL '1 month' - ts)
+                           AS seconds_left
+                  FROM clock;
+                """)
+            ).fetchone()
+            month = (clock.year, clock.month)
+            for start in (month, _add_months(month, 1)):
+                name = PARTITION_NAME.format(*start)
+                found = conn.execute(
+                    sa.text("SELECT to_regclass(:name) IS NOT NULL AS found;"), dict(name=name)
+                ).fetchone()
+                if found.found:
+                    continue
+                end = _add_months(start, 1)
+                # Safe strings, formatted from integers.
+                conn.execute(
+                    sa.text(
+                        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF history"
+                        f" FOR VALUES FROM ('{start[0]:04d}-{start[1]:02d}-01')"
+                        f" TO ('{end[0]:04d}-{end[1]:02d}-01');"
+                    )
+                )
+                logger.info(f"Created history partition {name!r}")
+
+            if self.retention_months > 0:
+                oldest = _add_months(month, -self.retention_months)
+                result = conn.execute(
+                    sa.text("""
+                    SELECT child.relname AS name
+                      FROM pg_inherits
+                      JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+                     WHERE pg_inherits.inhparent = 'history'::regclass;
+                    """)
+                )
+                for row in result.fetchall():
+                    match = PARTITION_NAME_REGEX.match(row.name)
+                    if match is None:
+                        continue
+                    if (int(match.group(1)), int(match.group(2))) < oldest:
+                        conn.execute(sa.text(f"DROP TABLE IF EXISTS {row.name};"))
+                        logger.info(f"Dropped expired history partition {row.name!r}")
+
+        return float(clock.seconds_left)
+
+    def _format_conditions(
+        self,
+        filters: list[Filter],
+        id_field: str,
+        modified_field: str,
+        prefix: str = "filters",
+    ) -> tuple[str, dict[str, Any]]:
+        """Use the columns of the table for the filters on the entries
+        attributes, and the ``data`` column for the others.
+        """
+        conditions = []
+        holders: dict[str, Any] = {}
+        data_filters = []
+        for i, filtr in enumerate(filters):
+            values = filtr.value
+            if filtr.operator not in (COMPARISON.IN, COMPARISON.EXCLUDE):
+                values = [values]
+            is_column = (
+                filtr.field in COLUMNS
+                and filtr.operator in COLUMN_OPERATORS
+                and all(isinstance(v, str) for v in values)
+            )
+            if not is_column:
+                data_filters.append(filtr)
+                continue
+
+            value = filtr.value
+            if filtr.operator in (COMPARISON.IN, COMPARISON.EXCLUDE):
+                # WHERE field IN ();  -- Fails with syntax error.
+                value = tuple(value) or (None,)
+            value_holder = f"{prefix}_column_{i}"
+            holders[value_holder] = value
+            conditions.append(f"{filtr.field} {COLUMN_OPERATORS[filtr.operator]} :{value_holder}")
+
+        if data_filters:
+            safe_sql, data_holders = super()._format_conditions(
+                data_filters, id_field, modified_field, prefix=prefix
+            )
+            conditions.append(safe_sql)
+            holders.update(data_holders)
+
+        return " AND ".join(conditions), holders
+
+    def _format_sorting(
+        self, sorting: list[Sort], id_field: str, modified_field: str
+    ) -> tuple[str, dict[str, Any]]:
+        safe_sql, holders = super()._format_sorting(sorting, id_field, modified_field)
+        return safe_sql.replace("objects.last_modified", "history.last_modified"), holders
+
+
+def _add_months(month: tuple[int, int], count: int) -> tuple[int, int]:
+    year, index = divmod(month[0] * 12 + month[1] - 1 + count, 12)
+    return year, index + 1
+
+
+def load_from_config(config) -> Storage:
+    settings = config.get_settings()
+    storage = config.registry.storage
+    if not isinstance(storage, postgresql.Storage):
+        raise ConfigurationError(
+            "The history PostgreSQL storage requires the PostgreSQL storage backend."
+        )
+
+    # The ``history`` table is created by ``kinto migrate``.
+    config.add_migration(HistoryMigration())
+
+    return Storage(
+        client=storage.client,
+        max_fetch_size=int(settings["storage_max_fetch_size"]),
+        readonly=settings.get("readonly", False),
+        retention_months=int(settings.get("history.retention_months", 0)),
+        maintenance_client=create_from_config(config, prefix="storage_", with_transaction=False),
+    )
@@ -0,0 +1,65 @@
+--
+-- History entries, in their own table partitioned by month.
+--
+CREATE TABLE IF NOT EXISTS history (
+    id TEXT COLLATE "C" NOT NULL,
+    -- URI of the bucket.
+    parent_id TEXT COLLATE "C" NOT NULL,
+    -- Type and URI of the changed object.
+    resource_name TEXT COLLATE "C" NOT NULL,
+    uri TEXT COLLATE "C" NOT NULL,
+    user_id TEXT COLLATE "C" NOT NULL,
+    action TEXT COLLATE "C" NOT NULL,
+    last_modified TIMESTAMP NOT NULL,
+    -- The whole entry, with the ``target`` object and its permissions.
+    data JSONB NOT NULL DEFAULT '{}'::JSONB,
+
+    PRIMARY KEY (id, parent_id, last_modified)
+) PARTITION BY RANGE (last_modified);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_history_parent_id_last_modified
+    ON history (parent_id, last_modified DESC);
+CREATE INDEX IF NOT EXISTS idx_history_parent_id_uri_last_modified
+    ON history (parent_id, uri, last_modified DESC);
+-- Index for trimming, by resource and user.
+CREATE INDEX IF NOT EXISTS idx_history_parent_id_resource_name_user_id_last_modified
+    ON history (parent_id, resource_name, user_id, last_modified DESC);
+
+--
+-- Move the existing entries, with a partition for each month.
+--
+DO $$
+DECLARE
+    month TIMESTAMP;
+BEGIN
+    FOR month IN
+        SELECT DISTINCT date_trunc('month', last_modified)
+          FROM objects
+         WHERE resource_name = 'history'
+    LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF history FOR VALUES FROM (%L) TO (%L)',
+            'history_' || to_char(month, '"y"YYYY"m"MM'),
+            month,
+            month + INTERVAL '1 month'
+        );
+    END LOOP;
+END;
+$$;
+
+INSERT INTO history (id, parent_id, resource_name, uri, user_id, action, last_modified, data)
+SELECT id,
+       parent_id,
+       data->>'resource_name',
+       data->>'uri',
+       data->>'user_id',
+       data->>'action',
+       last_modified,
+       data
+  FROM objects
+ WHERE resource_name = 'history'
+   AND NOT deleted;
+
+DELETE FROM objects WHERE resource_name = 'history';
+
+INSERT INTO metadata (name, value) VALUES ('history_schema_version', '2');
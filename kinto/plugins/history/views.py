@@ -4,6 +4,7 @@ import colander
 from pyramid.httpexceptions import HTTPForbidden
 
 from kinto.core import Service, resource, utils
+from kinto.core.resource.model import Model
 from kinto.core.resource.schema import ErrorResponseSchema
 from kinto.core.resource.viewset import ViewSet
 from kinto.core.storage import Filter, KintoObject, Sort
@@ -55,6 +56,10 @@ delete_history_arguments = {
 class History(resource.Resource):
     schema = HistorySchema
 
+    def default_model(self, storage: Any, **kwargs: Any) -> Model:
+        # Entries are read from the history storage (c.f. ``history.storage_backend``).
+        return Model(storage=self.request.registry.history_storage, **kwargs)
+
     def get_parent_id(self, request: Request) -> str:
         self.bucket_id = request.matchdict["bucket_id"]
         return instance_uri(request, "bucket", id=self.bucket_id)
@@ -155,7 +160,7 @@ def get_snapshot(request: Request) -> dict[str, list[KintoObject]]:
     # History entries store the current version. We need to pick the most recent
     # entry before the timestamp for each record_id to obtain the records' state
     # before it was changed or deleted.
-    history_entries = request.registry.storage.list_all(
+    history_entries = request.registry.history_storage.list_all(
         parent_id=bucket_uri,
         resource_name="history",
         filters=[
@@ -10,14 +10,18 @@ from zope.interface import implementer
 
 from kinto.core import logger
 from kinto.core import utils as core_utils
+from kinto.core.authentication import ParentAuthenticationMixin
 from kinto.core.openapi import OpenAPI
 from kinto.core.types import Request
 
 from .utils import fetch_openid_config
 
 
+VERIFICATION_LOCK_SECONDS = 10
+
+
 @implementer(IAuthenticationPolicy)
-class OpenIDConnectPolicy(base_auth.CallbackAuthenticationPolicy):
+class OpenIDConnectPolicy(ParentAuthenticationMixin, base_auth.CallbackAuthenticationPolicy):
     def __init__(self, issuer: str, client_id: str, realm: str = "Realm", **kwargs: Any) -> None:
         self.realm = realm
         self.issuer = issuer
@@ -51,14 +55,18 @@ class OpenIDConnectPolicy(base_auth.CallbackAuthenticationPolicy):
         cache_token = f"{self.issuer}:{self.client_id}:{self.audience}:{access_token}"
         hmac_tokens = core_utils.hmac_digest(hmac_secret, cache_token)
         cache_key = f"openid:verify:{hmac_tokens}"
-        payload = request.registry.cache.get(cache_key)
+        # Verification can take some time: concurrent requests with the same
+        # token wait for the first one instead of verifying it too.
+        payload = request.registry.cache.get_or_compute(
+            cache_key,
+            lambda: self._verify_token(access_token),
+            ttl=self.verification_ttl,
+            lock_timeout=VERIFICATION_LOCK_SECONDS,
+        )
         if payload is None:
-            # This can take some time.
-            payload = self._verify_token(access_token)
-            if payload is None:
-                return None
-        # Save for next time / refresh ttl.
-        request.registry.cache.set(cache_key, payload, ttl=self.verification_ttl)
+            return None
+        # Refresh ttl.
+        request.registry.cache.expire(cache_key, self.verification_ttl)
         request.bound_data["user_profile"] = payload
         # Extract meaningful field from userinfo (eg. email or sub)
         return payload.get(self.userid_field)
@@ -165,7 +165,7 @@ def get_token(request: Request) -> None:
     state = request.GET["state"]
 
     # State can be used only once.
-    callback = request.registry.cache.delete("openid:state:" + state)
+    callback = request.registry.cache.pop("openid:state:" + state)
     if callback is None:
         error_details = {
             "name": "state",
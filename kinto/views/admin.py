@@ -6,11 +6,13 @@ import collections
 import itertools
 
 import colander
+import transaction
 
 from kinto.authorization import RouteFactory
 from kinto.core import resource
 from kinto.core import utils as core_utils
-from kinto.core.events import ACTIONS, notify_resource_event
+from kinto.core.authorization import invalidate_principals_cache
+from kinto.core.events import ACTIONS, impacted_old_required, notify_resource_event
 from kinto.core.resource import viewset
 from kinto.core.storage import Filter
 
@@ -158,9 +160,11 @@ class UserData(resource.Resource):
                 batch = list(batch)
                 filters = [Filter("id", batch, core_utils.COMPARISON.IN)]
                 timestamp = storage.resource_timestamp(resource_name, parent_uri)
-                records = storage.list_all(
-                    resource_name=resource_name, parent_id=parent_uri, filters=filters
-                )
+                records = None
+                if impacted_old_required(self.request.registry, resource_name):
+                    records = storage.list_all(
+                        resource_name=resource_name, parent_id=parent_uri, filters=filters
+                    )
                 tombstones = storage.delete_all(
                     resource_name=resource_name, parent_id=parent_uri, filters=filters
                 )
@@ -192,4 +196,11 @@ class UserData(resource.Resource):
         for associated_principal in associated_principals:
             permission.remove_user_principal(principal, associated_principal)
 
+        # Bump the version of the cached principals once committed, so that
+        # concurrent requests cannot cache the previous ones under the new version.
+        current = transaction.get()
+        current.addAfterCommitHook(
+            lambda success: success and invalidate_principals_cache(self.request)
+        )
+
         return {"data": {"principal": principal}}
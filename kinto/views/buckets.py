@@ -1,3 +1,5 @@
+import logging
+
 import colander
 from pyramid.events import subscriber
 
@@ -7,6 +9,9 @@ from kinto.core.utils import instance_uri
 from kinto.schema_validation import JSONSchemaMapping
 
 
+logger = logging.getLogger(__name__)
+
+
 class BucketSchema(resource.ResourceSchema):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -25,14 +30,19 @@ class Bucket(resource.Resource):
         return ""
 
 
-@subscriber(ResourceChanged, for_resources=("bucket",), for_actions=(ACTIONS.DELETE,))
+@subscriber(
+    ResourceChanged,
+    for_resources=("bucket",),
+    for_actions=(ACTIONS.DELETE,),
+    impacted_fields=("new",),
+)
 def on_buckets_deleted(event):
     """Some buckets were deleted, delete sub-resources."""
     storage = event.request.registry.storage
     permission = event.request.registry.permission
 
     for change in event.impacted_objects:
-        bucket = change["old"]
+        bucket = change["new"]
         bucket_uri = instance_uri(event.request, "bucket", id=bucket["id"])
 
         # Delete everything with current parent id (eg. collections, groups)
@@ -41,5 +51,7 @@ def on_buckets_deleted(event):
             storage.delete_all(parent_id=pattern, resource_name=None, with_deleted=False)
             # Remove remaining tombstones too.
             storage.purge_deleted(parent_id=pattern, resource_name=None)
-            # Remove related permissions
-            permission.delete_object_permissions(pattern)
+
+        # Remove related permissions
+        deleted = permission.delete_object_permissions(bucket_uri, bucket_uri + "/*")
+        logger.info(f"Deleted {deleted} permissions entries of {bucket_uri!r}.")
@@ -1,3 +1,5 @@
+import logging
+
 import colander
 from pyramid.events import subscriber
 
@@ -6,6 +8,9 @@ from kinto.core.events import ACTIONS, ResourceChanged
 from kinto.schema_validation import JSONSchemaMapping, validate_from_bucket_schema_or_400
 
 
+logger = logging.getLogger(__name__)
+
+
 class CollectionSchema(resource.ResourceSchema):
     schema = JSONSchemaMapping(missing=colander.drop)
     cache_expires = colander.SchemaNode(colander.Int(), missing=colander.drop)
@@ -41,18 +46,24 @@ class Collection(resource.Resource):
         return new
 
 
-@subscriber(ResourceChanged, for_resources=("collection",), for_actions=(ACTIONS.DELETE,))
+@subscriber(
+    ResourceChanged,
+    for_resources=("collection",),
+    for_actions=(ACTIONS.DELETE,),
+    impacted_fields=("new",),
+)
 def on_collections_deleted(event):
     """Some collections were deleted, delete records."""
     storage = event.request.registry.storage
     permission = event.request.registry.permission
 
     for change in event.impacted_objects:
-        collection = change["old"]
+        collection = change["new"]
         bucket_id = event.payload["bucket_id"]
         parent_id = utils.instance_uri(
             event.request, "collection", bucket_id=bucket_id, id=collection["id"]
         )
         storage.delete_all(resource_name=None, parent_id=parent_id, with_deleted=False)
         storage.purge_deleted(resource_name=None, parent_id=parent_id)
-        permission.delete_object_permissions(parent_id + "/*")
+        deleted = permission.delete_object_permissions(parent_id + "/*")
+        logger.info(f"Deleted {deleted} permissions entries of {parent_id!r} children.")
@@ -2,7 +2,8 @@ import colander
 from pyramid.events import subscriber
 
 from kinto.core import resource, utils
-from kinto.core.events import ACTIONS, ResourceChanged
+from kinto.core.authorization import invalidate_principals_cache
+from kinto.core.events import ACTIONS, AfterResourceChanged, ResourceChanged
 from kinto.schema_validation import validate_from_bucket_schema_or_400
 
 
@@ -49,13 +50,18 @@ class Group(resource.Resource):
         return new
 
 
-@subscriber(ResourceChanged, for_resources=("group",), for_actions=(ACTIONS.DELETE,))
+@subscriber(
+    ResourceChanged,
+    for_resources=("group",),
+    for_actions=(ACTIONS.DELETE,),
+    impacted_fields=("new",),
+)
 def on_groups_deleted(event):
     """Some groups were deleted, remove them from users principals."""
     permission_backend = event.request.registry.permission
 
     for change in event.impacted_objects:
-        group = change["old"]
+        group = change["new"]
         bucket_id = event.payload["bucket_id"]
         group_uri = utils.instance_uri(event.request, "group", bucket_id=bucket_id, id=group["id"])
 
@@ -88,3 +94,9 @@ def on_groups_changed(event):
         for member in removed_members:
             # Remove the group from the member principal.
             permission_backend.remove_user_principal(member, group_uri)
+
+
+@subscriber(AfterResourceChanged, for_resources=("group",), impacted_fields=())
+def on_groups_committed(event):
+    """Groups changes were committed, invalidate the cached users principals."""
+    invalidate_principals_cache(event.request)
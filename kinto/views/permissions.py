@@ -58,6 +58,41 @@ def allowed_from_settings(settings, principals):
     return from_settings
 
 
+def _inverted_inheritance_tree(tree):
+    """Invert the permissions inheritance tree: for each resource and
+    permission, list the permissions that it grants on each resource.
+
+    Result example::
+
+        {
+            "bucket": {
+                "write": {"bucket": {"write", "read", ...}, "group": {"write", ...}},
+                ...
+            }
+        }
+    """
+    perms_descending_tree = {}
+    for on_resource, obtained_perms in tree.items():
+        for obtained_perm, obtained_from in obtained_perms.items():
+            for from_resource, perms in obtained_from.items():
+                for perm in perms:
+                    perms_descending_tree.setdefault(from_resource, {}).setdefault(
+                        perm, {}
+                    ).setdefault(on_resource, set()).add(obtained_perm)
+    return perms_descending_tree
+
+
+def _get_descending_tree(registry):
+    """Return the inverted permissions inheritance tree, computed once per
+    application (plugins can extend the tree when they are included).
+    """
+    tree = getattr(registry, "permissions_descending_tree", None)
+    if tree is None:
+        tree = _inverted_inheritance_tree(PERMISSIONS_INHERITANCE_TREE)
+        registry.permissions_descending_tree = tree
+    return tree
+
+
 class PermissionsModel:
     id_field = "id"
     modified_field = "last_modified"
@@ -65,6 +100,7 @@ class PermissionsModel:
 
     def __init__(self, request):
         self.request = request
+        self._perms_by_object_uri = None
 
     def timestamp(self, parent_id=None):
         return 0
@@ -78,38 +114,55 @@ class PermissionsModel:
         include_deleted=False,
         parent_id=None,
     ):
-        objects, _ = self._get_objects(
+        perms_by_object_uri = self._get_perms_by_object_uri()
+
+        # Entries are built from their URI, which is costly. When the list is
+        # only filtered and sorted by URI (default), we can paginate on the URIs
+        # and build the entries of the current page only.
+        rules = [f for rule in pagination_rules or [] for f in rule]
+        uri_only = all(f.field == "uri" for f in [*(filters or []), *(sorting or []), *rules])
+        if not uri_only:
+            entries = self._build_entries(perms_by_object_uri)
+            objects, _ = extract_object_set(
+                entries,
+                filters=filters,
+                sorting=sorting,
+                id_field="uri",
+                pagination_rules=pagination_rules,
+                limit=limit,
+            )
+            return objects
+
+        uris, _ = extract_object_set(
+            [{"uri": uri} for uri in perms_by_object_uri],
             filters=filters,
             sorting=sorting,
+            id_field="uri",
             pagination_rules=pagination_rules,
-            limit=limit,
-            include_deleted=include_deleted,
-            parent_id=parent_id,
         )
+        objects = []
+        for obj in uris:
+            entry = self._build_entry(obj["uri"], perms_by_object_uri[obj["uri"]])
+            if entry is None:
+                continue
+            objects.append(entry)
+            if limit and len(objects) >= limit:
+                break
         return objects
 
     def count_objects(self, filters=None, parent_id=None):
-        _, count = self._get_objects(filters=filters, parent_id=parent_id)
+        entries = self._build_entries(self._get_perms_by_object_uri())
+        _, count = extract_object_set(entries, filters=filters, sorting=None, id_field="uri")
         return count
 
-    def _get_objects(
-        self,
-        filters=None,
-        sorting=None,
-        pagination_rules=None,
-        limit=None,
-        include_deleted=False,
-        parent_id=None,
-    ):
-        # Invert the permissions inheritance tree.
-        perms_descending_tree = {}
-        for on_resource, tree in PERMISSIONS_INHERITANCE_TREE.items():
-            for obtained_perm, obtained_from in tree.items():
-                for from_resource, perms in obtained_from.items():
-                    for perm in perms:
-                        perms_descending_tree.setdefault(from_resource, {}).setdefault(
-                            perm, {}
-                        ).setdefault(on_resource, set()).add(obtained_perm)
+    def _get_perms_by_object_uri(self):
+        """Return the permissions of the current user by object URI.
+
+        They are obtained from the permission backend and from settings, and
+        are computed only once per request.
+        """
+        if self._perms_by_object_uri is not None:
+            return self._perms_by_object_uri
 
         # Obtain current principals.
         principals = self.request.prefixed_principals
@@ -123,73 +176,65 @@ class PermissionsModel:
 
         # Add additional resources and permissions defined in settings/plugins
         for root_perm in from_settings.get("root", []):
-            resource_name, _ = root_perm.split(":")
             perms_by_object_uri.setdefault("/", set()).add(root_perm)
-            perms_descending_tree.setdefault("root", {}).update({root_perm: {"root": {root_perm}}})
 
         # Expand permissions obtained from backend with the object URIs that
         # correspond to permissions allowed from settings.
         allowed_resources = {"bucket", "collection", "group"} & set(from_settings.keys())
-        if allowed_resources:
-            storage = self.request.registry.storage
-            every_bucket = storage.list_all(parent_id="", resource_name="bucket")
-            for bucket in every_bucket:
-                bucket_uri = "/buckets/{id}".format_map(bucket)
-                for res in allowed_resources:
-                    resource_perms = from_settings[res]
-                    # Bucket is always fetched.
-                    if res == "bucket":
-                        perms_by_object_uri.setdefault(bucket_uri, set()).update(resource_perms)
-                        continue
-                    # Fetch bucket collections and groups.
-                    # XXX: wrong approach: query in a loop!
-                    every_subobjects = storage.list_all(parent_id=bucket_uri, resource_name=res)
-                    for subobject in every_subobjects:
-                        subobj_uri = bucket_uri + f"/{res}s/{subobject['id']}"
-                        perms_by_object_uri.setdefault(subobj_uri, set()).update(resource_perms)
-
+        storage = self.request.registry.storage
+        for res in allowed_resources:
+            resource_perms = from_settings[res]
+            # Fetch every object of this type at once, whatever its bucket.
+            parent_id = "" if res == "bucket" else "/buckets/*"
+            every_objects = storage.list_all_by_parent_id(parent_id=parent_id, resource_name=res)
+            for parent_uri, objects in every_objects.items():
+                for obj in objects:
+                    obj_uri = f"{parent_uri}/{res}s/{obj['id']}"
+                    perms_by_object_uri.setdefault(obj_uri, set()).update(resource_perms)
+
+        self._perms_by_object_uri = perms_by_object_uri
+        return perms_by_object_uri
+
+    def _build_entries(self, perms_by_object_uri):
         entries = []
         for object_uri, perms in perms_by_object_uri.items():
-            try:
-                # Obtain associated res from object URI
-                resource_name, matchdict = core_utils.view_lookup(self.request, object_uri)
-            except ValueError:
-                # Skip permissions entries that are not linked to an object URI
-                continue
-
-            # For consistency with event payloads, if resource has an id,
-            # prefix it with its resource name
-            if "id" in matchdict:
-                matchdict[resource_name + "_id"] = matchdict["id"]
-
-            # The imaginary "root" resource gets mapped to the hello
-            # view. Handle it explicitly.
-            if resource_name == "hello":
-                resource_name = "root"
-
-            # Expand implicit permissions using descending tree.
-            permissions = set(perms)
-            for perm in perms:
-                obtained = perms_descending_tree[resource_name][perm]
-                # Related to same resource only and not every sub-objects.
-                # (e.g "bucket:write" gives "bucket:read" but not "group:read")
-                permissions |= obtained[resource_name]
-
-            entry = dict(
-                uri=object_uri,
-                resource_name=resource_name,
-                permissions=list(permissions),
-                **matchdict,
-            )
-            entries.append(entry)
-
-        return extract_object_set(
-            entries,
-            filters=filters,
-            sorting=sorting,
-            id_field="uri",
-            pagination_rules=pagination_rules,
-            limit=limit,
+            entry = self._build_entry(object_uri, perms)
+            if entry is not None:
+                entries.append(entry)
+        return entries
+
+    def _build_entry(self, object_uri, perms):
+        try:
+            # Obtain associated res from object URI
+            resource_name, matchdict = core_utils.view_lookup(self.request, object_uri)
+        except ValueError:
+            # Skip permissions entries that are not linked to an object URI
+            return None
+
+        # For consistency with event payloads, if resource has an id,
+        # prefix it with its resource name
+        if "id" in matchdict:
+            matchdict[resource_name + "_id"] = matchdict["id"]
+
+        # The imaginary "root" resource gets mapped to the hello
+        # view. Handle it explicitly.
+        if resource_name == "hello":
+            resource_name = "root"
+
+        # Expand implicit permissions using descending tree.
+        permissions = set(perms)
+        descending_tree = _get_descending_tree(self.request.registry).get(resource_name, {})
+        for perm in perms:
+            obtained = descending_tree.get(perm, {})
+            # Related to same resource only and not every sub-objects.
+            # (e.g "bucket:write" gives "bucket:read" but not "group:read")
+            permissions |= obtained.get(resource_name, set())
+
+        return dict(
+            uri=object_uri,
+            resource_name=resource_name,
+            permissions=list(permissions),
+            **matchdict,
         )
 
 
@@ -0,0 +1,83 @@
+"""Measure the time spent serving ``POST /batch`` requests.
+
+Run it from two checkouts to compare the cost of subrequests:
+
+    python scripts/benchmark_batch.py --requests 25 --rounds 200
+
+It runs a Kinto app with the in-memory backends and the accounts policy, and
+times batches of writes and reads of records, all authenticated with the
+credentials of the batch.
+"""
+
+import argparse
+import statistics
+import time
+
+import webtest
+
+from kinto import DEFAULT_SETTINGS, main
+from kinto.core.testing import get_user_headers
+
+
+def make_app():
+    settings = {
+        **DEFAULT_SETTINGS,
+        "storage_backend": "kinto.core.storage.memory",
+        "cache_backend": "kinto.core.cache.memory",
+        "permission_backend": "kinto.core.permission.memory",
+        "userid_hmac_secret": "benchmark",
+        "includes": "kinto.plugins.accounts",
+        "multiauth.policies": "account",
+        "multiauth.policy.account.use": (
+            "kinto.plugins.accounts.authentication.AccountsAuthenticationPolicy"
+        ),
+        "account_create_principals": "system.Everyone",
+        "bucket_create_principals": "system.Authenticated",
+    }
+    return webtest.TestApp(main({}, **settings))
+
+
+def timed(app, body, headers, rounds):
+    """Return the durations (in msec) of `rounds` batches of `body`."""
+    durations = []
+    for _ in range(rounds):
+        before = time.perf_counter()
+        app.post_json("/v1/batch", body, headers=headers)
+        durations.append((time.perf_counter() - before) * 1000)
+    return durations
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=25, help="Subrequests per batch")
+    parser.add_argument("--rounds", type=int, default=200, help="Batches per scenario")
+    args = parser.parse_args()
+
+    app = make_app()
+    app.put_json("/v1/accounts/benchmark", {"data": {"password": "secret"}})
+    headers = get_user_headers("benchmark")
+    app.put_json("/v1/buckets/bench", {}, headers=headers)
+    app.put_json("/v1/buckets/bench/collections/records", {}, headers=headers)
+
+    paths = [f"/buckets/bench/collections/records/records/r{i}" for i in range(args.requests)]
+    scenarios = {
+        "write": [
+            {"method": "PUT", "path": path, "body": {"data": {"title": "a" * 100, "rank": i}}}
+            for i, path in enumerate(paths)
+        ],
+        "read": [{"path": path} for path in paths],
+    }
+    # Warm up, and make sure the read scenario finds the records.
+    app.post_json("/v1/batch", {"requests": scenarios["write"]}, headers=headers)
+
+    for name, requests in scenarios.items():
+        durations = timed(app, {"requests": requests}, headers, args.rounds)
+        print(
+            f"{name:>5}: {args.requests} subrequests per batch, "
+            f"median {statistics.median(durations):.2f} ms, "
+            f"mean {statistics.mean(durations):.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main_benchmark()
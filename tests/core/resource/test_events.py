@@ -7,11 +7,16 @@ from pyramid.config import Configurator
 from kinto.core.events import (
     ACTIONS,
     AfterResourceChanged,
+    AfterResourceChangedBatch,
     AfterResourceRead,
+    EventCollector,
+    ImpactedObjects,
     ResourceChanged,
     ResourceRead,
+    impacted_old_required,
     notify_resource_event,
 )
+from kinto.core.initialization import EventActionFilter, EventImpactedFields, EventResourceFilter
 from kinto.core.storage.exceptions import BackendError
 from kinto.core.testing import skip_if_no_prometheus, skip_if_no_statsd, unittest
 from kinto.plugins import statsd
@@ -208,6 +213,43 @@ class AfterResourceChangedTest(BaseEventTest, unittest.TestCase):
         self.assertEqual(len(self.events), 0)
 
 
+class AfterResourceChangedBatchTest(BaseEventTest, unittest.TestCase):
+    subscribed = (AfterResourceChangedBatch,)
+
+    def test_changes_of_a_request_are_sent_at_once(self):
+        self.app.post_json(self.plural_url, self.body, headers=self.headers)
+
+        self.assertEqual(len(self.events), 1)
+        (event,) = self.events[0].events
+        self.assertIsInstance(event, AfterResourceChanged)
+        self.assertEqual(event.payload["action"], ACTIONS.CREATE.value)
+
+    def test_changes_of_a_batch_request_are_sent_at_once(self):
+        object_url = self.get_item_url(str(uuid.uuid4()))
+        body = {
+            "defaults": {"path": object_url},
+            "requests": [
+                {"method": "PUT", "body": {"data": {"name": "foo"}}},
+                {"method": "DELETE"},
+            ],
+        }
+        self.app.post_json("/batch", body, headers=self.headers)
+
+        self.assertEqual(len(self.events), 1)
+        actions = [e.payload["action"] for e in self.events[0].events]
+        self.assertEqual(actions, [ACTIONS.CREATE.value, ACTIONS.DELETE.value])
+
+    def test_no_batch_is_sent_without_changes(self):
+        self.app.get(self.plural_url, headers=self.headers)
+        self.assertEqual(len(self.events), 0)
+
+    def test_request_succeeds_if_notify_fails(self):
+        with notif_broken(self.app.app, AfterResourceChangedBatch):
+            self.app.post_json(self.plural_url, self.body, headers=self.headers)
+
+        self.assertEqual(len(self.events), 0)
+
+
 class AfterResourceReadTest(BaseEventTest, unittest.TestCase):
     subscribed = (AfterResourceRead,)
 
@@ -274,6 +316,86 @@ class ImpactedObjectsTest(BaseEventTest, unittest.TestCase):
         self.assertEqual(impacted_objects[0]["new"]["deleted"], True)
 
 
+class ImpactedFieldsTest(BaseEventTest, unittest.TestCase):
+    @classmethod
+    def make_app(cls, settings=None, config=None):
+        settings = cls.get_app_settings(settings)
+        config = Configurator(settings=settings)
+        config.add_subscriber(cls.listener, ResourceChanged, impacted_fields=("new",))
+        return super(BaseEventTest, cls).make_app(settings=settings, config=config)
+
+    def test_plural_delete_has_no_old_in_payload(self):
+        self.app.post_json(self.plural_url, self.body, headers=self.headers)
+        with mock.patch.object(self.app.app.registry.storage, "list_all") as list_all:
+            self.app.delete(self.plural_url, headers=self.headers, status=200)
+            self.assertFalse(list_all.called)
+
+        impacted_objects = self.events[-1].impacted_objects
+        self.assertEqual(len(impacted_objects), 1)
+        self.assertNotIn("old", impacted_objects[0])
+        self.assertEqual(impacted_objects[0]["new"]["deleted"], True)
+
+    def test_delete_still_has_old_in_payload(self):
+        resp = self.app.post_json(self.plural_url, self.body, headers=self.headers)
+        obj = resp.json["data"]
+        self.app.delete(self.get_item_url(obj["id"]), headers=self.headers)
+
+        impacted_objects = self.events[-1].impacted_objects
+        self.assertEqual(impacted_objects[0]["old"], obj)
+
+    def test_plural_delete_has_next_page_if_objects_remain(self):
+        for _ in range(3):
+            self.app.post_json(self.plural_url, self.body, headers=self.headers)
+
+        resp = self.app.delete(self.plural_url + "?_limit=2", headers=self.headers)
+        self.assertIn("Next-Page", resp.headers)
+
+        resp = self.app.delete(self.plural_url + "?_limit=1", headers=self.headers)
+        self.assertNotIn("Next-Page", resp.headers)
+
+
+class ImpactedOldRequiredTest(unittest.TestCase):
+    def setUp(self):
+        self.config = Configurator()
+        self.config.add_subscriber_predicate("for_actions", EventActionFilter)
+        self.config.add_subscriber_predicate("for_resources", EventResourceFilter)
+        self.config.add_subscriber_predicate("impacted_fields", EventImpactedFields)
+
+    def old_required(self, resource_name="mushroom"):
+        self.config.commit()
+        return impacted_old_required(self.config.registry, resource_name)
+
+    def test_old_is_not_required_without_subscribers(self):
+        self.assertFalse(self.old_required())
+
+    def test_old_is_required_if_a_subscriber_does_not_declare_fields(self):
+        self.config.add_subscriber(
+            mock.sentinel.declared, ResourceChanged, impacted_fields=("new",)
+        )
+        self.config.add_subscriber(mock.sentinel.undeclared, AfterResourceChanged)
+        self.assertTrue(self.old_required())
+
+    def test_old_is_required_if_a_subscriber_declares_it(self):
+        self.config.add_subscriber(
+            mock.sentinel.subscriber, ResourceChanged, impacted_fields=("new", "old")
+        )
+        self.assertTrue(self.old_required())
+
+    def test_old_is_not_required_by_subscribers_of_other_actions_or_resources(self):
+        self.config.add_subscriber(
+            mock.sentinel.created, ResourceChanged, for_actions=(ACTIONS.CREATE,)
+        )
+        self.config.add_subscriber(
+            mock.sentinel.others, ResourceChanged, for_resources=("bucket",)
+        )
+        self.assertFalse(self.old_required())
+        self.assertTrue(self.old_required("bucket"))
+
+    def test_subscribers_of_other_events_are_ignored(self):
+        self.config.add_subscriber(mock.sentinel.subscriber, ResourceRead)
+        self.assertFalse(self.old_required())
+
+
 class BatchEventsTest(BaseEventTest, unittest.TestCase):
     subscribed = (ResourceChanged, ResourceRead)
 
@@ -462,6 +584,103 @@ class BatchCascadeEventsTest(BaseEventTest, unittest.TestCase):
         self.assertEqual(batch_events[2].impacted_objects[0]["new"]["foo"], "42")
 
 
+class CompactImpactedObjectsTest(BaseEventTest, unittest.TestCase):
+    subscribed = (ResourceChanged, AfterResourceChanged)
+
+    @classmethod
+    def get_app_settings(cls, extras=None):
+        settings = super().get_app_settings(extras)
+        settings["resource_events_compact_threshold"] = "2"
+        return settings
+
+    def test_compacted_impacted_objects_are_notified(self):
+        created = [
+            self.app.post_json(self.plural_url, self.body, headers=self.headers).json["data"]
+            for _ in range(3)
+        ]
+        del self.events[:]
+
+        self.app.delete(self.plural_url, headers=self.headers)
+
+        for event in self.events:
+            impacted_objects = event.impacted_objects
+            self.assertEqual(len(impacted_objects), 3)
+            old_objects = sorted((i["old"] for i in impacted_objects), key=lambda o: o["id"])
+            self.assertEqual(old_objects, sorted(created, key=lambda o: o["id"]))
+
+
+class EventCollectorTest(unittest.TestCase):
+    def setUp(self):
+        self.collector = EventCollector()
+        self.request = mock.sentinel.request
+
+    def add(self, resource_name, action, impacted, parent_id="/buckets/bid"):
+        self.collector.add_event(resource_name, parent_id, action, {}, impacted, self.request)
+
+    def test_events_are_drained_in_order(self):
+        self.add("record", ACTIONS.CREATE, [1])
+        self.add("collection", ACTIONS.UPDATE, [2])
+        drained = [(e[1], e[3], e[5]) for e in self.collector.drain()]
+        self.assertEqual(
+            drained, [("record", ACTIONS.CREATE, [1]), ("collection", ACTIONS.UPDATE, [2])]
+        )
+        self.assertEqual(list(self.collector.drain()), [])
+
+    def test_impacted_objects_of_similar_events_are_merged(self):
+        self.add("record", ACTIONS.CREATE, [1])
+        self.add("record", ACTIONS.CREATE, [2, 3])
+        self.add("record", ACTIONS.CREATE, [4], parent_id="/buckets/other")
+        drained = [e[5] for e in self.collector.drain()]
+        self.assertEqual(drained, [[1, 2, 3], [4]])
+
+    def test_events_added_while_draining_are_drained_but_not_merged(self):
+        self.add("record", ACTIONS.CREATE, [1])
+        drained = []
+        for event in self.collector.drain():
+            drained.append(event[5])
+            if len(drained) == 1:
+                self.add("record", ACTIONS.CREATE, [2])
+        self.assertEqual(drained, [[1], [2]])
+
+    def test_events_of_other_collectors_can_be_merged(self):
+        self.add("record", ACTIONS.READ, [1])
+        other = EventCollector()
+        other.add_event("record", "/buckets/bid", ACTIONS.READ, {}, [2], self.request)
+        other.add_event("collection", "/buckets/bid", ACTIONS.READ, {}, [3], self.request)
+        self.collector.merge(other)
+        drained = [(e[1], e[5]) for e in self.collector.drain()]
+        self.assertEqual(drained, [("record", [1, 2]), ("collection", [3])])
+
+    def test_rewind_merges_events_of_every_cascade_level(self):
+        self.add("record", ACTIONS.CREATE, [1])
+        drain = self.collector.drain()
+        next(drain)
+        self.add("record", ACTIONS.CREATE, [2])
+        self.add("record", ACTIONS.DELETE, [3])
+        list(drain)
+
+        self.collector.rewind()
+
+        drained = [(e[0], e[3], e[5]) for e in self.collector.drain()]
+        self.assertEqual(drained, [(1, ACTIONS.CREATE, [1, 2]), (1, ACTIONS.DELETE, [3])])
+
+    def test_impacted_objects_are_compacted_above_threshold(self):
+        impacted = ImpactedObjects([{"new": {"id": "a"}}], compact_threshold=2)
+        self.assertEqual(impacted.chunks, [])
+        impacted.extend([{"new": {"id": "b"}}, {"new": {"id": "c"}}])
+        self.assertEqual(len(impacted.chunks), 1)
+        self.assertEqual(impacted.objects, [])
+        impacted.extend([{"new": {"id": "d"}}])
+        self.assertEqual([i["new"]["id"] for i in impacted.to_list()], ["a", "b", "c", "d"])
+
+    def test_compacted_impacted_objects_are_merged_in_order(self):
+        impacted = ImpactedObjects([{"new": {"id": "a"}}], compact_threshold=2)
+        other = ImpactedObjects([{"new": {"id": "b"}}, {"new": {"id": "c"}}], compact_threshold=2)
+        other.extend([{"new": {"id": "d"}}])
+        impacted.extend(other)
+        self.assertEqual([i["new"]["id"] for i in impacted.to_list()], ["a", "b", "c", "d"])
+
+
 class DeprecatedAttributes(unittest.TestCase):
     def setUp(self):
         patch = mock.patch("warnings.warn")
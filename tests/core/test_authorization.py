@@ -337,6 +337,7 @@ class GuestAuthorizationPolicyTest(unittest.TestCase):
 class GroupFinderTest(unittest.TestCase):
     def setUp(self):
         self.request = DummyRequest(method="GET")
+        self.request.bound_data = {}
 
     def test_uses_prefixed_as_userid(self):
         self.request.prefixed_userid = "basic:bob"
@@ -347,3 +348,25 @@ class GroupFinderTest(unittest.TestCase):
         self.request.prefixed_userid = None
         groupfinder("bob", self.request)
         self.request.registry.permission.get_user_principals.assert_called_with("bob")
+
+    def test_does_not_use_cache_by_default(self):
+        groupfinder("bob", self.request)
+        self.assertFalse(self.request.registry.cache.get.called)
+
+    def test_principals_are_read_from_cache_if_enabled(self):
+        self.request.registry.settings["principals_cache_ttl_seconds"] = 30
+        self.request.registry.cache.get.side_effect = ["abc", ["group:a"]]
+        principals = groupfinder("bob", self.request)
+        self.assertEqual(principals, {"group:a"})
+        self.request.registry.cache.get.assert_called_with("principals:abc:basicauth:bob")
+        self.assertFalse(self.request.registry.permission.get_user_principals.called)
+
+    def test_principals_are_stored_in_cache_on_miss(self):
+        self.request.registry.settings["principals_cache_ttl_seconds"] = 30
+        self.request.registry.cache.get.side_effect = ["abc", None]
+        self.request.registry.permission.get_user_principals.return_value = {"group:a"}
+        principals = groupfinder("bob", self.request)
+        self.assertEqual(principals, {"group:a"})
+        self.request.registry.cache.set.assert_called_with(
+            "principals:abc:basicauth:bob", ["group:a"], ttl=30
+        )
@@ -1,3 +1,4 @@
+import sqlite3
 import time
 import unittest
 from typing import cast
@@ -5,12 +6,16 @@ from unittest import mock
 
 import pytest
 from pyramid.config import Configurator
+from pyramid.exceptions import ConfigurationError
 
 from kinto.core.cache import CacheBase
+from kinto.core.cache import codec as codec_module
 from kinto.core.cache import memcached as memcached_backend
 from kinto.core.cache import memory as memory_backend
 from kinto.core.cache import postgresql as postgresql_backend
 from kinto.core.cache import redis as redis_backend
+from kinto.core.cache import sqlite as sqlite_backend
+from kinto.core.cache import tiered as tiered_backend
 from kinto.core.cache.testing import CacheTest
 from kinto.core.testing import skip_if_no_memcached, skip_if_no_postgresql, skip_if_no_redis
 from kinto.core.utils import memcache, redis, sqlalchemy
@@ -34,6 +39,75 @@ class CacheBaseTest(unittest.TestCase):
             self.assertRaises(NotImplementedError, callable_, *args)
 
 
+class CacheCodecTest(unittest.TestCase):
+    value = {"name": "\u00e9t\u00e9", "items": [1, 2.5, True, None], "nested": {"a": "b" * 2000}}
+
+    def test_json_values_are_encoded_without_header(self):
+        codec = codec_module.CacheCodec()
+        encoded = codec.encode({"a": 1})
+        self.assertEqual(encoded, b'{"a":1}')
+        self.assertEqual(codec.decode(encoded), {"a": 1})
+
+    def test_values_without_header_are_decoded_as_json(self):
+        codec = codec_module.CacheCodec(format="msgpack", compression="zlib")
+        self.assertEqual(codec.decode(b'"toto"'), "toto")
+        self.assertEqual(codec.decode('{"value": 1, "ttl": 2}'), {"value": 1, "ttl": 2})
+
+    def test_values_roundtrip_with_every_format_and_compression(self):
+        for format in ("json", "msgpack"):
+            for compression in ("", "zlib"):
+                codec = codec_module.CacheCodec(format=format, compression=compression)
+                self.assertEqual(codec.decode(codec.encode(self.value)), self.value)
+
+    def test_values_are_compressed_above_threshold_only(self):
+        codec = codec_module.CacheCodec(compression="zlib", compression_threshold=100)
+        small = codec.encode("toto")
+        large = codec.encode(self.value)
+        self.assertEqual(small, b'"toto"')
+        self.assertEqual(large[0], codec_module.FORMAT_JSON | codec_module.COMPRESSION_ZLIB)
+        self.assertLess(len(large), 200)
+
+    def test_msgpack_values_are_smaller_than_json(self):
+        codec = codec_module.CacheCodec(format="msgpack")
+        encoded = codec.encode({"items": list(range(100))})
+        self.assertEqual(encoded[0], codec_module.FORMAT_MSGPACK)
+        self.assertLess(len(encoded), len(codec_module.json.dumps({"items": list(range(100))})))
+
+    def test_values_are_decoded_whatever_the_codec_settings(self):
+        writer = codec_module.CacheCodec(
+            format="msgpack", compression="zlib", compression_threshold=0
+        )
+        reader = codec_module.CacheCodec()
+        self.assertEqual(reader.decode(writer.encode(self.value)), self.value)
+
+    def test_unknown_format_or_compression_raise_configuration_error(self):
+        with self.assertRaises(ConfigurationError):
+            codec_module.CacheCodec(format="pickle")
+        with self.assertRaises(ConfigurationError):
+            codec_module.CacheCodec(compression="lzma")
+
+    def test_missing_optional_dependencies_raise_configuration_error(self):
+        with mock.patch.object(codec_module, "msgpack", None):
+            with self.assertRaises(ConfigurationError):
+                codec_module.CacheCodec(format="msgpack")
+        with mock.patch.object(codec_module, "zstandard", None):
+            with self.assertRaises(ConfigurationError):
+                codec_module.CacheCodec(compression="zstd")
+
+    def test_codec_is_created_from_settings(self):
+        config = Configurator(
+            settings={
+                "cache_codec": "msgpack",
+                "cache_codec_compression": "zlib",
+                "cache_codec_compression_threshold_bytes": "10",
+            }
+        )
+        codec = codec_module.create_from_config(config, prefix="cache_")
+        self.assertEqual(codec.format, codec_module.FORMAT_MSGPACK)
+        self.assertEqual(codec.compression, codec_module.COMPRESSION_ZLIB)
+        self.assertEqual(codec.compression_threshold, 10)
+
+
 class MemoryCacheTest(CacheTest, unittest.TestCase):
     backend = memory_backend
     settings = {"cache_prefix": "", "cache_max_size_bytes": 7000}
@@ -43,6 +117,7 @@ class MemoryCacheTest(CacheTest, unittest.TestCase):
 
         # Share the store between both client for tests.
         backend_prefix._ttl = self.cache._ttl
+        backend_prefix._expirations = self.cache._expirations
         backend_prefix._store = self.cache._store
 
         return backend_prefix
@@ -56,6 +131,17 @@ class MemoryCacheTest(CacheTest, unittest.TestCase):
     def test_ping_logs_error_if_unavailable(self):
         pass
 
+    def test_lock_cannot_be_acquired_twice(self):
+        # Locks are granted to any process, which has its own memory.
+        self.assertTrue(self.cache.acquire_lock("foobar", 10))
+        self.assertTrue(self.cache.acquire_lock("foobar", 10))
+
+    def test_lock_can_be_acquired_once_expired(self):
+        pass
+
+    def test_lock_is_not_released_by_a_previous_owner(self):
+        pass
+
     def test_clean_expired_expires_items(self):
         self.cache.set("foobar", "toto", 0.01)
         assert "foobar" in self.cache._store
@@ -80,6 +166,33 @@ class MemoryCacheTest(CacheTest, unittest.TestCase):
         assert self.cache.get("foo000") is None
         assert self.cache.get("foobar") == "tata"
 
+    def test_expire_supersedes_previous_expiration(self):
+        self.cache.set("foobar", "toto", 0.01)
+        self.cache.expire("foobar", 42)
+        time.sleep(0.02)
+        assert self.cache.get("foobar") == "toto"
+
+    def test_superseded_expirations_are_compacted(self):
+        for _ in range(1000):
+            self.cache.set("foobar", "toto", 42)
+        assert len(self.cache._expirations) <= 2 * len(self.cache._ttl) + 64
+
+    def test_overwriting_a_key_does_not_count_it_twice_in_quota(self):
+        self.cache.set("foobar", "toto", 42)
+        self.cache.set("foobar", "tata", 42)
+        assert self.cache._quota == 70
+        self.cache.delete("foobar")
+        self.cache.delete("foobar")
+        assert self.cache._quota == 0
+
+    def test_oversized_items_are_cleaned_by_order_of_last_write(self):
+        for x in range(100):
+            self.cache.set("foo{0:03d}".format(x), "toto", 42)
+        self.cache.set("foo000", "toto", 42)
+        self.cache.set("foobar", "tata", 42)
+        assert self.cache.get("foo000") == "toto"
+        assert self.cache.get("foo001") is None
+
     def test_size_quota_can_be_set_to_zero(self):
         before = self.cache.max_size_bytes
         self.cache.max_size_bytes = 0
@@ -88,6 +201,113 @@ class MemoryCacheTest(CacheTest, unittest.TestCase):
         assert self.cache.get("foobar") == "tata"
 
 
+class SQLiteCacheTest(CacheTest, unittest.TestCase):
+    backend = sqlite_backend
+    settings = {"cache_prefix": "", "cache_url": "sqlite:///:memory:"}
+
+    def setUp(self):
+        super().setUp()
+        self.client_error_patcher = mock.patch.object(
+            self.cache.client,
+            "_connection",
+            side_effect=sqlite3.OperationalError("disk I/O error"),
+        )
+
+    def test_expired_entries_are_purged_on_write(self):
+        self.cache.set("foobar", "toto", 0.01)
+        time.sleep(0.02)
+        self.cache.set("other", "tata", 42)
+        with self.cache.client.connect(readonly=True) as conn:
+            keys = conn.execute("SELECT key FROM cache;").fetchall()
+        self.assertEqual(keys, [("other",)])
+
+
+class TieredCacheTest(CacheTest, unittest.TestCase):
+    backend = tiered_backend
+    settings = {
+        "cache_prefix": "",
+        "cache_tiered_backend": "kinto.core.cache.sqlite",
+        "cache_url": "sqlite:///:memory:",
+    }
+
+    def setUp(self):
+        super().setUp()
+        self.client_error_patcher = mock.patch.object(
+            self.cache.remote.client,
+            "_connection",
+            side_effect=sqlite3.OperationalError("disk I/O error"),
+        )
+
+    def test_remote_backend_setting_is_required(self):
+        settings = {**self.settings}
+        settings.pop("cache_tiered_backend")
+        with self.assertRaises(ConfigurationError):
+            self.backend.load_from_config(self._get_config(settings=settings))
+
+    def test_local_hits_do_not_reach_the_remote(self):
+        self.cache.set("foobar", "toto", 42)
+        self.cache.get("foobar")
+        with mock.patch.object(self.cache.remote, "get") as remote_get:
+            self.assertEqual(self.cache.get("foobar"), "toto")
+        remote_get.assert_not_called()
+
+    def test_local_entries_expire_after_local_ttl(self):
+        self.cache.local_ttl = 0.01
+        self.cache.set("foobar", "toto", 42)
+        self.cache.get("foobar")
+        time.sleep(0.02)
+        with mock.patch.object(self.cache.remote, "get", return_value="tata"):
+            self.assertEqual(self.cache.get("foobar"), "tata")
+
+    def test_least_recently_used_entries_are_evicted(self):
+        self.cache.local_max_entries = 2
+        for key in ("a", "b", "c"):
+            self.cache.set(key, key, 42)
+        self.cache.get("a")
+        self.cache.get("b")
+        self.cache.get("a")
+        self.cache.get("c")
+        self.assertEqual(list(self.cache._local.keys()), ["a", "c"])
+
+    def test_writes_do_not_invalidate_local_copy_if_disabled(self):
+        self.cache.invalidate = False
+        self.cache.set("foobar", "toto", 42)
+        self.cache.get("foobar")
+        self.cache.set("foobar", "tata", 42)
+        self.assertEqual(self.cache.get("foobar"), "toto")
+
+    def test_values_read_before_an_invalidation_are_not_kept(self):
+        self.cache.set("foobar", "toto", 42)
+
+        def concurrent_write(key):
+            self.cache.set(key, "tata", 42)
+            return "toto"
+
+        with mock.patch.object(self.cache.remote, "get", side_effect=concurrent_write):
+            self.cache.get("foobar")
+        self.assertEqual(self.cache.get("foobar"), "tata")
+
+    def test_get_many_only_fetches_local_misses_from_the_remote(self):
+        self.cache.set_many({"foo": "toto", "bar": "tata"}, 42)
+        self.cache.get("foo")
+        with mock.patch.object(
+            self.cache.remote, "get_many", return_value={"bar": "tata"}
+        ) as remote_get_many:
+            values = self.cache.get_many(["foo", "bar"])
+        remote_get_many.assert_called_with(["bar"])
+        self.assertEqual(values, {"foo": "toto", "bar": "tata"})
+        self.assertEqual(list(self.cache._local.keys()), ["foo", "bar"])
+
+    def test_hits_and_misses_are_counted_per_tier(self):
+        metrics_backend = mock.Mock()
+        self.cache.set_metrics_backend(metrics_backend)
+        self.cache.set("foobar", "toto", 42)
+        self.cache.get("foobar")
+        self.cache.get("foobar")
+        counted = [c.kwargs["key"] for c in metrics_backend.count.call_args_list]
+        self.assertEqual(counted, ["cache_local_misses", "cache_hits", "cache_local_hits"])
+
+
 @pytest.mark.xdist_group("memcached")
 @skip_if_no_memcached
 class MemcachedCacheTest(CacheTest, unittest.TestCase):
@@ -113,6 +333,18 @@ class MemcachedCacheTest(CacheTest, unittest.TestCase):
         retrieved = self.cache.get("foobar")
         self.assertIsNone(retrieved)
 
+    def test_lock_can_be_acquired_once_expired(self):
+        self.assertIsNotNone(self.cache.acquire_lock("foobar", 1))
+        time.sleep(1.1)
+        self.assertIsNotNone(self.cache.acquire_lock("foobar", 10))
+
+    def test_lock_is_not_released_by_a_previous_owner(self):
+        token = self.cache.acquire_lock("foobar", 1)
+        time.sleep(1.1)
+        self.assertIsNotNone(self.cache.acquire_lock("foobar", 10))
+        self.cache.release_lock("foobar", token)
+        self.assertIsNone(self.cache.acquire_lock("foobar", 10))
+
 
 @pytest.mark.xdist_group("redis")
 @skip_if_no_redis
@@ -139,6 +371,13 @@ class RedisCacheTest(CacheTest, unittest.TestCase):
         retrieved = self.cache.get("foobar")
         self.assertIsNone(retrieved)
 
+    def test_values_are_stored_with_the_codec(self):
+        self.cache.codec = codec_module.CacheCodec(format="msgpack")
+        self.cache.set("foobar", {"a": [1, 2]}, 42)
+        stored = self.cache._client.get("foobar")
+        self.assertEqual(stored[0], codec_module.FORMAT_MSGPACK)
+        self.assertEqual(self.cache.get("foobar"), {"a": [1, 2]})
+
     def test_pool_options(self):
         config = Configurator(
             settings={
@@ -171,3 +410,46 @@ class PostgreSQLCacheTest(CacheTest, unittest.TestCase):
             "session_factory",
             side_effect=sqlalchemy.exc.SQLAlchemyError,  # ty: ignore[possibly-missing-submodule]
         )
+
+    def test_get_does_not_delete_expired_entries(self):
+        self.cache.set("foobar", "toto", 0.01)
+        time.sleep(0.02)
+        self.assertIsNone(self.cache.get("foobar"))
+        with self.cache.client.connect(readonly=True) as conn:
+            result = conn.execute(sqlalchemy.text("SELECT key FROM cache;"))
+            self.assertEqual(result.rowcount, 1)
+
+    def test_purge_expired_deletes_entries_by_batches(self):
+        self.cache.purge_batch_size = 2
+        for x in range(5):
+            self.cache.set(f"expired{x}", "toto", 0.01)
+        self.cache.set("foobar", "tata", 42)
+        time.sleep(0.02)
+        self.assertEqual(self.cache.purge_expired(), 5)
+        self.assertEqual(self.cache.get("foobar"), "tata")
+
+    def test_purge_runs_in_background_after_interval(self):
+        self.cache._next_purge = 0
+        with mock.patch.object(self.cache, "purge_expired") as purge_expired:
+            self.cache.set("foobar", "toto", 42)
+            self.cache.set("foobar", "toto", 42)
+            time.sleep(0.1)
+        purge_expired.assert_called_once_with()
+
+    def test_purge_can_be_disabled(self):
+        self.cache.purge_interval = 0
+        self.cache._next_purge = 0
+        with mock.patch.object(self.cache, "purge_expired") as purge_expired:
+            self.cache.set("foobar", "toto", 42)
+            time.sleep(0.1)
+        purge_expired.assert_not_called()
+
+    def test_cache_table_can_be_made_unlogged(self):
+        self.cache.unlogged = True
+        self.cache.initialize_schema()
+        query = "SELECT relpersistence FROM pg_class WHERE oid = 'cache'::regclass;"
+        with self.cache.client.connect(readonly=True) as conn:
+            persistence = conn.execute(sqlalchemy.text(query)).fetchone().relpersistence
+        self.assertEqual(persistence, "u")
+        with self.cache.client.connect(force_commit=True) as conn:
+            conn.execute(sqlalchemy.text("ALTER TABLE cache SET LOGGED;"))
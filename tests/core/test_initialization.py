@@ -471,6 +471,16 @@ class MetricsConfigurationTest(unittest.TestCase):
             labels=[("method", "get"), ("endpoint", "heartbeat")],
         )
 
+    def test_statsd_observe_size_of_streamed_responses(self):
+        kinto.core.initialize(self.config, "0.0.1", "settings_prefix")
+        app = webtest.TestApp(self.config.make_wsgi_app())
+        resp = app.post_json("/v0/batch", {"requests": [{"path": "/"}]})
+        self.mocked().observe.assert_any_call(
+            "request_size",
+            len(resp.body),
+            labels=[("method", "post"), ("endpoint", "batch")],
+        )
+
     def test_statsd_observe_request_duration(self):
         kinto.core.initialize(self.config, "0.0.1", "settings_prefix")
         app = webtest.TestApp(self.config.make_wsgi_app())
@@ -1,12 +1,23 @@
 import os
+import threading
 import uuid
 from unittest import mock
 
+import transaction
 from pyramid import testing
 
-from kinto.core import initialization
-from kinto.core.events import ACTIONS, ResourceChanged, ResourceRead
-from kinto.core.listeners import ListenerBase
+from kinto.core import initialization, metrics
+from kinto.core.cache import memory as memory_cache
+from kinto.core.events import (
+    ACTIONS,
+    AfterResourceChanged,
+    AfterResourceChangedBatch,
+    ResourceChanged,
+    ResourceRead,
+    impacted_old_required,
+)
+from kinto.core.listeners import ListenerBase, get_impacted_fields, has_batch_processing
+from kinto.core.storage import memory as memory_storage
 from kinto.core.testing import unittest
 
 
@@ -198,8 +209,330 @@ class ListenerSetupTest(unittest.TestCase):
         self.assertFalse(self.demo_mocked.return_value.called)
 
 
+class BatchListener(ListenerBase):
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, event):
+        raise AssertionError("Should receive batches only")
+
+    def process_batch(self, events):
+        self.batches.append(events)
+
+
+class BatchListenerSetupTest(unittest.TestCase):
+    def setUp(self):
+        demo_patch = mock.patch("tests.core.listeners.load_from_config")
+        self.addCleanup(demo_patch.stop)
+        self.listener = BatchListener()
+        demo_patch.start().return_value = self.listener
+
+    def make_app(self, extra_settings={}):
+        settings = {"event_listeners": "demo", "event_listeners.demo.use": "tests.core.listeners"}
+        settings.update(**extra_settings)
+        config = testing.setUp(settings=settings)
+        initialization.setup_metrics(config)
+        config.commit()
+        initialization.setup_listeners(config)
+        return config
+
+    def notify_batch(self, config, *payloads):
+        events = [AfterResourceChanged(payload, [], Request()) for payload in payloads]
+        config.registry.notify(AfterResourceChangedBatch(events, Request()))
+
+    def test_changes_of_a_request_are_passed_at_once(self):
+        config = self.make_app()
+        self.notify_batch(
+            config, {"action": ACTIONS.CREATE.value}, {"action": ACTIONS.DELETE.value}
+        )
+        (batch,) = self.listener.batches
+        self.assertEqual([e.payload["action"] for e in batch], ["create", "delete"])
+
+    def test_changes_are_not_passed_one_by_one(self):
+        config = self.make_app()
+        config.registry.notify(ResourceChanged({"action": ACTIONS.CREATE.value}, [], Request()))
+        self.assertEqual(self.listener.batches, [])
+
+    def test_batch_is_filtered_by_action(self):
+        config = self.make_app({"event_listeners.demo.actions": "delete"})
+        self.notify_batch(
+            config, {"action": ACTIONS.CREATE.value}, {"action": ACTIONS.DELETE.value}
+        )
+        (batch,) = self.listener.batches
+        self.assertEqual([e.payload["action"] for e in batch], ["delete"])
+
+    def test_batch_is_filtered_by_resource(self):
+        config = self.make_app({"event_listeners.demo.resources": "toad"})
+        self.notify_batch(config, {"action": ACTIONS.CREATE.value, "resource_name": "mushroom"})
+        self.assertEqual(self.listener.batches, [])
+
+    def test_batch_is_timed_by_metrics(self):
+        config = self.make_app()
+        metrics_service = mock.MagicMock()
+        config.registry.registerUtility(metrics_service, metrics.IMetricsService)
+        self.notify_batch(config, {"action": ACTIONS.CREATE.value})
+        metrics_service.timer.assert_called_with("listeners.demo.seconds")
+
+
+class NewFieldsListener(ListenerBase):
+    impacted_fields = ("new",)
+
+    def __init__(self):
+        self.events = []
+
+    def __call__(self, event):
+        self.events.append(event)
+
+
+class ImpactedFieldsListenerSetupTest(unittest.TestCase):
+    def setUp(self):
+        demo_patch = mock.patch("tests.core.listeners.load_from_config")
+        self.addCleanup(demo_patch.stop)
+        self.listener = NewFieldsListener()
+        self.demo_mocked = demo_patch.start()
+        self.demo_mocked.return_value = self.listener
+
+    def make_app(self, extra_settings={}):
+        settings = {"event_listeners": "demo", "event_listeners.demo.use": "tests.core.listeners"}
+        settings.update(**extra_settings)
+        config = testing.setUp(settings=settings)
+        config.registry.storage = memory_storage.Storage()
+        initialization.setup_metrics(config)
+        config.commit()
+        initialization.setup_listeners(config)
+        config.commit()
+        return config
+
+    def test_old_objects_are_not_required_by_the_listener(self):
+        config = self.make_app()
+        self.assertFalse(impacted_old_required(config.registry, "mushroom"))
+
+    def test_old_objects_are_required_by_undeclared_listeners(self):
+        self.demo_mocked.return_value = mock.MagicMock()
+        config = self.make_app()
+        self.assertTrue(impacted_old_required(config.registry, "mushroom"))
+
+    def test_listener_receives_events(self):
+        config = self.make_app()
+        config.registry.notify(ResourceChanged({"action": ACTIONS.DELETE.value}, [], Request()))
+        self.assertEqual(len(self.listener.events), 1)
+
+    def test_impacted_objects_are_reduced_to_fields_in_outbox(self):
+        config = self.make_app({"event_listeners.demo.async": "true"})
+        impacted = [{"new": {"id": "abc"}, "old": {"id": "abc", "big": "payload"}}]
+        config.registry.notify(ResourceChanged({"action": "delete"}, impacted, Request()))
+        (entry,) = config.registry.storage.list_queue("demo", limit=10)
+        self.assertEqual(entry["impacted_objects"], [{"new": {"id": "abc"}}])
+
+
+class BaseAsyncListenerTest(unittest.TestCase):
+    listener_factory = mock.MagicMock
+
+    def setUp(self):
+        demo_patch = mock.patch("tests.core.listeners.load_from_config")
+        self.addCleanup(demo_patch.stop)
+        self.listener = self.listener_factory()
+        demo_patch.start().return_value = self.listener
+
+        settings = {
+            "event_listeners": "demo",
+            "event_listeners.demo.use": "tests.core.listeners",
+            "event_listeners.demo.async": "true",
+            "event_listeners_async_workers": 0,
+            "event_listeners_async_max_retries": 3,
+            "event_listeners_async_poll_interval_seconds": 0,
+        }
+        self.config = testing.setUp(settings=settings)
+        self.config.registry.storage = memory_storage.Storage()
+        self.config.registry.cache = memory_cache.Cache(cache_prefix="", cache_max_size_bytes=1000)
+        initialization.setup_metrics(self.config)
+        self.config.commit()
+        initialization.setup_listeners(self.config)
+        self.outbox = self.config.registry.outbox
+
+    def notify(self, action=ACTIONS.CREATE, resource_name="mushroom"):
+        payload = {"action": action.value, "resource_name": resource_name}
+        impacted = [{"new": {"id": "abc", "last_modified": 42}}]
+        event = ResourceChanged(payload, impacted, Request())
+        self.config.registry.notify(event)
+
+    def pending(self):
+        return self.config.registry.storage.list_queue("demo", limit=100)
+
+
+class AsyncListenerTest(BaseAsyncListenerTest):
+    def test_events_are_written_in_outbox_instead_of_delivered(self):
+        self.notify()
+        self.assertFalse(self.listener.called)
+        self.assertEqual(len(self.pending()), 1)
+
+    def test_impacted_objects_can_be_compacted_in_outbox(self):
+        writer = self.outbox.writer(
+            "demo", compact=lambda event: [{"id": i["new"]["id"]} for i in event.impacted_objects]
+        )
+        writer(ResourceChanged({"action": "create"}, [{"new": {"id": "abc"}}], Request()))
+        entries = self.pending()
+        self.assertEqual(entries[-1]["impacted_objects"], [{"id": "abc"}])
+
+    def test_filtered_events_are_not_written_in_outbox(self):
+        self.notify(action=ACTIONS.READ)
+        self.assertEqual(len(self.pending()), 0)
+
+    def test_pending_events_are_delivered_in_order_and_removed(self):
+        self.notify(resource_name="a")
+        self.notify(resource_name="b")
+
+        self.assertEqual(self.outbox.run_once(), 2)
+
+        events = [call[0][0] for call in self.listener.call_args_list]
+        self.assertIsInstance(events[0], AfterResourceChanged)
+        self.assertEqual([e.payload["resource_name"] for e in events], ["a", "b"])
+        self.assertEqual(events[0].impacted_objects, [{"new": {"id": "abc", "last_modified": 42}}])
+        self.assertEqual(events[0].request.registry, self.config.registry)
+        self.assertEqual(len(self.pending()), 0)
+
+    def test_batch_size_limits_events_delivered_at_once(self):
+        self.outbox.batch_size = 1
+        self.notify()
+        self.notify()
+
+        self.assertEqual(self.outbox.run_once(), 1)
+        self.assertEqual(len(self.pending()), 1)
+
+    def test_failed_event_is_kept_and_stops_the_batch(self):
+        self.listener.side_effect = [ValueError, None, None]
+        self.notify(resource_name="a")
+        self.notify(resource_name="b")
+
+        self.assertEqual(self.outbox.run_once(), 0)
+        self.assertEqual(len(self.pending()), 2)
+
+        self.assertEqual(self.outbox.run_once(), 2)
+        events = [call[0][0] for call in self.listener.call_args_list]
+        self.assertEqual([e.payload["resource_name"] for e in events], ["a", "a", "b"])
+
+    def test_failed_event_is_not_retried_before_backoff_delay(self):
+        self.outbox.poll_interval = 60
+        self.listener.side_effect = ValueError
+        self.notify()
+
+        self.outbox.run_once()
+        self.outbox.run_once()
+
+        self.assertEqual(self.listener.call_count, 1)
+
+    def test_failed_event_is_dropped_after_max_retries(self):
+        self.listener.side_effect = ValueError
+        self.notify()
+
+        for _ in range(3):
+            self.outbox.run_once()
+
+        self.assertEqual(self.listener.call_count, 3)
+        self.assertEqual(len(self.pending()), 0)
+
+    def test_queue_claimed_by_another_worker_is_skipped(self):
+        self.notify()
+        with self.config.registry.storage.claim_queue("demo"):
+            self.assertEqual(self.outbox.run_once(), 0)
+        self.assertFalse(self.listener.called)
+        self.assertEqual(self.outbox.run_once(), 1)
+
+    def test_workers_are_woken_after_commit(self):
+        with mock.patch.object(self.outbox, "wake") as wake:
+            with transaction.manager:
+                self.notify()
+                self.assertFalse(wake.called)
+            self.assertTrue(wake.called)
+
+    def test_workers_are_not_woken_after_abort(self):
+        with mock.patch.object(self.outbox, "wake") as wake:
+            txn = transaction.begin()
+            self.notify()
+            txn.abort()
+            self.assertFalse(wake.called)
+
+    def test_workers_deliver_events_in_background(self):
+        self.outbox.workers = 1
+        self.addCleanup(self.outbox.stop)
+        delivered = threading.Event()
+        self.listener.side_effect = lambda event: delivered.set()
+
+        with transaction.manager:
+            self.notify()
+
+        self.assertTrue(delivered.wait(timeout=5))
+
+    def test_run_once_returns_when_queues_are_empty(self):
+        self.notify()
+        self.outbox.run(once=True)
+        self.assertEqual(self.listener.call_count, 1)
+
+
+class AsyncBatchListenerTest(BaseAsyncListenerTest):
+    listener_factory = BatchListener
+
+    def test_pending_events_are_delivered_at_once(self):
+        self.notify(resource_name="a")
+        self.notify(resource_name="b")
+
+        self.assertEqual(self.outbox.run_once(), 2)
+
+        (batch,) = self.listener.batches
+        self.assertEqual([e.payload["resource_name"] for e in batch], ["a", "b"])
+        self.assertEqual(len(self.pending()), 0)
+
+    def test_incomplete_batch_waits_for_batch_window(self):
+        self.outbox.batch_window = 60
+        self.notify()
+
+        self.assertEqual(self.outbox.run_once(), 0)
+        self.assertEqual(self.listener.batches, [])
+
+    def test_complete_batch_is_delivered_within_batch_window(self):
+        self.outbox.batch_window = 60
+        self.outbox.batch_size = 2
+        self.notify()
+        self.notify()
+        self.notify()
+
+        self.assertEqual(self.outbox.run_once(), 2)
+        self.assertEqual(len(self.pending()), 1)
+
+    def test_failed_batch_is_retried_as_a_whole(self):
+        calls = []
+
+        def process_batch(events):
+            calls.append(len(events))
+            if len(calls) == 1:
+                raise ValueError
+
+        self.outbox.add_listener("demo", process_batch, batch=True)
+        self.notify()
+        self.notify()
+
+        self.assertEqual(self.outbox.run_once(), 0)
+        self.assertEqual(self.outbox.run_once(), 2)
+        self.assertEqual(calls, [2, 2])
+
+
 class ListenerBaseTest(unittest.TestCase):
     def test_not_implemented(self):
         # make sure we can't use the base listener
         listener = ListenerBase()
         self.assertRaises(NotImplementedError, listener, object())
+
+    def test_process_batch_calls_listener_with_each_event(self):
+        listener = mock.MagicMock(spec=ListenerBase)
+        ListenerBase.process_batch(listener, [1, 2])
+        listener.assert_has_calls([mock.call(1), mock.call(2)])
+
+    def test_batch_processing_is_detected_if_overridden(self):
+        self.assertFalse(has_batch_processing(ListenerBase()))
+        self.assertFalse(has_batch_processing(mock.MagicMock()))
+        self.assertTrue(has_batch_processing(BatchListener()))
+
+    def test_impacted_fields_are_read_from_listener_class(self):
+        self.assertIsNone(get_impacted_fields(ListenerBase()))
+        self.assertIsNone(get_impacted_fields(mock.MagicMock()))
+        self.assertEqual(get_impacted_fields(NewFieldsListener()), ("new",))
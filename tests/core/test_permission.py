@@ -1,3 +1,4 @@
+import sqlite3
 import unittest
 from unittest import mock
 
@@ -6,6 +7,7 @@ import pytest
 from kinto.core.permission import PermissionBase
 from kinto.core.permission import memory as memory_backend
 from kinto.core.permission import postgresql as postgresql_backend
+from kinto.core.permission import sqlite as sqlite_backend
 from kinto.core.permission.testing import PermissionTest
 from kinto.core.testing import skip_if_no_postgresql
 from kinto.core.utils import sqlalchemy
@@ -28,6 +30,7 @@ class PermissionBaseTest(unittest.TestCase):
             (self.permission.get_object_permission_principals, "", ""),
             (self.permission.get_objects_permissions, ""),
             (self.permission.replace_object_permissions, "", {}),
+            (self.permission.replace_objects_permissions, {"": {}}),
             (self.permission.delete_object_permissions, ""),
             (self.permission.get_accessible_objects, [], ""),
             (self.permission.get_authorized_principals, []),
@@ -48,6 +51,50 @@ class MemoryPermissionTest(PermissionTest, unittest.TestCase):
     def test_ping_logs_error_if_unavailable(self):
         pass
 
+    def test_indexes_are_cleaned_when_aces_are_removed(self):
+        self.permission.add_principal_to_ace("/url1", "read", "user1")
+        self.permission.add_principal_to_ace("/url2", "write", "user1")
+        self.permission.remove_principal_from_ace("/url1", "read", "user1")
+        self.permission.delete_object_permissions("/url2")
+        self.assertEqual(self.permission._aces, {})
+        self.assertEqual(self.permission._principal_aces, {})
+        self.assertEqual(self.permission._object_ids, [])
+
+    def test_accessible_objects_scans_prefix_when_smaller(self):
+        for i in range(10):
+            self.permission.add_principal_to_ace(f"/buckets/b{i}", "read", "user1")
+        self.permission.add_principal_to_ace("/other/b1", "read", "user1")
+        objects = self.permission.get_accessible_objects(
+            ["user1"], [("/other/*", "read")], with_children=False
+        )
+        self.assertEqual(objects, {"/other/b1": {"read"}})
+
+
+class SQLitePermissionTest(PermissionTest, unittest.TestCase):
+    backend = sqlite_backend
+    settings = {"permission_url": "sqlite:///:memory:"}
+
+    def setUp(self):
+        super().setUp()
+        self.client_error_patcher = [
+            mock.patch.object(
+                self.permission.client,
+                "_connection",
+                side_effect=sqlite3.OperationalError("disk I/O error"),
+            )
+        ]
+
+    def test_wildcards_only_match_in_patterns(self):
+        self.permission.add_principal_to_ace("/buckets/a?c", "read", "user1")
+        self.permission.add_principal_to_ace("/buckets/abc", "read", "user1")
+        self.permission.add_principal_to_ace("/buckets/a[b]c", "read", "user1")
+
+        deleted = self.permission.delete_object_permissions("/buckets/a?*")
+
+        self.assertEqual(deleted, 1)
+        objects = self.permission.get_accessible_objects(["user1"], [("/buckets/a[*", "read")])
+        self.assertEqual(objects, {"/buckets/a[b]c": {"read"}})
+
 
 @pytest.mark.xdist_group("postgres")
 @skip_if_no_postgresql
@@ -68,3 +115,15 @@ class PostgreSQLPermissionTest(PermissionTest, unittest.TestCase):
                 side_effect=sqlalchemy.exc.SQLAlchemyError,  # ty: ignore[possibly-missing-submodule]
             )
         ]
+
+    def test_subtree_permissions_are_deleted_with_a_range(self):
+        for i in range(5):
+            self.permission.add_principal_to_ace(f"/url/a/id/{i}", "read", "user1")
+        self.permission.add_principal_to_ace("/url/b/id/1", "read", "user1")
+
+        deleted = self.permission.delete_object_permissions("/url/a/*")
+
+        self.assertEqual(deleted, 5)
+        self.assertEqual(
+            self.permission.get_object_permissions("/url/b/id/1"), {"read": {"user1"}}
+        )
@@ -0,0 +1,154 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from kinto.core.permission.memory import Permission
+from kinto.core.persistence import Journal
+from kinto.core.storage import Filter, memory
+from kinto.core.utils import COMPARISON
+
+
+class JournalTest(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.path = tmp_dir.name
+        self.state = []
+        self.journal = self.open_journal()
+
+    def open_journal(self, **kwargs):
+        journal = Journal(self.path, dump_state=lambda: list(self.state), **kwargs)
+        self.addCleanup(journal.close)
+        return journal
+
+    def load(self, journal):
+        restored = []
+        replayed = []
+        journal.load(restore_state=restored.extend, replay=replayed.append)
+        return restored, replayed
+
+    def test_entries_are_replayed_on_load(self):
+        self.load(self.journal)
+        self.journal.append(["a", 1])
+        self.journal.append(["b", 2])
+        self.journal.close()
+
+        restored, replayed = self.load(self.open_journal())
+        self.assertEqual(restored, [])
+        self.assertEqual(replayed, [["a", 1], ["b", 2]])
+
+    def test_snapshot_is_restored_and_covered_journal_removed(self):
+        self.load(self.journal)
+        self.journal.append(["a", 1])
+        self.state = [{"a": 1}]
+        self.journal.snapshot()
+        self.journal.append(["b", 2])
+        self.journal.close()
+
+        restored, replayed = self.load(self.open_journal())
+        self.assertEqual(restored, [{"a": 1}])
+        self.assertEqual(replayed, [["b", 2]])
+        self.assertEqual(sorted(os.listdir(self.path))[0], "journal-00000001.jsonl")
+
+    def test_truncated_last_entry_is_ignored(self):
+        self.load(self.journal)
+        self.journal.append(["a", 1])
+        self.journal.close()
+        with open(os.path.join(self.path, "journal-00000000.jsonl"), "ab") as f:
+            f.write(b'["b", ')
+
+        _, replayed = self.load(self.open_journal())
+        self.assertEqual(replayed, [["a", 1]])
+
+    def test_snapshot_is_taken_in_background_after_interval(self):
+        journal = self.open_journal(snapshot_interval=2)
+        self.load(journal)
+        with mock.patch("kinto.core.persistence.threading.Thread") as mocked:
+            journal.append(["a", 1])
+            self.assertFalse(mocked.called)
+            journal.append(["b", 2])
+        mocked.assert_called_with(target=journal.snapshot, daemon=True)
+
+
+class PersistedMemoryStorageTest(unittest.TestCase):
+    storage_kw = {"resource_name": "test", "parent_id": "/abc"}
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.path = tmp_dir.name
+
+    def open_storage(self):
+        storage = memory.Storage(persistence_path=self.path)
+        self.addCleanup(storage._journal.close)
+        return storage
+
+    def assert_same_state(self, storage, restored):
+        for include_deleted in (False, True):
+            self.assertEqual(
+                storage.list_all(include_deleted=include_deleted, **self.storage_kw),
+                restored.list_all(include_deleted=include_deleted, **self.storage_kw),
+            )
+        self.assertEqual(
+            storage.all_resources_timestamps("test"), restored.all_resources_timestamps("test")
+        )
+
+    def populate(self, storage):
+        kept = storage.create(obj={"a": 1}, **self.storage_kw)
+        updated = storage.create(obj={"a": 2}, **self.storage_kw)
+        storage.update(object_id=updated["id"], obj={"a": 3}, **self.storage_kw)
+        deleted = storage.create(obj={"a": 4}, **self.storage_kw)
+        storage.delete(object_id=deleted["id"], **self.storage_kw)
+        return kept
+
+    def test_state_is_restored_from_journal(self):
+        storage = self.open_storage()
+        self.populate(storage)
+
+        self.assert_same_state(storage, self.open_storage())
+
+    def test_state_is_restored_from_snapshot_and_journal(self):
+        storage = self.open_storage()
+        self.populate(storage)
+        storage.snapshot()
+        storage.create(obj={"a": 5}, **self.storage_kw)
+        storage.purge_deleted(**self.storage_kw)
+
+        restored = self.open_storage()
+        self.assert_same_state(storage, restored)
+        filters = [Filter("a", 4, COMPARISON.GT)]
+        self.assertEqual(len(restored.list_all(filters=filters, **self.storage_kw)), 1)
+
+    def test_flush_is_persisted(self):
+        storage = self.open_storage()
+        self.populate(storage)
+        storage.flush()
+
+        self.assertEqual(self.open_storage().list_all(**self.storage_kw), [])
+
+
+class PersistedMemoryPermissionTest(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.path = tmp_dir.name
+
+    def open_permission(self):
+        permission = Permission(persistence_path=self.path)
+        self.addCleanup(permission._journal.close)
+        return permission
+
+    def test_state_is_restored_from_snapshot_and_journal(self):
+        permission = self.open_permission()
+        permission.add_user_principal("alice", "group:a")
+        permission.add_principal_to_ace("/buckets/a", "write", "alice")
+        permission.add_principal_to_ace("/buckets/b", "write", "alice")
+        permission.snapshot()
+        permission.add_user_principal("bob", "group:a")
+        permission.delete_object_permissions("/buckets/b")
+
+        restored = self.open_permission()
+        self.assertEqual(restored.get_user_principals("bob"), {"group:a"})
+        self.assertEqual(restored.get_accessible_objects(["alice"]), {"/buckets/a": {"write"}})
+        self.assertEqual(restored._object_ids, ["/buckets/a"])
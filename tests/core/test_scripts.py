@@ -110,3 +110,18 @@ class PurgeDeletedTest(unittest.TestCase):
         self.registry.storage.purge_deleted.assert_any_call(
             parent_id="*", resource_name="B", max_retained=42, force_commit=True
         )
+
+
+class ProcessEventsTest(unittest.TestCase):
+    def setUp(self):
+        self.registry = mock.MagicMock()
+
+    def test_process_events_runs_the_outbox(self):
+        code = scripts.process_events({"registry": self.registry}, once=True)
+        assert code == 0
+        self.registry.outbox.run.assert_called_with(once=True)
+
+    def test_process_events_fails_if_no_async_listener(self):
+        registry = mock.MagicMock(spec=["settings"])
+        code = scripts.process_events({"registry": registry})
+        assert code == 1
@@ -1,6 +1,12 @@
+import os
+import sqlite3
+import tempfile
+import threading
 from unittest import mock
 
 import pytest
+import transaction
+from pyramid.exceptions import ConfigurationError
 
 from kinto.core import DEFAULT_SETTINGS
 from kinto.core.storage import (
@@ -12,7 +18,10 @@ from kinto.core.storage import (
     generators,
     memory,
     postgresql,
+    sqlite,
 )
+from kinto.core.storage.sqlite import client as sqlite_client
+from kinto.core.storage.sqlite.client import SQLiteClient
 from kinto.core.storage.testing import StorageTest
 from kinto.core.testing import skip_if_no_postgresql, unittest
 from kinto.core.utils import COMPARISON, json
@@ -79,6 +88,17 @@ class StorageBaseTest(unittest.TestCase):
         for callable_, *args in calls:
             self.assertRaises(NotImplementedError, callable_, *args)
 
+    def test_list_all_by_parent_id_lists_objects_of_each_matching_parent(self):
+        self.storage.all_resources_timestamps = mock.Mock(
+            return_value={"/buckets/a": 1, "/buckets/b": 2, "/buckets/c": 3, "/other": 4}
+        )
+        self.storage.list_all = mock.Mock(side_effect=[[{"id": "x"}], [], [{"id": "y"}]])
+
+        by_parent_id = self.storage.list_all_by_parent_id("collection", "/buckets/*")
+
+        self.assertEqual(by_parent_id, {"/buckets/a": [{"id": "x"}], "/buckets/c": [{"id": "y"}]})
+        self.assertEqual(self.storage.list_all.call_count, 3)
+
     def test_backend_error_message_provides_given_message_if_defined(self):
         error = exceptions.BackendError(message="Connection Error")
         self.assertEqual(str(error), "Connection Error")
@@ -95,6 +115,29 @@ class MemoryBasedStorageTest(unittest.TestCase):
             storage.bump_and_store_timestamp("object", "/school/foo/students/bar")
 
 
+class MemoryFilteringSortingTest(unittest.TestCase):
+    def test_filters_are_all_required_with_has_operator(self):
+        objects = [{"a": 1, "b": 2}, {"a": 2, "b": 2}]
+        filters = [Filter("a", 1, COMPARISON.EQ), Filter("b", True, COMPARISON.HAS)]
+        self.assertEqual(list(memory.apply_filters(objects, filters)), [objects[0]])
+
+    def test_in_filter_supports_unhashable_values(self):
+        objects = [{"a": [1]}, {"a": 2}, {"a": {"b": 1}}]
+        filters = [Filter("a", [[1], 2], COMPARISON.IN)]
+        self.assertEqual(list(memory.apply_filters(objects, filters)), objects[:2])
+
+    def test_filters_on_nested_fields(self):
+        objects = [{"a": {"b": 1}}, {"a": {"b": 2}}, {"a.b": 1}]
+        filters = [Filter("a.b", 1, COMPARISON.EQ)]
+        self.assertEqual(list(memory.apply_filters(objects, filters)), [objects[0], objects[2]])
+
+    def test_sorting_on_several_fields_with_mixed_directions(self):
+        objects = [{"a": 1, "b": "x"}, {"a": 2, "b": "y"}, {"a": 1, "b": "z"}, {"b": "x"}]
+        sorting = [Sort("a", -1), Sort("b", 1)]
+        result = memory.apply_sorting(objects, sorting)
+        self.assertEqual(result, [objects[3], objects[1], objects[0], objects[2]])
+
+
 class MemoryStorageTest(StorageTest, unittest.TestCase):
     backend = memory
 
@@ -136,6 +179,325 @@ class MemoryStorageTest(StorageTest, unittest.TestCase):
             TypeError, self.storage.update, object_id=obj["id"], obj=new_object, **self.storage_kw
         )
 
+    def test_list_sorted_by_timestamp_stops_scanning_at_limit(self):
+        for i in range(10):
+            self.create_object({"number": i})
+        compile_filters = memory.compile_filters
+        scanned = []
+
+        def counting_compile_filters(filters):
+            matches = compile_filters(filters)
+            return lambda obj: scanned.append(obj) or matches(obj)
+
+        with mock.patch.object(memory, "compile_filters", side_effect=counting_compile_filters):
+            objects = self.storage.list_all(
+                filters=[Filter("number", 5, COMPARISON.LT)],
+                sorting=[Sort("last_modified", -1)],
+                limit=2,
+                **self.storage_kw,
+            )
+        self.assertEqual([o["number"] for o in objects], [4, 3])
+        # Objects 9 to 3 were scanned, not the whole collection.
+        self.assertEqual(len(scanned), 7)
+
+    def test_list_by_timestamp_range_uses_pagination_rules_bounds(self):
+        objects = [self.create_object({"number": i}) for i in range(5)]
+        pagination_rules = [[Filter("last_modified", objects[1]["last_modified"], COMPARISON.LT)]]
+        results = self.storage.list_all(
+            pagination_rules=pagination_rules,
+            sorting=[Sort("number", 1)],
+            **self.storage_kw,
+        )
+        self.assertEqual([o["number"] for o in results], [0])
+
+    def test_wildcard_parent_ids_are_matched_literally(self):
+        self.create_object(parent_id="/a.c/1", resource_name="test")
+        self.create_object(parent_id="/abc/1", resource_name="test")
+        objects = self.storage.list_all(parent_id="/a.c/*", resource_name="test")
+        self.assertEqual(len(objects), 1)
+
+    def test_purged_parent_ids_are_removed_from_index(self):
+        self.create_object(parent_id="/abc/a", resource_name="c")
+        self.storage.delete_all(parent_id="/abc/*", resource_name=None)
+        self.storage.purge_deleted(parent_id="/abc/*", resource_name=None)
+        self.assertEqual(self.storage._parent_ids, [])
+        self.assertEqual(self.storage._resources, {})
+
+    def test_purge_deleted_does_not_match_parent_ids_prefix(self):
+        self.create_object(parent_id="/abc", resource_name="c")
+        self.create_object(parent_id="/abcd", resource_name="c")
+        self.storage.delete_all(parent_id="/abc*", resource_name="c")
+        num_removed = self.storage.purge_deleted(parent_id="/abc", resource_name="c")
+        self.assertEqual(num_removed, 1)
+
+
+class SQLiteStorageTest(StorageTest, unittest.TestCase):
+    backend = sqlite
+    settings = {"storage_url": "sqlite:///:memory:"}
+
+    def setUp(self):
+        super().setUp()
+        self.client_error_patcher = mock.patch.object(
+            self.storage.client,
+            "_connection",
+            side_effect=sqlite3.OperationalError("disk I/O error"),
+        )
+
+    def test_create_bytes_raises(self):
+        data = {"steak": "haché".encode(encoding="utf-8")}
+        self.assertRaises(TypeError, self.create_object, data)
+
+    def test_client_is_shared_among_backend_instances(self):
+        config = self._get_config()
+        storage1 = self.backend.load_from_config(config)
+        storage2 = self.backend.load_from_config(config)
+        self.assertIs(storage1.client, storage2.client)
+
+    def test_create_does_not_overwrite_existing_object(self):
+        self.create_object({"id": "rock-and-roll"})
+
+        with mock.patch.object(self.storage, "get", side_effect=exceptions.ObjectNotFoundError):
+            with self.assertRaises(exceptions.UnicityError):
+                self.create_object({"id": "rock-and-roll", "genre": "jazz"})
+
+        self.assertNotIn("genre", self.storage.get(object_id="rock-and-roll", **self.storage_kw))
+
+    def test_failing_operation_rollbacks_transaction(self):
+        with self.assertRaises(exceptions.BackendError):
+            with self.storage.client.connect() as conn:
+                self.create_object()
+                conn.execute("INSERT INTO unknown VALUES (1);")
+
+        self.assertEqual(self.storage.list_all(**self.storage_kw), [])
+
+    def test_list_sorted_by_timestamp_stops_fetching_at_limit(self):
+        for i in range(10):
+            self.create_object({"number": i})
+        compile_filters = memory.compile_filters
+        scanned = []
+
+        def counting_compile_filters(filters):
+            matches = compile_filters(filters)
+            return lambda obj: scanned.append(obj) or matches(obj)
+
+        with mock.patch.object(memory, "compile_filters", side_effect=counting_compile_filters):
+            objects = self.storage.list_all(
+                filters=[Filter("number", 5, COMPARISON.LT)],
+                sorting=[Sort("last_modified", -1)],
+                limit=2,
+                **self.storage_kw,
+            )
+        self.assertEqual([o["number"] for o in objects], [4, 3])
+        self.assertEqual(len(scanned), 7)
+
+    def test_data_fields_equality_is_selected_by_sqlite(self):
+        self.create_object({"flavor": "strawberry"})
+        self.create_object({"flavor": "blueberry"})
+        self.create_object({"flavor": True})
+        self.create_object({"flavor": 1})
+        filters = [Filter("flavor", 1, COMPARISON.EQ)]
+
+        with mock.patch.object(self.storage, "extract_object_set") as extract:
+            extract.return_value = ([], 0)
+            self.storage.count_all(filters=filters, **self.storage_kw)
+        candidates = extract.call_args[1]["objects"]
+        # The JSON ``true`` is a candidate, refused by the filter.
+        self.assertEqual(len(candidates), 1)
+        self.assertEqual(self.storage.count_all(filters=filters, **self.storage_kw), 1)
+
+    def test_json_indexes_are_used_by_equality_filters(self):
+        storage = sqlite.Storage(client=self.storage.client, json_indexes=["flavor"])
+        storage.initialize_schema()
+        condition, _, _ = sqlite._filter_condition(
+            Filter("flavor", "strawberry", COMPARISON.EQ), "id", "last_modified"
+        )
+        query = (
+            "EXPLAIN QUERY PLAN SELECT id FROM objects"
+            f" WHERE parent_id = ? AND resource_name = ? AND {condition}"
+        )
+        with storage.client.connect(readonly=True) as conn:
+            plan = conn.execute(query, ("1234", "test", "strawberry")).fetchall()
+        self.assertIn("idx_objects_data_flavor", str(plan))
+
+    def test_json_indexes_fields_are_validated(self):
+        with self.assertRaises(ValueError):
+            sqlite.Storage(client=self.storage.client, json_indexes=["a') --"])
+
+
+class SQLiteClientTest(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.client = SQLiteClient(os.path.join(tmp_dir.name, "kinto.sqlite"))
+        self.addCleanup(transaction.abort)
+
+    def test_database_file_is_opened_in_wal_mode(self):
+        with self.client.connect(readonly=True) as conn:
+            (mode,) = conn.execute("PRAGMA journal_mode;").fetchone()
+        self.assertEqual(mode, "wal")
+
+    def test_each_thread_has_its_own_connection(self):
+        connections = []
+
+        def connect():
+            with self.client.connect(readonly=True) as conn:
+                connections.append(conn)
+
+        connect()
+        connect()
+        thread = threading.Thread(target=connect)
+        thread.start()
+        thread.join()
+        self.assertIs(connections[0], connections[1])
+        self.assertIsNot(connections[0], connections[2])
+
+    def test_nested_contexts_share_the_transaction(self):
+        with self.client.connect() as conn:
+            conn.execute("CREATE TABLE t (a INTEGER);")
+        with self.assertRaises(ValueError):
+            with self.client.connect() as conn:
+                conn.execute("INSERT INTO t VALUES (1);")
+                with self.client.connect() as nested:
+                    nested.execute("INSERT INTO t VALUES (2);")
+                raise ValueError()
+        with self.client.connect(readonly=True) as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM t;").fetchone(), (0,))
+
+    def count_rows(self):
+        with self.client.connect(readonly=True) as conn:
+            return conn.execute("SELECT COUNT(*) FROM t;").fetchone()[0]
+
+    def test_writes_are_committed_along_with_the_current_transaction(self):
+        self.client.transaction_per_request = True
+        self.client.execute_script("CREATE TABLE t (a INTEGER);")
+        with transaction.manager:
+            with self.client.connect() as conn:
+                conn.execute("INSERT INTO t VALUES (1);")
+            with self.client.connect() as conn:
+                conn.execute("INSERT INTO t VALUES (2);")
+        self.assertEqual(self.count_rows(), 2)
+
+    def test_writes_are_rolled_back_along_with_the_current_transaction(self):
+        self.client.transaction_per_request = True
+        self.client.execute_script("CREATE TABLE t (a INTEGER);")
+        with self.assertRaises(ValueError):
+            with transaction.manager:
+                with self.client.connect() as conn:
+                    conn.execute("INSERT INTO t VALUES (1);")
+                raise ValueError()
+        self.assertEqual(self.count_rows(), 0)
+
+    def test_forced_writes_are_committed_apart_from_the_current_transaction(self):
+        self.client.transaction_per_request = True
+        self.client.execute_script("CREATE TABLE t (a INTEGER);")
+        current = transaction.begin()
+        with self.client.connect(force_commit=True) as conn:
+            conn.execute("INSERT INTO t VALUES (1);")
+        other = sqlite3.connect(self.client.path)
+        self.addCleanup(other.close)
+        self.assertEqual(other.execute("SELECT COUNT(*) FROM t;").fetchone(), (1,))
+        current.abort()
+        self.assertEqual(self.count_rows(), 1)
+
+    def test_forced_writes_cannot_wait_for_the_write_transaction_of_the_thread(self):
+        self.client.transaction_per_request = True
+        self.client.execute_script("CREATE TABLE t (a INTEGER);")
+        transaction.begin()
+        with self.client.connect() as conn:
+            conn.execute("INSERT INTO t VALUES (1);")
+        with self.assertRaises(exceptions.BackendError):
+            with self.client.connect(force_commit=True) as conn:
+                conn.execute("INSERT INTO t VALUES (2);")
+        transaction.abort()
+        self.assertEqual(self.count_rows(), 0)
+
+    def test_writes_outside_a_begun_transaction_are_committed_at_once(self):
+        self.client.transaction_per_request = True
+        self.client.execute_script("CREATE TABLE t (a INTEGER);")
+        with transaction.manager:
+            with self.client.connect() as conn:
+                conn.execute("INSERT INTO t VALUES (1);")
+        # Implicitly started transactions are never committed by anyone.
+        transaction.get()
+        with self.client.connect() as conn:
+            conn.execute("INSERT INTO t VALUES (2);")
+        other = sqlite3.connect(self.client.path, timeout=0)
+        self.addCleanup(other.close)
+        with other:
+            other.execute("INSERT INTO t VALUES (3);")
+        self.assertEqual(self.count_rows(), 3)
+
+    def test_writes_after_commit_are_committed_apart(self):
+        self.client.transaction_per_request = True
+        self.client.execute_script("CREATE TABLE t (a INTEGER);")
+
+        def insert(success):
+            with self.client.connect() as conn:
+                conn.execute("INSERT INTO t VALUES (1);")
+
+        with transaction.manager as current:
+            current.addAfterCommitHook(insert)
+        self.assertEqual(self.count_rows(), 1)
+
+    def test_commit_errors_abort_the_current_transaction(self):
+        self.client.transaction_per_request = True
+        self.client.execute_script("CREATE TABLE t (a INTEGER);")
+        with self.assertRaises(exceptions.BackendError):
+            with transaction.manager:
+                with self.client.connect() as conn:
+                    conn.execute("INSERT INTO t VALUES (1);")
+                    conn.execute("COMMIT;")
+        transaction.abort()
+        self.assertEqual(self.count_rows(), 1)
+        with self.client.connect() as conn:
+            conn.execute("INSERT INTO t VALUES (2);")
+        self.assertEqual(self.count_rows(), 2)
+
+    def test_in_memory_database_is_released_once_the_transaction_is_over(self):
+        self.client = SQLiteClient(sqlite_client.MEMORY_DATABASE, transaction_per_request=True)
+        self.client.execute_script("CREATE TABLE t (a INTEGER);")
+        with transaction.manager:
+            with self.client.connect() as conn:
+                conn.execute("INSERT INTO t VALUES (1);")
+
+        def insert():
+            with self.client.connect(force_commit=True) as conn:
+                conn.execute("INSERT INTO t VALUES (2);")
+
+        thread = threading.Thread(target=insert)
+        thread.start()
+        thread.join(timeout=5)
+        self.assertEqual(self.count_rows(), 2)
+
+    def create_from_config(self, path, **kwargs):
+        config = mock.Mock()
+        config.get_settings.return_value = {"cache_url": path, "storage_url": path}
+        self.addCleanup(sqlite_client._CLIENTS.pop, path, None)
+        self.addCleanup(sqlite_client._EXCLUSIVE_CLIENTS.pop, path, None)
+        return sqlite_client.create_from_config(config, **kwargs)
+
+    def test_exclusive_clients_refuse_the_database_of_other_backends(self):
+        self.create_from_config(self.client.path, prefix="storage_")
+        with self.assertRaises(ConfigurationError):
+            self.create_from_config(self.client.path, prefix="cache_", exclusive=True)
+
+    def test_backends_refuse_the_database_of_exclusive_clients(self):
+        self.create_from_config(self.client.path, prefix="cache_", exclusive=True)
+        with self.assertRaises(ConfigurationError):
+            self.create_from_config(self.client.path, prefix="storage_")
+
+    def test_in_memory_exclusive_clients_have_their_own_database(self):
+        shared = self.create_from_config("", prefix="storage_")
+        exclusive = self.create_from_config("", prefix="cache_", exclusive=True)
+        self.assertIsNot(shared, exclusive)
+        self.assertIs(self.create_from_config("", prefix="cache_", exclusive=True), exclusive)
+
+    def test_database_path_is_read_from_url(self):
+        self.assertEqual(sqlite_client.database_path("sqlite:////tmp/a.db"), "/tmp/a.db")
+        self.assertEqual(sqlite_client.database_path("sqlite:///a.db"), "a.db")
+        self.assertEqual(sqlite_client.database_path("/tmp/a.db"), "/tmp/a.db")
+        self.assertEqual(sqlite_client.database_path(""), ":memory:")
+
 
 @pytest.mark.xdist_group("postgres")
 @skip_if_no_postgresql
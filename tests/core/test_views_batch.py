@@ -1,12 +1,19 @@
+import threading
 import unittest
 import uuid
 from unittest import mock
 
 import colander
+import transaction
+from pyramid import httpexceptions
+from pyramid.interfaces import ISecurityPolicy
 from pyramid.response import Response
 
-from kinto.core.testing import DummyRequest
+from kinto.core.events import AfterResourceRead
+from kinto.core.resource import Resource
+from kinto.core.testing import DummyRequest, get_user_headers
 from kinto.core.utils import json
+from kinto.core.views import batch as batch_views
 from kinto.core.views.batch import BatchPayloadSchema
 from kinto.core.views.batch import batch as batch_service
 
@@ -161,6 +168,128 @@ class BatchViewTest(BaseWebTest, unittest.TestCase):
         self.assertEqual(resp.json["responses"][0]["status"], 201)
         self.assertEqual(resp.json["responses"][1]["status"], 412)
 
+    def test_subrequests_are_authenticated_as_the_batch(self):
+        policy = self.app.app.registry.queryUtility(ISecurityPolicy).get_policies()[0][1]
+        with mock.patch.object(
+            policy, "unauthenticated_userid", wraps=policy.unauthenticated_userid
+        ) as checked:
+            requests = [{"path": "/"}, {"path": "/mushrooms"}, {"path": "/mushrooms"}]
+            resp = self.app.post_json("/batch", {"requests": requests}, headers=self.headers)
+
+        self.assertEqual(checked.call_count, 1)
+        self.assertEqual(resp.json["responses"][0]["body"]["user"]["id"], self.principal)
+        self.assertEqual([r["status"] for r in resp.json["responses"]], [200, 200, 200])
+
+    def test_subrequests_are_anonymous_if_the_batch_is(self):
+        requests = [{"path": "/"}, {"path": "/"}]
+        resp = self.app.post_json("/batch", {"requests": requests})
+        self.assertEqual([r["body"].get("user") for r in resp.json["responses"]], [None, None])
+
+    def test_subrequests_with_other_credentials_are_authenticated_apart(self):
+        headers = get_user_headers("alice")
+        requests = [{"path": "/"}, {"path": "/", "headers": headers}]
+        resp = self.app.post_json("/batch", {"requests": requests}, headers=self.headers)
+        user_ids = [r["body"]["user"]["id"] for r in resp.json["responses"]]
+        self.assertEqual(user_ids[0], self.principal)
+        self.assertNotIn(user_ids[1], (self.principal, None))
+
+
+class ParallelBatchViewTest(BatchViewTest):
+    @classmethod
+    def get_app_settings(cls, extras=None):
+        settings = super().get_app_settings(extras)
+        settings["batch_parallel_workers"] = 4
+        return settings
+
+    def setUp(self):
+        super().setUp()
+        patch = mock.patch(
+            "kinto.core.views.batch._follow_read_subrequest",
+            wraps=batch_views._follow_read_subrequest,
+        )
+        self.follow_read = patch.start()
+        self.addCleanup(patch.stop)
+
+    def create_mushrooms(self, count):
+        return [
+            self.app.post_json(
+                "/mushrooms", {"data": {"name": f"mushroom-{i}"}}, headers=self.headers
+            ).json["data"]
+            for i in range(count)
+        ]
+
+    def test_reads_are_run_apart_and_returned_in_order(self):
+        mushrooms = self.create_mushrooms(5)
+        requests = [{"path": f"/mushrooms/{m['id']}"} for m in mushrooms]
+        requests.append({"path": f"/mushrooms/{uuid.uuid4()}"})
+
+        resp = self.app.post_json("/batch", {"requests": requests}, headers=self.headers)
+
+        self.assertEqual(self.follow_read.call_count, 6)
+        responses = resp.json["responses"]
+        self.assertEqual([r["body"]["data"] for r in responses[:5]], mushrooms)
+        self.assertEqual(responses[5]["status"], 404)
+
+    def test_reads_after_a_write_are_run_in_the_batch_transaction(self):
+        (mushroom,) = self.create_mushrooms(1)
+        url = f"/mushrooms/{mushroom['id']}"
+        requests = [
+            {"path": url},
+            {"path": url},
+            {"method": "PATCH", "path": url, "body": {"data": {"name": "changed"}}},
+            {"path": url},
+        ]
+
+        resp = self.app.post_json("/batch", {"requests": requests}, headers=self.headers)
+
+        self.assertEqual(self.follow_read.call_count, 2)
+        names = [r["body"]["data"]["name"] for r in resp.json["responses"]]
+        self.assertEqual(names, ["mushroom-0", "mushroom-0", "changed", "changed"])
+
+    def test_single_read_is_not_run_apart(self):
+        self.app.post_json("/batch", {"requests": [{"path": "/"}]}, headers=self.headers)
+        self.assertFalse(self.follow_read.called)
+
+    def test_reads_are_not_run_apart_if_disabled(self):
+        self.app.app.registry.settings["batch_parallel_workers"] = 0
+        self.addCleanup(self.app.app.registry.settings.__setitem__, "batch_parallel_workers", 4)
+        requests = [{"path": "/"}, {"path": "/mushrooms"}]
+        self.app.post_json("/batch", {"requests": requests}, headers=self.headers)
+        self.assertFalse(self.follow_read.called)
+
+    def test_conflicts_of_reads_abort_the_batch_from_its_thread(self):
+        aborted_by = []
+        abort = transaction.TransactionManager.abort
+
+        def record_abort(tm):
+            aborted_by.append(threading.current_thread().name)
+            return abort(tm)
+
+        requests = [{"path": f"/mushrooms/{m['id']}"} for m in self.create_mushrooms(2)]
+        with mock.patch.object(transaction.TransactionManager, "abort", record_abort):
+            with mock.patch.object(
+                Resource, "_get_object_or_404", side_effect=httpexceptions.HTTPConflict()
+            ):
+                resp = self.app.post_json("/batch", {"requests": requests}, headers=self.headers)
+
+        self.assertEqual([r["status"] for r in resp.json["responses"]], [409, 409])
+        self.assertTrue(aborted_by)
+        self.assertFalse([name for name in aborted_by if name.startswith("batch")])
+
+    def test_read_events_of_subrequests_are_notified(self):
+        self.create_mushrooms(2)
+        events = []
+        self.app.app.registry.registerHandler(events.append, (AfterResourceRead,))
+        self.addCleanup(
+            self.app.app.registry.unregisterHandler, events.append, (AfterResourceRead,)
+        )
+        requests = [{"path": "/mushrooms"}, {"path": "/mushrooms"}]
+
+        self.app.post_json("/batch", {"requests": requests}, headers=self.headers)
+
+        (event,) = events
+        self.assertEqual(len(event.read_objects), 4)
+
 
 class BatchSchemaTest(unittest.TestCase):
     def setUp(self):
@@ -301,7 +430,10 @@ class BatchServiceTest(unittest.TestCase):
 
     def post(self, validated):
         self.request.validated = {"body": validated}
-        return self.view(self.request)
+        response = self.view(self.request)
+        if response is None:
+            return None
+        return json.loads(response.body)
 
     def test_returns_empty_list_of_responses_if_requests_empty(self):
         result = self.post({"requests": []})
@@ -366,6 +498,14 @@ class BatchServiceTest(unittest.TestCase):
         self.assertEqual(subrequest.path, "/v0/test")
         self.assertEqual(subrequest.GET["param"], "©")
 
+    def test_json_response_body_is_embedded_without_being_decoded(self):
+        response = Response(json={"data": [{"id": "abc"}]})
+        self.request.invoke_subrequest.return_value = response
+        with mock.patch.object(Response, "json", new_callable=mock.PropertyMock) as decoded:
+            resp = self.post({"requests": [{"path": "/test"}]})
+        self.assertFalse(decoded.called)
+        self.assertEqual(resp["responses"][0]["body"], {"data": [{"id": "abc"}]})
+
     def test_subrequests_responses_paths_are_url_decoded(self):
         request = {"path": "/test?param=©"}
         resp = self.post({"requests": [request]})
@@ -377,7 +517,7 @@ class BatchServiceTest(unittest.TestCase):
         self.request.invoke_subrequest.return_value = response
         request = {"path": "/test"}
         resp = self.post({"requests": [request]})
-        body = resp["responses"][0]["body"].decode("utf-8")
+        body = resp["responses"][0]["body"]
         self.assertEqual(body, "Internal Error")
 
     def test_number_of_requests_is_not_limited_when_settings_set_to_none(self):
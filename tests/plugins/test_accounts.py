@@ -62,6 +62,36 @@ class AccountCreationTest(AccountsWebTest):
         resp = self.app.get("/", headers=get_user_headers("me", "bouh"))
         assert resp.json["user"]["id"] == "account:me"
 
+    def test_authentication_is_accepted_once_account_is_created_in_batch(self):
+        requests = [
+            {"method": "PUT", "path": "/accounts/me", "body": {"data": {"password": "bouh"}}},
+            {"path": "/"},
+        ]
+        resp = self.app.post_json(
+            "/batch", {"requests": requests}, headers=get_user_headers("me", "bouh")
+        )
+        assert resp.json["responses"][1]["body"]["user"]["id"] == "account:me"
+
+    def test_authentication_is_refused_once_account_is_deleted_in_batch(self):
+        self.app.post_json("/accounts", {"data": {"id": "me", "password": "bouh"}}, status=201)
+        requests = [{"path": "/"}, {"method": "DELETE", "path": "/accounts/me"}, {"path": "/"}]
+        resp = self.app.post_json(
+            "/batch", {"requests": requests}, headers=get_user_headers("me", "bouh")
+        )
+        assert resp.json["responses"][0]["body"]["user"]["id"] == "account:me"
+        assert "user" not in resp.json["responses"][2]["body"]
+
+    def test_authentication_is_refused_once_password_is_changed_in_batch(self):
+        self.app.post_json("/accounts", {"data": {"id": "me", "password": "bouh"}}, status=201)
+        requests = [
+            {"method": "PATCH", "path": "/accounts/me", "body": {"data": {"password": "bah"}}},
+            {"path": "/"},
+        ]
+        resp = self.app.post_json(
+            "/batch", {"requests": requests}, headers=get_user_headers("me", "bouh")
+        )
+        assert "user" not in resp.json["responses"][1]["body"]
+
     def test_password_field_is_mandatory(self):
         self.app.post_json("/accounts", {"data": {"id": "me"}}, status=400)
 
@@ -3,6 +3,7 @@ from unittest import mock
 
 import jwt
 
+from kinto.core.cache import memory as memory_backend
 from kinto.core.testing import DummyRequest
 from kinto.plugins.openid import OpenIDConnectPolicy
 from kinto.plugins.openid.utils import fetch_openid_config
@@ -141,7 +142,11 @@ class PolicyTest(unittest.TestCase):
         self.policy = OpenIDConnectPolicy(issuer="https://idp", client_id="abc")
 
         self.request = DummyRequest()
-        self.request.registry.cache.get.return_value = None
+        cache = memory_backend.Cache(cache_prefix="")
+        self.request.registry.cache = cache
+        mock.patch.object(cache, "get", return_value=None).start()
+        mock.patch.object(cache, "set", wraps=cache.set).start()
+        self.addCleanup(mock.patch.stopall)
 
         mocked = mock.patch.object(self.policy, "_verify_token")
         self.verify = mocked.start()
@@ -349,6 +349,24 @@ class TestMain(unittest.TestCase):
             assert res == mock.sentinel.purge_deleted
             assert purge_deleted.call_count == 1
 
+    def test_cli_process_events_runs_process_events_script(self):
+        with mock.patch("kinto.core.scripts.process_events") as process_events:
+            process_events.return_value = mock.sentinel.process_events
+            main(
+                [
+                    "init",
+                    "--ini",
+                    TEMP_KINTO_INI,
+                    "--backend",
+                    "memory",
+                    "--cache-backend",
+                    "memory",
+                ]
+            )
+            res = main(["process-events", "--ini", TEMP_KINTO_INI, "--once"])
+            assert res == mock.sentinel.process_events
+            process_events.assert_called_with(mock.ANY, once=True)
+
     def test_cli_purge_deleted_fails_if_no_max_retained(self):
         with mock.patch("kinto.core.scripts.purge_deleted"):
             main(
@@ -1,5 +1,7 @@
 import unittest
+from unittest import mock
 
+import transaction
 from pyramid.config import Configurator
 
 from kinto.core import events, utils
@@ -223,6 +225,15 @@ class DeleteUserDataTest(BaseWebTest, unittest.TestCase):
     def test_double_delete_is_ok(self):
         self.app.delete(self.delete_user_url, headers=self.headers)
 
+    def test_cached_principals_are_invalidated_once_committed(self):
+        statuses = []
+        with mock.patch(
+            "kinto.views.admin.invalidate_principals_cache",
+            side_effect=lambda request: statuses.append(transaction.get().status),
+        ):
+            self.app.delete(self.delete_user_url, headers=self.headers)
+        self.assertEqual(statuses, ["Committed"])
+
     def test_cannot_delete_user_without_permission(self):
         # Only the user with self.headers can access this URL.
         self.app.delete(self.delete_user_url, headers=self.doomed_user, status=403)
@@ -1,7 +1,8 @@
 import unittest
+from unittest import mock
 
 from kinto.core.errors import ERRORS
-from kinto.core.testing import FormattedErrorMixin
+from kinto.core.testing import FormattedErrorMixin, get_user_headers
 
 from .support import MINIMALIST_BUCKET, MINIMALIST_GROUP, BaseWebTest
 
@@ -226,3 +227,47 @@ class GroupManagementTest(BaseWebTest, unittest.TestCase):
         valid = {"permissions": {"write": ["github:me"]}}
         self.app.put_json(self.group_url, MINIMALIST_GROUP, headers=self.headers)
         self.app.patch_json(self.group_url, valid, headers=self.headers)
+
+
+class CachedPrincipalsTest(BaseWebTest, unittest.TestCase):
+    @classmethod
+    def get_app_settings(cls, extras=None):
+        settings = super().get_app_settings(extras)
+        settings["principals_cache_ttl_seconds"] = 30
+        return settings
+
+    def setUp(self):
+        super().setUp()
+        self.create_bucket("beers")
+        self.alice_headers = {**self.headers, **get_user_headers("alice")}
+        resp = self.app.get("/", headers=self.alice_headers)
+        self.alice_principal = resp.json["user"]["id"]
+        group = {"data": {"members": []}, "permissions": {"write": [self.principal]}}
+        self.app.put_json("/buckets/beers/groups/readers", group, headers=self.headers)
+        bucket = {"permissions": {"read": ["/buckets/beers/groups/readers"]}}
+        self.app.patch_json("/buckets/beers", bucket, headers=self.headers)
+
+    def test_principals_are_served_from_cache(self):
+        self.app.get("/buckets/beers", headers=self.alice_headers, status=403)
+        with mock.patch.object(self.permission, "get_user_principals") as mocked:
+            self.app.get("/buckets/beers", headers=self.alice_headers, status=403)
+        self.assertFalse(mocked.called)
+
+    def test_group_members_changes_invalidate_the_cache(self):
+        self.app.get("/buckets/beers", headers=self.alice_headers, status=403)
+
+        group = {"data": {"members": [self.alice_principal]}}
+        self.app.patch_json("/buckets/beers/groups/readers", group, headers=self.headers)
+        self.app.get("/buckets/beers", headers=self.alice_headers, status=200)
+
+        group = {"data": {"members": []}}
+        self.app.patch_json("/buckets/beers/groups/readers", group, headers=self.headers)
+        self.app.get("/buckets/beers", headers=self.alice_headers, status=403)
+
+    def test_group_deletion_invalidates_the_cache(self):
+        group = {"data": {"members": [self.alice_principal]}}
+        self.app.patch_json("/buckets/beers/groups/readers", group, headers=self.headers)
+        self.app.get("/buckets/beers", headers=self.alice_headers, status=200)
+
+        self.app.delete("/buckets/beers/groups/readers", headers=self.headers)
+        self.app.get("/buckets/beers", headers=self.alice_headers, status=403)
@@ -1,5 +1,7 @@
 import unittest
+from unittest import mock
 
+from kinto.core import utils as core_utils
 from kinto.core.testing import get_user_headers
 
 from .support import (
@@ -208,6 +210,14 @@ class EntriesTest(PermissionsViewTest):
         page2 = resp.json["data"]
         assert len(page1 + page2) == 11  # see setup().
 
+    def test_only_entries_of_current_page_are_built(self):
+        with mock.patch(
+            "kinto.views.permissions.core_utils.view_lookup", wraps=core_utils.view_lookup
+        ) as mocked:
+            self.app.get("/permissions?_limit=2", headers=self.headers)
+        # One more entry is fetched to know whether there is a next page.
+        self.assertEqual(mocked.call_count, 3)
+
     def test_permissions_can_be_paginated_with_uri_in_sorting(self):
         for i in range(10):
             self.app.put_json(
@@ -354,6 +364,30 @@ class SettingsPermissionsTest(PermissionsViewTest):
         self.assertIn("record:create", collections[0]["permissions"])
         self.assertIn("read", collections[0]["permissions"])
 
+    def test_settings_objects_are_fetched_once_for_every_bucket(self):
+        self.app.put_json("/buckets/wines", MINIMALIST_BUCKET, headers=self.headers)
+        self.app.put_json(
+            "/buckets/wines/collections/red", MINIMALIST_COLLECTION, headers=self.headers
+        )
+        storage = self.app.app.registry.storage
+        with mock.patch.object(
+            storage, "list_all_by_parent_id", wraps=storage.list_all_by_parent_id
+        ) as mocked:
+            resp = self.app.get("/permissions", headers=get_user_headers("any"))
+
+        self.assertEqual(mocked.call_count, 2)  # buckets and collections.
+        uris = sorted(e["uri"] for e in resp.json["data"])
+        self.assertEqual(
+            uris,
+            [
+                "/",
+                "/buckets/beers",
+                "/buckets/beers/collections/barley",
+                "/buckets/wines",
+                "/buckets/wines/collections/red",
+            ],
+        )
+
 
 class DeletedObjectsTest(PermissionsViewTest):
     def setUp(self):